@@ -62,6 +62,7 @@ api = Api(
     - `per_page`: Items per page (default: 20, max: 100)
     - `sort_by`: Sort field (default: created_at)
     - `sort_order`: Sort direction (asc/desc, default: desc)
+    - `cursor`: Keyset cursor from a previous page's `next_cursor` (files list)
     
     ### Filtering and Search
     Most list endpoints support filtering and full-text search:
@@ -1,20 +1,28 @@
 """
 Files API endpoints.
 """
-from flask import request, send_file, current_app
+from flask import request, send_file, current_app, g
 from flask_restx import Namespace, Resource, fields
 from flask_login import current_user
 from werkzeug.utils import secure_filename
+from sqlalchemy import and_, or_
+import base64
+import binascii
+import hashlib
 import os
+import tempfile
 import uuid
 from datetime import datetime
 
-from models import db
+from models import db, UploadedFile
 from security.authentication import enhanced_login_required
 from security.validation import FileUploadSchema, validate_request_data, InputValidator
 from security.audit import get_audit_logger
 from monitoring.logging_config import audit_logger as app_logger
 
+# Temporary upload files older than this are left over from failed uploads
+BLOB_SWEEP_GRACE_SECONDS = 3600
+
 # Create namespace
 files_ns = Namespace('files', description='File management operations')
 
@@ -43,7 +51,8 @@ file_list_model = files_ns.model('FileList', {
     'total': fields.Integer(description='Total number of files'),
     'page': fields.Integer(description='Current page'),
     'per_page': fields.Integer(description='Files per page'),
-    'pages': fields.Integer(description='Total pages')
+    'pages': fields.Integer(description='Total pages'),
+    'next_cursor': fields.String(description='Pass as ?cursor= to fetch the next page')
 })
 
 
@@ -68,6 +77,7 @@ class FileManager:
             'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             'text/plain', 'text/csv'
         }
+        self.chunk_size = 64 * 1024
     
     def is_allowed_file(self, filename, mime_type):
         """Check if file is allowed."""
@@ -102,47 +112,89 @@ class FileManager:
         if file_size > self.max_file_size:
             return None, f"File size exceeds maximum allowed size of {self.max_file_size // (1024*1024)}MB"
         
-        # Generate unique filename
         file_id = str(uuid.uuid4())
         original_filename = secure_filename(file.filename)
-        extension = original_filename.rsplit('.', 1)[1].lower()
-        stored_filename = f"{file_id}.{extension}"
-        
-        # Create upload directory if it doesn't exist
-        upload_path = os.path.join(current_app.root_path, self.upload_folder)
-        if report_id:
-            upload_path = os.path.join(upload_path, 'reports', str(report_id))
-        
-        os.makedirs(upload_path, exist_ok=True)
         
-        # Save file
-        file_path = os.path.join(upload_path, stored_filename)
-        file.save(file_path)
+        # Hash while copying to a temporary file, then keep one blob per content
+        upload_root = self.upload_root()
+        os.makedirs(os.path.join(upload_root, 'blobs'), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(upload_root, 'blobs'), prefix='.upload-')
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in iter(lambda: file.stream.read(self.chunk_size), b''):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            
+            record = UploadedFile(
+                id=file_id,
+                report_id=str(report_id) if report_id else None,
+                filename=original_filename,
+                sha256=digest.hexdigest(),
+                size=file_size,
+                mime_type=file.content_type,
+                uploaded_by=getattr(getattr(g, 'current_user', None) or current_user, 'email', None),
+                created_at=datetime.utcnow()
+            )
+            blob_path = os.path.join(upload_root, record.blob_name)
+            
+            # The row is committed before the blob is looked at, so a sweep
+            # either sees the reference or has already moved the blob away
+            db.session.add(record)
+            db.session.commit()
+            self._publish_blob(tmp_path, blob_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         
-        # Store file metadata (in a real implementation, this would go to database)
         file_metadata = {
             'file_id': file_id,
             'original_filename': original_filename,
-            'stored_filename': stored_filename,
-            'file_path': file_path,
+            'stored_filename': record.blob_name,
+            'file_path': blob_path,
             'file_size': file_size,
+            'sha256': record.sha256,
             'mime_type': file.content_type,
-            'upload_date': datetime.utcnow(),
-            'uploaded_by': current_user.id,
-            'report_id': report_id
+            'upload_date': record.created_at,
+            'uploaded_by': record.uploaded_by,
+            'report_id': record.report_id
         }
         
         return file_metadata, None
     
+    @staticmethod
+    def _publish_blob(tmp_path, blob_path):
+        """Move an upload into place unless its content is already stored."""
+        if os.path.exists(blob_path):
+            os.remove(tmp_path)
+            return
+        from services.storage_accounting import storage_accountant
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        with storage_accountant.track_write(blob_path):
+            os.replace(tmp_path, blob_path)
+    
+    def upload_root(self):
+        return os.path.join(current_app.root_path, self.upload_folder)
+    
+    def get_file(self, file_id, report_id=None):
+        """Get the metadata row for a file ID, or None."""
+        record = db.session.get(UploadedFile, file_id)
+        if record is None or (report_id and record.report_id != str(report_id)):
+            return None
+        return record
+    
     def get_file_path(self, file_id, report_id=None):
         """Get file path by file ID."""
-        # In a real implementation, this would query the database
-        # For now, we'll construct the path based on the pattern
-        upload_path = os.path.join(current_app.root_path, self.upload_folder)
+        record = self.get_file(file_id, report_id)
+        if record is not None:
+            return os.path.join(self.upload_root(), record.blob_name)
+        
+        # Files uploaded before metadata was stored are found by name
+        upload_path = self.upload_root()
         if report_id:
             upload_path = os.path.join(upload_path, 'reports', str(report_id))
         
-        # Find file with matching ID
         if os.path.exists(upload_path):
             for filename in os.listdir(upload_path):
                 if filename.startswith(file_id):
@@ -150,14 +202,127 @@ class FileManager:
         
         return None
     
+    def list_files(self, report_id=None, per_page=20, cursor=None, page=1):
+        """
+        One page of uploads, newest first: ``(records, total, next_cursor)``.
+        
+        Pages are keyset-paginated on ``(created_at, id)``; ``page`` is still
+        honoured without a cursor for older clients but costs an OFFSET scan.
+        Raises ValueError for a malformed cursor.
+        """
+        query = UploadedFile.query
+        if report_id:
+            query = query.filter(UploadedFile.report_id == str(report_id))
+        total = query.order_by(None).count()
+        
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                UploadedFile.created_at < created_at,
+                and_(UploadedFile.created_at == created_at, UploadedFile.id < last_id)
+            ))
+        query = query.order_by(UploadedFile.created_at.desc(), UploadedFile.id.desc())
+        if not cursor and page > 1:
+            query = query.offset((page - 1) * per_page)
+        
+        # One extra row tells whether there is a next page
+        records = query.limit(per_page + 1).all()
+        next_cursor = encode_cursor(records[per_page - 1]) if len(records) > per_page else None
+        return records[:per_page], total, next_cursor
+    
     def delete_file(self, file_id, report_id=None):
-        """Delete file by file ID."""
+        """
+        Delete file by ID.
+        
+        Only the row is deleted; blobs no upload refers to any more are
+        removed by :meth:`sweep_blobs`, since another upload of the same
+        content may be about to commit a reference to it.
+        """
+        from services.storage_accounting import storage_accountant
+        
+        record = self.get_file(file_id, report_id)
+        if record is not None:
+            db.session.delete(record)
+            db.session.commit()
+            return True
+        
         file_path = self.get_file_path(file_id, report_id)
         if file_path and os.path.exists(file_path):
-            os.remove(file_path)
+            storage_accountant.remove(file_path)
             return True
         return False
 
+    
+    def sweep_blobs(self, grace_seconds=BLOB_SWEEP_GRACE_SECONDS):
+        """
+        Remove blobs no upload row refers to, and temporary files of uploads
+        that died more than ``grace_seconds`` ago.
+        
+        An unreferenced blob is first renamed aside and its references are
+        checked again: an upload that committed a row in between either
+        finds the blob gone and publishes its own copy, or is seen by the
+        second check, in which case the blob is moved back.
+        """
+        from services.storage_accounting import storage_accountant
+        
+        upload_root = self.upload_root()
+        blob_root = os.path.join(upload_root, 'blobs')
+        cutoff = datetime.now().timestamp() - grace_seconds
+        removed = 0
+        for root, _dirs, files in os.walk(blob_root):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.startswith('.'):
+                    # In-flight uploads and sweeps that were interrupted
+                    try:
+                        if os.path.getmtime(path) < cutoff:
+                            storage_accountant.remove(path)
+                            removed += 1
+                    except OSError:
+                        pass
+                    continue
+                
+                blob_name = os.path.relpath(path, upload_root)
+                if self._blob_referenced(blob_name):
+                    continue
+                quarantine = os.path.join(root, f".sweep-{name}")
+                try:
+                    os.replace(path, quarantine)
+                except OSError:
+                    continue
+                if self._blob_referenced(blob_name):
+                    os.replace(quarantine, path)
+                    continue
+                storage_accountant.remove(quarantine)
+                removed += 1
+        return removed
+    
+    @staticmethod
+    def _blob_referenced(blob_name):
+        sha256 = os.path.basename(blob_name).split('.', 1)[0]
+        # End the read transaction so rows committed meanwhile are visible
+        db.session.rollback()
+        return any(
+            record.blob_name == blob_name
+            for record in UploadedFile.query.filter_by(sha256=sha256).all()
+        )
+
+
+def encode_cursor(record):
+    """Opaque listing cursor pointing just past ``record``."""
+    raw = f"{record.created_at.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` from a listing cursor; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, file_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), file_id
+    except (UnicodeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
 
 # Global file manager instance - lazy loaded
 file_manager = None
@@ -241,7 +406,11 @@ class FileResource(Resource):
             details={'report_id': report_id}
         )
         
+        record = get_file_manager().get_file(file_id, report_id)
         try:
+            if record is not None:
+                return send_file(file_path, mimetype=record.mime_type, as_attachment=True,
+                                 download_name=record.filename)
             return send_file(file_path, as_attachment=True)
         except Exception as e:
             app_logger.error(f"File download failed: {str(e)}")
@@ -282,47 +451,32 @@ class FilesListResource(Resource):
         """Get list of uploaded files."""
         # Get query parameters
         page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        per_page = max(min(request.args.get('per_page', 20, type=int), 100), 1)
         report_id = request.args.get('report_id')
+        cursor = request.args.get('cursor')
         
-        # In a real implementation, this would query the database
-        # For now, return a placeholder response
-        files_data = []
-        
-        # Scan upload directory
-        upload_path = os.path.join(current_app.root_path, get_file_manager().upload_folder)
-        if report_id:
-            upload_path = os.path.join(upload_path, 'reports', str(report_id))
-        
-        if os.path.exists(upload_path):
-            for filename in os.listdir(upload_path):
-                if os.path.isfile(os.path.join(upload_path, filename)):
-                    file_id = filename.split('.')[0]
-                    file_path = os.path.join(upload_path, filename)
-                    file_stat = os.stat(file_path)
-                    
-                    files_data.append({
-                        'file_id': file_id,
-                        'filename': filename,
-                        'file_size': file_stat.st_size,
-                        'file_type': 'application/octet-stream',  # Would be stored in DB
-                        'upload_date': datetime.fromtimestamp(file_stat.st_ctime).isoformat(),
-                        'uploaded_by': current_user.id,  # Would be stored in DB
-                        'url': f"/api/v1/files/{file_id}"
-                    })
-        
-        # Simple pagination
-        total = len(files_data)
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated_files = files_data[start:end]
+        try:
+            records, total, next_cursor = get_file_manager().list_files(report_id, per_page, cursor, page)
+        except ValueError:
+            return {'message': 'Invalid cursor'}, 400
+        
+        files_data = [{
+            'file_id': record.id,
+            'filename': record.filename,
+            'file_size': record.size,
+            'file_type': record.mime_type,
+            'upload_date': record.created_at.isoformat(),
+            'uploaded_by': record.uploaded_by,
+            'url': f"/api/v1/files/{record.id}"
+        } for record in records]
         
         return {
-            'files': paginated_files,
+            'files': files_data,
             'total': total,
             'page': page,
             'per_page': per_page,
-            'pages': (total + per_page - 1) // per_page
+            'pages': (total + per_page - 1) // per_page,
+            'next_cursor': next_cursor
         }, 200
 
 
@@ -367,27 +521,13 @@ class FileStatsResource(Resource):
     @enhanced_login_required
     def get(self):
         """Get file statistics."""
-        # In a real implementation, this would query the database
-        # For now, scan the upload directory
-        
-        total_files = 0
-        total_size = 0
-        file_types = {}
+        from services.storage_accounting import storage_accountant
         
-        upload_path = os.path.join(current_app.root_path, get_file_manager().upload_folder)
-        
-        if os.path.exists(upload_path):
-            for root, dirs, files in os.walk(upload_path):
-                for filename in files:
-                    file_path = os.path.join(root, filename)
-                    if os.path.isfile(file_path):
-                        total_files += 1
-                        file_stat = os.stat(file_path)
-                        total_size += file_stat.st_size
-                        
-                        # Get file extension
-                        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else 'unknown'
-                        file_types[extension] = file_types.get(extension, 0) + 1
+        # Answered from the storage counters, not a walk of the upload tree
+        usage = storage_accountant.snapshot('uploads')
+        total_files = usage['files']
+        total_size = usage['bytes']
+        file_types = usage['file_types']
         
         return {
             'total_files': total_files,
@@ -45,6 +45,8 @@ except ImportError as e:
 
 def create_app(config_name='default', config_obj=None):
     """Create and configure Flask application"""
+    from services.startup_profile import StartupTimeline
+    timeline = StartupTimeline()
     app = Flask(__name__)
     
     if config_obj:
@@ -62,6 +64,10 @@ def create_app(config_name='default', config_obj=None):
         app.logger.error(f"Failed to initialize config system: {e}")
         # Continue with basic config if hierarchical config fails
     
+    # Defer optional subsystems (CDN, background refreshers) until first use
+    lazy_startup = app.config.get('LAZY_STARTUP', True)
+    timeline.mark('config')
+    
     # Initialize secrets management system
     try:
         secrets_manager = init_secrets_management(app)
@@ -75,6 +81,8 @@ def create_app(config_name='default', config_obj=None):
     # if config_name == 'production':
     #     init_security_middleware(app)
     
+    timeline.mark('secrets')
+    
     # Initialize extensions
     csrf.init_app(app)
     # Initialize optimized middleware
@@ -95,6 +103,8 @@ def create_app(config_name='default', config_obj=None):
     # Initialize Flask-Session for server-side session storage
     Session(app)
 
+    timeline.mark('extensions')
+
     # Initialize database and auth
     try:
         db_initialized = init_db(app)
@@ -102,7 +112,80 @@ def create_app(config_name='default', config_obj=None):
             app.logger.warning("Database initialization returned False")
 
         init_auth(app)
-        
+        timeline.mark('database')
+
+        # Keep per-user unread notification counters in step with the table
+        try:
+            from services.notification_counters import init_notification_counters
+            init_notification_counters(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize notification counters: {e}")
+
+        # Publish report status and approval transitions for SSE subscribers
+        try:
+            from services.report_events import init_report_events
+            init_report_events(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize report events: {e}")
+
+        # Day/hour analytics rollups, refreshed as reports change
+        try:
+            from services.analytics_rollups import init_analytics_rollups
+            init_analytics_rollups(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize analytics rollups: {e}")
+
+        # Template usage counts and cached per-template statistics
+        try:
+            from services.template_stats import init_template_stats
+            init_template_stats(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize template stats: {e}")
+
+        # Upload and output directory usage counters
+        try:
+            from services.storage_accounting import init_storage_accounting
+            init_storage_accounting(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize storage accounting: {e}")
+
+        # Delta-encoded report version history
+        try:
+            from services.version_store import init_version_store
+            init_version_store(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize version store: {e}")
+
+        # Coalesced, rate-limited autosave writes
+        try:
+            from services.autosave import init_autosave
+            init_autosave(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize autosave: {e}")
+
+        # Server-side AI conversation storage
+        try:
+            from services.conversation_store import init_conversation_store
+            init_conversation_store(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize conversation store: {e}")
+
+        # Per-user AI memory shards
+        try:
+            from services.memory_manager import init_memory_manager
+            init_memory_manager(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize memory manager: {e}")
+
+        # MCP health snapshot and circuit breakers
+        try:
+            from services.mcp_integration import init_mcp
+            init_mcp(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize MCP status refresher: {e}")
+
+        timeline.mark('services')
+
         # Initialize migration system
         from database import (
             init_migrations, init_database_performance, 
@@ -126,6 +209,15 @@ def create_app(config_name='default', config_obj=None):
         except Exception:
             # Task CLI is optional, silently skip if not available
             pass
+
+        from services.startup_profile import startup_profile_command
+        app.cli.add_command(startup_profile_command)
+
+        from cache.static_assets import assets_command
+        app.cli.add_command(assets_command)
+
+        from services.analytics_rollups import rollups_command
+        app.cli.add_command(rollups_command)
         
         # Initialize performance optimizations only if needed
         # Skip for development to improve startup time
@@ -137,6 +229,8 @@ def create_app(config_name='default', config_obj=None):
         else:
             app.logger.debug("Skipping performance initialization in non-production")
         
+        timeline.mark('migrations')
+        
         # Initialize Redis caching system
         try:
             from cache.redis_client import init_cache
@@ -164,6 +258,10 @@ def create_app(config_name='default', config_obj=None):
             # Initialize cache monitoring
             from cache.monitoring import init_cache_monitoring
             init_cache_monitoring(app)
+
+            # Fan out SSE events across workers through Redis when available
+            from services.event_bus import init_event_bus
+            init_event_bus(app)
             
             app.logger.debug("Cache system initialized successfully")  # Reduced log level
         except Exception as e:
@@ -184,15 +282,23 @@ def create_app(config_name='default', config_obj=None):
         except Exception as e:
             app.logger.error(f"Failed to initialize query caching: {e}")
         
+        timeline.mark('cache')
+        
         # Initialize CDN integration
         try:
-            from cache.flask_cdn import create_cdn_extension
-            
-            # Create and initialize CDN extension
-            cdn_extension = create_cdn_extension(app)
-            app.cdn_extension = cdn_extension
+            from cache.flask_cdn import create_cdn_extension, cdn_configured, register_deferred_cdn_cli
             
-            app.logger.debug("CDN integration initialized")  # Reduced log level
+            if lazy_startup and not cdn_configured(app):
+                # Nothing to serve from a CDN; only 'flask cdn' needs the extension
+                register_deferred_cdn_cli(app)
+                app.cdn_extension = None
+                app.logger.debug("CDN integration deferred (CDN not configured)")
+            else:
+                # Create and initialize CDN extension
+                cdn_extension = create_cdn_extension(app)
+                app.cdn_extension = cdn_extension
+                
+                app.logger.debug("CDN integration initialized")  # Reduced log level
         except ImportError:
             # CDN dependencies not installed - this is optional
             app.logger.debug("CDN integration not available (missing dependencies)")
@@ -237,6 +343,8 @@ def create_app(config_name='default', config_obj=None):
             app.logger.debug("Background task processing disabled (optional feature)")
             app.celery = None
         
+        timeline.mark('cdn')
+        
         app.logger.info("Database, auth, migrations, performance, backup, and cache systems initialized")
     except Exception as e:
         app.logger.error(f"Failed to initialize database or auth: {e}")
@@ -488,13 +596,25 @@ def create_app(config_name='default', config_obj=None):
                 app.logger.error(f"Failed to register CDN blueprint: {e}")
 
     register_blueprints()
+    timeline.mark('blueprints')
 
     if db_initialized and app.config.get('ENABLE_DASHBOARD_STATS_CACHE', True):
-        try:
-            from services.dashboard_stats import start_dashboard_stats_refresher
-            start_dashboard_stats_refresher(app)
-        except Exception as e:
-            app.logger.error(f"Failed to start dashboard stats refresher: {e}")
+        def start_stats_refresher():
+            try:
+                from services.dashboard_stats import start_dashboard_stats_refresher
+                start_dashboard_stats_refresher(app)
+            except Exception as e:
+                app.logger.error(f"Failed to start dashboard stats refresher: {e}")
+
+        if lazy_startup:
+            # Processes that never serve a request (CLI, Celery) skip the thread
+            @app.before_request
+            def start_stats_refresher_on_first_request():
+                if not getattr(app, '_stats_refresher_started', False):
+                    app._stats_refresher_started = True
+                    start_stats_refresher()
+        else:
+            start_stats_refresher()
     else:
         app.logger.debug('Dashboard stats cache disabled or database not initialized; skipping refresher thread')
 
@@ -526,6 +646,13 @@ def create_app(config_name='default', config_obj=None):
     if not db_initialized:
         app.logger.warning("Database initialization failed - running without database")
 
+    timeline.mark('handlers')
+    app.startup_timeline = timeline
+    app.logger.info(timeline.summary())
+    budget = app.config.get('STARTUP_BUDGET_SECONDS')
+    if budget and timeline.total > budget:
+        app.logger.warning(f"Startup took {timeline.total:.2f}s, over the {budget}s budget")
+
     return app
 
 def sigint_handler(signum, frame):
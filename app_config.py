@@ -44,6 +44,10 @@ class Config:
     DASHBOARD_STATS_REFRESH_SECONDS = int(os.environ.get('DASHBOARD_STATS_REFRESH_SECONDS', 300))
     DASHBOARD_STATS_MAX_AGE_SECONDS = int(os.environ.get('DASHBOARD_STATS_MAX_AGE_SECONDS', 600))
 
+    # Startup: defer optional subsystems until first use, warn past the budget
+    LAZY_STARTUP = os.environ.get('LAZY_STARTUP', 'True').lower() == 'true'
+    STARTUP_BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', 5.0))
+
     # AI assistance configuration
     AI_PROVIDER = os.environ.get('AI_PROVIDER', 'openai')
     AI_ENABLED = os.environ.get('AI_ENABLED', '').lower() == 'true' or bool(os.environ.get('OPENAI_API_KEY'))
@@ -3,19 +3,97 @@ CDN integration for static asset delivery and performance optimization.
 """
 
 import os
+import json
 import logging
 import hashlib
 import mimetypes
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
 from urllib.parse import urljoin, urlparse
 from datetime import datetime, timedelta
 
 from flask import current_app, url_for, request
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
 
 logger = logging.getLogger(__name__)
 
+HASH_CHUNK_SIZE = 64 * 1024
+DEFAULT_SYNC_MANIFEST = os.path.join('instance', 'cdn_sync_manifest.json')
+DEFAULT_SYNC_WORKERS = 8
+# CloudFront accepts at most this many paths in progress per distribution
+MAX_INVALIDATION_PATHS = 3000
+
+
+def hash_file(file_path: str) -> str:
+    """MD5 of a file, read in chunks so large assets are never held in memory."""
+    digest = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SyncManifest:
+    """
+    Persisted record of what the last CDN sync uploaded.
+
+    Maps each asset path to its content hash, size and mtime.  Files whose
+    size and mtime still match are not re-hashed; files whose hash still
+    matches are not re-uploaded.  The manifest is tied to a bucket so
+    pointing the sync at a new bucket uploads everything again.
+
+    Replaced files whose CDN copies have not been invalidated yet are kept
+    in ``pending_invalidations`` until an invalidation succeeds.
+    """
+
+    def __init__(self, path: str, bucket: Optional[str] = None):
+        self.path = path
+        self.bucket = bucket
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.pending_invalidations: List[str] = []
+
+    def load(self) -> 'SyncManifest':
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if isinstance(data, dict) and data.get('bucket') == self.bucket:
+            self.entries = data.get('files') or {}
+            self.pending_invalidations = data.get('pending_invalidations') or []
+        return self
+
+    def save(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.cdn-manifest-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({
+                    'bucket': self.bucket,
+                    'files': self.entries,
+                    'pending_invalidations': self.pending_invalidations,
+                }, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def content_hash(self, cdn_path: str, local_path: str, stat: os.stat_result) -> str:
+        """Hash of the file, reusing the recorded hash if size and mtime are unchanged."""
+        entry = self.entries.get(cdn_path)
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime_ns:
+            return entry['hash']
+        return hash_file(local_path)
+
+    def is_current(self, cdn_path: str, content_hash: str) -> bool:
+        entry = self.entries.get(cdn_path)
+        return bool(entry) and entry.get('hash') == content_hash
+
+    def record(self, cdn_path: str, content_hash: str, stat: os.stat_result) -> None:
+        self.entries[cdn_path] = {'hash': content_hash, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
 
 class CDNManager:
     """Manage CDN integration for static assets."""
@@ -36,15 +114,24 @@ class CDNManager:
         self.cloudfront_client = None
         self.s3_client = None
         
-        if self.enabled and self.provider == 'cloudfront':
+        # Without a base URL the CDN can never be used (see is_enabled), so
+        # skip creating clients and the AWS round trip at startup
+        if self.enabled and self.base_url and self.provider == 'cloudfront':
             self._init_aws_clients()
     
     def _init_aws_clients(self):
         """Initialize AWS clients for CloudFront and S3."""
+        # boto3 is only needed when CloudFront is enabled; importing it costs
+        # every worker noticeable startup time
+        import boto3
+        from botocore.exceptions import ClientError, NoCredentialsError
+
         try:
             # Use environment variables or IAM roles for credentials
             self.cloudfront_client = boto3.client('cloudfront', region_name=self.aws_region)
-            self.s3_client = boto3.client('s3', region_name=self.aws_region)
+            # An S3-compatible endpoint (e.g. MinIO) can stand in for S3
+            self.s3_client = boto3.client('s3', region_name=self.aws_region,
+                                          endpoint_url=self.config.get('s3_endpoint_url') or None)
             
             # Test connection
             self.cloudfront_client.list_distributions(MaxItems='1')
@@ -68,9 +155,12 @@ class CDNManager:
         # Clean asset path
         asset_path = asset_path.lstrip('/')
         
-        # Add version parameter for cache busting
+        # Add version parameter for cache busting; fingerprinted build outputs
+        # already carry their version in the filename
         if version:
             asset_path = f"{asset_path}?v={version}"
+        elif self._is_fingerprinted(asset_path):
+            pass
         elif self.config.get('auto_version', True):
             # Generate version based on file modification time or content hash
             version = self._get_asset_version(asset_path)
@@ -81,6 +171,14 @@ class CDNManager:
         cdn_url = urljoin(self.base_url.rstrip('/') + '/', asset_path)
         return cdn_url
     
+    def _is_fingerprinted(self, asset_path: str) -> bool:
+        try:
+            from .static_assets import DEFAULT_BUILD_DIR, get_asset_manifest
+            build_dir = current_app.config.get('STATIC_BUILD_DIR', DEFAULT_BUILD_DIR)
+            return get_asset_manifest(current_app.static_folder, build_dir).is_fingerprinted(asset_path)
+        except Exception:
+            return False
+    
     def _get_asset_version(self, asset_path: str) -> Optional[str]:
         """Get version string for asset (based on modification time or content hash)."""
         try:
@@ -244,20 +342,37 @@ class CDNManager:
             logger.error(f"Failed to get distribution stats: {e}")
             return {'error': str(e)}
     
-    def sync_static_assets(self, static_folder: str) -> Dict[str, Any]:
-        """Sync local static assets to CDN."""
+    def sync_static_assets(self, static_folder: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Upload static assets that changed since the last sync.
+
+        Unchanged files are recognised from the sync manifest (see
+        ``SyncManifest``); changed files are uploaded on a bounded thread
+        pool and previously uploaded paths that changed are invalidated in
+        a single batch.  ``force`` re-uploads every file and invalidates all
+        of them, since the CDN may hold copies the manifest does not know of.
+        Paths whose invalidation failed are retried by the next sync.
+        """
         if not self.is_enabled() or not static_folder or not os.path.exists(static_folder):
             return {'error': 'CDN not enabled or static folder not found'}
         
         results = {
             'uploaded': 0,
+            'unchanged': 0,
             'skipped': 0,
             'failed': 0,
+            'invalidated': 0,
             'files': []
         }
         
+        manifest = SyncManifest(self.config.get('sync_manifest', DEFAULT_SYNC_MANIFEST), self.s3_bucket)
+        manifest.load()
+        
         try:
-            # Walk through static folder
+            # Work out which files changed; only files with a new size or
+            # mtime are hashed
+            pending = []
+            seen = set()
             for root, dirs, files in os.walk(static_folder):
                 for file in files:
                     local_path = os.path.join(root, file)
@@ -269,23 +384,67 @@ class CDNManager:
                         results['skipped'] += 1
                         continue
                     
-                    # Upload file
-                    if self.upload_asset(local_path, cdn_path):
-                        results['uploaded'] += 1
-                        results['files'].append({
-                            'path': cdn_path,
-                            'status': 'uploaded',
-                            'url': self.get_asset_url(cdn_path)
-                        })
-                    else:
-                        results['failed'] += 1
-                        results['files'].append({
-                            'path': cdn_path,
-                            'status': 'failed'
-                        })
+                    seen.add(cdn_path)
+                    stat = os.stat(local_path)
+                    content_hash = manifest.content_hash(cdn_path, local_path, stat)
+                    if not force and manifest.is_current(cdn_path, content_hash):
+                        # Refresh size/mtime so the next sync skips hashing it
+                        manifest.record(cdn_path, content_hash, stat)
+                        results['unchanged'] += 1
+                        continue
+                    pending.append((local_path, cdn_path, content_hash, stat))
+            
+            # Upload changed files concurrently
+            workers = max(1, min(self.config.get('sync_workers', DEFAULT_SYNC_WORKERS), len(pending) or 1))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cdn-sync') as pool:
+                outcomes = list(pool.map(
+                    lambda item: self.upload_asset(item[0], item[1]), pending
+                ))
+            
+            changed_paths = []
+            for (local_path, cdn_path, content_hash, stat), uploaded in zip(pending, outcomes):
+                if uploaded:
+                    if force or cdn_path in manifest.entries:
+                        changed_paths.append(cdn_path)
+                    manifest.record(cdn_path, content_hash, stat)
+                    results['uploaded'] += 1
+                    results['files'].append({
+                        'path': cdn_path,
+                        'status': 'uploaded',
+                        'url': self.get_asset_url(cdn_path)
+                    })
+                else:
+                    results['failed'] += 1
+                    results['files'].append({
+                        'path': cdn_path,
+                        'status': 'failed'
+                    })
+            
+            # Forget files that no longer exist locally
+            for cdn_path in set(manifest.entries) - seen:
+                del manifest.entries[cdn_path]
+            
+            # New files were never cached; only replaced ones need invalidating.
+            # They are saved as pending first so a failed invalidation is
+            # retried by the next sync instead of leaving stale copies behind
+            to_invalidate = sorted(set(manifest.pending_invalidations) | set(changed_paths))
+            manifest.pending_invalidations = to_invalidate
+            manifest.save()
+            
+            if to_invalidate:
+                paths = to_invalidate if len(to_invalidate) <= MAX_INVALIDATION_PATHS else ['/*']
+                if self.invalidate_cache(paths):
+                    results['invalidated'] = len(to_invalidate)
+                    manifest.pending_invalidations = []
+                    manifest.save()
+                else:
+                    results['invalidation_pending'] = len(to_invalidate)
+                    logger.warning(f"CDN invalidation of {len(to_invalidate)} paths failed; "
+                                   f"retrying on the next sync")
             
             logger.info(f"CDN sync completed: {results['uploaded']} uploaded, "
-                       f"{results['skipped']} skipped, {results['failed']} failed")
+                       f"{results['unchanged']} unchanged, {results['skipped']} skipped, "
+                       f"{results['failed']} failed, {results['invalidated']} invalidated")
             
         except Exception as e:
             logger.error(f"Error during CDN sync: {e}")
@@ -364,9 +523,7 @@ class AssetVersionManager:
     def generate_content_hash(self, file_path: str) -> Optional[str]:
         """Generate content hash for file."""
         try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-                return hashlib.md5(content).hexdigest()[:8]
+            return hash_file(file_path)[:8]
         except Exception as e:
             logger.error(f"Failed to generate content hash for {file_path}: {e}")
             return None
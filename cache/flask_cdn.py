@@ -115,20 +115,33 @@ class FlaskCDN:
     def _register_template_functions(self, app: Flask):
         """Register CDN template functions."""
         
+        def fingerprinted(asset_path: str) -> Optional[str]:
+            """Build output for an asset listed in the static asset manifest."""
+            from .static_assets import DEFAULT_BUILD_DIR, get_asset_manifest
+            
+            build_dir = app.config.get('STATIC_BUILD_DIR', DEFAULT_BUILD_DIR)
+            resolved = get_asset_manifest(app.static_folder, build_dir).resolve(asset_path.lstrip('/'))
+            return resolved if resolved != asset_path.lstrip('/') else None
+        
         @app.template_global()
         def cdn_url_for(endpoint: str, **values) -> str:
             """Generate CDN URL for static assets in templates."""
             if endpoint == 'static' and self.cdn_manager and self.cdn_manager.is_enabled():
                 filename = values.get('filename')
                 if filename:
-                    return self.cdn_manager.get_asset_url(filename)
+                    return self.cdn_manager.get_asset_url(fingerprinted(filename) or filename)
             
-            # Fallback to regular url_for
+            # Fallback to regular url_for (which resolves fingerprinted static files itself)
             return url_for(endpoint, **values)
         
         @app.template_global()
         def asset_url(asset_path: str, version: Optional[str] = None) -> str:
             """Generate asset URL with optional versioning."""
+            built = fingerprinted(asset_path)
+            if built:
+                # The content hash in the filename is the version
+                asset_path, version = built, None
+            
             if self.cdn_manager and self.cdn_manager.is_enabled():
                 return self.cdn_manager.get_asset_url(asset_path, version)
             
@@ -157,6 +170,9 @@ class FlaskCDN:
         @app.template_filter()
         def versioned(asset_path: str) -> str:
             """Add version parameter to asset path."""
+            built = fingerprinted(asset_path)
+            if built:
+                return built
             if self.asset_version_manager:
                 version = self.asset_version_manager.get_version(asset_path)
                 if version:
@@ -197,8 +213,9 @@ class FlaskCDN:
                     print(f"Error getting stats: {stats['error']}")
         
         @cdn.command()
-        def sync():
-            """Sync static assets to CDN."""
+        @click.option('--force', is_flag=True, help='Upload every asset, ignoring the sync manifest')
+        def sync(force):
+            """Sync changed static assets to CDN."""
             if not self.cdn_manager or not self.cdn_manager.is_enabled():
                 print("CDN not enabled")
                 return
@@ -209,12 +226,14 @@ class FlaskCDN:
                 return
             
             print(f"Syncing assets from {static_folder}...")
-            results = self.cdn_manager.sync_static_assets(static_folder)
+            results = self.cdn_manager.sync_static_assets(static_folder, force=force)
             
             print(f"Upload results:")
-            print(f"  Uploaded: {results['uploaded']}")
-            print(f"  Skipped: {results['skipped']}")
-            print(f"  Failed: {results['failed']}")
+            print(f"  Uploaded: {results.get('uploaded', 0)}")
+            print(f"  Unchanged: {results.get('unchanged', 0)}")
+            print(f"  Skipped: {results.get('skipped', 0)}")
+            print(f"  Failed: {results.get('failed', 0)}")
+            print(f"  Invalidated: {results.get('invalidated', 0)}")
             
             if results.get('error'):
                 print(f"Error: {results['error']}")
@@ -333,7 +352,8 @@ class CDNBlueprint:
             if not static_folder:
                 return jsonify({'error': 'No static folder configured'}), 400
             
-            results = self.cdn_extension.cdn_manager.sync_static_assets(static_folder)
+            force = bool((request.get_json(silent=True) or {}).get('force'))
+            results = self.cdn_extension.cdn_manager.sync_static_assets(static_folder, force=force)
             return jsonify(results)
         
         @bp.route('/invalidate', methods=['POST'])
@@ -382,4 +402,36 @@ class CDNBlueprint:
 
 def create_cdn_extension(app: Flask = None) -> FlaskCDN:
     """Factory function to create CDN extension."""
-    return FlaskCDN(app)
\ No newline at end of file
+    return FlaskCDN(app)
+
+
+def cdn_configured(app: Flask) -> bool:
+    """Whether app config, cdn.yaml and the environment enable a usable CDN."""
+    config = FlaskCDN()._load_cdn_config(app)
+    return bool(config.get('enabled') and config.get('base_url'))
+
+
+def register_deferred_cdn_cli(app: Flask):
+    """
+    Register the ``flask cdn`` command group without initializing the CDN.
+
+    The extension is created the first time the group is used, which replaces
+    this placeholder with the real command group.
+    """
+    if click is None or not hasattr(app, 'cli'):
+        return
+
+    class DeferredCDNGroup(click.Group):
+        def _load(self) -> click.Group:
+            if getattr(app, 'cdn_extension', None) is None:
+                app.cdn_extension = FlaskCDN(app)
+            group = app.cli.commands.get('cdn')
+            return group if group is not self else click.Group('cdn')
+
+        def list_commands(self, ctx):
+            return self._load().list_commands(ctx)
+
+        def get_command(self, ctx, name):
+            return self._load().get_command(ctx, name)
+
+    app.cli.add_command(DeferredCDNGroup('cdn', help='CDN management commands.'))
\ No newline at end of file
@@ -0,0 +1,336 @@
+"""
+Fingerprinted, precompressed static assets.
+
+``flask assets build`` copies every asset under ``static/`` to
+``static/dist/`` with its content hash in the filename
+(``css/form.css`` -> ``dist/css/form.1a2b3c4d.css``), writes ``.gz`` (and,
+when the ``brotli`` package is installed, ``.br``) siblings for text assets,
+and records both in ``static/dist/manifest.json``.  Relative ``url()`` and
+``@import`` references inside CSS are rewritten to the fingerprinted names of
+their targets, so a stylesheet's hash also changes when an asset it pulls in
+does.
+
+At runtime ``url_for('static', ...)`` and the CDN template helpers resolve
+logical paths through the manifest, and the middleware serves the
+precompressed sibling that matches ``Accept-Encoding``.  Fingerprinted files
+never change, so they can be cached as ``immutable``; nothing is compressed
+per request.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import click
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip siblings are built without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUILD_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+FINGERPRINT_LENGTH = 8
+
+ASSET_EXTENSIONS = frozenset({
+    '.css', '.js', '.map', '.json', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.ico', '.webp',
+    '.woff', '.woff2', '.ttf', '.eot', '.otf',
+})
+COMPRESSIBLE_EXTENSIONS = frozenset({'.css', '.js', '.map', '.json', '.svg', '.ttf', '.eot', '.otf'})
+# Uploaded content, not build inputs
+EXCLUDED_DIRS = frozenset({'signatures', 'uploads'})
+MIN_COMPRESS_SIZE = 256
+
+# Content-Encoding -> sibling suffix, in order of preference
+ENCODINGS: Tuple[Tuple[str, str], ...] = (('br', '.br'), ('gzip', '.gz'))
+
+
+# ``url(x)``, ``url('x')``, ``url("x")`` and ``@import 'x'`` in stylesheets
+CSS_REFERENCE = re.compile(rb'''(url\(\s*['"]?|@import\s+['"])([^'"()\s]+)''')
+_URL_SCHEME = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')
+
+
+def fingerprinted_name(path: str, digest: str) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def _iter_sources(static_folder: str, build_dir: str) -> Iterator[str]:
+    """Relative paths (with ``/`` separators) of the assets to build."""
+    for root, dirs, files in os.walk(static_folder):
+        rel_root = os.path.relpath(root, static_folder)
+        if rel_root == '.':
+            dirs[:] = [d for d in dirs if d != build_dir and d not in EXCLUDED_DIRS]
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in files:
+            if name.startswith('.') or os.path.splitext(name)[1].lower() not in ASSET_EXTENSIONS:
+                continue
+            rel_path = os.path.normpath(os.path.join(rel_root, name))
+            yield rel_path.replace(os.sep, '/')
+
+
+def _rewrite_css_references(rel_path: str, data: bytes, build_dir: str, resolve) -> bytes:
+    """
+    Point the relative references of the stylesheet ``rel_path`` at the
+    built copies of their targets.
+
+    ``resolve`` maps a logical asset path to its fingerprinted path, or None
+    for files that are not built; those are referenced at their original
+    location, since the stylesheet itself moves into ``build_dir``.
+    """
+    base = posixpath.dirname(rel_path)
+    output_dir = posixpath.join(build_dir, base)
+
+    def replace(match):
+        ref = match.group(2).decode('utf-8', 'surrogateescape')
+        if ref.startswith(('/', '#')) or _URL_SCHEME.match(ref):
+            return match.group(0)
+        cut = min((i for i in (ref.find('?'), ref.find('#')) if i >= 0), default=len(ref))
+        path, suffix = ref[:cut], ref[cut:]
+        if not path:
+            return match.group(0)
+        logical = posixpath.normpath(posixpath.join(base, path))
+        target = resolve(logical) or logical
+        rewritten = posixpath.relpath(target, output_dir) + suffix
+        return match.group(1) + rewritten.encode('utf-8', 'surrogateescape')
+
+    return CSS_REFERENCE.sub(replace, data)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.asset-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    # mtime=0 keeps the output, and so the sibling's ETag, identical across builds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def build_static_assets(static_folder: str, build_dir: str = DEFAULT_BUILD_DIR,
+                        use_brotli: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Fingerprint and precompress every asset and write the manifest.
+
+    Outputs that already exist are not rewritten, so rebuilding an unchanged
+    tree only hashes it.  Files from builds older than the previous one are
+    removed; the previous build is kept for pages rendered before a deploy.
+    """
+    if use_brotli is None:
+        use_brotli = brotli is not None
+    elif use_brotli and brotli is None:
+        logger.warning("brotli is not installed; building gzip siblings only")
+        use_brotli = False
+    encodings = [(name, suffix) for name, suffix in ENCODINGS if name != 'br' or use_brotli]
+
+    output_root = os.path.join(static_folder, build_dir)
+    manifest_path = os.path.join(output_root, MANIFEST_NAME)
+    previous = AssetManifest.read(manifest_path)
+
+    sources = list(_iter_sources(static_folder, build_dir))
+    source_set = set(sources)
+    assets: Dict[str, str] = {}
+    outputs: Dict[str, bytes] = {}  # rewritten stylesheets
+    in_progress = set()
+
+    def fingerprint(rel_path: str) -> Optional[str]:
+        # Stylesheets are hashed after the rewrite, so their targets go first
+        if rel_path in assets:
+            return assets[rel_path]
+        if rel_path not in source_set or rel_path in in_progress:
+            return None
+        in_progress.add(rel_path)
+        with open(os.path.join(static_folder, rel_path), 'rb') as f:
+            data = f.read()
+        if os.path.splitext(rel_path)[1].lower() == '.css':
+            data = outputs[rel_path] = _rewrite_css_references(rel_path, data, build_dir, fingerprint)
+        in_progress.discard(rel_path)
+        assets[rel_path] = f"{build_dir}/{fingerprinted_name(rel_path, hashlib.md5(data).hexdigest())}"
+        return assets[rel_path]
+
+    for rel_path in sources:
+        fingerprint(rel_path)
+
+    compressed: Dict[str, List[str]] = {}
+    written = 0
+    for rel_path in sources:
+        data = outputs.pop(rel_path, None)
+        if data is None:
+            with open(os.path.join(static_folder, rel_path), 'rb') as f:
+                data = f.read()
+        target = assets[rel_path]
+        target_path = os.path.join(static_folder, target)
+
+        if not os.path.exists(target_path):
+            _write_atomic(target_path, data)
+            written += 1
+
+        if os.path.splitext(rel_path)[1].lower() not in COMPRESSIBLE_EXTENSIONS or len(data) < MIN_COMPRESS_SIZE:
+            continue
+        available = []
+        for name, suffix in encodings:
+            sibling_path = target_path + suffix
+            if not os.path.exists(sibling_path):
+                packed = _compress(data, name)
+                if len(packed) >= len(data):
+                    continue
+                _write_atomic(sibling_path, packed)
+                written += 1
+            available.append(name)
+        if available:
+            compressed[target] = available
+
+    manifest = {'version': 1, 'built_at': time.time(), 'assets': assets, 'encodings': compressed}
+    os.makedirs(output_root, exist_ok=True)
+    _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+    keep = set(assets.values()) | set(previous.get('assets', {}).values())
+    removed = _prune(static_folder, build_dir, keep)
+    return {'assets': len(assets), 'compressed': len(compressed), 'written': written,
+            'removed': removed, 'encodings': [name for name, _ in encodings], 'manifest': manifest_path}
+
+
+def _prune(static_folder: str, build_dir: str, keep: set) -> int:
+    """Delete build outputs (and their siblings) that are not in ``keep``."""
+    removed = 0
+    output_root = os.path.join(static_folder, build_dir)
+    suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    for root, _dirs, files in os.walk(output_root):
+        for name in files:
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if rel_path == f"{build_dir}/{MANIFEST_NAME}":
+                continue
+            base = os.path.splitext(rel_path)[0] if rel_path.endswith(suffixes) else rel_path
+            if base not in keep:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Could not remove stale asset {rel_path}: {e}")
+    return removed
+
+
+class AssetManifest:
+    """
+    The build manifest, reloaded when the file changes.
+
+    The file's mtime is checked at most once every ``check_interval`` seconds,
+    so resolving a URL is a dictionary lookup on the hot path.
+    """
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.assets: Dict[str, str] = {}
+        self.encodings: Dict[str, Tuple[str, ...]] = {}
+        self._fingerprinted: frozenset = frozenset()
+        self._mtime: Optional[float] = None
+        self._checked = float('-inf')
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def read(path: str) -> Dict[str, Any]:
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def refresh(self) -> 'AssetManifest':
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return self
+        with self._lock:
+            if now - self._checked < self.check_interval:
+                return self
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                data = self.read(self.path) if mtime is not None else {}
+                self.assets = dict(data.get('assets') or {})
+                self.encodings = {path: tuple(names) for path, names in (data.get('encodings') or {}).items()}
+                self._fingerprinted = frozenset(self.assets.values())
+                self._mtime = mtime
+            self._checked = now
+        return self
+
+    def resolve(self, path: str) -> str:
+        """Fingerprinted path for a logical asset path, or the path unchanged."""
+        return self.refresh().assets.get(path, path)
+
+    def is_fingerprinted(self, path: str) -> bool:
+        return path in self.refresh()._fingerprinted
+
+    def variant_for(self, path: str, accept_encodings) -> Optional[Tuple[str, str]]:
+        """
+        ``(encoding, suffix)`` of the best precompressed sibling of ``path``
+        the client accepts, or None to serve the file as is.
+        """
+        available = self.refresh().encodings.get(path)
+        if not available:
+            return None
+        for name, suffix in ENCODINGS:
+            if name in available and accept_encodings.quality(name) > 0:
+                return name, suffix
+        return None
+
+
+_manifests: Dict[str, AssetManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_asset_manifest(static_folder: str, build_dir: str = DEFAULT_BUILD_DIR) -> AssetManifest:
+    """Shared manifest for a static folder."""
+    path = os.path.join(static_folder, build_dir, MANIFEST_NAME)
+    manifest = _manifests.get(path)
+    if manifest is None:
+        with _manifests_lock:
+            manifest = _manifests.setdefault(path, AssetManifest(path))
+    return manifest
+
+
+@click.group('assets')
+def assets_command():
+    """Static asset build commands."""
+
+
+@assets_command.command('build')
+@click.option('--brotli/--no-brotli', 'use_brotli', default=None,
+              help='Also write .br siblings (default: when brotli is installed)')
+def build_assets_command(use_brotli):
+    """Fingerprint and precompress static assets."""
+    from flask import current_app
+
+    build_dir = current_app.config.get('STATIC_BUILD_DIR', DEFAULT_BUILD_DIR)
+    try:
+        result = build_static_assets(current_app.static_folder, build_dir, use_brotli)
+    except Exception as e:
+        click.echo(f'❌ Asset build failed: {e}')
+        raise SystemExit(1)
+
+    click.echo(f"✅ Built {result['assets']} assets ({result['compressed']} precompressed "
+               f"as {', '.join(result['encodings'])})")
+    click.echo(f"   {result['written']} files written, {result['removed']} stale files removed")
+    click.echo(f"   Manifest: {result['manifest']}")
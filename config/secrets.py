@@ -6,9 +6,12 @@ import json
 import logging
 import time
 import threading
-from typing import Dict, Any, Optional, List
+import queue
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Mapping
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, replace
 from pathlib import Path
 import requests
 from cryptography.fernet import Fernet
@@ -20,6 +23,10 @@ import secrets
 logger = logging.getLogger(__name__)
 
 
+class VaultUnavailableError(Exception):
+    """Vault could not be reached or failed to answer."""
+
+
 @dataclass
 class SecretMetadata:
     """Metadata for a secret."""
@@ -127,119 +134,146 @@ class VaultClient:
         except Exception as e:
             logger.error(f"Token renewal failed: {e}")
     
-    def get_secret(self, path: str, version: int = None) -> Optional[Dict[str, Any]]:
-        """Get secret from Vault."""
+    def _ensure_token(self):
+        """Re-authenticate if the token is no longer valid."""
+        if self.is_token_valid():
+            return
+        # Only re-authentication is serialized; requests with a valid token
+        # run concurrently.
         with self.lock:
-            if not self.is_token_valid():
-                if self.vault_role_id and self.vault_secret_id:
-                    self.authenticate_approle()
-                else:
-                    raise Exception("Vault token is invalid and no AppRole credentials available")
+            if self.is_token_valid():
+                return
+            if self.vault_role_id and self.vault_secret_id:
+                self.authenticate_approle()
+            else:
+                raise Exception("Vault token is invalid and no AppRole credentials available")
+    
+    def get_secret(self, path: str, version: int = None) -> Optional[Dict[str, Any]]:
+        """
+        Get secret from Vault.
+        
+        Returns None when the secret does not exist.  Raises
+        ``VaultUnavailableError`` when Vault cannot be reached or answers
+        with a server error, so callers can tell an outage from a miss.
+        """
+        self._ensure_token()
+        
+        try:
+            url = f"{self.vault_url}/v1/secret/data/{path}"
+            if version:
+                url += f"?version={version}"
             
-            try:
-                url = f"{self.vault_url}/v1/secret/data/{path}"
-                if version:
-                    url += f"?version={version}"
-                
-                response = self.session.get(url)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get('data', {}).get('data', {})
-                elif response.status_code == 404:
-                    return None
-                else:
-                    logger.error(f"Failed to get secret {path}: {response.text}")
-                    return None
-                    
-            except Exception as e:
-                logger.error(f"Error getting secret {path}: {e}")
-                return None
+            response = self.session.get(url)
+        except requests.RequestException as e:
+            raise VaultUnavailableError(f"Error getting secret {path}: {e}") from e
+        
+        if response.status_code == 200:
+            data = response.json()
+            return data.get('data', {}).get('data', {})
+        elif response.status_code == 404:
+            return None
+        elif response.status_code >= 500:
+            raise VaultUnavailableError(f"Vault returned {response.status_code} for secret {path}")
+        else:
+            logger.error(f"Failed to get secret {path}: {response.text}")
+            return None
     
     def put_secret(self, path: str, data: Dict[str, Any]) -> bool:
         """Store secret in Vault."""
-        with self.lock:
-            if not self.is_token_valid():
-                if self.vault_role_id and self.vault_secret_id:
-                    self.authenticate_approle()
-                else:
-                    raise Exception("Vault token is invalid and no AppRole credentials available")
+        self._ensure_token()
+        
+        try:
+            url = f"{self.vault_url}/v1/secret/data/{path}"
+            payload = {'data': data}
             
-            try:
-                url = f"{self.vault_url}/v1/secret/data/{path}"
-                payload = {'data': data}
-                
-                response = self.session.post(url, json=payload)
-                
-                if response.status_code in [200, 204]:
-                    logger.info(f"Secret stored successfully: {path}")
-                    return True
-                else:
-                    logger.error(f"Failed to store secret {path}: {response.text}")
-                    return False
-                    
-            except Exception as e:
-                logger.error(f"Error storing secret {path}: {e}")
+            response = self.session.post(url, json=payload)
+            
+            if response.status_code in [200, 204]:
+                logger.info(f"Secret stored successfully: {path}")
+                return True
+            else:
+                logger.error(f"Failed to store secret {path}: {response.text}")
                 return False
+                
+        except Exception as e:
+            logger.error(f"Error storing secret {path}: {e}")
+            return False
     
     def delete_secret(self, path: str) -> bool:
         """Delete secret from Vault."""
-        with self.lock:
-            if not self.is_token_valid():
-                if self.vault_role_id and self.vault_secret_id:
-                    self.authenticate_approle()
-                else:
-                    raise Exception("Vault token is invalid and no AppRole credentials available")
+        self._ensure_token()
+        
+        try:
+            url = f"{self.vault_url}/v1/secret/metadata/{path}"
+            response = self.session.delete(url)
             
-            try:
-                url = f"{self.vault_url}/v1/secret/metadata/{path}"
-                response = self.session.delete(url)
-                
-                if response.status_code in [200, 204]:
-                    logger.info(f"Secret deleted successfully: {path}")
-                    return True
-                else:
-                    logger.error(f"Failed to delete secret {path}: {response.text}")
-                    return False
-                    
-            except Exception as e:
-                logger.error(f"Error deleting secret {path}: {e}")
+            if response.status_code in [200, 204]:
+                logger.info(f"Secret deleted successfully: {path}")
+                return True
+            else:
+                logger.error(f"Failed to delete secret {path}: {response.text}")
                 return False
+                
+        except Exception as e:
+            logger.error(f"Error deleting secret {path}: {e}")
+            return False
     
     def list_secrets(self, path: str = "") -> List[str]:
         """List secrets at path."""
-        with self.lock:
-            if not self.is_token_valid():
-                if self.vault_role_id and self.vault_secret_id:
-                    self.authenticate_approle()
-                else:
-                    raise Exception("Vault token is invalid and no AppRole credentials available")
+        self._ensure_token()
+        
+        try:
+            url = f"{self.vault_url}/v1/secret/metadata/{path}"
+            response = self.session.request('LIST', url)
             
-            try:
-                url = f"{self.vault_url}/v1/secret/metadata/{path}"
-                response = self.session.request('LIST', url)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get('data', {}).get('keys', [])
-                else:
-                    logger.error(f"Failed to list secrets at {path}: {response.text}")
-                    return []
-                    
-            except Exception as e:
-                logger.error(f"Error listing secrets at {path}: {e}")
+            if response.status_code == 200:
+                data = response.json()
+                return data.get('data', {}).get('keys', [])
+            else:
+                logger.error(f"Failed to list secrets at {path}: {response.text}")
                 return []
+                
+        except Exception as e:
+            logger.error(f"Error listing secrets at {path}: {e}")
+            return []
 
 
 class LocalSecretsManager:
-    """Local encrypted secrets manager for development/fallback."""
+    """
+    Local encrypted secrets manager for development/fallback.
+    
+    The secrets file is an append-only log with one Fernet token per line,
+    each holding a single record: a put, a delete, a batch of access
+    metadata, or a full snapshot.  A write appends one record instead of
+    re-encrypting every secret; once the log holds more records than
+    ``COMPACT_MIN_RECORDS`` and twice the number of live secrets, it is
+    rewritten as a single snapshot.  Files written before the log format
+    are a lone snapshot record and load unchanged.
+    
+    Several processes (web workers, rotation, the CLI) share the file, so
+    appends and compaction hold an exclusive lock on ``<file>.lock`` and
+    compaction replays the file as it is on disk rather than this process's
+    view of it.
+    
+    Reads take no lock and never write: access counts are queued in memory
+    and folded into the in-memory metadata in batches of
+    ``ACCESS_FOLD_THRESHOLD``, so they last only as long as the process
+    (compaction keeps the counts it knows of).
+    """
+    
+    COMPACT_MIN_RECORDS = 200
+    ACCESS_FOLD_THRESHOLD = 1000
     
     def __init__(self, secrets_file: str = 'secrets.enc', master_key: str = None):
         self.secrets_file = Path(secrets_file)
         self.master_key = master_key or os.environ.get('SECRETS_MASTER_KEY')
         self.secrets_cache: Dict[str, Any] = {}
         self.metadata_cache: Dict[str, SecretMetadata] = {}
+        # Serializes writers and the log file; readers never take it
         self.lock = threading.Lock()
+        self._log_records = 0
+        self._needs_newline = False
+        self._accesses: deque = deque()
         
         # Generate master key if not provided
         if not self.master_key:
@@ -268,114 +302,216 @@ class LocalSecretsManager:
         key = base64.urlsafe_b64encode(kdf.derive(self.master_key.encode()))
         return Fernet(key)
     
-    def _load_secrets(self):
-        """Load secrets from encrypted file."""
+    @staticmethod
+    def _metadata_to_dict(meta: SecretMetadata) -> Dict[str, Any]:
+        return {
+            'version': meta.version,
+            'created_at': meta.created_at.isoformat() if meta.created_at else None,
+            'expires_at': meta.expires_at.isoformat() if meta.expires_at else None,
+            'last_accessed': meta.last_accessed.isoformat() if meta.last_accessed else None,
+            'access_count': meta.access_count,
+            'source': meta.source,
+            'encrypted': meta.encrypted
+        }
+    
+    @staticmethod
+    def _metadata_from_dict(key: str, meta: Dict[str, Any]) -> SecretMetadata:
+        return SecretMetadata(
+            key=key,
+            version=meta.get('version', 1),
+            created_at=datetime.fromisoformat(meta['created_at']) if meta.get('created_at') else None,
+            expires_at=datetime.fromisoformat(meta['expires_at']) if meta.get('expires_at') else None,
+            last_accessed=datetime.fromisoformat(meta['last_accessed']) if meta.get('last_accessed') else None,
+            access_count=meta.get('access_count', 0),
+            source=meta.get('source', 'local'),
+            encrypted=meta.get('encrypted', True)
+        )
+    
+    def _apply_record(self, record: Dict[str, Any]):
+        """Apply one log record to the in-memory maps."""
+        op = record.get('op')
+        if op is None:
+            # Snapshot, as written by compaction (and by the old format)
+            self.secrets_cache = dict(record.get('secrets', {}))
+            self.metadata_cache = {
+                key: self._metadata_from_dict(key, meta)
+                for key, meta in record.get('metadata', {}).items()
+            }
+        elif op == 'put':
+            key = record['key']
+            self.secrets_cache[key] = record['value']
+            self.metadata_cache[key] = self._metadata_from_dict(key, record.get('metadata', {}))
+        elif op == 'delete':
+            self.secrets_cache.pop(record['key'], None)
+            self.metadata_cache.pop(record['key'], None)
+        elif op == 'access':
+            # Written by earlier versions, which persisted access metadata
+            for key, (count, last_accessed) in record.get('keys', {}).items():
+                meta = self.metadata_cache.get(key)
+                if meta is not None:
+                    meta.access_count += count
+                    meta.last_accessed = datetime.fromisoformat(last_accessed)
+    
+    def _file_lock(self):
+        """Exclusive lock shared with the other processes using the file."""
+        from utils import file_lock
+        
+        self.secrets_file.parent.mkdir(parents=True, exist_ok=True)
+        return file_lock(str(self.secrets_file) + '.lock', 'w')
+    
+    def _replay(self):
+        """Rebuild the in-memory maps from the log as it is on disk."""
+        self.secrets_cache = {}
+        self.metadata_cache = {}
+        self._log_records = 0
         if not self.secrets_file.exists():
             return
         
+        with open(self.secrets_file, 'rb') as f:
+            content = f.read()
+        # Old-format files end without a newline to separate the next record
+        self._needs_newline = bool(content) and not content.endswith(b'\n')
+        
+        for number, line in enumerate(content.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(self.cipher.decrypt(line.strip()).decode())
+            except Exception as e:
+                # A torn final append or a corrupt line loses only that record
+                logger.error(f"Skipping unreadable record {number} in {self.secrets_file}: {e}")
+                continue
+            self._apply_record(record)
+            self._log_records = 0 if record.get('op') is None else self._log_records + 1
+    
+    def _load_secrets(self):
+        """Load secrets by replaying the encrypted log."""
         try:
-            with open(self.secrets_file, 'rb') as f:
-                encrypted_data = f.read()
-            
-            decrypted_data = self.cipher.decrypt(encrypted_data)
-            data = json.loads(decrypted_data.decode())
-            
-            self.secrets_cache = data.get('secrets', {})
-            
-            # Load metadata
-            metadata = data.get('metadata', {})
-            for key, meta in metadata.items():
-                self.metadata_cache[key] = SecretMetadata(
-                    key=key,
-                    version=meta.get('version', 1),
-                    created_at=datetime.fromisoformat(meta['created_at']) if meta.get('created_at') else None,
-                    expires_at=datetime.fromisoformat(meta['expires_at']) if meta.get('expires_at') else None,
-                    last_accessed=datetime.fromisoformat(meta['last_accessed']) if meta.get('last_accessed') else None,
-                    access_count=meta.get('access_count', 0),
-                    source=meta.get('source', 'local'),
-                    encrypted=meta.get('encrypted', True)
-                )
-            
-            logger.info(f"Loaded {len(self.secrets_cache)} secrets from local storage")
-            
+            self._replay()
         except Exception as e:
             logger.error(f"Failed to load local secrets: {e}")
+            return
+        
+        logger.info(f"Loaded {len(self.secrets_cache)} secrets from local storage")
     
-    def _save_secrets(self):
-        """Save secrets to encrypted file."""
+    def _append(self, record: Dict[str, Any]):
+        """Append one encrypted record to the log; caller holds ``self.lock``."""
+        token = self.cipher.encrypt(json.dumps(record).encode())
+        
+        with self._file_lock():
+            with open(self.secrets_file, 'ab') as f:
+                f.write((b'\n' if self._needs_newline else b'') + token + b'\n')
+        self._needs_newline = False
+        self._log_records += 1
+    
+    def _maybe_compact(self):
+        """Compact once the log is mostly superseded records; caller holds ``self.lock``."""
+        if self._log_records >= max(self.COMPACT_MIN_RECORDS, 2 * len(self.secrets_cache)):
+            self._compact()
+    
+    def _compact(self):
+        """Rewrite the log as a single snapshot record; caller holds ``self.lock``."""
         try:
-            # Prepare data
-            data = {
-                'secrets': self.secrets_cache,
-                'metadata': {
-                    key: {
-                        'version': meta.version,
-                        'created_at': meta.created_at.isoformat() if meta.created_at else None,
-                        'expires_at': meta.expires_at.isoformat() if meta.expires_at else None,
-                        'last_accessed': meta.last_accessed.isoformat() if meta.last_accessed else None,
-                        'access_count': meta.access_count,
-                        'source': meta.source,
-                        'encrypted': meta.encrypted
-                    }
-                    for key, meta in self.metadata_cache.items()
-                }
+            self._apply_accesses()
+            previous = (self.secrets_cache, self.metadata_cache, self._log_records)
+            accessed = {
+                key: (meta.access_count, meta.last_accessed)
+                for key, meta in self.metadata_cache.items()
             }
+            with self._file_lock():
+                # Other processes may have appended since this one loaded
+                self._replay()
+                for key, meta in self.metadata_cache.items():
+                    count, last_accessed = accessed.get(key, (0, None))
+                    if count > meta.access_count:
+                        meta.access_count = count
+                        meta.last_accessed = last_accessed
+                
+                data = {
+                    'secrets': self.secrets_cache,
+                    'metadata': {key: self._metadata_to_dict(meta) for key, meta in self.metadata_cache.items()}
+                }
+                token = self.cipher.encrypt(json.dumps(data).encode())
+                
+                tmp_file = self.secrets_file.with_name(self.secrets_file.name + '.tmp')
+                with open(tmp_file, 'wb') as f:
+                    f.write(token + b'\n')
+                os.replace(tmp_file, self.secrets_file)
+            self._log_records = 0
+            self._needs_newline = False
             
-            # Encrypt and save
-            json_data = json.dumps(data).encode()
-            encrypted_data = self.cipher.encrypt(json_data)
-            
-            # Ensure directory exists
-            self.secrets_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(self.secrets_file, 'wb') as f:
-                f.write(encrypted_data)
-            
-            logger.debug("Secrets saved to local storage")
+            logger.debug("Local secrets log compacted")
             
         except Exception as e:
-            logger.error(f"Failed to save local secrets: {e}")
+            self.secrets_cache, self.metadata_cache, self._log_records = previous
+            logger.error(f"Failed to compact local secrets: {e}")
+    
+    def _apply_accesses(self) -> Dict[str, list]:
+        """Fold queued accesses into the metadata; caller holds ``self.lock``."""
+        batch: Dict[str, list] = {}
+        while True:
+            try:
+                key, accessed_at = self._accesses.popleft()
+            except IndexError:
+                break
+            meta = self.metadata_cache.get(key)
+            if meta is None:
+                continue
+            entry = batch.setdefault(key, [0, accessed_at])
+            entry[0] += 1
+            entry[1] = max(entry[1], accessed_at)
+            meta.access_count += 1
+            meta.last_accessed = max(meta.last_accessed or accessed_at, accessed_at)
+        return batch
+    
+    def flush_access_metadata(self):
+        """Fold queued accesses into the in-memory metadata; nothing is written."""
+        with self.lock:
+            self._apply_accesses()
     
     def get_secret(self, key: str) -> Optional[Any]:
         """Get secret value."""
-        with self.lock:
-            if key not in self.secrets_cache:
-                return None
-            
-            # Update access metadata
-            if key in self.metadata_cache:
-                self.metadata_cache[key].last_accessed = datetime.now()
-                self.metadata_cache[key].access_count += 1
-            
-            # Check expiration
-            if key in self.metadata_cache and self.metadata_cache[key].expires_at:
-                if datetime.now() > self.metadata_cache[key].expires_at:
-                    logger.warning(f"Secret {key} has expired")
-                    return None
-            
-            return self.secrets_cache[key]
+        value = self.secrets_cache.get(key)
+        if value is None and key not in self.secrets_cache:
+            return None
+        
+        # Check expiration
+        meta = self.metadata_cache.get(key)
+        if meta is not None and meta.expires_at and datetime.now() > meta.expires_at:
+            logger.warning(f"Secret {key} has expired")
+            return None
+        
+        # Access metadata is kept in memory and folded in batches
+        if meta is not None:
+            self._accesses.append((key, datetime.now()))
+            if len(self._accesses) >= self.ACCESS_FOLD_THRESHOLD:
+                self.flush_access_metadata()
+        
+        return value
     
     def put_secret(self, key: str, value: Any, expires_at: datetime = None) -> bool:
         """Store secret value."""
         with self.lock:
             try:
-                self.secrets_cache[key] = value
-                
                 # Update metadata
                 now = datetime.now()
-                if key in self.metadata_cache:
-                    self.metadata_cache[key].version += 1
+                meta = self.metadata_cache.get(key)
+                if meta is not None:
+                    meta = replace(meta, version=meta.version + 1)
                 else:
-                    self.metadata_cache[key] = SecretMetadata(
+                    meta = SecretMetadata(
                         key=key,
                         created_at=now,
                         source='local'
                     )
                 
                 if expires_at:
-                    self.metadata_cache[key].expires_at = expires_at
+                    meta.expires_at = expires_at
                 
-                self._save_secrets()
+                self._append({'op': 'put', 'key': key, 'value': value, 'metadata': self._metadata_to_dict(meta)})
+                self.secrets_cache[key] = value
+                self.metadata_cache[key] = meta
+                self._maybe_compact()
                 return True
                 
             except Exception as e:
@@ -386,13 +522,13 @@ class LocalSecretsManager:
         """Delete secret."""
         with self.lock:
             try:
-                if key in self.secrets_cache:
-                    del self.secrets_cache[key]
-                
-                if key in self.metadata_cache:
-                    del self.metadata_cache[key]
+                if key not in self.secrets_cache and key not in self.metadata_cache:
+                    return True
                 
-                self._save_secrets()
+                self._append({'op': 'delete', 'key': key})
+                self.secrets_cache.pop(key, None)
+                self.metadata_cache.pop(key, None)
+                self._maybe_compact()
                 return True
                 
             except Exception as e:
@@ -401,20 +537,61 @@ class LocalSecretsManager:
     
     def list_secrets(self) -> List[str]:
         """List all secret keys."""
-        with self.lock:
-            return list(self.secrets_cache.keys())
+        return list(self.secrets_cache.keys())
+
+
+@dataclass(frozen=True)
+class _CachedSecret:
+    """A cached secret value; times are readings of ``SecretsManager.clock``."""
+    value: Any
+    source: str
+    fetched_at: float
+    refresh_at: float
+    expires_at: float
+
+
+class _Fetch:
+    """A backend fetch in progress that other readers of the key wait on."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[Any] = None
 
 
 class SecretsManager:
-    """Unified secrets management with multiple backends."""
+    """
+    Unified secrets management with multiple backends.
+    
+    Reads never take a lock: the cache is an immutable mapping that writers
+    replace wholesale, so a reader sees either the old or the new snapshot.
+    On a miss only one thread per key goes to the backends while the others
+    wait for its result.  Entries read during the last ``refresh_ahead``
+    fraction of their lifetime are re-fetched by a background thread, so hot
+    secrets never expire in front of a request.  If the backends fail, the
+    last good value keeps being served for up to ``max_stale``.
+    """
+    
+    # Seconds before a failed refresh is retried while serving a stale value
+    STALE_RETRY_SECONDS = 30
+    # Seconds a reader waits for another thread's fetch of the same key
+    FETCH_WAIT_SECONDS = 30
     
     def __init__(self):
         self.vault_client: Optional[VaultClient] = None
         self.local_manager: Optional[LocalSecretsManager] = None
-        self.cache: Dict[str, Any] = {}
-        self.cache_ttl: Dict[str, datetime] = {}
         self.default_cache_duration = timedelta(minutes=5)
+        self.refresh_ahead = 0.2
+        self.max_stale = timedelta(hours=1)
+        # Monotonic time source of the cache timestamps
+        self.clock = time.monotonic
+        # Guards snapshot swaps and the in-flight fetch map, never I/O
         self.lock = threading.Lock()
+        self._snapshot: Mapping[str, _CachedSecret] = MappingProxyType({})
+        self._generation = 0
+        self._fetches: Dict[str, _Fetch] = {}
+        self._refresh_queue: queue.Queue = queue.Queue()
+        self._refresh_pending: set = set()
+        self.refresh_thread = None
         self.rotation_schedule: Dict[str, datetime] = {}
         
         # Auto-rotation thread
@@ -441,61 +618,185 @@ class SecretsManager:
     
     def get_secret(self, key: str, use_cache: bool = True) -> Optional[Any]:
         """Get secret from available backends."""
+        if not use_cache:
+            return self._fetch(key)
+        
+        entry = self._snapshot.get(key)
+        if entry is not None:
+            now = self.clock()
+            if now < entry.expires_at:
+                if now >= entry.refresh_at:
+                    self._schedule_refresh(key)
+                return entry.value
+        
+        return self._load(key, entry)
+    
+    # -- cache internals -------------------------------------------------
+    
+    def _load(self, key: str, stale: Optional[_CachedSecret]) -> Optional[Any]:
+        """Fetch ``key`` once for all concurrent readers and cache it."""
         with self.lock:
-            # Check cache first
-            if use_cache and key in self.cache:
-                if key not in self.cache_ttl or datetime.now() < self.cache_ttl[key]:
-                    return self.cache[key]
-                else:
-                    # Cache expired
-                    del self.cache[key]
-                    del self.cache_ttl[key]
-            
-            # Try Vault first
-            if self.vault_client:
-                try:
-                    vault_data = self.vault_client.get_secret(key)
-                    if vault_data:
-                        # Cache the result
-                        if use_cache:
-                            self.cache[key] = vault_data
-                            self.cache_ttl[key] = datetime.now() + self.default_cache_duration
-                        return vault_data
-                except Exception as e:
-                    logger.warning(f"Failed to get secret from Vault: {e}")
-            
-            # Fallback to local manager
-            if self.local_manager:
-                try:
-                    local_data = self.local_manager.get_secret(key)
-                    if local_data is not None:
-                        # Cache the result
-                        if use_cache:
-                            self.cache[key] = local_data
-                            self.cache_ttl[key] = datetime.now() + self.default_cache_duration
-                        return local_data
-                except Exception as e:
-                    logger.warning(f"Failed to get secret from local storage: {e}")
-            
-            # Check environment variables as last resort
-            env_key = f"SECRET_{key.upper().replace('/', '_')}"
-            env_value = os.environ.get(env_key)
-            if env_value:
-                logger.info(f"Retrieved secret {key} from environment variable")
-                return env_value
-            
-            return None
+            fetch = self._fetches.get(key)
+            leader = fetch is None
+            if leader:
+                fetch = self._fetches[key] = _Fetch()
+            generation = self._generation
+        
+        if not leader:
+            if fetch.done.wait(self.FETCH_WAIT_SECONDS):
+                return fetch.value
+            logger.warning(f"Timed out waiting for secret {key} to be fetched")
+            return stale.value if stale is not None else None
+        
+        try:
+            fetch.value = self._fetch(key, stale, generation)
+        finally:
+            with self.lock:
+                self._fetches.pop(key, None)
+            fetch.done.set()
+        return fetch.value
+    
+    def _fetch(self, key: str, stale: Optional[_CachedSecret] = None,
+               generation: Optional[int] = None) -> Optional[Any]:
+        """
+        Look ``key`` up in Vault, the local store and the environment.
+        
+        ``stale`` is served again if the backends fail; the result is only
+        cached when ``generation`` is given.
+        """
+        backend_failed = False
+        
+        # Try Vault first
+        if self.vault_client:
+            try:
+                vault_data = self.vault_client.get_secret(key)
+                if vault_data:
+                    self._store(key, vault_data, 'vault', generation)
+                    return vault_data
+            except Exception as e:
+                backend_failed = True
+                logger.warning(f"Failed to get secret from Vault: {e}")
+        
+        if backend_failed and stale is not None and self._serve_stale(key, stale, generation):
+            return stale.value
+        
+        # Fallback to local manager
+        if self.local_manager:
+            try:
+                local_data = self.local_manager.get_secret(key)
+                if local_data is not None:
+                    self._store(key, local_data, 'local', generation)
+                    return local_data
+            except Exception as e:
+                backend_failed = True
+                logger.warning(f"Failed to get secret from local storage: {e}")
+        
+        if backend_failed and stale is not None and self._serve_stale(key, stale, generation):
+            return stale.value
+        
+        if generation is not None:
+            self._evict(key, generation)
+        
+        # Check environment variables as last resort
+        env_key = f"SECRET_{key.upper().replace('/', '_')}"
+        env_value = os.environ.get(env_key)
+        if env_value:
+            logger.info(f"Retrieved secret {key} from environment variable")
+            return env_value
+        
+        return None
+    
+    def _serve_stale(self, key: str, stale: _CachedSecret, generation: Optional[int]) -> bool:
+        """Keep serving ``stale`` after a backend failure, unless it is too old."""
+        now = self.clock()
+        if now - stale.fetched_at > self.max_stale.total_seconds():
+            return False
+        logger.warning(f"Backends unavailable, serving cached value of secret {key}")
+        if generation is not None:
+            retry_at = now + self.STALE_RETRY_SECONDS
+            self._swap(generation, key, _CachedSecret(
+                value=stale.value,
+                source=stale.source,
+                fetched_at=stale.fetched_at,
+                refresh_at=retry_at,
+                expires_at=max(stale.expires_at, retry_at),
+            ))
+        return True
+    
+    def _store(self, key: str, value: Any, source: str, generation: Optional[int]) -> None:
+        if generation is None:
+            return
+        now = self.clock()
+        ttl = self.default_cache_duration.total_seconds()
+        self._swap(generation, key, _CachedSecret(
+            value=value,
+            source=source,
+            fetched_at=now,
+            refresh_at=now + ttl * (1 - self.refresh_ahead),
+            expires_at=now + ttl,
+        ))
+    
+    def _evict(self, key: str, generation: int) -> None:
+        self._swap(generation, key, None)
+    
+    def _swap(self, generation: int, key: str, entry: Optional[_CachedSecret]) -> None:
+        """Publish a new snapshot with ``key`` set to ``entry`` (or removed)."""
+        with self.lock:
+            # A put/delete/clear since the fetch started makes its result stale
+            if generation != self._generation:
+                return
+            snapshot = dict(self._snapshot)
+            if entry is None:
+                if snapshot.pop(key, None) is None:
+                    return
+            else:
+                snapshot[key] = entry
+            self._snapshot = MappingProxyType(snapshot)
+    
+    def _invalidate(self, key: Optional[str] = None) -> None:
+        """Drop ``key`` (or everything) from the cache and void in-flight fetches."""
+        with self.lock:
+            self._generation += 1
+            if key is None:
+                self._snapshot = MappingProxyType({})
+            elif key in self._snapshot:
+                snapshot = dict(self._snapshot)
+                del snapshot[key]
+                self._snapshot = MappingProxyType(snapshot)
+    
+    def _schedule_refresh(self, key: str) -> None:
+        with self.lock:
+            if key in self._refresh_pending or key in self._fetches:
+                return
+            self._refresh_pending.add(key)
+            if self.refresh_thread is None or not self.refresh_thread.is_alive():
+                self.refresh_thread = threading.Thread(
+                    target=self._refresh_worker, name='SecretsRefresh', daemon=True
+                )
+                self.refresh_thread.start()
+        self._refresh_queue.put(key)
+    
+    def _refresh_worker(self):
+        """Worker thread re-fetching secrets that are about to expire."""
+        while True:
+            key = self._refresh_queue.get()
+            try:
+                entry = self._snapshot.get(key)
+                # Skip keys invalidated since they were queued
+                if entry is not None:
+                    self._load(key, entry)
+            except Exception as e:
+                logger.error(f"Error refreshing secret {key}: {e}")
+            finally:
+                with self.lock:
+                    self._refresh_pending.discard(key)
     
     def put_secret(self, key: str, value: Any, backend: str = 'auto') -> bool:
         """Store secret in specified backend."""
         success = False
         
         # Clear cache
-        with self.lock:
-            if key in self.cache:
-                del self.cache[key]
-            if key in self.cache_ttl:
-                del self.cache_ttl[key]
+        self._invalidate(key)
         
         if backend == 'vault' or (backend == 'auto' and self.vault_client):
             if self.vault_client:
@@ -528,11 +829,7 @@ class SecretsManager:
         success = False
         
         # Clear cache
-        with self.lock:
-            if key in self.cache:
-                del self.cache[key]
-            if key in self.cache_ttl:
-                del self.cache_ttl[key]
+        self._invalidate(key)
         
         if backend in ['vault', 'all'] and self.vault_client:
             try:
@@ -634,9 +931,7 @@ class SecretsManager:
     
     def clear_cache(self):
         """Clear the secrets cache."""
-        with self.lock:
-            self.cache.clear()
-            self.cache_ttl.clear()
+        self._invalidate()
         logger.info("Secrets cache cleared")
     
     def get_status(self) -> Dict[str, Any]:
@@ -644,7 +939,7 @@ class SecretsManager:
         return {
             'vault_available': self.vault_client is not None,
             'local_available': self.local_manager is not None,
-            'cached_secrets': len(self.cache),
+            'cached_secrets': len(self._snapshot),
             'rotation_enabled': self.rotation_enabled,
             'scheduled_rotations': len(self.rotation_schedule),
             'next_rotation': min(self.rotation_schedule.values()).isoformat() if self.rotation_schedule else None
@@ -681,6 +976,13 @@ def init_secrets_management(app):
     except Exception as e:
         logger.error(f"Failed to initialize local secrets manager: {e}")
     
+    secrets_manager.default_cache_duration = timedelta(
+        seconds=app.config.get('SECRETS_CACHE_SECONDS', 300)
+    )
+    secrets_manager.max_stale = timedelta(
+        seconds=app.config.get('SECRETS_MAX_STALE_SECONDS', 3600)
+    )
+    
     # Store secrets manager in app
     app.secrets_manager = secrets_manager
     
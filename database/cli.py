@@ -161,6 +161,21 @@ def create_admin_command(email, password, name):
         db.session.rollback()
 
 
+@db_cli.command('import-submissions')
+@click.option('--path', default=None, help='Legacy submissions.json (defaults to SUBMISSIONS_FILE)')
+@click.option('--overwrite', is_flag=True, help='Replace reports that already exist in the database')
+@with_appcontext
+def import_submissions_command(path, overwrite):
+    """Import legacy submissions.json entries into the reports tables."""
+    try:
+        from services.submission_store import import_legacy_submissions
+        imported, skipped = import_legacy_submissions(path, overwrite=overwrite)
+        click.echo(f'✅ Imported {imported} submissions ({skipped} skipped)')
+    except Exception as e:
+        click.echo(f'❌ Failed to import submissions: {e}')
+        db.session.rollback()
+
+
 def register_db_commands(app):
     """Register database CLI commands with Flask app."""
     app.cli.add_command(db_cli, name='db')
\ No newline at end of file
@@ -40,9 +40,19 @@ def run_migration(app, db):
                 ('submitted_at', 'TIMESTAMP', None),
                 ('approved_at', 'TIMESTAMP', None),
                 ('approved_by', 'VARCHAR(120)', None),
-                ('edit_count', 'INTEGER', 0)
+                ('edit_count', 'INTEGER', 0),
+                ('template_id', 'INTEGER', None)
             ]
             
+            # Columns added to other tables, applied after the reports table
+            other_table_columns = {
+                'report_versions': [
+                    ('is_keyframe', 'BOOLEAN', True),
+                    ('base_version_id', 'INTEGER', None),
+                    ('snapshot_size', 'INTEGER', None),
+                ],
+            }
+            
             # Check database type
             db_uri = str(engine.url)
             is_sqlite = 'sqlite' in db_uri
@@ -89,6 +99,53 @@ def run_migration(app, db):
                     else:
                         logger.info(f"Column {column_name} already exists")
             
+            # Add missing columns to other tables
+            existing_tables = inspector.get_table_names()
+            with engine.begin() as conn:
+                for table_name, table_columns in other_table_columns.items():
+                    if table_name not in existing_tables:
+                        continue
+                    table_existing = [col['name'] for col in inspector.get_columns(table_name)]
+                    for column_name, column_type, default_value in table_columns:
+                        if column_name in table_existing:
+                            continue
+                        sql = f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"
+                        if isinstance(default_value, bool):
+                            sql += f" DEFAULT {'TRUE' if default_value else 'FALSE'}" if is_postgresql else f" DEFAULT {int(default_value)}"
+                        elif default_value is not None:
+                            sql += f" DEFAULT {default_value}"
+                        try:
+                            conn.execute(text(sql))
+                            logger.info(f"✓ Added column {table_name}.{column_name} successfully")
+                        except Exception as col_error:
+                            logger.warning(f"Could not add column {table_name}.{column_name}: {col_error}")
+            
+            # Index the template usage statistics and, the first time the
+            # column appears, attribute existing reports to the active
+            # template of their type and recount template usage
+            if 'report_templates' in existing_tables:
+                with engine.begin() as conn:
+                    try:
+                        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_report_template_status ON reports (template_id, status)"))
+                        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_report_template_user ON reports (template_id, user_email)"))
+                        if 'template_id' not in existing_columns:
+                            active = 'TRUE' if is_postgresql else '1'
+                            conn.execute(text(f"""
+                                UPDATE reports SET template_id = (
+                                    SELECT t.id FROM report_templates t
+                                    WHERE t.type = reports.type AND t.is_active = {active}
+                                    ORDER BY t.updated_at DESC, t.id DESC LIMIT 1
+                                ) WHERE template_id IS NULL
+                            """))
+                            conn.execute(text("""
+                                UPDATE report_templates SET usage_count = (
+                                    SELECT COUNT(*) FROM reports WHERE reports.template_id = report_templates.id
+                                )
+                            """))
+                        logger.info("✓ Template statistics indexes are in place")
+                    except Exception as index_error:
+                        logger.warning(f"Could not prepare template statistics: {index_error}")
+            
             # Check if report_edits table exists, create if not
             if 'report_edits' not in inspector.get_table_names():
                 logger.info("Creating report_edits table...")
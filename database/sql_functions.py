@@ -0,0 +1,35 @@
+"""
+Portable SQL expressions for queries that must run on SQLite and PostgreSQL.
+"""
+from sqlalchemy import Float
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class hours_between(FunctionElement):
+    """``hours_between(start, end)``: hours from ``start`` to ``end`` as a float."""
+
+    type = Float()
+    inherit_cache = True
+    name = 'hours_between'
+
+
+@compiles(hours_between)
+def _hours_between_default(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return (f"(EXTRACT(EPOCH FROM ({compiler.process(end, **kw)} - {compiler.process(start, **kw)}))"
+            f" / 3600.0)")
+
+
+@compiles(hours_between, 'sqlite')
+def _hours_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return (f"((julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)}))"
+            f" * 24.0)")
+
+
+@compiles(hours_between, 'mysql')
+def _hours_between_mysql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return (f"(TIMESTAMPDIFF(SECOND, {compiler.process(start, **kw)}, {compiler.process(end, **kw)})"
+            f" / 3600.0)")
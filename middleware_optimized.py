@@ -1,31 +1,230 @@
 """
 Optimized middleware for SAT Report Generator with caching and compression
 """
-import gzip
-import io
+import mimetypes
+import zlib
 from functools import wraps
-from flask import request, make_response, current_app
+from flask import request, make_response, current_app, send_from_directory
+from werkzeug.exceptions import NotFound
 from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
 import hashlib
 import time
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/x-javascript',
+    'application/xml', 'application/x-ndjson', 'image/svg+xml',
+)
+
+
+class _BrotliCompressor:
+    """zlib-style compress/flush interface over brotli.Compressor"""
+    
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+    
+    def compress(self, data):
+        return self._compressor.process(data)
+    
+    def flush(self):
+        return self._compressor.finish()
+
+
+class StreamingCompressionMiddleware:
+    """
+    WSGI middleware that compresses response bodies as they are produced.
+    
+    Each chunk the application yields is fed to an incremental gzip (or
+    brotli) compressor and whatever compressed output is ready is passed on,
+    so neither buffered nor streamed responses (CSV and NDJSON exports,
+    send_file) are ever held in memory twice. Responses with an unknown
+    length are only compressed once they reach ``min_size`` bytes.
+    """
+    
+    def __init__(self, wsgi_app, min_size=500, level=6, brotli_quality=4,
+                 compressible_types=COMPRESSIBLE_TYPES):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.compressible_types = tuple(compressible_types)
+    
+    def negotiate(self, environ):
+        """Preferred encoding the client accepts, or None"""
+        accept = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and accept.quality('br') > 0:
+            return 'br'
+        if accept.quality('gzip') > 0:
+            return 'gzip'
+        return None
+    
+    def compressor(self, encoding):
+        if encoding == 'br':
+            return _BrotliCompressor(self.brotli_quality)
+        return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    
+    def should_compress(self, status, headers):
+        """Check the status and headers of a response for compressibility"""
+        code = int(status.split(' ', 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return False
+        if 'Content-Encoding' in headers or 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        content_type = headers.get('Content-Type', '')
+        # Event streams must reach the client unbuffered
+        if content_type.startswith('text/event-stream'):
+            return False
+        if not content_type.startswith(self.compressible_types):
+            return False
+        length = headers.get('Content-Length', type=int)
+        return length is None or length >= self.min_size
+    
+    def __call__(self, environ, start_response):
+        encoding = None if environ.get('REQUEST_METHOD') == 'HEAD' else self.negotiate(environ)
+        if encoding is None:
+            return self.wsgi_app(environ, start_response)
+        
+        state = {}
+        
+        def capture_start_response(status, headers, exc_info=None):
+            state['start'] = (status, headers, exc_info)
+            return lambda data: None  # legacy write() is not supported
+        
+        app_iter = self.wsgi_app(environ, capture_start_response)
+        return self._iter_response(app_iter, state, start_response, encoding)
+    
+    def _iter_response(self, app_iter, state, start_response, encoding):
+        iterator = iter(app_iter)
+        try:
+            buffered, size, exhausted = [], 0, False
+            
+            def pull():
+                nonlocal size, exhausted
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    return
+                buffered.append(chunk)
+                size += len(chunk)
+            
+            # The application may call start_response on its first chunk
+            while 'start' not in state and not exhausted:
+                pull()
+            status, headers, exc_info = state['start']
+            response_headers = Headers(headers)
+            
+            compress = self.should_compress(status, response_headers)
+            if compress and 'Content-Length' not in response_headers:
+                while size < self.min_size and not exhausted:
+                    pull()
+                compress = size >= self.min_size
+            
+            if not compress:
+                start_response(status, headers, exc_info)
+                yield from buffered
+                buffered.clear()
+                yield from iterator
+                return
+            
+            response_headers.remove('Content-Length')
+            response_headers.remove('Accept-Ranges')
+            response_headers['Content-Encoding'] = encoding
+            vary = response_headers.get('Vary')
+            if not vary:
+                response_headers['Vary'] = 'Accept-Encoding'
+            elif 'accept-encoding' not in vary.lower():
+                response_headers['Vary'] = f'{vary}, Accept-Encoding'
+            etag = response_headers.get('ETag')
+            if etag and not etag.startswith('W/'):
+                # The compressed bytes differ from the ones the strong ETag names
+                response_headers['ETag'] = f'W/{etag}'
+            start_response(status, response_headers.to_wsgi_list(), exc_info)
+            
+            compressor = self.compressor(encoding)
+            for chunk in buffered:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            buffered.clear()
+            for chunk in iterator:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
 class OptimizedMiddleware:
     """Middleware for performance optimization"""
     
     def __init__(self, app=None):
         self.app = app
+        self.static_prefix = '/static/'
+        self.asset_manifest = None
+        self.revalidate_max_age = 3600
         if app:
             self.init_app(app)
     
     def init_app(self, app):
         """Initialize middleware with Flask app"""
+        from cache.static_assets import DEFAULT_BUILD_DIR, get_asset_manifest
+
+        self.static_prefix = f"{app.static_url_path}/"
+        self.static_folder = app.static_folder
+        self.revalidate_max_age = app.config.get('STATIC_REVALIDATE_MAX_AGE', 3600)
+        self.asset_manifest = None
+        if self.static_folder:
+            build_dir = app.config.get('STATIC_BUILD_DIR', DEFAULT_BUILD_DIR)
+            self.asset_manifest = get_asset_manifest(self.static_folder, build_dir)
+            # url_for('static', filename='css/form.css') -> the fingerprinted build output
+            app.url_defaults(self.fingerprint_static_url)
+
         app.before_request(self.before_request)
         app.after_request(self.after_request)
+        
+        # Compress bodies chunk by chunk as the WSGI server consumes them
+        app.wsgi_app = StreamingCompressionMiddleware(
+            app.wsgi_app,
+            min_size=app.config.get('COMPRESS_MIN_SIZE', 500),
+            level=app.config.get('COMPRESS_LEVEL', 6),
+            brotli_quality=app.config.get('COMPRESS_BROTLI_QUALITY', 4),
+        )
+    
+    def fingerprint_static_url(self, endpoint, values):
+        """Point static URLs at fingerprinted build outputs when a manifest exists"""
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.asset_manifest.resolve(values['filename'])
     
     def before_request(self):
         """Pre-request optimizations"""
         # Record request start time for performance monitoring
         request._start_time = time.time()
+        
+        # Serve the precompressed sibling of a built asset instead of the file itself
+        if self.asset_manifest is not None and request.path.startswith(self.static_prefix) \
+                and request.method in ('GET', 'HEAD'):
+            return self.serve_precompressed(request.path[len(self.static_prefix):])
+    
+    def serve_precompressed(self, filename):
+        """Send the .br/.gz build output the client accepts, or None to fall through"""
+        variant = self.asset_manifest.variant_for(filename, request.accept_encodings)
+        if variant is None:
+            return None
+        encoding, suffix = variant
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        try:
+            response = send_from_directory(self.static_folder, filename + suffix, mimetype=mimetype)
+        except NotFound:
+            return None
+        response.headers['Content-Encoding'] = encoding
+        return response
     
     def after_request(self, response):
         """Post-request optimizations"""
@@ -35,97 +234,27 @@ class OptimizedMiddleware:
             response.headers['X-Response-Time'] = f'{elapsed:.3f}s'
         
         # Apply caching headers for static files
-        if request.path.startswith('/static/'):
+        if request.path.startswith(self.static_prefix):
             self.add_static_cache_headers(response)
         
-        # Apply gzip compression for text-based responses
-        if self.should_compress(response):
-            response = self.compress_response(response)
-        
         # Add security headers
         self.add_security_headers(response)
         
         return response
     
     def add_static_cache_headers(self, response):
-        """Add aggressive caching headers for static files"""
-        # Determine cache duration based on file type
-        path = request.path
-        
-        if path.endswith(('.jpg', '.jpeg', '.png', '.gif', '.ico', '.svg')):
-            # Images - cache for 1 year
-            max_age = 31536000
-        elif path.endswith(('.css', '.js')):
-            # CSS and JS - cache for 1 month with revalidation
-            max_age = 2592000
-            # Only add ETag if response has data and not in passthrough mode
-            try:
-                if not response.direct_passthrough:
-                    response.headers['ETag'] = self.generate_etag(response.get_data())
-            except:
-                pass  # Skip ETag if there's any issue
-        elif path.endswith(('.woff', '.woff2', '.ttf', '.eot')):
-            # Fonts - cache for 1 year
-            max_age = 31536000
-        else:
-            # Other static files - cache for 1 week
-            max_age = 604800
+        """Add caching headers for static files"""
+        filename = request.path[len(self.static_prefix):]
         
-        response.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+        if self.asset_manifest is not None and self.asset_manifest.is_fingerprinted(filename):
+            # Content-addressed build output - the URL changes whenever the file does
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            # Plain filenames can change in place; send_file's ETag and
+            # Last-Modified make the revalidation a cheap 304
+            response.headers['Cache-Control'] = f'public, max-age={self.revalidate_max_age}'
         response.headers['Vary'] = 'Accept-Encoding'
     
-    def should_compress(self, response):
-        """Check if response should be compressed"""
-        # Don't compress if already compressed
-        if 'Content-Encoding' in response.headers:
-            return False
-        
-        # Don't compress small responses (less than 500 bytes)
-        if response.content_length and response.content_length < 500:
-            return False
-        
-        # Don't compress non-text content
-        content_type = response.headers.get('Content-Type', '')
-        compressible_types = [
-            'text/', 'application/json', 'application/javascript',
-            'application/xml', 'application/x-javascript'
-        ]
-        
-        if not any(ct in content_type for ct in compressible_types):
-            return False
-        
-        # Check if client accepts gzip
-        accept_encoding = request.headers.get('Accept-Encoding', '')
-        return 'gzip' in accept_encoding.lower()
-    
-    def compress_response(self, response):
-        """Compress response using gzip"""
-        try:
-            # Skip compression for direct passthrough responses
-            if response.direct_passthrough:
-                return response
-            
-            # Get response data
-            data = response.get_data()
-            
-            # Compress data
-            gzip_buffer = io.BytesIO()
-            with gzip.GzipFile(mode='wb', fileobj=gzip_buffer, compresslevel=6) as gzip_file:
-                gzip_file.write(data)
-            
-            compressed_data = gzip_buffer.getvalue()
-            
-            # Only use compression if it actually reduces size
-            if len(compressed_data) < len(data):
-                response.set_data(compressed_data)
-                response.headers['Content-Encoding'] = 'gzip'
-                response.headers['Content-Length'] = len(compressed_data)
-                response.headers['Vary'] = 'Accept-Encoding'
-        except Exception as e:
-            current_app.logger.error(f"Compression error: {e}")
-        
-        return response
-    
     def add_security_headers(self, response):
         """Add security headers for better performance and security"""
         # Prevent clickjacking
@@ -92,6 +92,7 @@ class Report(db.Model):
     approved_at = db.Column(db.DateTime, nullable=True)  # When finally approved by Automation Manager
     approved_by = db.Column(db.String(120), nullable=True)  # Email of the approver
     edit_count = db.Column(db.Integer, default=0)  # Number of edits made
+    template_id = db.Column(db.Integer, db.ForeignKey('report_templates.id'), nullable=True)  # Template the report was created from
 
     # Relationships
     sat_report = db.relationship('SATReport', backref='parent_report', uselist=False, cascade='all, delete-orphan')
@@ -101,6 +102,12 @@ class Report(db.Model):
     sds_report = db.relationship('SDSReport', backref='parent_report', uselist=False, cascade='all, delete-orphan')
     fat_report = db.relationship('FATReport', backref='parent_report', uselist=False, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Grouped counts behind the template usage statistics
+        db.Index('idx_report_template_status', 'template_id', 'status'),
+        db.Index('idx_report_template_user', 'template_id', 'user_email'),
+    )
+
     def __repr__(self):
         return f'<Report {self.id}: {self.type} - {self.document_title}>'
 
@@ -382,6 +389,26 @@ class UserAnalytics(db.Model):
     def __repr__(self):
         return f'<UserAnalytics {self.user_email} - {self.date}>'
 
+class ReportRollup(db.Model):
+    """Report counts pre-aggregated per UTC day or hour of creation (see services.analytics_rollups)"""
+    __tablename__ = 'report_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(8), nullable=False)  # 'day', 'hour', or 'meta' for the backfill marker
+    bucket_start = db.Column(db.DateTime, nullable=False)  # Start of the day/hour the reports were created in
+    dimension = db.Column(db.String(20), nullable=False)  # 'created', 'status', 'type', 'client', 'approval', 'tm_approval'
+    bucket_key = db.Column(db.String(200), nullable=False, default='')  # Status, type or client name
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total_hours = db.Column(db.Float, nullable=False, default=0.0)  # Summed durations for the approval dimensions
+    
+    __table_args__ = (
+        db.UniqueConstraint('period', 'bucket_start', 'dimension', 'bucket_key', name='uq_report_rollup_bucket'),
+        db.Index('idx_report_rollup_lookup', 'period', 'dimension', 'bucket_start'),
+    )
+    
+    def __repr__(self):
+        return f'<ReportRollup {self.period} {self.bucket_start} {self.dimension}={self.bucket_key}: {self.count}>'
+
 class ReportVersion(db.Model):
     """Track document versions and changes"""
     __tablename__ = 'report_versions'
@@ -392,9 +419,12 @@ class ReportVersion(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.String(120), nullable=False)
     change_summary = db.Column(db.Text, nullable=True)
-    data_snapshot = db.Column(db.Text, nullable=False)  # JSON snapshot of report data
+    data_snapshot = db.Column(db.Text, nullable=False)  # Full JSON keyframe or compressed delta (see services.version_store)
     file_path = db.Column(db.String(200), nullable=True)  # Path to generated document
     is_current = db.Column(db.Boolean, default=False)
+    is_keyframe = db.Column(db.Boolean, default=True)  # False when data_snapshot is a delta
+    base_version_id = db.Column(db.Integer, db.ForeignKey('report_versions.id'), nullable=True)  # Version the delta applies to
+    snapshot_size = db.Column(db.Integer, nullable=True)  # Uncompressed size of the full document in bytes
     
     def __repr__(self):
         return f'<ReportVersion {self.report_id} - {self.version_number}>'
@@ -477,6 +507,38 @@ class ReportArchive(db.Model):
     def __repr__(self):
         return f'<ReportArchive {self.original_report_id} - {self.document_title}>'
 
+class UploadedFile(db.Model):
+    """Metadata for files uploaded through the files API; identical content shares one blob on disk"""
+    __tablename__ = 'uploaded_files'
+
+    id = db.Column(db.String(36), primary_key=True)  # Also the file id in API URLs
+    report_id = db.Column(db.String(36), nullable=True)
+    filename = db.Column(db.String(255), nullable=False)  # Original (sanitised) filename
+    sha256 = db.Column(db.String(64), nullable=False, index=True)  # Content hash, names the blob
+    size = db.Column(db.Integer, nullable=False)
+    mime_type = db.Column(db.String(100), nullable=True)
+    uploaded_by = db.Column(db.String(120), nullable=True)  # Uploader's email
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Keyset pagination: newest first, optionally within a report
+        db.Index('idx_uploaded_file_listing', 'created_at', 'id'),
+        db.Index('idx_uploaded_file_report_listing', 'report_id', 'created_at', 'id'),
+    )
+
+    @property
+    def extension(self):
+        return self.filename.rsplit('.', 1)[-1].lower() if '.' in self.filename else ''
+
+    @property
+    def blob_name(self):
+        """Blob path relative to the upload folder."""
+        name = f"{self.sha256}.{self.extension}" if self.extension else self.sha256
+        return os.path.join('blobs', self.sha256[:2], name)
+
+    def __repr__(self):
+        return f'<UploadedFile {self.id} {self.filename}>'
+
 
 
 class ScheduledReport(db.Model):
@@ -775,8 +837,8 @@ class ReportEdit(db.Model):
     report_id = db.Column(db.String(36), db.ForeignKey('reports.id'), nullable=False)
     editor_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     editor_email = db.Column(db.String(120), nullable=False)  # Store email for reference
-    before_json = db.Column(db.Text, nullable=True)  # Previous data state
-    after_json = db.Column(db.Text, nullable=False)  # New data state
+    before_json = db.Column(db.Text, nullable=True)  # Previous data state (legacy rows only)
+    after_json = db.Column(db.Text, nullable=False)  # New data state, or compressed patch from the previous state
     changes_summary = db.Column(db.Text, nullable=True)  # Human-readable summary of changes
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     version_before = db.Column(db.String(10), nullable=True)  # e.g., R0
@@ -63,7 +63,8 @@ def main():
     
     print("\n" + "=" * 50)
     print("🚀 Ready for deployment!")
-    print("Use: gunicorn --bind 0.0.0.0:80 --workers 4 production_start:app")
+    # Notification streams hold a thread each; sync workers would be pinned by one
+    print("Use: gunicorn --bind 0.0.0.0:80 --workers 4 --worker-class gthread --threads 40 production_start:app")
     
     return app
 
@@ -5,7 +5,7 @@ from api.security import APIUsage
 from security.audit import AuditLog
 from auth import role_required
 from datetime import datetime, timedelta
-from sqlalchemy import func, extract
+from sqlalchemy import func
 import json
 
 analytics_bp = Blueprint('analytics', __name__)
@@ -29,74 +29,22 @@ def analytics_dashboard():
 def get_report_metrics():
     """Get report generation metrics for charts"""
     try:
-        # Time range
-        days = int(request.args.get('days', 30))
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Reports by status
-        status_counts = db.session.query(
-            Report.status,
-            func.count(Report.id).label('count')
-        ).filter(
-            Report.created_at >= start_date
-        ).group_by(Report.status).all()
-        
-        # Reports by type
-        type_counts = db.session.query(
-            Report.type,
-            func.count(Report.id).label('count')
-        ).filter(
-            Report.created_at >= start_date
-        ).group_by(Report.type).all()
-        
-        # Daily report creation
-        daily_reports = db.session.query(
-            func.date(Report.created_at).label('date'),
-            func.count(Report.id).label('count')
-        ).filter(
-            Report.created_at >= start_date
-        ).group_by(func.date(Report.created_at)).order_by(func.date(Report.created_at)).all()
-        
-        # Top clients
-        top_clients = db.session.query(
-            Report.client_name,
-            func.count(Report.id).label('count')
-        ).filter(
-            Report.created_at >= start_date
-        ).group_by(Report.client_name).order_by(func.count(Report.id).desc()).limit(10).all()
-        
-        # Average approval time
-        approved_reports = Report.query.filter(
-            Report.status.in_(['TECH_APPROVED', 'PM_APPROVED', 'COMPLETED']),
-            Report.created_at >= start_date
-        ).all()
+        from services.analytics_rollups import report_metrics, report_metrics_raw, rollups_ready, window_start
         
-        approval_times = []
-        for report in approved_reports:
-            if report.updated_at:
-                time_diff = (report.updated_at - report.created_at).total_seconds() / 3600  # Hours
-                approval_times.append(time_diff)
+        # Time range, in whole UTC days
+        days = int(request.args.get('days', 30))
+        granularity = 'hour' if request.args.get('granularity') == 'hour' else 'day'
+        start_date = window_start(days)
         
-        avg_approval_time = sum(approval_times) / len(approval_times) if approval_times else 0
+        # Pre-aggregated rollups once backfilled, raw tables until then
+        if rollups_ready():
+            metrics = report_metrics(start_date, granularity)
+        else:
+            metrics = report_metrics_raw(start_date, granularity)
         
         return jsonify({
             'success': True,
-            'metrics': {
-                'status_distribution': [
-                    {'status': s[0], 'count': s[1]} for s in status_counts
-                ],
-                'type_distribution': [
-                    {'type': t[0], 'count': t[1]} for t in type_counts
-                ],
-                'daily_trend': [
-                    {'date': d[0].isoformat(), 'count': d[1]} for d in daily_reports
-                ],
-                'top_clients': [
-                    {'client': c[0], 'count': c[1]} for c in top_clients
-                ],
-                'avg_approval_time_hours': round(avg_approval_time, 2),
-                'total_reports': Report.query.filter(Report.created_at >= start_date).count()
-            }
+            'metrics': metrics
         })
         
     except Exception as e:
@@ -108,56 +56,62 @@ def get_report_metrics():
 def get_user_performance():
     """Get user performance metrics"""
     try:
+        from sqlalchemy import case, distinct
+        from database.sql_functions import hours_between
+        
         # Time range
         days = int(request.args.get('days', 30))
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        # Reports by user
+        # Top users by reports created, resolved against users in the same query
+        reports_created = func.count(Report.id)
         user_reports = db.session.query(
             Report.user_email,
-            func.count(Report.id).label('count'),
-            func.avg(
-                extract('epoch', Report.updated_at - Report.created_at) / 3600
-            ).label('avg_time')
+            User.full_name,
+            reports_created.label('count'),
+            func.avg(hours_between(Report.created_at, Report.updated_at)).label('avg_time')
+        ).join(
+            User, User.email == Report.user_email
         ).filter(
             Report.created_at >= start_date
-        ).group_by(Report.user_email).all()
-        
-        # Format user data
-        user_metrics = []
-        for user_data in user_reports:
-            user = User.query.filter_by(email=user_data[0]).first()
-            if user:
-                user_metrics.append({
-                    'name': user.full_name,
-                    'email': user_data[0],
-                    'reports_created': user_data[1],
-                    'avg_completion_hours': round(user_data[2] if user_data[2] else 0, 2)
-                })
-        
-        # Sort by reports created
-        user_metrics.sort(key=lambda x: x['reports_created'], reverse=True)
-        
-        # Approval rates
-        total_submitted = Report.query.filter(
-            Report.status != 'DRAFT',
-            Report.created_at >= start_date
-        ).count()
-        
-        total_approved = Report.query.filter(
-            Report.status.in_(['TECH_APPROVED', 'PM_APPROVED', 'COMPLETED']),
+        ).group_by(
+            Report.user_email, User.full_name
+        ).order_by(
+            reports_created.desc(), Report.user_email
+        ).limit(10).all()
+        
+        user_metrics = [
+            {
+                'name': full_name,
+                'email': email,
+                'reports_created': count,
+                'avg_completion_hours': round(avg_time if avg_time else 0, 2)
+            }
+            for email, full_name, count, avg_time in user_reports
+        ]
+        
+        # Users with reports in the window, submissions and approvals in one pass
+        total_users, total_submitted, total_approved = db.session.query(
+            func.count(distinct(User.email)),
+            func.coalesce(func.sum(case((Report.status != 'DRAFT', 1), else_=0)), 0),
+            func.coalesce(func.sum(case(
+                (Report.status.in_(['TECH_APPROVED', 'PM_APPROVED', 'COMPLETED']), 1), else_=0
+            )), 0)
+        ).select_from(Report).outerjoin(
+            User, User.email == Report.user_email
+        ).filter(
             Report.created_at >= start_date
-        ).count()
+        ).one()
         
         approval_rate = (total_approved / total_submitted * 100) if total_submitted > 0 else 0
         
         return jsonify({
             'success': True,
             'performance': {
-                'user_metrics': user_metrics[:10],  # Top 10 users
+                'user_metrics': user_metrics,  # Top 10 users
                 'approval_rate': round(approval_rate, 2),
-                'total_users': len(user_metrics),
-                'active_users': len([u for u in user_metrics if u['reports_created'] > 0])
+                'total_users': total_users,
+                'active_users': total_users
             }
         })
         
@@ -192,16 +146,9 @@ def get_system_health():
         
         error_rate = (recent_errors / total_actions * 100) if total_actions > 0 else 0
         
-        # Storage usage (simplified)
-        import os
-        outputs_size = 0
-        if os.path.exists('outputs'):
-            for dirpath, dirnames, filenames in os.walk('outputs'):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    outputs_size += os.path.getsize(filepath)
-        
-        storage_mb = outputs_size / (1024 * 1024)
+        # Storage usage from the accounting counters (no directory walk)
+        from services.storage_accounting import storage_accountant
+        storage_mb = storage_accountant.snapshot('outputs')['bytes'] / (1024 * 1024)
         
         # Response times from API usage
         recent_api_calls = APIUsage.query.filter(
@@ -236,49 +183,18 @@ def get_system_health():
 def get_workflow_analytics():
     """Get workflow and approval analytics"""
     try:
-        days = int(request.args.get('days', 30))
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Approval cycle times by stage
-        reports = Report.query.filter(
-            Report.created_at >= start_date
-        ).all()
-        
-        submission_to_tm = []
-        tm_to_pm = []
-        pm_to_complete = []
+        from services.analytics_rollups import rollups_ready, window_start, workflow_metrics, workflow_metrics_raw
         
-        for report in reports:
-            if report.tm_approved and report.updated_at:
-                # Calculate time from submission to TM approval
-                # This is simplified - in production would track actual approval timestamps
-                time_to_tm = (report.updated_at - report.created_at).total_seconds() / 3600
-                submission_to_tm.append(time_to_tm)
+        start_date = window_start(int(request.args.get('days', 30)))
         
-        # Average cycle times
-        avg_submission_to_tm = sum(submission_to_tm) / len(submission_to_tm) if submission_to_tm else 0
-        
-        # Bottleneck analysis
-        pending_tm = Report.query.filter_by(status='SUBMITTED').count()
-        pending_pm = Report.query.filter_by(status='TECH_APPROVED').count()
-        
-        # Rejection rates by stage
-        rejected_count = Report.query.filter_by(status='REJECTED').count()
-        total_processed = Report.query.filter(
-            Report.status != 'DRAFT'
-        ).count()
-        
-        rejection_rate = (rejected_count / total_processed * 100) if total_processed > 0 else 0
+        if rollups_ready():
+            workflow = workflow_metrics(start_date)
+        else:
+            workflow = workflow_metrics_raw(start_date)
         
         return jsonify({
             'success': True,
-            'workflow': {
-                'avg_tm_approval_hours': round(avg_submission_to_tm, 2),
-                'pending_tm_approval': pending_tm,
-                'pending_pm_approval': pending_pm,
-                'rejection_rate': round(rejection_rate, 2),
-                'bottleneck_stage': 'TM Approval' if pending_tm > pending_pm else 'PM Approval' if pending_pm > 0 else 'None'
-            }
+            'workflow': workflow
         })
         
     except Exception as e:
@@ -289,58 +205,28 @@ def get_workflow_analytics():
 @login_required
 @role_required(['Admin', 'Automation Manager'])
 def export_analytics():
-    """Export analytics data to CSV"""
+    """Export analytics data as a streamed CSV/NDJSON/XLSX download"""
     try:
-        import csv
-        import io
-        from flask import Response
+        from services.export_engine import export_response
         
-        # Get date range
-        days = int(request.args.get('days', 30))
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'Report ID', 'Type', 'Title', 'Project Reference', 'Client',
-            'Status', 'Created By', 'Created At', 'Updated At',
-            'TM Approved', 'PM Approved'
-        ])
-        
-        # Get reports
-        reports = Report.query.filter(
-            Report.created_at >= start_date
-        ).order_by(Report.created_at.desc()).all()
-        
-        # Write data
-        for report in reports:
-            writer.writerow([
-                report.id,
-                report.type,
-                report.document_title,
-                report.project_reference,
-                report.client_name,
-                report.status,
-                report.user_email,
-                report.created_at.isoformat(),
-                report.updated_at.isoformat() if report.updated_at else '',
-                'Yes' if report.tm_approved else 'No',
-                'Yes' if report.pm_approved else 'No'
-            ])
+        params = {'days': int(request.args.get('days', 30))}
+        background = request.args.get('async')
         
-        output.seek(0)
-        
-        return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename=analytics_{datetime.now().strftime("%Y%m%d")}.csv'
-            }
+        return export_response(
+            'analytics', params,
+            fmt=request.args.get('format', 'csv'),
+            background=None if background is None else background.lower() in ('1', 'true', 'yes'),
+            download_endpoint='analytics.download_analytics_export',
         )
         
     except Exception as e:
         current_app.logger.error(f"Error exporting analytics: {e}")
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/api/export-analytics/<export_id>')
+@login_required
+@role_required(['Admin', 'Automation Manager'])
+def download_analytics_export(export_id):
+    """Download an analytics export that was written in the background"""
+    from services.export_engine import download_response
+    return download_response('analytics', export_id)
@@ -4,9 +4,9 @@ import datetime
 import base64
 from docxtpl import DocxTemplate, InlineImage
 from docx.shared import Mm
+from models import db
+from services.submission_store import load_submission, store_submission
 from utils import (
-    load_submissions,
-    save_submissions,
     send_approval_link,
     notify_completion,
     convert_to_pdf,
@@ -20,35 +20,10 @@ approval_bp = Blueprint('approval', __name__)
 def approve_submission(submission_id, stage):
     """Handle approval workflow for a submission"""
     try:
-        submissions = load_submissions()
-        
-        # Fix: Ensure submissions is a dictionary, not a list
-        if isinstance(submissions, list):
-            current_app.logger.error(f"Submissions loaded as list instead of dict: {type(submissions)}")
-            # Try to load from database instead
-            try:
-                from models import db, Report, SATReport
-                report = Report.query.get(submission_id)
-                if report:
-                    sat_report = SATReport.query.filter_by(report_id=submission_id).first()
-                    if sat_report and sat_report.data_json:
-                        import json as json_module
-                        submission_data = json_module.loads(sat_report.data_json)
-                        current_app.logger.info(f"Loaded submission data from database for {submission_id}")
-                    else:
-                        current_app.logger.error(f"No SAT report data found for {submission_id}")
-                        flash("Submission data not found", "error")
-                        return redirect(url_for('main.index'))
-                else:
-                    current_app.logger.error(f"No report found for {submission_id}")
-                    flash("Submission not found", "error")
-                    return redirect(url_for('main.index'))
-            except Exception as e:
-                current_app.logger.error(f"Error loading from database: {e}")
-                flash("Error loading submission data", "error")
-                return redirect(url_for('main.index'))
-        else:
-            submission_data = submissions.get(submission_id)
+        # Lock only this report's row while an approval is being recorded
+        report, sat_report, submission_data = load_submission(
+            submission_id, for_update=request.method == "POST"
+        )
         
         if not submission_data:
             flash("Submission not found", "error")
@@ -128,8 +103,31 @@ def approve_submission(submission_id, stage):
                 
                 # Mark as approved and lock permanently when Automation Manager approves
                 submission_data["status"] = "APPROVED"
-                submission_data["locked"] = True
             
+            # Once a stage is approved, lock editing 
+            submission_data["locked"] = True
+
+            # Update last modified timestamp
+            submission_data["updated_at"] = datetime.datetime.now().isoformat()
+
+            # When Automation Manager (stage 1) approves, lock report permanently
+            if stage == 1:
+                report.status = 'APPROVED'
+                report.approved_at = datetime.datetime.utcnow()
+                report.approved_by = current_stage.get("approver_email", current_stage.get("approver_name", ""))
+                current_app.logger.info(f"Automation Manager approved report {submission_id} - locking permanently")
+
+            # Save approvals and the approval context in one transaction
+            try:
+                store_submission(report, sat_report, submission_data)
+                db.session.commit()
+                current_app.logger.info(f"Successfully updated Report database record for {submission_id}, locked={report.locked}, status={report.status}")
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Error updating database: {e}")
+                flash("Could not record the approval, please try again", "error")
+                return redirect(url_for('status.view_status', submission_id=submission_id))
+
             # Create notification for submitter
             from utils import create_status_update_notification
             try:
@@ -146,57 +144,6 @@ def approve_submission(submission_id, stage):
             except Exception as e:
                 current_app.logger.error(f"Error creating approval notification: {e}")
 
-            # Once a stage is approved, lock editing 
-            submission_data["locked"] = True
-
-            # Update last modified timestamp
-            submission_data["updated_at"] = datetime.datetime.now().isoformat()
-            
-            # Save changes
-            submissions[submission_id] = submission_data
-            save_submissions(submissions)
-            
-            # Also update the database Report record
-            try:
-                from models import db, Report, SATReport
-                import json as json_module
-                report = Report.query.get(submission_id)
-                if report:
-                    # Update the database with new approval data
-                    report.approvals_json = json_module.dumps(approvals)
-                    
-                    # When Automation Manager (stage 1) approves, lock report permanently
-                    if stage == 1:
-                        report.locked = True
-                        report.status = 'APPROVED'
-                        report.approved_at = datetime.datetime.utcnow()
-                        report.approved_by = current_stage.get("approver_email", current_stage.get("approver_name", ""))
-                        current_app.logger.info(f"Automation Manager approved report {submission_id} - locking permanently")
-                    
-                    # Commit Report changes immediately to ensure database is updated
-                    db.session.commit()
-                    current_app.logger.info(f"Successfully updated Report database record for {submission_id}, locked={report.locked}, status={report.status}")
-                    
-                    # Update SAT report data with Word template fields
-                    sat_report = SATReport.query.filter_by(report_id=submission_id).first()
-                    if sat_report:
-                        import json as json_module
-                        try:
-                            stored_data = json_module.loads(sat_report.data_json)
-                            stored_data["context"] = submission_data.get("context", {})
-                            sat_report.data_json = json_module.dumps(stored_data)
-                            db.session.commit()
-                            current_app.logger.info(f"Updated SAT report data with approval context for submission {submission_id}")
-                        except Exception as e:
-                            current_app.logger.error(f"Error updating SAT report data: {e}")
-                            db.session.rollback()
-                else:
-                    current_app.logger.error(f"Report {submission_id} not found in database for approval update")
-                    
-            except Exception as e:
-                current_app.logger.error(f"Error updating database: {e}")
-                db.session.rollback()
-
             # Determine if this is the PM approval (stage 2)
             # After PM approves, we finalize the document and send to client
             is_final_approval = stage == 2
@@ -430,7 +377,12 @@ def approve_submission(submission_id, stage):
                     pdf = convert_to_pdf(out)
                     if pdf:
                         submission_data["pdf_path"] = pdf
-                        save_submissions(submissions)
+                        try:
+                            store_submission(report, sat_report, submission_data)
+                            db.session.commit()
+                        except Exception as e:
+                            db.session.rollback()
+                            current_app.logger.error(f"Error saving PDF path for {submission_id}: {e}")
 
                 # Improved client email finding and notification
                 # Always get client email from approvals list with better error handling
@@ -543,8 +495,7 @@ def approve_submission(submission_id, stage):
 def reject_submission(submission_id, stage):
     """Reject a submission at a specific approval stage"""
     try:
-        submissions = load_submissions()
-        submission_data = submissions.get(submission_id)
+        report, sat_report, submission_data = load_submission(submission_id, for_update=True)
         
         if not submission_data:
             flash("Submission not found", "error")
@@ -568,6 +519,19 @@ def reject_submission(submission_id, stage):
         current_stage["timestamp"] = datetime.datetime.now().isoformat()
         current_stage["approver_name"] = request.form.get("approver_name", "")
         
+        # Update submission
+        submission_data["updated_at"] = datetime.datetime.now().isoformat()
+        submission_data["status"] = "REJECTED"
+        report.status = 'REJECTED'
+        try:
+            store_submission(report, sat_report, submission_data)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error recording rejection for {submission_id}: {e}")
+            flash("Could not record the rejection, please try again", "error")
+            return redirect(url_for('status.view_status', submission_id=submission_id))
+        
         # Create rejection notification for submitter
         from utils import create_status_update_notification
         try:
@@ -584,11 +548,6 @@ def reject_submission(submission_id, stage):
         except Exception as e:
             current_app.logger.error(f"Error creating rejection notification: {e}")
         
-        # Update submission
-        submission_data["updated_at"] = datetime.datetime.now().isoformat()
-        submissions[submission_id] = submission_data
-        save_submissions(submissions)
-        
         # Notify submitter about rejection
         user_email = submission_data.get("user_email")
         if user_email:
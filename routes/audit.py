@@ -172,68 +172,35 @@ def audit_statistics():
 @login_required
 @role_required(['Admin'])
 def export_audit_logs():
-    """Export audit logs to CSV"""
+    """Export audit logs as a streamed CSV/NDJSON/XLSX download"""
     try:
-        import csv
-        import io
-        
-        # Get filters
-        date_from = request.args.get('date_from')
-        date_to = request.args.get('date_to')
-        
-        query = AuditLog.query
-        
-        if date_from:
-            query = query.filter(AuditLog.timestamp >= datetime.fromisoformat(date_from))
-        
-        if date_to:
-            query = query.filter(AuditLog.timestamp <= datetime.fromisoformat(date_to))
-        
-        # Get all logs in range
-        logs = query.order_by(AuditLog.timestamp.desc()).all()
-        
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'Timestamp', 'User Email', 'User Name', 'Action', 
-            'Entity Type', 'Entity ID', 'Details', 'IP Address', 
-            'User Agent', 'Success'
-        ])
-        
-        # Write data
-        for log in logs:
-            writer.writerow([
-                log.timestamp.isoformat(),
-                log.user_email,
-                log.user_name,
-                log.action,
-                log.entity_type,
-                log.entity_id,
-                log.details,
-                log.ip_address,
-                log.user_agent,
-                'Yes' if log.success else 'No'
-            ])
-        
-        # Send CSV file
-        from flask import Response
-        
-        output.seek(0)
-        return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename=audit_logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-            }
+        from services.export_engine import export_response
+        
+        params = {
+            'date_from': request.args.get('date_from'),
+            'date_to': request.args.get('date_to'),
+        }
+        background = request.args.get('async')
+        
+        return export_response(
+            'audit_logs', params,
+            fmt=request.args.get('format', 'csv'),
+            background=None if background is None else background.lower() in ('1', 'true', 'yes'),
+            download_endpoint='audit.download_audit_export',
         )
         
     except Exception as e:
         current_app.logger.error(f"Error exporting audit logs: {e}")
         return jsonify({'error': str(e)}), 500
 
+@audit_bp.route('/api/export/<export_id>')
+@login_required
+@role_required(['Admin'])
+def download_audit_export(export_id):
+    """Download an audit log export that was written in the background"""
+    from services.export_engine import download_response
+    return download_response('audit_logs', export_id)
+
 def log_action(action, entity_type, entity_id=None, details=None, success=True):
     """Helper function to log an action"""
     try:
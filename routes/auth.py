@@ -309,11 +309,8 @@ def reset_password():
 def change_password():
     """Change user password"""
     try:
-        from models import Notification
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
+        from utils import get_unread_count
+        unread_count = get_unread_count(current_user.email)
     except Exception as e:
         current_app.logger.warning(f"Could not get unread count: {e}")
         unread_count = 0
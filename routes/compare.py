@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required, current_user
 from models import db, Report, ReportVersion, SATReport
+from services.version_store import version_store
 import json
 import difflib
 from datetime import datetime
@@ -58,12 +59,8 @@ def compare_versions(report_id):
         if report.user_email != current_user.email and current_user.role != 'Admin':
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # Parse JSON data
-        data1 = json.loads(v1.data_snapshot)
-        data2 = json.loads(v2.data_snapshot)
-        
-        # Generate diff
-        diff_results = generate_field_diff(data1, data2)
+        # Generate diff from the stored deltas
+        diff_results = version_store.diff_versions(v1, v2)
         
         return render_template('version_diff.html',
                              report=report,
@@ -89,10 +86,7 @@ def get_diff_data(report_id):
         v1 = ReportVersion.query.get_or_404(version1_id)
         v2 = ReportVersion.query.get_or_404(version2_id)
         
-        data1 = json.loads(v1.data_snapshot)
-        data2 = json.loads(v2.data_snapshot)
-        
-        diff_results = generate_field_diff(data1, data2)
+        diff_results = version_store.diff_versions(v1, v2)
         
         return jsonify({
             'success': True,
@@ -114,39 +108,29 @@ def get_diff_data(report_id):
         current_app.logger.error(f"Error getting diff data: {e}")
         return jsonify({'error': str(e)}), 500
 
-def create_version_snapshot(report):
+def create_version_snapshot(report, change_summary='Initial version', created_by=None):
     """Create a version snapshot of the current report state"""
     try:
         # Get report data
         if report.type == 'SAT':
             sat_report = SATReport.query.filter_by(report_id=report.id).first()
-            if sat_report:
-                data_snapshot = sat_report.data_json
-            else:
-                data_snapshot = json.dumps({})
+            data = json.loads(sat_report.data_json) if sat_report and sat_report.data_json else {}
         else:
             # For other report types
-            data_snapshot = json.dumps({
+            data = {
                 'document_title': report.document_title,
                 'project_reference': report.project_reference,
                 'client_name': report.client_name,
                 'revision': report.revision
-            })
+            }
         
-        # Create version record
-        version = ReportVersion(
-            report_id=report.id,
-            version_number=report.revision or 'R0',
-            created_by=report.user_email,
-            change_summary='Initial version',
-            data_snapshot=data_snapshot,
-            is_current=True
+        # Stored as a keyframe or as a delta against the current version
+        version = version_store.record_version(
+            report,
+            data,
+            created_by=created_by or report.user_email,
+            change_summary=change_summary
         )
-        
-        # Mark other versions as not current
-        ReportVersion.query.filter_by(report_id=report.id).update({'is_current': False})
-        
-        db.session.add(version)
         db.session.commit()
         
         return version
@@ -214,11 +198,8 @@ def save_version(report_id):
         change_summary = request.json.get('change_summary', 'Manual save')
         
         # Create version snapshot
-        version = create_version_snapshot(report)
+        version = create_version_snapshot(report, change_summary=change_summary, created_by=current_user.email)
         if version:
-            version.change_summary = change_summary
-            db.session.commit()
-            
             return jsonify({
                 'success': True,
                 'version': {
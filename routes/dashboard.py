@@ -83,10 +83,7 @@ def admin():
 
     # Get unread notifications count
     try:
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
+        unread_count = get_unread_count(current_user.email)
     except Exception as e:
         current_app.logger.warning(f"Could not get unread count for admin: {e}")
         unread_count = 0
@@ -172,10 +169,7 @@ def engineer():
 
     # Get unread notifications count
     try:
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
+        unread_count = get_unread_count(current_user.email)
     except Exception as e:
         current_app.logger.warning(f"Could not get unread count for engineer: {e}")
         unread_count = 0
@@ -221,10 +215,7 @@ def automation_manager():
 
     # Get unread notifications count
     try:
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
+        unread_count = get_unread_count(current_user.email)
     except Exception as e:
         current_app.logger.warning(f"Could not get unread count for Automation Manager: {e}")
         unread_count = 0
@@ -330,10 +321,7 @@ def pm():
 
     # Get unread notifications count
     try:
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
+        unread_count = get_unread_count(current_user.email)
     except Exception as e:
         current_app.logger.warning(f"Could not get unread count for PM: {e}")
         unread_count = 0
@@ -554,6 +542,9 @@ def delete_user(user_id):
         # Delete the user
         db.session.delete(user)
         db.session.commit()
+
+        from services.notification_counters import notification_counters
+        notification_counters.invalidate(user_email)
         flash(f'User {user_name} ({user_email}) has been permanently deleted.', 'success')
     except Exception as e:
         db.session.rollback()
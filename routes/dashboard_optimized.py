@@ -8,7 +8,7 @@ from models import db, User, Report, Notification, SystemSettings, SATReport
 from utils import get_unread_count
 from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy import and_, or_, func
-from functools import wraps, lru_cache
+from functools import wraps
 import json
 from datetime import datetime, timedelta
 from database.query_cache import cache_manager, cache_system_stats, cache_user_reports
@@ -24,23 +24,13 @@ def no_cache(f):
         return response
     return decorated_function
 
-# Helper function for caching user notification counts
-@lru_cache(maxsize=128, typed=False)
-def get_cached_unread_count(user_email: str, cache_buster: int) -> int:
-    """Get cached unread notification count with 5-minute TTL"""
+def get_unread_count_with_cache(user_email: str) -> int:
+    """Get unread count from the shared per-user notification counters"""
     try:
-        return Notification.query.filter_by(
-            user_email=user_email,
-            read=False
-        ).count()
+        return get_unread_count(user_email)
     except Exception:
         return 0
 
-def get_unread_count_with_cache(user_email: str) -> int:
-    """Get unread count with automatic cache invalidation every 5 minutes"""
-    cache_buster = int(datetime.now().timestamp() // 300)  # Changes every 5 minutes
-    return get_cached_unread_count(user_email, cache_buster)
-
 class OptimizedDashboard:
     """Optimized dashboard queries with eager loading and caching"""
     
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
 from models import db, Report, SATReport, ReportEdit, User
+from services.version_store import version_store, encode_edit_patch, describe_edit
 import json
 import uuid
 from datetime import datetime
@@ -143,6 +144,11 @@ def save_edit(report_id):
             current_app.logger.error(f"Error parsing timestamp for concurrency check: {e}")
             # Continue without concurrency check if timestamp parsing fails
     
+    try:
+        before_data = json.loads(before_json) if before_json else {}
+    except (TypeError, ValueError):
+        before_data = {}
+    
     # Update the SAT report data
     sat_report.data_json = json.dumps(new_data)
     
@@ -161,13 +167,14 @@ def save_edit(report_id):
     report.version = new_version
     report.edit_count = (report.edit_count or 0) + 1
     
-    # Create audit trail entry
+    # Create audit trail entry; only the patch is kept, full states live in
+    # the delta-encoded version history
     edit_entry = ReportEdit(
         report_id=report_id,
         editor_user_id=current_user.id,
         editor_email=current_user.email,
-        before_json=before_json,
-        after_json=json.dumps(new_data),
+        before_json=None,
+        after_json=encode_edit_patch(before_data, new_data),
         changes_summary=f"Report edited by {current_user.full_name}",
         version_before=before_version,
         version_after=new_version
@@ -175,6 +182,13 @@ def save_edit(report_id):
     
     try:
         db.session.add(edit_entry)
+        version_store.record_version(
+            report,
+            new_data,
+            created_by=current_user.email,
+            change_summary=edit_entry.changes_summary,
+            version_number=new_version
+        )
         db.session.commit()
         
         return jsonify({
@@ -204,10 +218,41 @@ def view_edit_history(report_id):
     # Get edit history
     edits = ReportEdit.query.filter_by(report_id=report_id)\
                            .order_by(ReportEdit.created_at.desc()).all()
+    changes = {edit.id: describe_edit(edit) for edit in edits}
     
     return render_template('edit_history.html',
                          report=report,
-                         edits=edits)
+                         edits=edits,
+                         changes=changes)
+
+@edit_bp.route('/api/reports/<report_id>/edit-history', methods=['GET'])
+@login_required
+def edit_history_api(report_id):
+    """API endpoint returning the edit audit trail with the fields each edit changed"""
+    report = Report.query.get(report_id)
+    if not report:
+        return jsonify({'error': 'Report not found'}), 404
+    
+    if not (current_user.role == 'Admin' or 
+            report.user_email == current_user.email or
+            current_user.role in ['Automation Manager', 'PM']):
+        return jsonify({'error': 'Permission denied'}), 403
+    
+    edits = ReportEdit.query.filter_by(report_id=report_id)\
+                           .order_by(ReportEdit.created_at.desc()).all()
+    
+    return jsonify({
+        'success': True,
+        'edits': [{
+            'id': edit.id,
+            'editor_email': edit.editor_email,
+            'summary': edit.changes_summary,
+            'version_before': edit.version_before,
+            'version_after': edit.version_after,
+            'created_at': edit.created_at.isoformat() if edit.created_at else None,
+            'changes': describe_edit(edit)
+        } for edit in edits]
+    })
 
 @edit_bp.route('/api/reports/<report_id>/can-edit', methods=['GET'])
 @login_required
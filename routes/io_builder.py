@@ -13,11 +13,8 @@ io_builder_bp = Blueprint('io_builder', __name__)
 def get_unread_count():
     """Get unread notifications count with error handling"""
     try:
-        from models import Notification
-        return Notification.query.filter_by(
-            user_email=current_user.email, 
-            read=False
-        ).count()
+        from services.notification_counters import get_unread_count as get_cached_unread_count
+        return get_cached_unread_count(current_user.email)
     except Exception as e:
         current_app.logger.warning(f"Could not get unread count: {e}")
         return 0
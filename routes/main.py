@@ -79,11 +79,14 @@ except ImportError as e:
     create_docx_from_template = None
     convert_to_pdf = None
 
-# Helper function to get unread notification count (assuming it exists elsewhere)
 def get_unread_count():
-    """Placeholder for getting unread notification count"""
-    # Replace with actual implementation if available
-    return 0
+    """Get unread notification count for the current user from the cached counters"""
+    try:
+        from services.notification_counters import get_unread_count as get_cached_unread_count
+        return get_cached_unread_count(current_user.email) if current_user.is_authenticated else 0
+    except Exception as e:
+        current_app.logger.warning(f"Could not get unread count: {e}")
+        return 0
 
 def setup_approval_workflow_db(report, approver_emails):
     """Set up approval workflow for database-stored reports"""
@@ -793,6 +796,10 @@ def generate():
         # Save to database
         db.session.commit()
 
+        # The full submission supersedes any buffered autosave for this report
+        from services.autosave import autosave_buffer
+        autosave_buffer.discard(submission_id)
+
         # Render the DOCX template
         doc.render(context)
 
@@ -807,8 +814,10 @@ def generate():
 
         # Try to copy to permanent location
         try:
+            from services.storage_accounting import storage_accountant
             permanent = os.path.abspath(current_app.config['OUTPUT_FILE'])
-            shutil.copyfile(temp_path, permanent)
+            with storage_accountant.track_write(permanent):
+                shutil.copyfile(temp_path, permanent)
             current_app.logger.info(f"Also copied report to outputs: {permanent}")
         except Exception as e:
             current_app.logger.warning(f"Could not copy to outputs folder: {e}")
@@ -983,6 +992,9 @@ def save_progress():
         # Save to database
         db.session.commit()
 
+        from services.autosave import autosave_buffer
+        autosave_buffer.discard(submission_id)
+
         return jsonify({
             'success': True,
             'message': 'Progress saved successfully',
@@ -1070,6 +1082,9 @@ def generate_site_survey():
         # Save to database
         db.session.commit()
 
+        from services.autosave import autosave_buffer
+        autosave_buffer.discard(submission_id)
+
         flash("Site Survey submitted successfully!", "success")
         
         return jsonify({
@@ -1201,102 +1216,64 @@ def generate_scada_migration():
 @main_bp.route('/auto_save_progress', methods=['POST'])
 @login_required
 def auto_save_progress():
-    """Auto-save form progress with CSRF validation"""
+    """
+    Auto-save form progress.
+
+    JSON clients send ``{"submission_id", "report_type", "base_revision",
+    "changes"}`` with only the fields edited since the last acknowledged save;
+    a stale ``base_revision`` gets a 409 carrying the current revision.
+    ``report_type`` (``SAT`` unless given) selects the report's fields and the
+    record the draft is stored in.  Plain form posts are still accepted and
+    reduced to the fields that actually changed.  Writes are coalesced per
+    report by the autosave buffer.
+    """
     try:
-        from models import db, Report, SATReport
+        from services.autosave import autosave_buffer, form_changes, AutosaveConflict, REPORT_TYPE_FIELDS
+
+        payload = request.get_json(silent=True) if request.is_json else None
+        source = payload if payload is not None else request.form
+        report_type = (source.get("report_type") or "SAT").upper()
+        if report_type not in REPORT_TYPE_FIELDS:
+            return jsonify({'success': False, 'message': f'Unsupported report type: {report_type}'}), 400
+
+        if payload is not None:
+            submission_id = payload.get("submission_id") or ""
+            changes = form_changes(payload.get("changes") or {}, report_type)
+            base_revision = payload.get("base_revision")
+            if base_revision is not None:
+                try:
+                    base_revision = int(base_revision)
+                except (TypeError, ValueError):
+                    return jsonify({'success': False, 'message': 'Invalid base_revision'}), 400
+        else:
+            submission_id = request.form.get("submission_id", "")
+            changes = form_changes(request.form.to_dict(), report_type)
+            base_revision = None
 
         # Get submission ID or create new one
-        submission_id = request.form.get("submission_id", "")
         if not submission_id:
             submission_id = str(uuid.uuid4())
 
-        # Get form data
-        form_data = request.form.to_dict()
-
-        # Get or create report record
-        report = Report.query.get(submission_id)
-        if not report:
-            report = Report(
-                id=submission_id,
-                type='SAT',
-                status='DRAFT',  # Always start as DRAFT
-                user_email=current_user.email if hasattr(current_user, 'email') else '',
-                approvals_json='[]'
-            )
-            db.session.add(report)
-        # IMPORTANT: Ensure status remains DRAFT for auto-save (not submission)
-        # Only preserve existing non-draft status if it's already PENDING/APPROVED
-        if not report.status or report.status == '':
-            report.status = 'DRAFT'
-        current_app.logger.debug(f"Auto-save: Report {submission_id} status is {report.status}")
-
-        # Get or create SAT report record
-        sat_report = SATReport.query.filter_by(report_id=submission_id).first()
-        if not sat_report:
-            sat_report = SATReport(
-                report_id=submission_id,
-                data_json='{}',
-                scada_image_urls='[]',
-                trends_image_urls='[]',
-                alarm_image_urls='[]'
-            )
-            db.session.add(sat_report)
-
-        # Load existing data
-        existing_data = json.loads(sat_report.data_json) if sat_report.data_json != '{}' else {}
-
-        # Build context from current form data
-        context = {
-            "DOCUMENT_TITLE": form_data.get('document_title', ''),
-            "PROJECT_REFERENCE": form_data.get('project_reference', ''),
-            "DOCUMENT_REFERENCE": form_data.get('document_reference', ''),
-            "DATE": form_data.get('date', ''),
-            "CLIENT_NAME": form_data.get('client_name', ''),
-            "REVISION": form_data.get('revision', ''),
-            "REVISION_DETAILS": form_data.get('revision_details', ''),
-            "REVISION_DATE": form_data.get('revision_date', ''),
-            "PREPARED_BY": form_data.get('prepared_by', ''),
-            "REVIEWED_BY_TECH_LEAD": form_data.get('reviewed_by_tech_lead', ''),
-            "REVIEWED_BY_PM": form_data.get('reviewed_by_pm', ''),
-            "APPROVED_BY_CLIENT": form_data.get('approved_by_client', ''),
-            "PURPOSE": form_data.get("purpose", ""),
-            "SCOPE": form_data.get("scope", ""),
-            "approver_1_email": form_data.get("approver_1_email", ""),
-            "approver_2_email": form_data.get("approver_2_email", ""),
-            "approver_3_email": form_data.get("approver_3_email", ""),
-        }
-
-        # Update report metadata
-        report.document_title = context.get('DOCUMENT_TITLE', '')
-        report.updated_at = dt.datetime.utcnow()
-
-        # Prepare submission data for storage
-        submission_data = {
-            "context": context,
-            "user_email": current_user.email if hasattr(current_user, 'email') else form_data.get("user_email", ""),
-            "approvals": existing_data.get("approvals", []),
-            "locked": existing_data.get("locked", False),
-            "scada_image_urls": existing_data.get("scada_image_urls", []),
-            "trends_image_urls": existing_data.get("trends_image_urls", []),
-            "alarm_image_urls": existing_data.get("alarm_image_urls", []),
-            "created_at": existing_data.get("created_at", dt.datetime.now().isoformat()),
-            "updated_at": dt.datetime.now().isoformat(),
-            "auto_saved": True  # Mark as auto-saved
-        }
-
-        # Update SAT report data
-        sat_report.data_json = json.dumps(submission_data)
-        sat_report.date = context.get('DATE', '')
-        sat_report.purpose = context.get('PURPOSE', '')
-        sat_report.scope = context.get('SCOPE', '')
-
-        # Save to database
-        db.session.commit()
+        user_email = current_user.email if hasattr(current_user, 'email') else ''
+        try:
+            result = autosave_buffer.save(submission_id, user_email, changes, base_revision, report_type)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        except AutosaveConflict as conflict:
+            return jsonify({
+                'success': False,
+                'conflict': True,
+                'message': 'Report changed since the last save',
+                'submission_id': submission_id,
+                'revision': conflict.revision
+            }), 409
 
         return jsonify({
             'success': True,
             'message': 'Auto-save completed',
             'submission_id': submission_id,
+            'revision': result['revision'],
+            'persisted': result['persisted'],
             'timestamp': dt.datetime.now().isoformat()
         })
 
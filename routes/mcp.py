@@ -31,7 +31,7 @@ mcp_bp = Blueprint('mcp', __name__, url_prefix='/api/mcp')
 def get_mcp_server_status():
     """Get status of all MCP servers"""
     try:
-        status = get_mcp_status()
+        status = get_mcp_status(refresh=request.args.get('refresh') == '1')
         return jsonify({
             "success": True,
             "status": status,
@@ -1,7 +1,11 @@
-from flask import Blueprint, render_template, jsonify, request, current_app
+from flask import Blueprint, render_template, jsonify, request, current_app, Response
 from flask_login import current_user
 from models import db, Notification
 from auth import login_required
+from services.event_bus import (
+    event_bus, user_channel, open_stream, format_sse, DEFAULT_MAX_STREAM_SECONDS
+)
+from services.notification_counters import notification_counters
 import json
 from datetime import datetime
 
@@ -19,27 +23,22 @@ def get_notifications():
     """Get notifications for current user"""
     try:
         if not current_user.is_authenticated:
-            return jsonify({'notifications': [], 'total': 0, 'pages': 0, 'current_page': 1})
+            return jsonify({'success': True, 'notifications': [], 'unread_count': 0,
+                            'total': 0, 'pages': 0, 'current_page': 1})
 
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
         notifications = Notification.query.filter_by(
-            user_id=current_user.id
+            user_email=current_user.email
         ).order_by(Notification.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
 
         return jsonify({
-            'notifications': [{
-                'id': n.id,
-                'type': n.type,
-                'title': n.title,
-                'message': n.message,
-                'is_read': n.is_read,
-                'created_at': n.created_at.isoformat(),
-                'metadata': n.metadata
-            } for n in notifications.items],
+            'success': True,
+            'notifications': [n.to_dict() for n in notifications.items],
+            'unread_count': notification_counters.get_unread_count(current_user.email),
             'total': notifications.total,
             'pages': notifications.pages,
             'current_page': notifications.page
@@ -48,7 +47,9 @@ def get_notifications():
         # Return empty list when database issues occur
         current_app.logger.warning(f"Notifications not available: {e}")
         return jsonify({
+            'success': False,
             'notifications': [],
+            'unread_count': 0,
             'total': 0,
             'pages': 0,
             'current_page': 1
@@ -62,15 +63,54 @@ def get_unread_count_api():
         if not current_user.is_authenticated:
             return jsonify({'count': 0})
 
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
-        return jsonify({'count': unread_count})
+        unread_count = notification_counters.get_unread_count(current_user.email)
+        return jsonify({'success': True, 'count': unread_count})
     except Exception as e:
         current_app.logger.warning(f"Notifications not available: {e}")
         return jsonify({'count': 0})
 
+@notifications_bp.route('/api/notifications/stream')
+@login_required
+def notification_stream():
+    """Server-Sent Events stream pushing unread count changes and new notifications"""
+    app = current_app._get_current_object()
+    user_email = current_user.email
+    subscription = event_bus.subscribe(user_channel(user_email))
+
+    try:
+        initial_count = notification_counters.get_unread_count(user_email)
+    except Exception as e:
+        current_app.logger.warning(f"Notifications not available: {e}")
+        initial_count = 0
+    finally:
+        db.session.remove()
+
+    def resolve_count(event):
+        # Counters that were not cached when the change happened are published
+        # without a value; look them up once here instead of in the publisher.
+        if event.get('type') == 'unread_count' and event['data'].get('count') is None:
+            with app.app_context():
+                try:
+                    count = notification_counters.get_unread_count(user_email)
+                finally:
+                    db.session.remove()
+            return {**event, 'data': {'count': count}}
+        return event
+
+    def generate():
+        yield from open_stream(
+            subscription,
+            initial_frames=[format_sse({'count': initial_count}, event='unread_count')],
+            heartbeat_seconds=app.config.get('SSE_HEARTBEAT_SECONDS', 20),
+            max_duration=app.config.get('SSE_MAX_STREAM_SECONDS', DEFAULT_MAX_STREAM_SECONDS),
+            transform=resolve_count,
+        )
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @notifications_bp.route('/api/notifications/<int:notification_id>/mark-read', methods=['POST'])
 @login_required
 def mark_notification_read(notification_id):
@@ -95,6 +135,7 @@ def mark_all_read():
         Notification.query.filter_by(user_email=current_user.email, read=False)\
                          .update({'read': True})
         db.session.commit()
+        notification_counters.mark_all_read(current_user.email)
 
         return jsonify({'success': True})
     except Exception as e:
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, current_app, send_file
+from flask import Blueprint, render_template, redirect, url_for, flash, current_app, send_file, Response, jsonify
 import os
 import json
 import tempfile
@@ -37,15 +37,8 @@ def view_status(submission_id):
     approvals = json.loads(report.approvals_json) if report.approvals_json else []
 
     # Determine overall status
-    statuses = [a.get("status", "pending") for a in approvals]
-    if "rejected" in statuses:
-        overall_status = "rejected"
-    elif all(status == "approved" for status in statuses):
-        overall_status = "approved"
-    elif any(status == "approved" for status in statuses):
-        overall_status = "partially_approved"
-    else:
-        overall_status = "pending"
+    from services.report_events import overall_approval_status
+    overall_status = overall_approval_status(approvals)
 
     # Get submission data context with fallbacks
     submission_data = stored_data.get("context", {})
@@ -94,6 +87,75 @@ def view_status(submission_id):
 
     return render_template('status.html', **context)
 
+def _event_stream_response(subscription, initial_event=None):
+    """Wrap a bus subscription in a text/event-stream response"""
+    from services.event_bus import open_stream, format_sse, DEFAULT_MAX_STREAM_SECONDS
+
+    heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', 20)
+    max_duration = current_app.config.get('SSE_MAX_STREAM_SECONDS', DEFAULT_MAX_STREAM_SECONDS)
+    initial_frames = []
+    if initial_event:
+        initial_frames.append(format_sse(initial_event['data'], event=initial_event['type']))
+
+    def generate():
+        yield from open_stream(subscription, initial_frames=initial_frames,
+                               heartbeat_seconds=heartbeat, max_duration=max_duration)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@status_bp.route('/events')
+@login_required
+def user_events():
+    """Stream report status and approval events for every report the user owns or approves"""
+    from services.event_bus import event_bus, user_channel
+
+    subscription = event_bus.subscribe(user_channel(current_user.email))
+    return _event_stream_response(subscription)
+
+
+@status_bp.route('/<submission_id>/events')
+@login_required
+def report_events(submission_id):
+    """Stream status, approval and generation events for one report"""
+    from models import db, Report
+    from services.event_bus import event_bus, report_channel
+    from services.report_events import (
+        parse_approvals, summarise_approvals, overall_approval_status
+    )
+
+    report = Report.query.filter_by(id=submission_id).first()
+    if not report:
+        return jsonify({'error': 'Report not found'}), 404
+
+    approvals = parse_approvals(report.approvals_json)
+    approver_emails = {(a.get('approver_email') or '').lower() for a in approvals}
+    if (current_user.role != 'Admin'
+            and current_user.email != report.user_email
+            and current_user.email.lower() not in approver_emails):
+        return jsonify({'error': 'Access denied'}), 403
+
+    # Current state first, so the page can reconcile anything it missed
+    initial_event = {
+        'type': 'report_status',
+        'data': {
+            'report_id': report.id,
+            'status': report.status,
+            'locked': bool(report.locked),
+            'document_title': report.document_title,
+            'overall_status': overall_approval_status(approvals),
+            'approvals': summarise_approvals(approvals),
+        },
+    }
+    db.session.remove()
+
+    subscription = event_bus.subscribe(report_channel(submission_id))
+    return _event_stream_response(subscription, initial_event)
+
+
 @status_bp.route('/download/<submission_id>')
 @login_required
 def download_report(submission_id):
@@ -111,7 +173,8 @@ def download_report(submission_id):
         # Remove existing file if it exists to force fresh generation
         if os.path.exists(permanent_path):
             try:
-                os.remove(permanent_path)
+                from services.storage_accounting import storage_accountant
+                storage_accountant.remove(permanent_path)
                 current_app.logger.info(f"Removed existing file to force fresh generation: {permanent_path}")
             except Exception as e:
                 current_app.logger.warning(f"Could not remove existing file: {e}")
@@ -482,8 +545,10 @@ def download_report(submission_id):
                     
                     # Write to file using working method
                     buffer.seek(0)
-                    with open(permanent_path, 'wb') as f:
-                        f.write(buffer.getvalue())
+                    from services.storage_accounting import storage_accountant
+                    with storage_accountant.track_write(permanent_path):
+                        with open(permanent_path, 'wb') as f:
+                            f.write(buffer.getvalue())
                     
                     current_app.logger.info(f"SAT template document written to file: {permanent_path}")
                     
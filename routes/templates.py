@@ -21,10 +21,10 @@ def template_manager():
         
         # Calculate usage statistics
         template_data = []
+        max_usage = max((t.usage_count or 0 for t in templates), default=0)
         for template in templates:
             # Calculate usage percentage (relative to most used template)
-            max_usage = max([t.usage_count for t in templates]) if templates else 1
-            usage_percentage = (template.usage_count / max_usage * 100) if max_usage > 0 else 0
+            usage_percentage = ((template.usage_count or 0) / max_usage * 100) if max_usage > 0 else 0
             
             template_data.append({
                 'id': template.id,
@@ -179,26 +179,9 @@ def get_template_stats(template_id):
     try:
         template = ReportTemplate.query.get_or_404(template_id)
         
-        # Get reports using this template
-        reports = Report.query.filter_by(type=template.type).all()
-        
-        # Calculate statistics
-        stats = {
-            'total_uses': template.usage_count,
-            'last_30_days': 0,  # To be implemented with date filtering
-            'by_user': {},
-            'by_status': {'DRAFT': 0, 'PENDING': 0, 'APPROVED': 0}
-        }
-        
-        for report in reports:
-            # Count by user
-            if report.user_email not in stats['by_user']:
-                stats['by_user'][report.user_email] = 0
-            stats['by_user'][report.user_email] += 1
-            
-            # Count by status
-            if report.status in stats['by_status']:
-                stats['by_status'][report.status] += 1
+        # Grouped counts over this template's reports, cached until one changes
+        from services import template_stats
+        stats = template_stats.get_template_stats(template)
         
         return jsonify(stats), 200
         
@@ -9,12 +9,14 @@ import os
 import re
 import hashlib
 import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 import requests
 from flask import current_app, session, g
+from werkzeug.local import LocalProxy
 
 # Import existing models and utilities
 from models import db, Report, SATReport, FDSReport, HDSReport, SDSReport, FATReport, SiteSurveyReport, User, ReportTemplate
@@ -30,6 +32,8 @@ from services.memory_manager import (
     memory_manager, initialize_memory_session, process_memory_interaction,
     get_memory_context, get_response_context, add_memory_correction, end_memory_session
 )
+from services.conversation_store import conversation_store, new_conversation_id
+from services.intent_classifier import intent_classifier
 from services.mcp_integration import (
     mcp_service, sat_mcp, get_mcp_status, generate_intelligent_report,
     backup_report_with_mcp, schedule_reviews_with_mcp, fetch_standards_with_mcp,
@@ -79,6 +83,8 @@ class AgentContext:
     personality: AgentPersonality
     knowledge_base: Dict[str, Any]
     learning_data: Dict[str, Any]
+    conversation_summary: str = ""
+    conversation_id: Optional[str] = None
 
 @dataclass
 class AgentResponse:
@@ -100,6 +106,7 @@ class AIAgentCore:
     
     def __init__(self):
         self.session_key = "ai_agent_context"
+        self.conversation_key = "ai_conversation_id"
         self.knowledge_base = self._initialize_knowledge_base()
         self.capabilities = [cap for cap in AgentCapability]
         self.learning_memory = {}
@@ -189,14 +196,29 @@ class AIAgentCore:
             }
         }
     
+    def _current_user_id(self) -> str:
+        return getattr(g, 'current_user', {}).get('id', 'anonymous')
+
     def get_context(self) -> AgentContext:
         """Retrieve or create agent context"""
-        context_data = session.get(self.session_key)
-        
-        if not context_data:
+        user_id = self._current_user_id()
+
+        # Contexts embedded in the session by older versions are moved to the store
+        legacy = session.pop(self.session_key, None)
+        if legacy:
+            context = AgentContext(**legacy)
+            context.knowledge_base = self.knowledge_base
+            context.capabilities = self.capabilities
+            context.conversation_id = session.get(self.conversation_key) or new_conversation_id()
+            return context
+
+        conversation_id = session.get(self.conversation_key)
+        state = conversation_store.load(user_id, conversation_id) if conversation_id else None
+
+        if not state:
             # Create new context
             context = AgentContext(
-                user_id=getattr(g, 'current_user', {}).get('id', 'anonymous'),
+                user_id=user_id,
                 session_id=session.get('session_id', self._generate_session_id()),
                 conversation_history=[],
                 current_task=None,
@@ -206,16 +228,65 @@ class AIAgentCore:
                 capabilities=self.capabilities,
                 personality=AgentPersonality.PROFESSIONAL,
                 knowledge_base=self.knowledge_base,
-                learning_data={}
+                learning_data={},
+                conversation_id=conversation_id or new_conversation_id()
             )
         else:
-            context = AgentContext(**context_data)
+            context = self._context_from_state(state, conversation_id)
             
         return context
     
+    def _context_from_state(self, state: Dict[str, Any], conversation_id: str) -> AgentContext:
+        """Rebuild a context from stored state, re-attaching the shared knowledge base"""
+        try:
+            personality = AgentPersonality(state.get('personality', AgentPersonality.PROFESSIONAL.value))
+        except ValueError:
+            personality = AgentPersonality.PROFESSIONAL
+        return AgentContext(
+            user_id=state.get('user_id', 'anonymous'),
+            session_id=state.get('session_id') or self._generate_session_id(),
+            conversation_history=state.get('conversation_history', []),
+            current_task=state.get('current_task'),
+            user_preferences=state.get('user_preferences', {}),
+            project_context=state.get('project_context', {}),
+            system_state=state.get('system_state', {}),
+            capabilities=self.capabilities,
+            personality=personality,
+            knowledge_base=self.knowledge_base,
+            learning_data=state.get('learning_data', {}),
+            conversation_summary=state.get('conversation_summary', ''),
+            conversation_id=conversation_id
+        )
+
     def save_context(self, context: AgentContext):
-        """Save agent context to session"""
-        session[self.session_key] = asdict(context)
+        """Save agent context to the conversation store; the session keeps only its id"""
+        if not context.conversation_id:
+            context.conversation_id = new_conversation_id()
+
+        state = {
+            'user_id': context.user_id,
+            'session_id': context.session_id,
+            'conversation_history': context.conversation_history,
+            'conversation_summary': context.conversation_summary,
+            'current_task': context.current_task,
+            'user_preferences': context.user_preferences,
+            'project_context': context.project_context,
+            'system_state': context.system_state,
+            'personality': context.personality.value,
+            'learning_data': context.learning_data,
+        }
+        conversation_store.save(context.user_id, context.conversation_id, state)
+
+        # Only touch the session when the id changes, so it is not rewritten per message
+        if session.get(self.conversation_key) != context.conversation_id:
+            session[self.conversation_key] = context.conversation_id
+
+    def clear_context(self):
+        """Forget the current conversation"""
+        conversation_id = session.pop(self.conversation_key, None)
+        session.pop(self.session_key, None)
+        if conversation_id:
+            conversation_store.delete(self._current_user_id(), conversation_id)
     
     def process_message(self, message: str, context_updates: Dict[str, Any] = None) -> AgentResponse:
         """
@@ -290,30 +361,15 @@ class AIAgentCore:
     def _analyze_intent(self, message: str, context: AgentContext) -> Dict[str, Any]:
         """Advanced intent analysis with context awareness"""
         
-        # Normalize message
-        normalized = message.lower().strip()
-        
-        # Intent categories
-        intents = {
-            "create_report": self._detect_create_intent(normalized),
-            "get_help": self._detect_help_intent(normalized),
-            "analyze_data": self._detect_analysis_intent(normalized),
-            "workflow_assistance": self._detect_workflow_intent(normalized),
-            "knowledge_query": self._detect_knowledge_intent(normalized),
-            "system_operation": self._detect_system_intent(normalized),
-            "collaboration": self._detect_collaboration_intent(normalized),
-            "troubleshooting": self._detect_troubleshooting_intent(normalized)
-        }
+        # One pass scores every intent and extracts entities, sentiment and urgency
+        analysis = intent_classifier.classify(message)
+        intents = analysis["intents"]
         
         # Determine primary intent
         primary_intent = max(intents.items(), key=lambda x: x[1]["confidence"])
-        
-        # Extract entities and parameters
-        entities = self._extract_entities(message, context)
-        
-        # Analyze sentiment and urgency
-        sentiment = self._analyze_sentiment(message)
-        urgency = self._analyze_urgency(message, context)
+        entities = analysis["entities"]
+        sentiment = analysis["sentiment"]
+        urgency = analysis["urgency"]
         
         return {
             "primary_intent": primary_intent[0],
@@ -1047,134 +1103,6 @@ I can help implement these solutions automatically. Which would you like me to s
         )
     
     # Helper methods for intent detection
-    def _detect_create_intent(self, message: str) -> Dict[str, Any]:
-        """Detect report creation intent"""
-        create_keywords = ["create", "new", "generate", "make", "start", "begin", "build"]
-        report_keywords = ["report", "sat", "document", "form"]
-        
-        create_score = sum(1 for word in create_keywords if word in message) * 0.3
-        report_score = sum(1 for word in report_keywords if word in message) * 0.4
-        
-        confidence = min(create_score + report_score, 1.0)
-        
-        return {"confidence": confidence, "keywords_found": create_score + report_score > 0}
-    
-    def _detect_help_intent(self, message: str) -> Dict[str, Any]:
-        """Detect help request intent"""
-        help_keywords = ["help", "how", "what", "guide", "explain", "show", "teach", "learn"]
-        
-        confidence = sum(0.2 for word in help_keywords if word in message)
-        confidence = min(confidence, 1.0)
-        
-        return {"confidence": confidence, "keywords_found": confidence > 0}
-    
-    def _detect_analysis_intent(self, message: str) -> Dict[str, Any]:
-        """Detect data analysis intent"""
-        analysis_keywords = ["analyze", "analysis", "data", "metrics", "insights", "trends", "statistics", "performance"]
-        
-        confidence = sum(0.25 for word in analysis_keywords if word in message)
-        confidence = min(confidence, 1.0)
-        
-        return {"confidence": confidence, "keywords_found": confidence > 0}
-    
-    def _detect_workflow_intent(self, message: str) -> Dict[str, Any]:
-        """Detect workflow assistance intent"""
-        workflow_keywords = ["workflow", "process", "steps", "procedure", "automation", "optimize", "streamline"]
-        
-        confidence = sum(0.3 for word in workflow_keywords if word in message)
-        confidence = min(confidence, 1.0)
-        
-        return {"confidence": confidence, "keywords_found": confidence > 0}
-    
-    def _detect_knowledge_intent(self, message: str) -> Dict[str, Any]:
-        """Detect knowledge query intent"""
-        knowledge_keywords = ["what is", "explain", "definition", "standard", "best practice", "guideline"]
-        
-        confidence = sum(0.25 for phrase in knowledge_keywords if phrase in message)
-        confidence = min(confidence, 1.0)
-        
-        return {"confidence": confidence, "keywords_found": confidence > 0}
-    
-    def _detect_system_intent(self, message: str) -> Dict[str, Any]:
-        """Detect system operation intent"""
-        system_keywords = ["status", "performance", "system", "health", "monitor", "check", "optimize"]
-        
-        confidence = sum(0.3 for word in system_keywords if word in message)
-        confidence = min(confidence, 1.0)
-        
-        return {"confidence": confidence, "keywords_found": confidence > 0}
-    
-    def _detect_collaboration_intent(self, message: str) -> Dict[str, Any]:
-        """Detect collaboration intent"""
-        collab_keywords = ["team", "collaborate", "review", "approve", "share", "assign", "workflow"]
-        
-        confidence = sum(0.25 for word in collab_keywords if word in message)
-        confidence = min(confidence, 1.0)
-        
-        return {"confidence": confidence, "keywords_found": confidence > 0}
-    
-    def _detect_troubleshooting_intent(self, message: str) -> Dict[str, Any]:
-        """Detect troubleshooting intent"""
-        trouble_keywords = ["problem", "issue", "error", "bug", "fix", "broken", "not working", "trouble"]
-        
-        confidence = sum(0.3 for word in trouble_keywords if word in message)
-        confidence = min(confidence, 1.0)
-        
-        return {"confidence": confidence, "keywords_found": confidence > 0}
-    
-    # Additional helper methods
-    def _extract_entities(self, message: str, context: AgentContext) -> Dict[str, Any]:
-        """Extract entities from message"""
-        entities = {}
-        
-        # Extract project references
-        project_pattern = r'\b[A-Z0-9]{3,}-[A-Z0-9]{2,}\b'
-        projects = re.findall(project_pattern, message)
-        if projects:
-            entities['project_references'] = projects
-        
-        # Extract dates
-        date_pattern = r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b'
-        dates = re.findall(date_pattern, message)
-        if dates:
-            entities['dates'] = dates
-        
-        # Extract email addresses
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, message)
-        if emails:
-            entities['emails'] = emails
-        
-        return entities
-    
-    def _analyze_sentiment(self, message: str) -> str:
-        """Analyze message sentiment"""
-        positive_words = ["good", "great", "excellent", "perfect", "amazing", "wonderful", "fantastic"]
-        negative_words = ["bad", "terrible", "awful", "horrible", "frustrated", "annoyed", "problem"]
-        
-        positive_count = sum(1 for word in positive_words if word in message.lower())
-        negative_count = sum(1 for word in negative_words if word in message.lower())
-        
-        if positive_count > negative_count:
-            return "positive"
-        elif negative_count > positive_count:
-            return "negative"
-        else:
-            return "neutral"
-    
-    def _analyze_urgency(self, message: str, context: AgentContext) -> str:
-        """Analyze message urgency"""
-        urgent_words = ["urgent", "asap", "immediately", "critical", "emergency", "now", "quickly"]
-        
-        urgency_score = sum(1 for word in urgent_words if word in message.lower())
-        
-        if urgency_score >= 2:
-            return "high"
-        elif urgency_score == 1:
-            return "medium"
-        else:
-            return "low"
-    
     def _assess_context_relevance(self, message: str, context: AgentContext) -> float:
         """Assess how relevant the message is to current context"""
         current_task = context.current_task
@@ -1583,6 +1511,7 @@ I can help implement these solutions automatically. Which would you like me to s
                 "user_role": context.user_preferences.get("role", "user"),
                 "current_task": context.current_task,
                 "conversation_history": context.conversation_history[-3:],
+                "conversation_summary": context.conversation_summary,
                 "project_context": context.project_context,
                 "system_state": context.system_state,
                 "memory_context": {
@@ -1704,9 +1633,8 @@ def process_ai_message(message: str, context_updates: Dict[str, Any] = None) ->
 
 def reset_ai_conversation() -> Dict[str, Any]:
     """Reset AI conversation"""
-    # Clear session data
-    if ai_agent.session_key in session:
-        del session[ai_agent.session_key]
+    # Clear stored conversation
+    ai_agent.clear_context()
     
     return start_ai_conversation()
 
@@ -1717,7 +1645,22 @@ def get_ai_capabilities() -> List[str]:
 def get_ai_context() -> Dict[str, Any]:
     """Get current AI context"""
     context = ai_agent.get_context()
-    return asdict(context)
-
-# Global agent instance
-ai_agent = AIAgentCore()
+    data = asdict(context)
+    # The knowledge base is shared by every conversation, not part of it
+    data.pop('knowledge_base', None)
+    return data
+
+# Global agent instance, built on first use together with its knowledge base
+_ai_agent: Optional[AIAgentCore] = None
+_AI_AGENT_LOCK = threading.Lock()
+
+def get_ai_agent() -> AIAgentCore:
+    """Get global AI agent instance."""
+    global _ai_agent
+    if _ai_agent is None:
+        with _AI_AGENT_LOCK:
+            if _ai_agent is None:
+                _ai_agent = AIAgentCore()
+    return _ai_agent
+
+ai_agent = LocalProxy(get_ai_agent)
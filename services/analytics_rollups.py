@@ -0,0 +1,384 @@
+"""
+Materialised rollups behind the analytics dashboard.
+
+The analytics endpoints used to recompute every chart from the raw
+``reports`` table on each refresh, loading whole report rows to average
+approval times in Python.  ``report_rollups`` keeps the same figures
+pre-aggregated per UTC day (and per hour for the creation trend) of report
+creation, so a chart over N days reads O(N) small rows.
+
+Rollups are maintained from SQLAlchemy session events: whenever a flush
+creates, deletes, or changes the status, type, client or approvals of a
+report, the day bucket that report was created in is recomputed from its
+raw rows inside the same transaction.  The rebuild first takes a per-day lock
+held to the end of the transaction, so transactions touching the same day
+rebuild it one after the other, each seeing the reports the previous one
+committed.  A nightly task reconciles recent
+days and performs the initial backfill; until that backfill has completed
+the endpoints read the raw tables instead.  The raw-scan functions are kept
+so tests can check both paths agree.
+
+Windows are whole UTC days: ``days=30`` covers today and the 30 days before.
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import click
+from sqlalchemy import and_, delete, event, func, inspect, insert, select, text
+
+from services.report_events import parse_approvals
+
+logger = logging.getLogger(__name__)
+
+APPROVED_STATUSES = ('TECH_APPROVED', 'PM_APPROVED', 'COMPLETED')
+RECONCILE_DAYS = 2
+
+_PENDING_KEY = '_analytics_rollup_days'
+_TRACKED_ATTRS = ('status', 'type', 'client_name', 'approvals_json', 'created_at')
+_META_PERIOD = 'meta'
+_BACKFILL_DIMENSION = 'backfill'
+# First key of the advisory locks on rollup days ('ROLL')
+_LOCK_NAMESPACE = 0x524F4C4C
+
+Bucket = Tuple[str, datetime, str, str]
+
+
+def window_start(days: int, now: Optional[datetime] = None) -> datetime:
+    """Start of the UTC day ``days`` days before ``now``."""
+    start = (now or datetime.utcnow()) - timedelta(days=days)
+    return datetime(start.year, start.month, start.day)
+
+
+def _day(value: datetime) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+
+def _hours(start: datetime, end: datetime) -> float:
+    return (end - start).total_seconds() / 3600
+
+
+def _tm_approval_hours(created_at: datetime, approvals_json) -> Optional[float]:
+    """Hours from creation to the stage 1 (technical) approval, if it has happened."""
+    for approval in parse_approvals(approvals_json):
+        if isinstance(approval, dict) and approval.get('stage') == 1 and approval.get('status') == 'approved':
+            try:
+                return _hours(created_at, datetime.fromisoformat(str(approval.get('timestamp'))))
+            except ValueError:
+                return None
+    return None
+
+
+def aggregate_reports(rows: Iterable[Tuple]) -> Dict[Bucket, List[float]]:
+    """
+    Fold raw ``(created_at, status, type, client_name, updated_at, approvals_json)``
+    rows into ``{(period, bucket_start, dimension, key): [count, total_hours]}``.
+    """
+    buckets: Dict[Bucket, List[float]] = defaultdict(lambda: [0, 0.0])
+
+    def add(period, start, dimension, key='', hours=0.0):
+        bucket = buckets[(period, start, dimension, key or '')]
+        bucket[0] += 1
+        bucket[1] += hours
+
+    for created_at, status, report_type, client_name, updated_at, approvals_json in rows:
+        if created_at is None:
+            continue
+        day = _day(created_at)
+        add('day', day, 'created')
+        add('hour', created_at.replace(minute=0, second=0, microsecond=0), 'created')
+        add('day', day, 'status', status)
+        add('day', day, 'type', report_type)
+        add('day', day, 'client', client_name)
+        if status in APPROVED_STATUSES and updated_at:
+            add('day', day, 'approval', hours=_hours(created_at, updated_at))
+        tm_hours = _tm_approval_hours(created_at, approvals_json)
+        if tm_hours is not None:
+            add('day', day, 'tm_approval', hours=tm_hours)
+    return buckets
+
+
+def _report_columns():
+    from models import Report
+
+    return (Report.created_at, Report.status, Report.type, Report.client_name,
+            Report.updated_at, Report.approvals_json)
+
+
+def _lock_day(connection, day: date) -> None:
+    """
+    Hold ``day`` until the transaction ends.
+
+    SQLite needs no lock: it only lets one transaction write at a time.
+    """
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('SELECT pg_advisory_xact_lock(:namespace, :day)'),
+                           {'namespace': _LOCK_NAMESPACE, 'day': day.toordinal()})
+
+
+def rebuild_days(connection, days: Iterable[date]) -> int:
+    """Recompute the day and hour buckets of ``days`` from the raw reports; returns rows written."""
+    from models import Report, ReportRollup
+
+    rollups = ReportRollup.__table__
+    written = 0
+    # Days are locked in order, so two rebuilds cannot wait on each other
+    for day in sorted(set(days)):
+        _lock_day(connection, day)
+        start = datetime(day.year, day.month, day.day)
+        end = start + timedelta(days=1)
+        rows = connection.execute(
+            select(*_report_columns()).where(and_(Report.created_at >= start, Report.created_at < end))
+        ).all()
+        connection.execute(delete(rollups).where(and_(
+            rollups.c.period.in_(('day', 'hour')),
+            rollups.c.bucket_start >= start,
+            rollups.c.bucket_start < end,
+        )))
+        values = [
+            {'period': period, 'bucket_start': bucket_start, 'dimension': dimension,
+             'bucket_key': key, 'count': int(count), 'total_hours': hours}
+            for (period, bucket_start, dimension, key), (count, hours) in aggregate_reports(rows).items()
+        ]
+        if values:
+            connection.execute(insert(rollups), values)
+            written += len(values)
+    return written
+
+
+def backfill(connection, since: Optional[date] = None) -> int:
+    """
+    Rebuild every day from ``since`` (default: the first report) to today.
+
+    A full backfill records a marker; rollups are only read once it exists.
+    """
+    from models import Report, ReportRollup
+
+    full = since is None
+    if full:
+        first = connection.execute(select(func.min(Report.created_at))).scalar()
+        since = (first or datetime.utcnow()).date()
+    today = datetime.utcnow().date()
+    days = [since + timedelta(days=offset) for offset in range((today - since).days + 1)]
+    written = rebuild_days(connection, days)
+
+    if full:
+        rollups = ReportRollup.__table__
+        connection.execute(delete(rollups).where(rollups.c.period == _META_PERIOD))
+        connection.execute(insert(rollups), [{
+            'period': _META_PERIOD, 'bucket_start': datetime.utcnow(), 'dimension': _BACKFILL_DIMENSION,
+            'bucket_key': since.isoformat(), 'count': len(days), 'total_hours': 0.0,
+        }])
+    return written
+
+
+def rollups_ready() -> bool:
+    """Whether the initial backfill has completed."""
+    from models import db, ReportRollup
+
+    try:
+        return db.session.query(ReportRollup.id).filter(
+            ReportRollup.period == _META_PERIOD, ReportRollup.dimension == _BACKFILL_DIMENSION
+        ).first() is not None
+    except Exception as e:
+        logger.debug(f"Analytics rollups unavailable: {e}")
+        db.session.rollback()
+        return False
+
+
+# --- Readers -----------------------------------------------------------------
+
+def _sum_by_key(dimension: str, start: datetime, period: str = 'day'):
+    from models import db, ReportRollup
+
+    query = db.session.query(
+        ReportRollup.bucket_key, func.sum(ReportRollup.count), func.sum(ReportRollup.total_hours)
+    ).filter(ReportRollup.period == period, ReportRollup.dimension == dimension)
+    if start is not None:
+        query = query.filter(ReportRollup.bucket_start >= start)
+    return query.group_by(ReportRollup.bucket_key).all()
+
+
+def _distribution(pairs, label: str) -> List[Dict[str, Any]]:
+    return [{label: key or None, 'count': int(count)} for key, count in sorted(pairs, key=lambda p: p[0] or '')]
+
+
+def _top(pairs, label: str, limit: int = 10) -> List[Dict[str, Any]]:
+    ranked = sorted(pairs, key=lambda p: (-p[1], p[0] or ''))[:limit]
+    return [{label: key or None, 'count': int(count)} for key, count in ranked]
+
+
+def _average(count, hours) -> float:
+    return round(float(hours) / float(count), 2) if count else 0
+
+
+def _bucket_label(bucket_start: datetime, granularity: str) -> str:
+    return bucket_start.isoformat() if granularity == 'hour' else bucket_start.date().isoformat()
+
+
+def report_metrics(start: datetime, granularity: str = 'day') -> Dict[str, Any]:
+    """Report metrics for reports created since ``start``, read from the rollups."""
+    from models import db, ReportRollup
+
+    trend = db.session.query(ReportRollup.bucket_start, ReportRollup.count).filter(
+        ReportRollup.period == granularity,
+        ReportRollup.dimension == 'created',
+        ReportRollup.bucket_start >= start,
+    ).order_by(ReportRollup.bucket_start).all()
+    approval = _sum_by_key('approval', start)
+
+    return {
+        'status_distribution': _distribution([(k, c) for k, c, _ in _sum_by_key('status', start)], 'status'),
+        'type_distribution': _distribution([(k, c) for k, c, _ in _sum_by_key('type', start)], 'type'),
+        'daily_trend': [{'date': _bucket_label(bucket, granularity), 'count': count} for bucket, count in trend],
+        'top_clients': _top([(k, c) for k, c, _ in _sum_by_key('client', start)], 'client'),
+        'avg_approval_time_hours': _average(*(approval[0][1:] if approval else (0, 0))),
+        'total_reports': sum(count for _, count in trend),
+    }
+
+
+def workflow_metrics(start: datetime) -> Dict[str, Any]:
+    """Workflow metrics read from the rollups; status totals cover all time."""
+    tm = _sum_by_key('tm_approval', start)
+    statuses = {key: int(count) for key, count, _ in _sum_by_key('status', None)}
+    return _workflow(_average(*(tm[0][1:] if tm else (0, 0))), statuses)
+
+
+def _workflow(avg_tm_hours: float, statuses: Dict[str, int]) -> Dict[str, Any]:
+    pending_tm = statuses.get('SUBMITTED', 0)
+    pending_pm = statuses.get('TECH_APPROVED', 0)
+    total_processed = sum(count for status, count in statuses.items() if status != 'DRAFT')
+    rejection_rate = statuses.get('REJECTED', 0) / total_processed * 100 if total_processed > 0 else 0
+    return {
+        'avg_tm_approval_hours': avg_tm_hours,
+        'pending_tm_approval': pending_tm,
+        'pending_pm_approval': pending_pm,
+        'rejection_rate': round(rejection_rate, 2),
+        'bottleneck_stage': 'TM Approval' if pending_tm > pending_pm else 'PM Approval' if pending_pm > 0 else 'None',
+    }
+
+
+def _raw_buckets(start: Optional[datetime]) -> Dict[Bucket, List[float]]:
+    from models import db, Report
+
+    query = db.session.query(*_report_columns())
+    if start is not None:
+        query = query.filter(Report.created_at >= start)
+    return aggregate_reports(query.yield_per(1000))
+
+
+def _from_buckets(buckets, period: str, dimension: str):
+    """``[(key, count, hours)]`` summed over the buckets of one dimension."""
+    totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+    for (bucket_period, _, bucket_dimension, key), (count, hours) in buckets.items():
+        if bucket_period == period and bucket_dimension == dimension:
+            totals[key][0] += count
+            totals[key][1] += hours
+    return [(key, count, hours) for key, (count, hours) in totals.items()]
+
+
+def report_metrics_raw(start: datetime, granularity: str = 'day') -> Dict[str, Any]:
+    """``report_metrics`` computed by scanning the raw reports (fallback and verification)."""
+    buckets = _raw_buckets(start)
+    trend = sorted((bucket_start, int(count)) for (period, bucket_start, dimension, _), (count, _h) in buckets.items()
+                   if period == granularity and dimension == 'created')
+    approval = _from_buckets(buckets, 'day', 'approval')
+    return {
+        'status_distribution': _distribution([(k, c) for k, c, _ in _from_buckets(buckets, 'day', 'status')], 'status'),
+        'type_distribution': _distribution([(k, c) for k, c, _ in _from_buckets(buckets, 'day', 'type')], 'type'),
+        'daily_trend': [{'date': _bucket_label(bucket, granularity), 'count': count} for bucket, count in trend],
+        'top_clients': _top([(k, c) for k, c, _ in _from_buckets(buckets, 'day', 'client')], 'client'),
+        'avg_approval_time_hours': _average(*(approval[0][1:] if approval else (0, 0))),
+        'total_reports': sum(count for _, count in trend),
+    }
+
+
+def workflow_metrics_raw(start: datetime) -> Dict[str, Any]:
+    """``workflow_metrics`` computed by scanning the raw reports (fallback and verification)."""
+    from models import db, Report
+
+    tm = _from_buckets(_raw_buckets(start), 'day', 'tm_approval')
+    statuses = dict(db.session.query(Report.status, func.count(Report.id)).group_by(Report.status).all())
+    return _workflow(_average(*(tm[0][1:] if tm else (0, 0))), {k or '': v for k, v in statuses.items()})
+
+
+# --- Incremental maintenance -------------------------------------------------
+
+def _collect_touched_days(session, flush_context) -> None:
+    from models import Report
+
+    days = set()
+    for obj in session.new:
+        if isinstance(obj, Report) and obj.created_at:
+            days.add(obj.created_at.date())
+    for obj in session.deleted:
+        if isinstance(obj, Report) and obj.created_at:
+            days.add(obj.created_at.date())
+    for obj in session.dirty:
+        if not isinstance(obj, Report) or obj.created_at is None:
+            continue
+        state = inspect(obj)
+        created_history = state.attrs.created_at.history
+        changed = any(state.attrs[attr].history.has_changes() for attr in _TRACKED_ATTRS)
+        # Average approval time depends on updated_at while a report is approved
+        if not changed and obj.status in APPROVED_STATUSES:
+            changed = state.attrs.updated_at.history.has_changes()
+        if changed:
+            days.add(obj.created_at.date())
+            days.update(value.date() for value in created_history.deleted or () if value)
+    if days:
+        session.info.setdefault(_PENDING_KEY, set()).update(days)
+
+
+def _refresh_touched_days(session, flush_context) -> None:
+    days = session.info.pop(_PENDING_KEY, None)
+    if not days:
+        return
+    connection = session.connection()
+    try:
+        # A savepoint keeps a rollup failure from aborting the report change
+        with connection.begin_nested():
+            rebuild_days(connection, days)
+    except Exception as e:
+        logger.error(f"Failed to refresh analytics rollups for {sorted(days)}: {e}")
+
+
+def _discard_touched_days(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+_listeners_installed = False
+_listeners_lock = threading.Lock()
+
+
+def init_analytics_rollups(app) -> None:
+    """Attach the session listeners that keep the rollups current."""
+    global _listeners_installed
+    from models import db
+
+    if not app.config.get('ANALYTICS_ROLLUPS', True):
+        return
+    with _listeners_lock:
+        if not _listeners_installed:
+            event.listen(db.session, 'after_flush', _collect_touched_days)
+            event.listen(db.session, 'after_flush_postexec', _refresh_touched_days)
+            event.listen(db.session, 'after_rollback', _discard_touched_days)
+            _listeners_installed = True
+
+
+@click.command('rollups-backfill')
+@click.option('--days', type=int, default=None, help='Only rebuild this many recent days')
+def rollups_command(days):
+    """Rebuild the analytics rollups from the raw reports."""
+    from models import db
+
+    since = None if days is None else datetime.utcnow().date() - timedelta(days=days)
+    try:
+        with db.engine.begin() as connection:
+            rows = backfill(connection, since)
+    except Exception as e:
+        click.echo(f'❌ Rollup backfill failed: {e}')
+        raise SystemExit(1)
+    click.echo(f'✅ Wrote {rows} rollup rows' + ('' if since else ' (full backfill)'))
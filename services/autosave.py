@@ -0,0 +1,411 @@
+"""
+Incremental autosave for report forms.
+
+Editors send only the fields that changed since their last acknowledged save,
+together with the revision that save returned.  Changes are applied to an
+in-memory draft per report, coalesced, and written to the ``data_json`` of the
+report's type-specific row (``SATReport``, ``SiteSurveyReport``) at most once per ``AUTOSAVE_WRITE_INTERVAL_SECONDS``; a background thread
+flushes drafts whose interval has elapsed.  A save whose base revision does not
+match the draft is rejected so the client can resend its fields on top of the
+current revision instead of silently overwriting someone else's edits.
+
+Drafts are held per process.  When a write finds that the stored document was
+changed elsewhere (another worker's autosave) the pending fields are rebased
+onto it; when a full form submission has replaced the document the pending
+autosave is dropped, since the submission is authoritative.
+
+Revisions only move forward and are shared through the client: a base
+revision newer than the local draft was issued by another worker, so the
+draft is refreshed from the stored row and continues from that revision
+instead of rejecting it.  Only a base older than the draft is a conflict.
+
+Pending fields live in memory until their write, so a worker killed without
+a graceful shutdown loses the changes acknowledged in the last
+``AUTOSAVE_WRITE_INTERVAL_SECONDS`` (10s by default); a graceful exit
+flushes them.
+"""
+import atexit
+import datetime as dt
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Form field name -> key in the stored ``context``
+AUTOSAVE_FIELDS = {
+    'document_title': 'DOCUMENT_TITLE',
+    'project_reference': 'PROJECT_REFERENCE',
+    'document_reference': 'DOCUMENT_REFERENCE',
+    'date': 'DATE',
+    'client_name': 'CLIENT_NAME',
+    'revision': 'REVISION',
+    'revision_details': 'REVISION_DETAILS',
+    'revision_date': 'REVISION_DATE',
+    'prepared_by': 'PREPARED_BY',
+    'reviewed_by_tech_lead': 'REVIEWED_BY_TECH_LEAD',
+    'reviewed_by_pm': 'REVIEWED_BY_PM',
+    'approved_by_client': 'APPROVED_BY_CLIENT',
+    'purpose': 'PURPOSE',
+    'scope': 'SCOPE',
+    'approver_1_email': 'approver_1_email',
+    'approver_2_email': 'approver_2_email',
+    'approver_3_email': 'approver_3_email',
+}
+
+SITE_SURVEY_AUTOSAVE_FIELDS = {
+    'site_name': 'SITE_NAME',
+    'site_location': 'SITE_LOCATION',
+    'site_access_details': 'SITE_ACCESS_DETAILS',
+    'on_site_parking': 'ON_SITE_PARKING',
+    'area_engineer': 'AREA_ENGINEER',
+    'site_caretaker': 'SITE_CARETAKER',
+    'survey_completed_by': 'SURVEY_COMPLETED_BY',
+}
+
+# Report type -> autosaved form fields
+REPORT_TYPE_FIELDS = {
+    'SAT': AUTOSAVE_FIELDS,
+    'SITE_SURVEY': SITE_SURVEY_AUTOSAVE_FIELDS,
+}
+
+REVISION_KEY = 'autosave_revision'
+DEFAULT_WRITE_INTERVAL = 10
+DEFAULT_IDLE_TTL = 1800
+
+
+class AutosaveConflict(Exception):
+    """The client's base revision is not the draft's current revision."""
+
+    def __init__(self, revision: int):
+        super().__init__(f"Autosave conflict, current revision is {revision}")
+        self.revision = revision
+
+
+class _Draft:
+    def __init__(self, report_id: str, report_type: str, user_email: str,
+                 context: Dict[str, Any], revision: int):
+        self.report_id = report_id
+        self.report_type = report_type
+        self.user_email = user_email
+        self.context = context
+        self.revision = revision
+        self.persisted_revision = revision
+        self.pending: Dict[str, Any] = {}
+        self.last_write = 0.0
+        self.last_touch = time.monotonic()
+        self.lock = threading.Lock()
+
+
+def form_changes(form: Dict[str, Any], report_type: str = 'SAT') -> Dict[str, Any]:
+    """Pick the autosaved fields of ``report_type`` out of a form, keyed by context name."""
+    return {
+        context_key: form.get(field_name, '')
+        for field_name, context_key in REPORT_TYPE_FIELDS[report_type].items()
+        if field_name in form
+    }
+
+
+class AutosaveBuffer:
+    """Coalesces autosave patches per report and rate-limits their writes."""
+
+    def __init__(self, write_interval: float = DEFAULT_WRITE_INTERVAL, idle_ttl: float = DEFAULT_IDLE_TTL):
+        self.write_interval = write_interval
+        self.idle_ttl = idle_ttl
+        self._drafts: Dict[str, _Draft] = {}
+        self._lock = threading.Lock()
+
+    # public API ---------------------------------------------------------
+
+    def save(self, report_id: str, user_email: str, changes: Dict[str, Any],
+             base_revision: Optional[int] = None, report_type: str = 'SAT') -> Dict[str, Any]:
+        """
+        Apply ``changes`` (context key -> value) to the report's draft.
+
+        ``base_revision`` is the revision the client last saw; pass None for
+        clients that post the whole form, in which case unchanged fields are
+        simply ignored.  Raises :class:`AutosaveConflict` on a stale base or
+        when a full submission has replaced the stored report, and
+        ``ValueError`` when the report exists with another type.
+        Returns the new revision and whether the change reached the database.
+        """
+        draft = self._get_draft(report_id, report_type, user_email)
+        with draft.lock:
+            draft.last_touch = time.monotonic()
+            if base_revision is not None and base_revision != draft.revision:
+                if base_revision < draft.revision:
+                    raise AutosaveConflict(draft.revision)
+                # Issued by another worker: catch up with what it stored
+                self._refresh(draft)
+                draft.revision = max(draft.revision, base_revision)
+
+            delta = {key: value for key, value in changes.items() if draft.context.get(key) != value}
+            if delta:
+                draft.context.update(delta)
+                draft.pending.update(delta)
+                draft.revision += 1
+
+            persisted = False
+            if draft.pending and self._is_due(draft):
+                persisted = self._write(draft)
+
+            return {
+                'revision': draft.revision,
+                'changed': sorted(delta),
+                'persisted': persisted or not draft.pending,
+            }
+
+    def flush(self, report_id: Optional[str] = None, force: bool = False) -> int:
+        """Write pending drafts whose interval has elapsed (all when ``force``)."""
+        with self._lock:
+            drafts = [self._drafts[report_id]] if report_id in self._drafts else (
+                [] if report_id else list(self._drafts.values()))
+        written = 0
+        for draft in drafts:
+            with draft.lock:
+                if draft.pending and (force or self._is_due(draft)):
+                    try:
+                        if self._write(draft):
+                            written += 1
+                    except AutosaveConflict:
+                        continue
+        self._evict_idle()
+        return written
+
+    def discard(self, report_id: str) -> None:
+        """Forget a report's draft, e.g. after a full form submission replaced it."""
+        with self._lock:
+            self._drafts.pop(report_id, None)
+
+    def revision(self, report_id: str) -> Optional[int]:
+        with self._lock:
+            draft = self._drafts.get(report_id)
+        return draft.revision if draft else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._drafts.clear()
+
+    # internals ----------------------------------------------------------
+
+    def _is_due(self, draft: _Draft) -> bool:
+        return time.monotonic() - draft.last_write >= self.write_interval
+
+    def _get_draft(self, report_id: str, report_type: str, user_email: str) -> _Draft:
+        with self._lock:
+            draft = self._drafts.get(report_id)
+        if draft is None:
+            draft = self._load(report_id, report_type, user_email)
+            with self._lock:
+                # Another request may have loaded it meanwhile
+                draft = self._drafts.setdefault(report_id, draft)
+        if draft.report_type != report_type:
+            raise ValueError(f"Report {report_id} is a {draft.report_type} report, not {report_type}")
+        return draft
+
+    def _load(self, report_id: str, report_type: str, user_email: str) -> _Draft:
+        from models import Report
+
+        report = Report.query.get(report_id)
+        if report is not None and report.type != report_type:
+            raise ValueError(f"Report {report_id} is a {report.type} report, not {report_type}")
+
+        detail = _detail_model(report_type).query.filter_by(report_id=report_id).first()
+        data = _parse(detail.data_json) if detail else {}
+        draft = _Draft(report_id, report_type, user_email,
+                       dict(data.get('context') or {}), data.get(REVISION_KEY, 0))
+        if detail is None:
+            # Nothing stored yet: the first save creates the records immediately
+            draft.last_write = float('-inf')
+        return draft
+
+    def _refresh(self, draft: _Draft) -> None:
+        """Rebase the draft onto the stored row if another process wrote it since."""
+        detail = _detail_model(draft.report_type).query.filter_by(report_id=draft.report_id).first()
+        data = _parse(detail.data_json) if detail else {}
+        stored_revision = data.get(REVISION_KEY)
+        if stored_revision is None or stored_revision == draft.persisted_revision:
+            return
+        draft.context = {**(data.get('context') or {}), **draft.pending}
+        draft.persisted_revision = stored_revision
+        draft.revision = max(draft.revision, stored_revision)
+
+    def _write(self, draft: _Draft) -> bool:
+        """Persist the draft's pending fields; called with ``draft.lock`` held."""
+        from models import db, Report
+
+        model = _detail_model(draft.report_type)
+        try:
+            report = Report.query.get(draft.report_id)
+            if not report:
+                report = Report(
+                    id=draft.report_id,
+                    type=draft.report_type,
+                    status='DRAFT',
+                    user_email=draft.user_email,
+                    approvals_json='[]'
+                )
+                db.session.add(report)
+            if not report.status:
+                report.status = 'DRAFT'
+
+            detail = model.query.filter_by(report_id=draft.report_id).first()
+            if not detail:
+                detail = _new_detail(draft.report_type, draft.report_id)
+                db.session.add(detail)
+
+            data = _parse(detail.data_json)
+            stored_revision = data.get(REVISION_KEY, 0)
+            if stored_revision != draft.persisted_revision:
+                if REVISION_KEY not in data and draft.persisted_revision:
+                    # A full submission rewrote the report; it wins over the draft
+                    self._reset(draft, data)
+                    db.session.rollback()
+                    raise AutosaveConflict(draft.revision)
+                # Written by another process: rebase the pending fields onto it
+                draft.context = {**(data.get('context') or {}), **draft.pending}
+                draft.revision = max(draft.revision, stored_revision + 1)
+
+            now = dt.datetime.now().isoformat()
+            context = dict(data.get('context') or {})
+            context.update(draft.pending)
+            data.update({
+                'context': context,
+                'user_email': data.get('user_email') or draft.user_email,
+                'created_at': data.get('created_at', now),
+                'updated_at': now,
+                'auto_saved': True,
+                REVISION_KEY: draft.revision,
+            })
+            if draft.report_type == 'SAT':
+                data.update({
+                    'approvals': data.get('approvals', []),
+                    'locked': data.get('locked', False),
+                    'scada_image_urls': data.get('scada_image_urls', []),
+                    'trends_image_urls': data.get('trends_image_urls', []),
+                    'alarm_image_urls': data.get('alarm_image_urls', []),
+                })
+            else:
+                data['report_type'] = draft.report_type
+
+            detail.data_json = json.dumps(data)
+            _apply_summary(draft.report_type, report, detail, context)
+            report.updated_at = dt.datetime.utcnow()
+
+            db.session.commit()
+        except AutosaveConflict:
+            raise
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Autosave write failed for {draft.report_id}: {e}", exc_info=True)
+            return False
+
+        draft.persisted_revision = draft.revision
+        draft.pending.clear()
+        draft.last_write = time.monotonic()
+        return True
+
+    @staticmethod
+    def _reset(draft: _Draft, data: Dict[str, Any]) -> None:
+        draft.context = dict(data.get('context') or {})
+        draft.pending.clear()
+        draft.revision = draft.persisted_revision = data.get(REVISION_KEY, 0)
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            for report_id, draft in list(self._drafts.items()):
+                if not draft.pending and draft.last_touch < cutoff:
+                    del self._drafts[report_id]
+
+
+def _detail_model(report_type: str):
+    """The model holding ``data_json`` for reports of ``report_type``."""
+    from models import SATReport, SiteSurveyReport
+
+    return {'SAT': SATReport, 'SITE_SURVEY': SiteSurveyReport}[report_type]
+
+
+def _new_detail(report_type: str, report_id: str):
+    model = _detail_model(report_type)
+    if report_type == 'SAT':
+        return model(
+            report_id=report_id,
+            data_json='{}',
+            scada_image_urls='[]',
+            trends_image_urls='[]',
+            alarm_image_urls='[]'
+        )
+    return model(report_id=report_id, data_json='{}')
+
+
+def _apply_summary(report_type: str, report, detail, context: Dict[str, Any]) -> None:
+    """Copy the summary columns the listings read out of ``context``."""
+    if report_type == 'SAT':
+        detail.date = context.get('DATE', '')
+        detail.purpose = context.get('PURPOSE', '')
+        detail.scope = context.get('SCOPE', '')
+        report.document_title = context.get('DOCUMENT_TITLE', '')
+    else:
+        detail.site_name = context.get('SITE_NAME', '')
+        detail.site_location = context.get('SITE_LOCATION', '')
+        detail.survey_completed_by = context.get('SURVEY_COMPLETED_BY', '')
+        report.document_title = f"Site Survey - {context.get('SITE_NAME') or report.id}"
+
+
+def _parse(data_json: Optional[str]) -> Dict[str, Any]:
+    try:
+        data = json.loads(data_json) if data_json else {}
+    except (TypeError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+autosave_buffer = AutosaveBuffer()
+
+_FLUSH_THREAD: Optional[threading.Thread] = None
+_FLUSH_LOCK = threading.Lock()
+
+
+def init_autosave(app) -> AutosaveBuffer:
+    """Configure the buffer and start the thread that flushes due drafts."""
+    global _FLUSH_THREAD
+    from models import db
+
+    autosave_buffer.write_interval = app.config.get('AUTOSAVE_WRITE_INTERVAL_SECONDS', DEFAULT_WRITE_INTERVAL)
+    autosave_buffer.idle_ttl = app.config.get('AUTOSAVE_IDLE_TTL_SECONDS', DEFAULT_IDLE_TTL)
+    app.autosave_buffer = autosave_buffer
+
+    if not app.config.get('AUTOSAVE_BACKGROUND_FLUSH', True):
+        return autosave_buffer
+
+    with _FLUSH_LOCK:
+        if _FLUSH_THREAD and _FLUSH_THREAD.is_alive():
+            return autosave_buffer
+
+        def _flush_loop():
+            with app.app_context():
+                while True:
+                    time.sleep(max(1.0, autosave_buffer.write_interval / 2))
+                    try:
+                        autosave_buffer.flush()
+                    except Exception as exc:  # noqa: broad-except
+                        logger.error(f"Autosave flush cycle failed: {exc}", exc_info=True)
+                    finally:
+                        db.session.remove()
+
+        def _flush_on_exit():
+            with app.app_context():
+                autosave_buffer.flush(force=True)
+
+        _FLUSH_THREAD = threading.Thread(
+            target=_flush_loop,
+            name='AutosaveFlusher',
+            daemon=True,
+        )
+        _FLUSH_THREAD.start()
+        atexit.register(_flush_on_exit)
+
+    return autosave_buffer
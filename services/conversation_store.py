@@ -0,0 +1,174 @@
+"""
+Server-side store for AI agent conversations.
+
+The agent used to serialise its whole context (including the shared knowledge
+base and the full conversation history) into the Flask session on every
+message.  Conversations now live here, keyed by user and conversation id, and
+the session only carries the id.  History is bounded: once it exceeds
+``max_messages`` the oldest messages are folded into a short rolling summary,
+so the cost of loading and saving a conversation does not grow with its
+length.
+
+Redis is used when available so every worker sees the same conversation;
+otherwise conversations are kept in a bounded in-process map.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = 'ai:conversation:'
+DEFAULT_TTL_SECONDS = 86400
+DEFAULT_MAX_MESSAGES = 20
+DEFAULT_SUMMARY_CHARS = 2000
+_SUMMARY_LINE_CHARS = 160
+
+
+def new_conversation_id() -> str:
+    return uuid.uuid4().hex
+
+
+def summarise_messages(summary: str, messages: List[Dict[str, Any]],
+                       max_chars: int = DEFAULT_SUMMARY_CHARS) -> str:
+    """
+    Fold messages into the rolling summary.
+
+    Each message contributes one trimmed line; when the summary grows past
+    ``max_chars`` its oldest lines are dropped first.
+    """
+    lines = [line for line in (summary or '').split('\n') if line]
+    for message in messages:
+        speaker = 'User' if message.get('type') == 'user_message' else 'Agent'
+        content = ' '.join(str(message.get('content', '')).split())
+        if len(content) > _SUMMARY_LINE_CHARS:
+            content = content[:_SUMMARY_LINE_CHARS - 3].rstrip() + '...'
+        if content:
+            lines.append(f"{speaker}: {content}")
+
+    while lines and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+def compact_history(history: List[Dict[str, Any]], summary: str, max_messages: int,
+                    max_summary_chars: int = DEFAULT_SUMMARY_CHARS) -> Tuple[List[Dict[str, Any]], str]:
+    """Keep the newest ``max_messages`` entries and summarise the rest."""
+    if len(history) <= max_messages:
+        return history, summary
+    overflow = len(history) - max_messages
+    return history[overflow:], summarise_messages(summary, history[:overflow], max_summary_chars)
+
+
+class ConversationStore:
+    """Conversation state keyed by ``(user_id, conversation_id)``."""
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS, max_messages: int = DEFAULT_MAX_MESSAGES,
+                 max_summary_chars: int = DEFAULT_SUMMARY_CHARS, max_local_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.max_summary_chars = max_summary_chars
+        self.max_local_entries = max_local_entries
+        self._local: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _redis(self):
+        try:
+            from cache.redis_client import redis_client
+            if redis_client.redis_client is not None and redis_client.is_available():
+                return redis_client.redis_client
+        except Exception as e:
+            logger.debug(f"Redis unavailable for conversation store: {e}")
+        return None
+
+    @staticmethod
+    def _key(user_id: str, conversation_id: str) -> str:
+        return f"{_KEY_PREFIX}{user_id}:{conversation_id}"
+
+    def load(self, user_id: str, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored conversation state or None if unknown or expired."""
+        if not conversation_id:
+            return None
+        key = self._key(user_id, conversation_id)
+        raw = None
+
+        client = self._redis()
+        if client is not None:
+            try:
+                raw = client.get(key)
+            except Exception as e:
+                logger.warning(f"Could not read conversation {conversation_id}: {e}")
+
+        if raw is None:
+            with self._lock:
+                entry = self._local.get(key)
+                if entry is not None:
+                    if entry[1] < time.monotonic():
+                        del self._local[key]
+                    else:
+                        self._local.move_to_end(key)
+                        raw = entry[0]
+
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+
+    def save(self, user_id: str, conversation_id: str, state: Dict[str, Any]) -> None:
+        """Compact the history and persist the state."""
+        history, summary = compact_history(
+            list(state.get('conversation_history') or []),
+            state.get('conversation_summary', ''),
+            self.max_messages,
+            self.max_summary_chars,
+        )
+        state = {**state, 'conversation_history': history, 'conversation_summary': summary}
+        raw = json.dumps(state, default=str)
+        key = self._key(user_id, conversation_id)
+
+        client = self._redis()
+        if client is not None:
+            try:
+                client.setex(key, self.ttl_seconds, raw)
+                return
+            except Exception as e:
+                logger.warning(f"Could not store conversation {conversation_id}: {e}")
+
+        with self._lock:
+            self._local[key] = (raw, time.monotonic() + self.ttl_seconds)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def delete(self, user_id: str, conversation_id: str) -> None:
+        if not conversation_id:
+            return
+        key = self._key(user_id, conversation_id)
+        client = self._redis()
+        if client is not None:
+            try:
+                client.delete(key)
+            except Exception as e:
+                logger.warning(f"Could not delete conversation {conversation_id}: {e}")
+        with self._lock:
+            self._local.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+
+conversation_store = ConversationStore()
+
+
+def init_conversation_store(app) -> ConversationStore:
+    conversation_store.ttl_seconds = app.config.get('AI_CONVERSATION_TTL', DEFAULT_TTL_SECONDS)
+    conversation_store.max_messages = app.config.get('AI_CONVERSATION_MAX_MESSAGES', DEFAULT_MAX_MESSAGES)
+    conversation_store.max_summary_chars = app.config.get('AI_CONVERSATION_SUMMARY_CHARS', DEFAULT_SUMMARY_CHARS)
+    return conversation_store
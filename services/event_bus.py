@@ -0,0 +1,318 @@
+"""
+Lightweight publish/subscribe event bus used for Server-Sent Events streams.
+
+Publishers push small JSON-serialisable events onto named channels (for example
+``user:<email>`` or ``report:<id>``); every open stream subscribed to that
+channel receives them through a bounded per-subscriber queue.  Slow consumers
+drop their oldest events rather than blocking the publisher.
+
+When Redis is configured, events are published through Redis pub/sub so that
+streams held by any web worker see events raised in other workers or in Celery
+tasks.  Each process runs one listener thread, started by its first
+subscriber.  Without Redis the bus delivers to local subscribers only.
+
+An open stream holds one server thread, so at most ``SSE_MAX_STREAMS`` are
+open per process and the server is given that many threads on top of its
+request threads (see ``wsgi.py``).  A stream lasts ``SSE_MAX_STREAM_SECONDS``
+before the browser's EventSource reconnects, i.e. one request per tab every
+ten minutes instead of one every 30s with polling.  Clients beyond the cap get
+the current state and reconnect after ``BUSY_RETRY_MS`` (two minutes), which
+is still a quarter of the polling rate.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_HEARTBEAT_SECONDS = 20
+DEFAULT_RETRY_MS = 2000
+DEFAULT_MAX_STREAM_SECONDS = 600
+DEFAULT_MAX_STREAMS = 32
+BUSY_RETRY_MS = 120000
+
+
+def user_channel(user_email: str) -> str:
+    """Channel name carrying events for a single user."""
+    return f"user:{(user_email or '').lower()}"
+
+
+def report_channel(report_id: str) -> str:
+    """Channel name carrying events for a single report."""
+    return f"report:{report_id}"
+
+
+class Subscription:
+    """A single consumer attached to one or more channels."""
+
+    def __init__(self, bus: 'EventBus', channels: Set[str], max_queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.bus = bus
+        self.channels = channels
+        self.queue: 'queue.Queue[Dict[str, Any]]' = queue.Queue(maxsize=max_queue_size)
+        self.closed = False
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Queue an event, discarding the oldest one if the consumer is behind."""
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the next event; returns None on timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class EventBus:
+    """Fan-out of events to subscribers keyed by channel."""
+
+    def __init__(self, max_queue_size: int = DEFAULT_QUEUE_SIZE, redis_prefix: str = 'events:'):
+        self.max_queue_size = max_queue_size
+        self.redis_prefix = redis_prefix
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._redis = None
+        self._listener: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def configure_redis(self, redis_client) -> None:
+        """Route events through Redis pub/sub; pass None to stay in-process."""
+        self._redis = redis_client
+
+    @property
+    def uses_redis(self) -> bool:
+        return self._redis is not None
+
+    def subscribe(self, *channels: str) -> Subscription:
+        subscription = Subscription(self, set(channels), self.max_queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        if self._redis is not None:
+            self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def publish(self, channel: str, event_type: str, data: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Publish an event.
+
+        Returns the number of receivers: Redis subscribers (one per listening
+        process) when Redis is in use, otherwise local subscriptions.
+        """
+        event = {
+            'channel': channel,
+            'type': event_type,
+            'data': data or {},
+            'timestamp': time.time(),
+        }
+        if self._redis is not None:
+            try:
+                return self._redis.publish(self.redis_prefix + channel, json.dumps(event, default=str))
+            except Exception as e:
+                logger.warning(f"Redis publish failed for {channel}, delivering locally: {e}")
+        return self._dispatch(event)
+
+    def _dispatch(self, event: Dict[str, Any]) -> int:
+        with self._lock:
+            subscribers = list(self._subscribers.get(event.get('channel'), ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return len(subscribers)
+
+    def _ensure_listener(self) -> None:
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._stop.clear()
+            self._listener = threading.Thread(
+                target=self._listen,
+                name='EventBusListener',
+                daemon=True,
+            )
+            self._listener.start()
+
+    def _listen(self) -> None:
+        """Relay Redis messages to local subscribers, reconnecting on failure."""
+        backoff = 1.0
+        while not self._stop.is_set() and self._redis is not None:
+            pubsub = None
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.redis_prefix + '*')
+                backoff = 1.0
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message or message.get('type') != 'pmessage':
+                        continue
+                    try:
+                        self._dispatch(json.loads(message['data']))
+                    except (TypeError, ValueError) as e:
+                        logger.warning(f"Discarding malformed event: {e}")
+            except Exception as e:
+                logger.warning(f"Event bus listener error, retrying in {backoff:.0f}s: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+def format_sse(data: Any, event: Optional[str] = None, event_id: Optional[str] = None,
+               retry: Optional[int] = None) -> str:
+    """Serialise one message in the text/event-stream wire format."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    if retry is not None:
+        lines.append(f"retry: {retry}")
+    payload = data if isinstance(data, str) else json.dumps(data, default=str)
+    for line in payload.splitlines() or ['']:
+        lines.append(f"data: {line}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream_events(subscription: Subscription, heartbeat_seconds: float = DEFAULT_HEARTBEAT_SECONDS,
+                  max_duration: Optional[float] = None, transform=None) -> Iterator[str]:
+    """
+    Yield SSE frames for a subscription until the client disconnects.
+
+    ``transform`` may rewrite or drop (by returning None) each event before it
+    is sent.  A comment line is emitted every ``heartbeat_seconds`` so proxies
+    keep the connection open; after ``max_duration`` the stream ends and the
+    browser's EventSource reconnects on its own.
+    """
+    started = time.monotonic()
+    try:
+        yield format_sse({'connected': True}, event='ready', retry=DEFAULT_RETRY_MS)
+        while True:
+            remaining = None if max_duration is None else max_duration - (time.monotonic() - started)
+            if remaining is not None and remaining <= 0:
+                break
+            timeout = heartbeat_seconds if remaining is None else min(heartbeat_seconds, remaining)
+            event = subscription.get(timeout=timeout)
+            if event is None:
+                if remaining is None or remaining > heartbeat_seconds:
+                    yield ': keep-alive\n\n'
+                continue
+            if transform is not None:
+                event = transform(event)
+                if event is None:
+                    continue
+            yield format_sse(event.get('data', {}), event=event.get('type'))
+    finally:
+        subscription.close()
+
+
+class StreamSlots:
+    """Counts open streams so they cannot take every server thread."""
+
+    def __init__(self, limit: int = DEFAULT_MAX_STREAMS):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.active = max(self.active - 1, 0)
+
+
+stream_slots = StreamSlots()
+
+
+def open_stream(subscription: Subscription, initial_frames: Iterable[str] = (),
+                heartbeat_seconds: float = DEFAULT_HEARTBEAT_SECONDS,
+                max_duration: float = DEFAULT_MAX_STREAM_SECONDS, transform=None) -> Iterator[str]:
+    """
+    ``stream_events`` holding one of the process's stream slots.
+
+    When every slot is taken the client only gets ``initial_frames`` and a
+    ``busy`` event asking it to reconnect after ``BUSY_RETRY_MS``.  The slot
+    is taken on the first frame, so a response that is never iterated does
+    not hold one.
+    """
+    if not stream_slots.acquire():
+        subscription.close()
+        yield from initial_frames
+        yield format_sse({'retry_ms': BUSY_RETRY_MS}, event='busy', retry=BUSY_RETRY_MS)
+        return
+    try:
+        yield from initial_frames
+        yield from stream_events(subscription, heartbeat_seconds=heartbeat_seconds,
+                                 max_duration=max_duration, transform=transform)
+    finally:
+        subscription.close()
+        stream_slots.release()
+
+
+event_bus = EventBus()
+
+
+def init_event_bus(app) -> EventBus:
+    """Use Redis for cross-process fan-out when it is available."""
+    event_bus.max_queue_size = app.config.get('EVENT_BUS_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+    stream_slots.limit = app.config.get('SSE_MAX_STREAMS', DEFAULT_MAX_STREAMS)
+    if app.config.get('EVENT_BUS_USE_REDIS', True):
+        try:
+            from cache.redis_client import redis_client
+            if redis_client.is_available():
+                event_bus.configure_redis(redis_client.redis_client)
+                app.logger.debug("Event bus using Redis pub/sub")
+        except Exception as e:
+            app.logger.debug(f"Event bus staying in-process: {e}")
+    app.event_bus = event_bus
+    return event_bus
@@ -0,0 +1,358 @@
+"""
+Streaming export engine for audit logs and analytics.
+
+Exports used to load every matching row as an ORM object with ``.all()`` and
+build the whole file in an ``io.StringIO`` before responding, so a wide date
+range (audit logs are kept for seven years) could exhaust a worker.
+
+Here an export is a named set of columns plus a query builder.  Only the
+exported columns are selected, rows are fetched in batches with
+``yield_per`` (a server-side cursor where the driver supports one) and
+written straight into a generator response, so memory stays flat whatever
+the row count.  CSV and NDJSON stream as they are produced; XLSX is a zip
+archive and is written row by row to a temporary file first.  Ranges larger
+than ``EXPORT_ASYNC_ROW_THRESHOLD`` rows are handed to a Celery task that
+writes the file to ``EXPORT_OUTPUT_DIR`` and the caller gets a download link;
+a failed task leaves a ``.failed`` marker there instead, and files older than
+``EXPORT_RETENTION_HOURS`` are removed by a maintenance task.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Response, current_app, jsonify, send_file, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_ASYNC_ROW_THRESHOLD = 100000
+DEFAULT_RETENTION_HOURS = 24
+FAILED_SUFFIX = '.failed'
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+_EXPORT_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _iso(value) -> str:
+    return value.isoformat() if value else ''
+
+
+def _json(value) -> str:
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+
+class ExportSpec:
+    """
+    A named export: ``(header, column, formatter)`` triples and a function
+    that applies the request parameters to the query.
+    """
+
+    def __init__(self, name: str, columns: Callable[[], Sequence[Tuple[str, Any, Optional[Callable]]]],
+                 apply_filters: Callable[[Any, Dict[str, Any]], Any]):
+        self.name = name
+        self._columns = columns
+        self.apply_filters = apply_filters
+
+    @property
+    def columns(self):
+        # Built on use so the models are only imported once an export runs
+        return self._columns()
+
+    @property
+    def headers(self) -> List[str]:
+        return [header for header, _, _ in self.columns]
+
+    def query(self, params: Dict[str, Any]):
+        from models import db
+
+        query = db.session.query(*[column for _, column, _ in self.columns])
+        return self.apply_filters(query, params)
+
+    def rows(self, query, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Any]]:
+        """Formatted rows of ``query``, fetched from the database ``batch_size`` at a time."""
+        formatters = [formatter for _, _, formatter in self.columns]
+        for row in query.yield_per(batch_size):
+            yield [formatter(value) if formatter else value for formatter, value in zip(formatters, row)]
+
+
+def _audit_log_columns():
+    from security.audit import AuditLog
+
+    return [
+        ('Timestamp', AuditLog.timestamp, _iso),
+        ('User ID', AuditLog.user_id, None),
+        ('Event Type', AuditLog.event_type, None),
+        ('Severity', AuditLog.severity, None),
+        ('Action', AuditLog.action, None),
+        ('Resource Type', AuditLog.resource_type, None),
+        ('Resource ID', AuditLog.resource_id, None),
+        ('Details', AuditLog.details, _json),
+        ('IP Address', AuditLog.ip_address, None),
+        ('User Agent', AuditLog.user_agent, None),
+    ]
+
+
+def _audit_log_filters(query, params):
+    from security.audit import AuditLog
+
+    if params.get('date_from'):
+        query = query.filter(AuditLog.timestamp >= datetime.fromisoformat(params['date_from']))
+    if params.get('date_to'):
+        query = query.filter(AuditLog.timestamp <= datetime.fromisoformat(params['date_to']))
+    return query.order_by(AuditLog.timestamp.desc())
+
+
+def _analytics_columns():
+    from models import Report
+
+    return [
+        ('Report ID', Report.id, None),
+        ('Type', Report.type, None),
+        ('Title', Report.document_title, None),
+        ('Project Reference', Report.project_reference, None),
+        ('Client', Report.client_name, None),
+        ('Status', Report.status, None),
+        ('Created By', Report.user_email, None),
+        ('Created At', Report.created_at, _iso),
+        ('Updated At', Report.updated_at, _iso),
+        ('Approved By', Report.approved_by, None),
+        ('Approved At', Report.approved_at, _iso),
+    ]
+
+
+def _analytics_filters(query, params):
+    from models import Report
+
+    start_date = datetime.utcnow() - timedelta(days=int(params.get('days', 30)))
+    return query.filter(Report.created_at >= start_date).order_by(Report.created_at.desc())
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    'audit_logs': ExportSpec('audit_logs', _audit_log_columns, _audit_log_filters),
+    'analytics': ExportSpec('analytics', _analytics_columns, _analytics_filters),
+}
+
+
+def iter_csv(headers: Sequence[str], rows: Iterable[Sequence[Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[str]:
+    """CSV text in chunks of ``batch_size`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def iter_ndjson(headers: Sequence[str], rows: Iterable[Sequence[Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[str]:
+    """One JSON object per line, in chunks of ``batch_size`` rows."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(headers, row)), default=str))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def write_xlsx(headers: Sequence[str], rows: Iterable[Sequence[Any]], path: str, title: str = 'Export') -> None:
+    """Write rows to an XLSX file without keeping the sheet in memory."""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError('XLSX export requires the openpyxl package to be installed on the server.')
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append(list(headers))
+    for row in rows:
+        sheet.append(list(row))
+    workbook.save(path)
+
+
+def write_export(spec: ExportSpec, params: Dict[str, Any], fmt: str, path: str,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Write an export to ``path`` (atomically); returns the number of rows."""
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    rows = counted(spec.rows(spec.query(params), batch_size))
+    tmp_path = f"{path}.part"
+    try:
+        if fmt == 'xlsx':
+            write_xlsx(spec.headers, rows, tmp_path, spec.name)
+        else:
+            chunks = iter_csv if fmt == 'csv' else iter_ndjson
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                for chunk in chunks(spec.headers, rows, batch_size):
+                    f.write(chunk)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError as e:
+        logger.warning(f"Could not remove export file {path}: {e}")
+
+
+def export_output_dir() -> str:
+    path = current_app.config.get('EXPORT_OUTPUT_DIR') or os.path.join(current_app.instance_path, 'exports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def mark_export_failed(export_id: str, fmt: str, error: str) -> None:
+    """Leave a marker so the download link reports the failure instead of waiting."""
+    path = os.path.join(export_output_dir(), f"{export_id}.{fmt}{FAILED_SUFFIX}")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'error': error, 'failed_at': datetime.utcnow().isoformat()}, f)
+
+
+def cleanup_exports(max_age_hours: Optional[float] = None) -> int:
+    """Delete finished exports, failure markers and abandoned partial files past retention."""
+    if max_age_hours is None:
+        max_age_hours = current_app.config.get('EXPORT_RETENTION_HOURS', DEFAULT_RETENTION_HOURS)
+    cutoff = (datetime.now() - timedelta(hours=max_age_hours)).timestamp()
+    directory = export_output_dir()
+    removed = 0
+    for entry in os.scandir(directory):
+        if not entry.is_file() or not _EXPORT_ID_RE.match(entry.name.split('.', 1)[0]):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Could not remove export file {entry.path}: {e}")
+    return removed
+
+
+def _filename(name: str, fmt: str) -> str:
+    return f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+
+
+def _start_background_export(spec: ExportSpec, params: Dict[str, Any], fmt: str) -> Optional[str]:
+    """Queue the export on Celery; returns its id, or None when Celery is unavailable."""
+    try:
+        from tasks.celery_app import get_celery_app
+        if get_celery_app() is None:
+            return None
+        from tasks.report_tasks import export_data_task
+
+        export_id = uuid.uuid4().hex
+        export_data_task.apply_async(args=[spec.name, params, fmt, export_id])
+        return export_id
+    except Exception as e:
+        current_app.logger.warning(f"Could not queue background export, streaming instead: {e}")
+        return None
+
+
+def export_response(name: str, params: Dict[str, Any], fmt: str = 'csv', background: Optional[bool] = None,
+                    download_endpoint: Optional[str] = None):
+    """
+    Respond with the export streamed in ``fmt``, or queue it.
+
+    With ``background=None`` the export is queued when it matches more than
+    ``EXPORT_ASYNC_ROW_THRESHOLD`` rows; the 202 response carries a link to
+    ``download_endpoint``.
+    """
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported export format '{fmt}'"}), 400
+    spec = EXPORTS[name]
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    # Built up front so bad parameters fail before the response starts
+    query = spec.query(params)
+
+    if download_endpoint and background is not False:
+        if background is None:
+            threshold = current_app.config.get('EXPORT_ASYNC_ROW_THRESHOLD', DEFAULT_ASYNC_ROW_THRESHOLD)
+            background = query.order_by(None).count() > threshold
+        export_id = _start_background_export(spec, params, fmt) if background else None
+        if export_id:
+            from flask import url_for
+            return jsonify({
+                'status': 'queued',
+                'export_id': export_id,
+                'download_url': url_for(download_endpoint, export_id=export_id),
+            }), 202
+
+    filename = _filename(name, fmt)
+    headers = {'Content-Disposition': f'attachment; filename={filename}'}
+
+    if fmt == 'xlsx':
+        fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='export-')
+        os.close(fd)
+        try:
+            write_xlsx(spec.headers, spec.rows(query, batch_size), path, name)
+            response = send_file(path, mimetype=EXPORT_FORMATS[fmt], as_attachment=True, download_name=filename)
+        except Exception:
+            _remove_quietly(path)
+            raise
+        # Deleted once the response has closed the file: Windows refuses to
+        # remove a file that is still open
+        response.call_on_close(lambda: _remove_quietly(path))
+        return response
+
+    chunks = iter_csv if fmt == 'csv' else iter_ndjson
+
+    def generate():
+        try:
+            yield from chunks(spec.headers, spec.rows(query, batch_size), batch_size)
+        except Exception as e:
+            # Headers are already sent; the truncated body is all we can signal
+            current_app.logger.error(f"Export {name} failed mid-stream: {e}")
+
+    return Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt], headers=headers)
+
+
+def download_response(name: str, export_id: str):
+    """Send a finished background export, or report that it is still running or failed."""
+    if not _EXPORT_ID_RE.match(export_id or ''):
+        return jsonify({'error': 'Invalid export id'}), 400
+    directory = export_output_dir()
+    for fmt, mimetype in EXPORT_FORMATS.items():
+        path = os.path.join(directory, f"{export_id}.{fmt}")
+        if os.path.exists(path):
+            return send_file(path, mimetype=mimetype, as_attachment=True, download_name=_filename(name, fmt))
+        if os.path.exists(f"{path}.part"):
+            return jsonify({'status': 'running', 'export_id': export_id}), 202
+        if os.path.exists(f"{path}{FAILED_SUFFIX}"):
+            try:
+                with open(f"{path}{FAILED_SUFFIX}", encoding='utf-8') as f:
+                    error = json.load(f).get('error')
+            except (OSError, ValueError):
+                error = None
+            return jsonify({'status': 'failed', 'export_id': export_id, 'error': error or 'Export failed'}), 500
+    return jsonify({'status': 'pending', 'export_id': export_id}), 202
@@ -0,0 +1,208 @@
+"""
+Compiled keyword classifier for AI agent message routing.
+
+The agent used to score every message with eight ``_detect_*_intent`` helpers
+plus separate sentiment and urgency passes, each looping over its keywords
+with ``keyword in message``.  That is one substring scan per keyword per
+message, and substring matching misfires on words that merely contain a
+keyword ("show" in "showcase", "now" in "know", "fix" in "prefix").
+
+Here the keyword lists are compiled once into a single table mapping a word
+(or a short phrase) to the scores it contributes.  A message is tokenised in
+one pass, its distinct words are intersected with the table, phrases are only
+checked when their first word occurs, and all intent scores, sentiment,
+urgency and entities come back from one call.  Matching is on whole words; common inflections of longer keywords
+("reports", "analyzing", "errors") and the forms of short or irregular ones
+listed in ``IRREGULAR_FORMS`` ("fixed", "bugs", "made") are added to the
+table at compile time so they still count.
+"""
+import re
+from collections import defaultdict
+from typing import AbstractSet, Any, Dict, FrozenSet, List, Tuple
+
+# intent -> ((keywords, weight per distinct keyword), ...)
+INTENT_KEYWORDS: Dict[str, Tuple[Tuple[Tuple[str, ...], float], ...]] = {
+    "create_report": (
+        (("create", "new", "generate", "make", "start", "begin", "build"), 0.3),
+        (("report", "sat", "document", "form"), 0.4),
+    ),
+    "get_help": (
+        (("help", "how", "what", "guide", "explain", "show", "teach", "learn"), 0.2),
+    ),
+    "analyze_data": (
+        (("analyze", "analysis", "data", "metrics", "insights", "trends", "statistics", "performance"), 0.25),
+    ),
+    "workflow_assistance": (
+        (("workflow", "process", "steps", "procedure", "automation", "optimize", "streamline"), 0.3),
+    ),
+    "knowledge_query": (
+        (("what is", "explain", "definition", "standard", "best practice", "guideline"), 0.25),
+    ),
+    "system_operation": (
+        (("status", "performance", "system", "health", "monitor", "check", "optimize"), 0.3),
+    ),
+    "collaboration": (
+        (("team", "collaborate", "review", "approve", "share", "assign", "workflow"), 0.25),
+    ),
+    "troubleshooting": (
+        (("problem", "issue", "error", "bug", "fix", "broken", "not working", "trouble"), 0.3),
+    ),
+}
+
+POSITIVE_WORDS = ("good", "great", "excellent", "perfect", "amazing", "wonderful", "fantastic")
+NEGATIVE_WORDS = ("bad", "terrible", "awful", "horrible", "frustrated", "annoyed", "problem")
+URGENT_WORDS = ("urgent", "asap", "immediately", "critical", "emergency", "now", "quickly")
+
+_SENTIMENT_POSITIVE = "_positive"
+_SENTIMENT_NEGATIVE = "_negative"
+_URGENCY = "_urgency"
+
+# Shorter keywords ("new", "now") are matched exactly; inflecting them
+# produces unrelated words ("news", "nows")
+_MIN_INFLECTED_LENGTH = 4
+
+# Forms the regular rules miss: short keywords that do inflect, irregular verbs
+IRREGULAR_FORMS: Dict[str, Tuple[str, ...]] = {
+    "fix": ("fixes", "fixed", "fixing"),
+    "bug": ("bugs",),
+    "make": ("made",),
+    "build": ("built",),
+    "begin": ("began", "begun", "beginning"),
+    "teach": ("taught",),
+    "show": ("shown",),
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PROJECT_RE = re.compile(r'\b[A-Z0-9]{3,}-[A-Z0-9]{2,}\b')
+_DATE_RE = re.compile(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b')
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+
+def _inflections(word: str) -> List[str]:
+    """The word plus its plural, past and gerund forms."""
+    forms = [word, *IRREGULAR_FORMS.get(word, ())]
+    if len(word) < _MIN_INFLECTED_LENGTH or not word.isalpha():
+        return forms
+    if word.endswith(('ing', 'ed')) or (word.endswith('s') and not word.endswith('ss')):
+        return forms
+    stem = word[:-1] if word.endswith('e') else word
+    if word.endswith('y') and word[-2] not in 'aeiou':
+        forms += [word[:-1] + 'ies', word[:-1] + 'ied', word + 'ing']
+    elif word.endswith(('ss', 'sh', 'ch', 'x', 'z')):
+        forms += [word + 'es', word + 'ed', word + 'ing']
+    else:
+        forms += [word + 's', stem + 'ed', stem + 'ing']
+    return forms
+
+
+class IntentClassifier:
+    """Scores a message against every intent with one tokenisation pass."""
+
+    def __init__(self, intent_keywords=INTENT_KEYWORDS, positive_words=POSITIVE_WORDS,
+                 negative_words=NEGATIVE_WORDS, urgent_words=URGENT_WORDS):
+        self.intents: Tuple[str, ...] = tuple(intent_keywords)
+        # word or space-joined phrase -> {(category, keyword, weight), ...}
+        table: Dict[str, set] = defaultdict(set)
+
+        def add(keyword: str, category: str, weight: float) -> None:
+            words = keyword.split()
+            for form in _inflections(words[-1]):
+                table[' '.join(words[:-1] + [form])].add((category, keyword, weight))
+
+        for intent, groups in intent_keywords.items():
+            for keywords, weight in groups:
+                for keyword in keywords:
+                    add(keyword, intent, weight)
+        for word in positive_words:
+            add(word, _SENTIMENT_POSITIVE, 1.0)
+        for word in negative_words:
+            add(word, _SENTIMENT_NEGATIVE, 1.0)
+        for word in urgent_words:
+            add(word, _URGENCY, 1.0)
+
+        self._table: Dict[str, FrozenSet[Tuple[str, str, float]]] = {
+            key: frozenset(entries) for key, entries in table.items()
+        }
+        self._words = frozenset(key for key in self._table if ' ' not in key)
+        # first word -> phrases starting with it, checked only when that word occurs
+        self._phrases: Dict[str, Tuple[str, ...]] = {}
+        for key in self._table:
+            if ' ' in key:
+                first = key.split(' ', 1)[0]
+                self._phrases[first] = self._phrases.get(first, ()) + (key,)
+        self._phrase_starts = frozenset(self._phrases)
+
+    def _terms(self, message: str) -> AbstractSet[str]:
+        """Distinct keywords and keyword phrases of the message that are in the table."""
+        tokens = _TOKEN_RE.findall(message.lower())
+        terms = self._words.intersection(tokens)
+        starts = self._phrase_starts.intersection(tokens)
+        if starts:
+            text = ' %s ' % ' '.join(tokens)
+            phrases = {phrase for first in starts for phrase in self._phrases[first]
+                       if ' %s ' % phrase in text}
+            terms = terms.union(phrases)
+        return terms
+
+    def classify(self, message: str) -> Dict[str, Any]:
+        """
+        Return every intent score plus entities, sentiment and urgency.
+
+        Each distinct keyword counts once however often (and in however many
+        inflections) it appears; intent confidences are capped at 1.0.
+        """
+        # Deduplicate (category, keyword) entries across inflections first
+        entries = set()
+        for term in self._terms(message):
+            entries |= self._table[term]
+
+        scores: Dict[str, float] = {}
+        for category, _keyword, weight in entries:
+            scores[category] = scores.get(category, 0.0) + weight
+
+        intents = {
+            intent: {"confidence": min(scores[intent], 1.0), "keywords_found": True}
+            if intent in scores else {"confidence": 0.0, "keywords_found": False}
+            for intent in self.intents
+        }
+
+        positive = scores.get(_SENTIMENT_POSITIVE, 0)
+        negative = scores.get(_SENTIMENT_NEGATIVE, 0)
+        if positive > negative:
+            sentiment = "positive"
+        elif negative > positive:
+            sentiment = "negative"
+        else:
+            sentiment = "neutral"
+
+        urgent = scores.get(_URGENCY, 0)
+        urgency = "high" if urgent >= 2 else "medium" if urgent == 1 else "low"
+
+        return {
+            "intents": intents,
+            "entities": extract_entities(message),
+            "sentiment": sentiment,
+            "urgency": urgency,
+        }
+
+
+def extract_entities(message: str) -> Dict[str, List[str]]:
+    """Project references, dates and email addresses mentioned in the message."""
+    entities = {}
+    # Each pattern needs a separator character; skip the scan when it is absent
+    if '-' in message:
+        projects = _PROJECT_RE.findall(message)
+        if projects:
+            entities['project_references'] = projects
+    if '/' in message or '-' in message:
+        dates = _DATE_RE.findall(message)
+        if dates:
+            entities['dates'] = dates
+    if '@' in message:
+        emails = _EMAIL_RE.findall(message)
+        if emails:
+            entities['emails'] = emails
+    return entities
+
+
+intent_classifier = IntentClassifier()
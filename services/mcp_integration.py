@@ -7,11 +7,15 @@ import json
 import os
 import logging
 import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional, Union
 from dataclasses import dataclass
 import requests
 from flask import current_app
+from werkzeug.local import LocalProxy
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -26,12 +30,75 @@ class MCPServerConfig:
     timeout: int = 30
     retry_attempts: int = 3
 
+class CircuitBreaker:
+    """
+    Per-server circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail immediately instead of waiting out the client timeout.  Once
+    ``reset_timeout`` seconds have passed it half-opens and lets a single
+    trial call through: success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            # Half-open: one trial call at a time
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
 class MCPClient:
     """Enhanced MCP Client with error handling and connection management"""
     
-    def __init__(self, server_url: str, timeout: int = 30):
+    def __init__(self, server_url: str, timeout: int = 30, health_timeout: float = 2.0,
+                 breaker: Optional[CircuitBreaker] = None):
         self.server_url = server_url
         self.timeout = timeout
+        self.health_timeout = health_timeout
+        self.breaker = breaker or CircuitBreaker()
         self.session = requests.Session()
         self.session.headers.update({
             'Content-Type': 'application/json',
@@ -40,6 +107,9 @@ class MCPClient:
     
     def query(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Send query to MCP server with error handling"""
+        if not self.breaker.allow():
+            return {"error": f"MCP server at {self.server_url} is unavailable", "success": False,
+                    "circuit_open": True}
         try:
             response = self.session.post(
                 f"{self.server_url}/query",
@@ -47,24 +117,44 @@ class MCPClient:
                 timeout=self.timeout
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            result = response.json()
+        except requests.exceptions.HTTPError as e:
+            # A 4xx means the server is up and rejected this request
+            if e.response is not None and e.response.status_code < 500:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            logger.error(f"MCP query failed: {e}")
+            return {"error": str(e), "success": False}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.breaker.record_failure()
             logger.error(f"MCP query failed: {e}")
             return {"error": str(e), "success": False}
+        self.breaker.record_success()
+        return result
     
     def health_check(self) -> bool:
-        """Check if MCP server is healthy"""
-        try:
-            response = self.session.get(f"{self.server_url}/health", timeout=5)
-            return response.status_code == 200
-        except:
+        """Check if MCP server is healthy; fails fast while the circuit is open"""
+        if not self.breaker.allow():
             return False
+        try:
+            response = self.session.get(f"{self.server_url}/health", timeout=self.health_timeout)
+            healthy = response.status_code == 200
+        except requests.exceptions.RequestException:
+            healthy = False
+        if healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        return healthy
 
 class MCPIntegrationService:
     """Main service for MCP server integration"""
     
-    def __init__(self):
-        self.servers = {
+    def __init__(self, servers: Optional[Dict[str, MCPServerConfig]] = None,
+                 health_timeout: float = 2.0, failure_threshold: int = 3,
+                 reset_timeout: float = 30.0, status_ttl: float = 30.0):
+        self.servers = servers or {
             'filesystem': MCPServerConfig('filesystem', 'localhost', 4312),
             'git': MCPServerConfig('git', 'localhost', 4322),
             'fetch': MCPServerConfig('fetch', 'localhost', 4332),
@@ -72,7 +162,15 @@ class MCPIntegrationService:
             'sequential': MCPServerConfig('sequential', 'localhost', 4352),
             'time': MCPServerConfig('time', 'localhost', 4362)
         }
+        self.health_timeout = health_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.status_ttl = status_ttl
         self.clients = {}
+        self._status: Dict[str, bool] = {}
+        self._status_checked_at: Optional[datetime] = None
+        self._status_monotonic = float('-inf')
+        self._status_lock = threading.Lock()
         self._initialize_clients()
     
     def _initialize_clients(self):
@@ -80,15 +178,60 @@ class MCPIntegrationService:
         for name, config in self.servers.items():
             if config.enabled:
                 server_url = f"http://{config.host}:{config.port}"
-                self.clients[name] = MCPClient(server_url, config.timeout)
+                self.clients[name] = MCPClient(
+                    server_url, config.timeout, self.health_timeout,
+                    CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                )
                 logger.info(f"Initialized MCP client for {name} at {server_url}")
     
-    def get_server_status(self) -> Dict[str, bool]:
-        """Get health status of all MCP servers"""
-        status = {}
-        for name, client in self.clients.items():
-            status[name] = client.health_check()
-        return status
+    def configure(self, health_timeout: float = None, failure_threshold: int = None,
+                  reset_timeout: float = None, status_ttl: float = None) -> None:
+        """Apply new probe and breaker settings to every client"""
+        if health_timeout is not None:
+            self.health_timeout = health_timeout
+        if failure_threshold is not None:
+            self.failure_threshold = failure_threshold
+        if reset_timeout is not None:
+            self.reset_timeout = reset_timeout
+        if status_ttl is not None:
+            self.status_ttl = status_ttl
+        for client in self.clients.values():
+            client.health_timeout = self.health_timeout
+            client.breaker.failure_threshold = self.failure_threshold
+            client.breaker.reset_timeout = self.reset_timeout
+    
+    def probe_servers(self) -> Dict[str, bool]:
+        """Health-check every server concurrently and cache the result"""
+        if not self.clients:
+            status = {}
+        else:
+            with ThreadPoolExecutor(max_workers=len(self.clients), thread_name_prefix='mcp-probe') as pool:
+                futures = {name: pool.submit(client.health_check) for name, client in self.clients.items()}
+                status = {name: future.result() for name, future in futures.items()}
+        with self._status_lock:
+            self._status = status
+            self._status_checked_at = datetime.now(timezone.utc)
+            self._status_monotonic = time.monotonic()
+        return dict(status)
+    
+    def get_server_status(self, refresh: bool = False) -> Dict[str, bool]:
+        """Get health status of all MCP servers from the cached snapshot"""
+        with self._status_lock:
+            fresh = time.monotonic() - self._status_monotonic < self.status_ttl
+            if fresh and not refresh:
+                return dict(self._status)
+        return self.probe_servers()
+    
+    def get_status_snapshot(self, refresh: bool = False) -> Dict[str, Any]:
+        """Cached server health plus circuit states and when it was checked"""
+        servers = self.get_server_status(refresh)
+        with self._status_lock:
+            checked_at = self._status_checked_at
+        return {
+            "servers": servers,
+            "circuits": {name: client.breaker.state for name, client in self.clients.items()},
+            "last_check": checked_at.isoformat() if checked_at else None,
+        }
     
     # Filesystem MCP Integration
     def upload_file(self, file_path: str, content: bytes, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -620,18 +763,43 @@ class SATMCPIntegration:
         
         return recommendations
 
-# Global MCP integration instance
-mcp_service = MCPIntegrationService()
-sat_mcp = SATMCPIntegration(mcp_service)
+# Global MCP integration instances, built on first use so processes that never
+# touch MCP (CLI commands, Celery workers) do not pay for them
+_mcp_service: Optional[MCPIntegrationService] = None
+_sat_mcp: Optional[SATMCPIntegration] = None
+_MCP_INIT_LOCK = threading.Lock()
+_mcp_config: Dict[str, Any] = {}
+
+def get_mcp_service() -> MCPIntegrationService:
+    """Get global MCP integration service instance."""
+    global _mcp_service
+    if _mcp_service is None:
+        with _MCP_INIT_LOCK:
+            if _mcp_service is None:
+                service = MCPIntegrationService()
+                _mcp_service = service
+                _apply_mcp_config(service)
+    return _mcp_service
+
+def get_sat_mcp() -> SATMCPIntegration:
+    """Get global SAT MCP integration instance."""
+    global _sat_mcp
+    if _sat_mcp is None:
+        service = get_mcp_service()
+        with _MCP_INIT_LOCK:
+            if _sat_mcp is None:
+                _sat_mcp = SATMCPIntegration(service)
+    return _sat_mcp
+
+mcp_service = LocalProxy(get_mcp_service)
+sat_mcp = LocalProxy(get_sat_mcp)
 
 # Public interface functions
-def get_mcp_status() -> Dict[str, Any]:
+def get_mcp_status(refresh: bool = False) -> Dict[str, Any]:
     """Get status of all MCP servers"""
-    return {
-        "servers": mcp_service.get_server_status(),
-        "integration_active": True,
-        "last_check": datetime.now(timezone.utc).isoformat()
-    }
+    status = mcp_service.get_status_snapshot(refresh)
+    status["integration_active"] = True
+    return status
 
 def generate_intelligent_report(report_data: Dict[str, Any], report_type: str = "SAT") -> Dict[str, Any]:
     """Generate report using MCP-enhanced intelligence"""
@@ -651,4 +819,60 @@ def fetch_standards_with_mcp(standard_type: str) -> Dict[str, Any]:
 
 def analyze_project_with_mcp(project_id: str) -> Dict[str, Any]:
     """Analyze project using MCP git and memory servers"""
-    return sat_mcp.analyze_project_history(project_id)
\ No newline at end of file
+    return sat_mcp.analyze_project_history(project_id)
+
+_STATUS_THREAD: Optional[threading.Thread] = None
+_STATUS_LOCK = threading.Lock()
+
+def init_mcp(app) -> None:
+    """
+    Record MCP settings from the app config.
+
+    The service itself, and the thread that refreshes its status snapshot,
+    start when MCP is first used.
+    """
+    interval = app.config.get('MCP_STATUS_REFRESH_SECONDS', 30)
+    _mcp_config.update(
+        health_timeout=app.config.get('MCP_HEALTH_TIMEOUT_SECONDS', 2.0),
+        failure_threshold=app.config.get('MCP_CIRCUIT_FAILURE_THRESHOLD', 3),
+        reset_timeout=app.config.get('MCP_CIRCUIT_RESET_SECONDS', 30),
+        # Readers fall back to probing inline only if the refresher stalls
+        status_ttl=interval * 2,
+    )
+    _mcp_config['refresh_interval'] = interval
+    _mcp_config['background_status'] = app.config.get('MCP_BACKGROUND_STATUS', True)
+    if _mcp_service is not None:
+        _apply_mcp_config(_mcp_service)
+
+def _apply_mcp_config(service: MCPIntegrationService) -> None:
+    global _STATUS_THREAD
+    if not _mcp_config:
+        return
+    service.configure(
+        health_timeout=_mcp_config['health_timeout'],
+        failure_threshold=_mcp_config['failure_threshold'],
+        reset_timeout=_mcp_config['reset_timeout'],
+        status_ttl=_mcp_config['status_ttl'],
+    )
+    if not _mcp_config['background_status']:
+        return
+
+    interval = _mcp_config['refresh_interval']
+    with _STATUS_LOCK:
+        if _STATUS_THREAD and _STATUS_THREAD.is_alive():
+            return
+
+        def _refresh_loop():
+            while True:
+                try:
+                    service.probe_servers()
+                except Exception as exc:  # noqa: broad-except
+                    logger.error(f"MCP status refresh failed: {exc}")
+                time.sleep(interval)
+
+        _STATUS_THREAD = threading.Thread(
+            target=_refresh_loop,
+            name='MCPStatusRefresher',
+            daemon=True,
+        )
+        _STATUS_THREAD.start()
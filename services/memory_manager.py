@@ -5,18 +5,32 @@ Implements hierarchical memory architecture with consolidation protocols
 
 import json
 import os
+import atexit
+import functools
+from contextlib import contextmanager
 import hashlib
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, asdict, field
-from collections import deque, defaultdict
+from collections import deque, defaultdict, OrderedDict
 import pickle
+import queue
+import threading
 from flask import current_app, session, g
+from werkzeug.local import LocalProxy
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+def _synchronized(method):
+    """Run a method while holding the instance's re-entrant ``lock``"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 @dataclass
 class MemoryEntry:
     """Base class for memory entries"""
@@ -201,6 +215,8 @@ class LongTermMemory:
         self.cross_project_insights: List[MemoryEntry] = []
         self.optimization_patterns: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
         self.global_statistics: Dict[str, Any] = {}
+        # Shared by every user shard and the consolidation worker
+        self.lock = threading.RLock()
         
         # Ensure storage directory exists
         os.makedirs(storage_path, exist_ok=True)
@@ -265,6 +281,7 @@ class LongTermMemory:
         except Exception as e:
             logger.error(f"Error saving persistent memory data: {e}")
     
+    @_synchronized
     def get_user_profile(self, user_id: str) -> UserProfile:
         """Get or create user profile"""
         if user_id not in self.user_profiles:
@@ -282,6 +299,7 @@ class LongTermMemory:
         
         return self.user_profiles[user_id]
     
+    @_synchronized
     def update_user_profile(self, user_id: str, updates: Dict[str, Any]):
         """Update user profile with new information"""
         profile = self.get_user_profile(user_id)
@@ -306,6 +324,7 @@ class LongTermMemory:
         except Exception as e:
             logger.error(f"Error saving user profile: {e}")
     
+    @_synchronized
     def add_domain_knowledge(self, domain: str, knowledge: Dict[str, Any], importance: float = 0.5):
         """Add domain-specific knowledge"""
         entry = MemoryEntry(
@@ -330,6 +349,7 @@ class LongTermMemory:
         
         self._save_persistent_data()
     
+    @_synchronized
     def add_historical_pattern(self, pattern_type: str, pattern_data: Dict[str, Any]):
         """Add historical pattern"""
         if pattern_type not in self.historical_patterns:
@@ -354,6 +374,7 @@ class LongTermMemory:
         
         self._save_persistent_data()
     
+    @_synchronized
     def add_cross_project_insight(self, insight: MemoryEntry):
         """Add cross-project insight"""
         self.cross_project_insights.append(insight)
@@ -365,6 +386,7 @@ class LongTermMemory:
         
         self._save_persistent_data()
     
+    @_synchronized
     def add_optimization_pattern(self, optimization_type: str, pattern: Dict[str, Any]):
         """Add optimization pattern"""
         pattern['timestamp'] = datetime.now()
@@ -377,6 +399,7 @@ class LongTermMemory:
         
         self._save_persistent_data()
     
+    @_synchronized
     def get_relevant_knowledge(self, query_tags: List[str], limit: int = 10) -> List[MemoryEntry]:
         """Get relevant knowledge based on tags"""
         relevant_entries = []
@@ -398,6 +421,7 @@ class LongTermMemory:
         
         return relevant_entries[:limit]
     
+    @_synchronized
     def update_global_statistics(self, stats: Dict[str, Any]):
         """Update global statistics"""
         self.global_statistics.update(stats)
@@ -578,33 +602,270 @@ class MemoryConsolidationProtocol:
                 }
             )
 
-class AdvancedMemoryManager:
-    """Main memory management system coordinating all memory levels"""
+class UserMemoryShard:
+    """Short- and mid-term memory belonging to a single user"""
     
-    def __init__(self, storage_path: str = "instance/memory"):
+    def __init__(self, user_id: str, long_term: LongTermMemory):
+        self.user_id = user_id
         self.short_term = ShortTermMemory()
         self.mid_term = MidTermMemory()
-        self.long_term = LongTermMemory(storage_path)
-        self.consolidation = MemoryConsolidationProtocol(
-            self.short_term, self.mid_term, self.long_term
-        )
+        self.consolidation = MemoryConsolidationProtocol(self.short_term, self.mid_term, long_term)
         self.interaction_count = 0
+        self.lock = threading.RLock()
+        self.consolidation_queued = False
+        self.pins = 0  # callers currently using the shard; pinned shards are never evicted
+    
+    def reset(self):
+        """Start over with empty short- and mid-term memory"""
+        self.interaction_count = 0
+        self.short_term = ShortTermMemory()
+        self.mid_term = MidTermMemory()
+        self.consolidation.short_term = self.short_term
+        self.consolidation.mid_term = self.mid_term
+    
+    def __getstate__(self):
+        # Only the memories are persisted; locks and the shared long-term
+        # store are re-attached when the shard is loaded again
+        return {
+            'user_id': self.user_id,
+            'short_term': self.short_term,
+            'mid_term': self.mid_term,
+            'interaction_count': self.interaction_count,
+            'consolidation_counter': self.consolidation.consolidation_counter,
+            'last_consolidation': self.consolidation.last_consolidation,
+        }
+
+class AdvancedMemoryManager:
+    """
+    Main memory management system coordinating all memory levels
+    
+    Short- and mid-term memory is partitioned into one shard per user.  At most
+    ``max_active_users`` shards are kept in memory; the least recently used
+    ones are pickled to ``<storage_path>/shards`` and reloaded on demand.
+    Disk reads and writes happen outside ``_shards_lock``: an evicted shard
+    stays reachable through ``_saving`` until it is written, and concurrent
+    loads of one user wait on a single in-flight read.
+    Consolidation into long-term memory runs on a background worker thread.
+    """
+    
+    def __init__(self, storage_path: str = "instance/memory", max_active_users: int = 256,
+                 background_consolidation: bool = True):
+        self.storage_path = storage_path
+        self.shard_path = os.path.join(storage_path, "shards")
+        self.max_active_users = max_active_users
+        self.background_consolidation = background_consolidation
+        self.long_term = LongTermMemory(storage_path)
+        self._shards: "OrderedDict[str, UserMemoryShard]" = OrderedDict()
+        self._shards_lock = threading.Lock()
+        # user_id -> (evicted shard, writes still in progress)
+        self._saving: Dict[str, Tuple[UserMemoryShard, int]] = {}
+        # user_id -> set once the shard has been read from disk
+        self._loading: Dict[str, threading.Event] = {}
+        self._local = threading.local()
+        self._consolidation_queue: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        os.makedirs(self.shard_path, exist_ok=True)
+    
+    # -- shards ----------------------------------------------------------
+    
+    def _shard_file(self, user_id: str) -> str:
+        safe_user_id = hashlib.md5(user_id.encode()).hexdigest()
+        return os.path.join(self.shard_path, f"shard_{safe_user_id}.pkl")
+    
+    def _load_shard(self, user_id: str) -> UserMemoryShard:
+        shard = UserMemoryShard(user_id, self.long_term)
+        path = self._shard_file(user_id)
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    state = pickle.load(f)
+                shard.short_term = state['short_term']
+                shard.mid_term = state['mid_term']
+                shard.interaction_count = state.get('interaction_count', 0)
+                shard.consolidation = MemoryConsolidationProtocol(shard.short_term, shard.mid_term, self.long_term)
+                shard.consolidation.consolidation_counter = state.get('consolidation_counter', 0)
+                shard.consolidation.last_consolidation = state.get('last_consolidation', datetime.now())
+            except Exception as e:
+                logger.error(f"Error loading memory shard for {user_id}: {e}")
+        return shard
+    
+    def _save_shard(self, shard: UserMemoryShard):
+        try:
+            with open(self._shard_file(shard.user_id), 'wb') as f:
+                pickle.dump(shard.__getstate__(), f)
+        except Exception as e:
+            logger.error(f"Error saving memory shard for {shard.user_id}: {e}")
+    
+    def shard(self, user_id: str, pin: bool = False) -> UserMemoryShard:
+        """Return the user's shard, loading it from cold storage if needed"""
+        self._local.user_id = user_id
+        while True:
+            with self._shards_lock:
+                shard = self._shards.get(user_id)
+                if shard is None and user_id in self._saving:
+                    # Evicted but not written yet; the file may be older
+                    shard = self._saving[user_id][0]
+                    self._shards[user_id] = shard
+                if shard is not None:
+                    self._shards.move_to_end(user_id)
+                    shard.pins += 1 if pin else 0
+                    return shard
+                loading = self._loading.get(user_id)
+                if loading is None:
+                    loading = self._loading[user_id] = threading.Event()
+                    break
+            # Another thread is reading this user's shard from disk
+            loading.wait()
         
+        try:
+            shard = self._load_shard(user_id)
+            with self._shards_lock:
+                shard.pins += 1 if pin else 0
+                self._shards[user_id] = shard
+                evicted = self._evict_locked()
+        finally:
+            with self._shards_lock:
+                self._loading.pop(user_id, None)
+            loading.set()
+        self._save_evicted(evicted)
+        return shard
+    
+    @contextmanager
+    def _using(self, user_id: str):
+        """Pin and lock a user's shard for the duration of the block"""
+        shard = self.shard(user_id, pin=True)
+        try:
+            with shard.lock:
+                yield shard
+        finally:
+            with self._shards_lock:
+                shard.pins -= 1
+    
+    def _evict_locked(self) -> List[UserMemoryShard]:
+        """Detach least recently used idle shards beyond the limit; caller holds the lock"""
+        evicted = []
+        for user_id in list(self._shards):
+            if len(self._shards) <= self.max_active_users:
+                break
+            candidate = self._shards[user_id]
+            # Skip shards that are in use or waiting for consolidation
+            if candidate.pins or candidate.consolidation_queued:
+                continue
+            del self._shards[user_id]
+            _, writes = self._saving.get(user_id, (candidate, 0))
+            self._saving[user_id] = (candidate, writes + 1)
+            evicted.append(candidate)
+        return evicted
+    
+    def _save_evicted(self, shards: List[UserMemoryShard]):
+        """Write detached shards to cold storage without holding ``_shards_lock``"""
+        for shard in shards:
+            try:
+                with shard.lock:
+                    self._save_shard(shard)
+            finally:
+                with self._shards_lock:
+                    saved, writes = self._saving[shard.user_id]
+                    if writes > 1:
+                        self._saving[shard.user_id] = (saved, writes - 1)
+                    else:
+                        del self._saving[shard.user_id]
+    
+    def persist_all(self):
+        """Write every active shard to cold storage"""
+        with self._shards_lock:
+            shards = list(self._shards.values())
+        for shard in shards:
+            with shard.lock:
+                self._save_shard(shard)
+    
+    def _current_user(self) -> str:
+        return getattr(self._local, 'user_id', None) or 'anonymous'
+    
+    def _current_shard(self) -> UserMemoryShard:
+        return self.shard(self._current_user())
+    
+    # Compatibility accessors for callers written against the single shared
+    # memory: they resolve to the shard last used by the current thread.
+    
+    @property
+    def short_term(self) -> ShortTermMemory:
+        return self._current_shard().short_term
+    
+    @property
+    def mid_term(self) -> MidTermMemory:
+        return self._current_shard().mid_term
+    
+    @property
+    def interaction_count(self) -> int:
+        return self._current_shard().interaction_count
+    
+    # -- consolidation ---------------------------------------------------
+    
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._consolidation_loop,
+                name='MemoryConsolidation',
+                daemon=True,
+            )
+            self._worker.start()
+    
+    def _consolidation_loop(self):
+        while True:
+            user_id, action = self._consolidation_queue.get()
+            try:
+                self._run_consolidation(user_id, action)
+            except Exception as e:
+                logger.error(f"Memory consolidation failed for user {user_id}: {e}")
+            finally:
+                self._consolidation_queue.task_done()
+    
+    def _run_consolidation(self, user_id: str, action: str):
+        with self._using(user_id) as shard:
+            shard.consolidation_queued = False
+            shard.consolidation.consolidate_memories(user_id)
+            if action == 'end':
+                self._finish_session(shard)
+    
+    def _schedule(self, shard: UserMemoryShard, action: str = 'consolidate'):
+        """Queue consolidation for a shard; the caller holds ``shard.lock``"""
+        if not self.background_consolidation:
+            shard.consolidation.consolidate_memories(shard.user_id)
+            if action == 'end':
+                self._finish_session(shard)
+            return
+        if shard.consolidation_queued and action != 'end':
+            return
+        shard.consolidation_queued = True
+        self._ensure_worker()
+        self._consolidation_queue.put((shard.user_id, action))
+    
+    def wait_for_consolidation(self):
+        """Block until queued consolidations have finished"""
+        self._consolidation_queue.join()
+    
+    # -- public API ------------------------------------------------------
+    
     def initialize_session(self, user_id: str, session_id: str):
         """Initialize memory system for a new session"""
-        self.mid_term.start_session(session_id)
-        
         # Load user profile to inform session
         profile = self.long_term.get_user_profile(user_id)
         
-        # Initialize mid-term memory with user preferences
-        self.mid_term.user_preferences = {
-            'expertise_level': profile.expertise_level,
-            'communication_style': profile.communication_style,
-            'detail_level': profile.preferred_detail_level,
-            'common_tasks': profile.common_tasks,
-            'template_preferences': profile.template_preferences
-        }
+        with self._using(user_id) as shard:
+            shard.mid_term.start_session(session_id)
+            
+            # Initialize mid-term memory with user preferences
+            shard.mid_term.user_preferences = {
+                'expertise_level': profile.expertise_level,
+                'communication_style': profile.communication_style,
+                'detail_level': profile.preferred_detail_level,
+                'common_tasks': profile.common_tasks,
+                'template_preferences': profile.template_preferences
+            }
         
         logger.info(f"Memory system initialized for user {user_id}, session {session_id}")
     
@@ -625,23 +886,25 @@ class AdvancedMemoryManager:
             task_context=task_context
         )
         
-        # Add to short-term memory
-        self.short_term.add_exchange(exchange)
-        
-        # Update task context if provided
-        if task_context:
-            self.short_term.update_task_context({'current_task': task_context})
-        
-        # Increment interaction count
-        self.interaction_count += 1
-        
-        # Check if consolidation is needed
-        if self.consolidation.should_consolidate(self.interaction_count):
-            self.consolidation.consolidate_memories(user_id)
+        with self._using(user_id) as shard:
+            # Add to short-term memory
+            shard.short_term.add_exchange(exchange)
+            
+            # Update task context if provided
+            if task_context:
+                shard.short_term.update_task_context({'current_task': task_context})
+            
+            # Increment interaction count
+            shard.interaction_count += 1
+            
+            # Check if consolidation is needed
+            if shard.consolidation.should_consolidate(shard.interaction_count):
+                self._schedule(shard)
     
-    def add_user_correction(self, correction: Dict[str, Any]):
+    def add_user_correction(self, correction: Dict[str, Any], user_id: Optional[str] = None):
         """Add user correction to memory"""
-        self.short_term.add_correction(correction)
+        with self._using(user_id or self._current_user()) as shard:
+            shard.short_term.add_correction(correction)
     
     def get_contextual_memory(self, user_id: str, query_tags: List[str] = None) -> Dict[str, Any]:
         """Get comprehensive contextual memory for response generation"""
@@ -649,90 +912,116 @@ class AdvancedMemoryManager:
         # Get user profile
         profile = self.long_term.get_user_profile(user_id)
         
-        # Get short-term context
-        short_term_context = self.short_term.get_active_context()
-        
-        # Get mid-term insights
-        mid_term_summary = self.mid_term.get_session_summary()
-        
         # Get relevant long-term knowledge
         relevant_knowledge = []
         if query_tags:
             relevant_knowledge = self.long_term.get_relevant_knowledge(query_tags, limit=5)
         
-        return {
-            'user_profile': asdict(profile),
-            'short_term': short_term_context,
-            'mid_term': mid_term_summary,
-            'relevant_knowledge': [asdict(entry) for entry in relevant_knowledge],
-            'interaction_count': self.interaction_count,
-            'consolidation_count': self.consolidation.consolidation_counter
-        }
+        with self._using(user_id) as shard:
+            # Get short-term context
+            short_term_context = shard.short_term.get_active_context()
+            
+            # Get mid-term insights
+            mid_term_summary = shard.mid_term.get_session_summary()
+            
+            return {
+                'user_profile': asdict(profile),
+                'short_term': short_term_context,
+                'mid_term': mid_term_summary,
+                'relevant_knowledge': [asdict(entry) for entry in relevant_knowledge],
+                'interaction_count': shard.interaction_count,
+                'consolidation_count': shard.consolidation.consolidation_counter
+            }
     
     def get_memory_influenced_response_context(self, user_id: str, current_intent: str) -> Dict[str, Any]:
         """Get memory-influenced context for response generation"""
         
         profile = self.long_term.get_user_profile(user_id)
-        recent_context = self.short_term.get_recent_context(3)
-        
-        # Build context based on memory
-        context = {
-            'user_expertise': profile.expertise_level,
-            'communication_style': profile.communication_style,
-            'preferred_detail_level': profile.preferred_detail_level,
-            'recent_interactions': [
-                {
-                    'intent': ex.intent,
-                    'confidence': ex.confidence,
-                    'task_context': ex.task_context
-                } for ex in recent_context
-            ],
-            'common_tasks': profile.common_tasks,
-            'workflow_patterns': profile.workflow_patterns,
-            'template_preferences': profile.template_preferences,
-            'current_task': self.short_term.current_task_context.get('current_task'),
-            'active_parameters': self.short_term.active_parameters,
-            'recent_corrections': self.short_term.corrections[-2:] if self.short_term.corrections else []
-        }
         
-        # Add relevant historical patterns
-        if current_intent in self.long_term.historical_patterns:
-            pattern_data = self.long_term.historical_patterns[current_intent]
-            context['historical_pattern'] = {
-                'occurrences': pattern_data['occurrences'],
-                'success_rate': pattern_data.get('success_rate', 0.8),
-                'common_parameters': pattern_data.get('common_parameters', {})
+        with self._using(user_id) as shard:
+            recent_context = shard.short_term.get_recent_context(3)
+            
+            # Build context based on memory
+            context = {
+                'user_expertise': profile.expertise_level,
+                'communication_style': profile.communication_style,
+                'preferred_detail_level': profile.preferred_detail_level,
+                'recent_interactions': [
+                    {
+                        'intent': ex.intent,
+                        'confidence': ex.confidence,
+                        'task_context': ex.task_context
+                    } for ex in recent_context
+                ],
+                'common_tasks': profile.common_tasks,
+                'workflow_patterns': profile.workflow_patterns,
+                'template_preferences': profile.template_preferences,
+                'current_task': shard.short_term.current_task_context.get('current_task'),
+                'active_parameters': dict(shard.short_term.active_parameters),
+                'recent_corrections': shard.short_term.corrections[-2:] if shard.short_term.corrections else []
             }
         
+        # Add relevant historical patterns
+        with self.long_term.lock:
+            pattern_data = self.long_term.historical_patterns.get(current_intent)
+            if pattern_data:
+                context['historical_pattern'] = {
+                    'occurrences': pattern_data['occurrences'],
+                    'success_rate': pattern_data.get('success_rate', 0.8),
+                    'common_parameters': pattern_data.get('common_parameters', {})
+                }
+        
         return context
     
     def end_session(self, user_id: str):
-        """End session and perform final consolidation"""
+        """End session; final consolidation and reset happen on the worker"""
         logger.info(f"Ending session for user {user_id}")
-        
-        # Perform final consolidation
-        self.consolidation.consolidate_memories(user_id)
-        
-        # Update global statistics
+        with self._using(user_id) as shard:
+            self._schedule(shard, 'end')
+    
+    def _finish_session(self, shard: UserMemoryShard):
+        """Record session statistics and reset the shard; caller holds ``shard.lock``"""
         session_stats = {
-            'total_interactions': self.interaction_count,
-            'session_duration': datetime.now() - self.mid_term.session_start,
-            'consolidations_performed': self.consolidation.consolidation_counter,
-            'insights_generated': len(self.mid_term.session_insights)
+            'total_interactions': shard.interaction_count,
+            'session_duration': datetime.now() - shard.mid_term.session_start,
+            'consolidations_performed': shard.consolidation.consolidation_counter,
+            'insights_generated': len(shard.mid_term.session_insights)
         }
         
         self.long_term.update_global_statistics({
-            f'session_{self.mid_term.session_id}': session_stats,
+            f'session_{shard.mid_term.session_id}': session_stats,
             'last_session_end': datetime.now()
         })
         
         # Reset for next session
-        self.interaction_count = 0
-        self.short_term = ShortTermMemory()
-        self.mid_term = MidTermMemory()
+        shard.reset()
+
+# Global memory manager, built on first use: constructing it loads the
+# long-term memory from disk, which processes without AI traffic never need
+_memory_manager: Optional[AdvancedMemoryManager] = None
+_MEMORY_MANAGER_LOCK = threading.Lock()
+_memory_manager_config: Dict[str, Any] = {}
+
+def get_memory_manager() -> AdvancedMemoryManager:
+    """Get global memory manager instance."""
+    global _memory_manager
+    if _memory_manager is None:
+        with _MEMORY_MANAGER_LOCK:
+            if _memory_manager is None:
+                manager = AdvancedMemoryManager(**_memory_manager_config)
+                atexit.register(manager.persist_all)
+                _memory_manager = manager
+    return _memory_manager
+
+memory_manager = LocalProxy(get_memory_manager)
 
-# Global memory manager instance
-memory_manager = AdvancedMemoryManager()
+def init_memory_manager(app) -> None:
+    """Record app configuration for the memory manager"""
+    _memory_manager_config['max_active_users'] = app.config.get('AI_MEMORY_MAX_ACTIVE_USERS', 256)
+    _memory_manager_config['background_consolidation'] = app.config.get('AI_MEMORY_BACKGROUND_CONSOLIDATION', True)
+    if _memory_manager is not None:
+        for name, value in _memory_manager_config.items():
+            setattr(_memory_manager, name, value)
 
 # Public interface functions
 def initialize_memory_session(user_id: str, session_id: str):
@@ -756,9 +1045,9 @@ def get_response_context(user_id: str, current_intent: str) -> Dict[str, Any]:
     """Get memory-influenced response context"""
     return memory_manager.get_memory_influenced_response_context(user_id, current_intent)
 
-def add_memory_correction(correction: Dict[str, Any]):
+def add_memory_correction(correction: Dict[str, Any], user_id: Optional[str] = None):
     """Add user correction to memory"""
-    return memory_manager.add_user_correction(correction)
+    return memory_manager.add_user_correction(correction, user_id)
 
 def end_memory_session(user_id: str):
     """End memory session"""
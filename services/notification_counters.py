@@ -0,0 +1,247 @@
+"""
+Per-user unread notification counters.
+
+The unread count is kept in Redis when it is available (shared by every
+worker) and otherwise in an in-process map with a short TTL.  Counters are
+adjusted from SQLAlchemy session events when notifications are created, read
+or deleted, so page renders no longer run a COUNT(*) against the
+notifications table.  Every change is also published on the event bus so the
+notification stream can push it to open browser tabs.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, inspect
+
+from services.event_bus import event_bus, user_channel
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = 'notifications:unread:'
+_PENDING_KEY = '_notification_counter_deltas'
+_PENDING_NEW_KEY = '_notification_counter_new'
+
+# Only adjust counters that are already cached; a missing key means the next
+# read recomputes the exact value from the database.
+_INCR_IF_EXISTS = """
+if redis.call('exists', KEYS[1]) == 1 then
+    local value = redis.call('incrby', KEYS[1], ARGV[1])
+    if value < 0 then
+        value = redis.call('incrby', KEYS[1], -value)
+    end
+    return value
+end
+return nil
+"""
+
+
+class NotificationCounterStore:
+    """Unread counters backed by Redis with an in-process fallback."""
+
+    def __init__(self, ttl_seconds: int = 3600, local_ttl_seconds: int = 300):
+        self.ttl_seconds = ttl_seconds
+        self.local_ttl_seconds = local_ttl_seconds
+        self._local: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    # -- backend helpers -------------------------------------------------
+
+    def _redis(self):
+        try:
+            from cache.redis_client import redis_client
+            if redis_client.redis_client is not None and redis_client.is_available():
+                return redis_client.redis_client
+        except Exception as e:
+            logger.debug(f"Redis unavailable for notification counters: {e}")
+        return None
+
+    @staticmethod
+    def _key(user_email: str) -> str:
+        return f"{_KEY_PREFIX}{user_email.lower()}"
+
+    def get_cached(self, user_email: str) -> Optional[int]:
+        """Return the cached count or None when it has to be recomputed."""
+        key = self._key(user_email)
+        client = self._redis()
+        if client is not None:
+            try:
+                value = client.get(key)
+                return int(value) if value is not None else None
+            except Exception as e:
+                logger.warning(f"Could not read unread counter for {user_email}: {e}")
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            count, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            return count
+
+    def set_count(self, user_email: str, count: int) -> None:
+        key = self._key(user_email)
+        count = max(int(count), 0)
+        client = self._redis()
+        if client is not None:
+            try:
+                client.setex(key, self.ttl_seconds, count)
+                return
+            except Exception as e:
+                logger.warning(f"Could not store unread counter for {user_email}: {e}")
+
+        with self._lock:
+            self._local[key] = (count, time.monotonic() + self.local_ttl_seconds)
+
+    def adjust(self, user_email: str, delta: int) -> Optional[int]:
+        """Apply a delta to a cached counter; returns the new value if known."""
+        if not delta:
+            return self.get_cached(user_email)
+
+        key = self._key(user_email)
+        client = self._redis()
+        if client is not None:
+            try:
+                value = client.eval(_INCR_IF_EXISTS, 1, key, delta)
+                return int(value) if value is not None else None
+            except Exception as e:
+                logger.warning(f"Could not adjust unread counter for {user_email}: {e}")
+                self.invalidate(user_email)
+                return None
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self._local.pop(key, None)
+                return None
+            count = max(entry[0] + delta, 0)
+            self._local[key] = (count, entry[1])
+            return count
+
+    def invalidate(self, user_email: str) -> None:
+        key = self._key(user_email)
+        client = self._redis()
+        if client is not None:
+            try:
+                client.delete(key)
+            except Exception as e:
+                logger.warning(f"Could not invalidate unread counter for {user_email}: {e}")
+        with self._lock:
+            self._local.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+    # -- public API ------------------------------------------------------
+
+    def get_unread_count(self, user_email: str) -> int:
+        """Return the unread count, querying the database only on a cache miss."""
+        if not user_email:
+            return 0
+
+        cached = self.get_cached(user_email)
+        if cached is not None:
+            return cached
+
+        from models import Notification
+        count = Notification.query.filter_by(user_email=user_email, read=False).count()
+        self.set_count(user_email, count)
+        return count
+
+    def mark_all_read(self, user_email: str) -> None:
+        """Record that every notification for the user has been read."""
+        self.set_count(user_email, 0)
+        publish_unread_count(user_email, 0)
+
+
+def publish_unread_count(user_email: str, count: Optional[int]) -> None:
+    """Push a count change to the user's notification stream."""
+    event_bus.publish(user_channel(user_email), 'unread_count', {'count': count})
+
+
+notification_counters = NotificationCounterStore()
+
+
+def get_unread_count(user_email: str) -> int:
+    """Module-level shortcut used by routes and templates."""
+    return notification_counters.get_unread_count(user_email)
+
+
+# -- session hooks ---------------------------------------------------------
+
+def _collect_notification_changes(session, flush_context) -> None:
+    from models import Notification
+
+    deltas = session.info.setdefault(_PENDING_KEY, {})
+    created = session.info.setdefault(_PENDING_NEW_KEY, [])
+
+    for obj in session.new:
+        if isinstance(obj, Notification) and obj.user_email:
+            if not obj.read:
+                deltas[obj.user_email] = deltas.get(obj.user_email, 0) + 1
+            try:
+                created.append((obj.user_email, obj.to_dict()))
+            except Exception:
+                created.append((obj.user_email, {'title': obj.title, 'message': obj.message}))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Notification) or not obj.user_email:
+            continue
+        history = inspect(obj).attrs.read.history
+        if not history.has_changes():
+            continue
+        was_read = bool(history.deleted[0]) if history.deleted else False
+        is_read = bool(obj.read)
+        if was_read != is_read:
+            deltas[obj.user_email] = deltas.get(obj.user_email, 0) + (-1 if is_read else 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Notification) and obj.user_email and not obj.read:
+            deltas[obj.user_email] = deltas.get(obj.user_email, 0) - 1
+
+
+def _apply_notification_changes(session) -> None:
+    deltas = session.info.pop(_PENDING_KEY, None) or {}
+    created = session.info.pop(_PENDING_NEW_KEY, None) or []
+
+    for user_email, delta in deltas.items():
+        try:
+            count = notification_counters.adjust(user_email, delta)
+            publish_unread_count(user_email, count)
+        except Exception as e:
+            logger.error(f"Failed to update unread counter for {user_email}: {e}")
+
+    for user_email, payload in created:
+        event_bus.publish(user_channel(user_email), 'notification', payload)
+
+
+def _discard_notification_changes(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_PENDING_NEW_KEY, None)
+
+
+_listeners_installed = False
+_listeners_lock = threading.Lock()
+
+
+def init_notification_counters(app) -> NotificationCounterStore:
+    """Attach the session listeners that keep counters in step with the table."""
+    global _listeners_installed
+    from models import db
+
+    notification_counters.ttl_seconds = app.config.get('NOTIFICATION_COUNTER_TTL', 3600)
+    notification_counters.local_ttl_seconds = app.config.get('NOTIFICATION_COUNTER_LOCAL_TTL', 300)
+
+    with _listeners_lock:
+        if not _listeners_installed:
+            event.listen(db.session, 'after_flush', _collect_notification_changes)
+            event.listen(db.session, 'after_commit', _apply_notification_changes)
+            event.listen(db.session, 'after_rollback', _discard_notification_changes)
+            _listeners_installed = True
+
+    app.notification_counters = notification_counters
+    return notification_counters
@@ -0,0 +1,155 @@
+"""
+Report state-transition events.
+
+Changes to ``Report.status`` and to the approval workflow are detected from
+SQLAlchemy session events and, once the transaction commits, published on the
+event bus to the report's own channel and to the channels of its owner and
+approvers.  Status pages and dashboards subscribe to these instead of polling
+and re-reading the full report payload.
+"""
+import json
+import logging
+import threading
+from typing import Any, Dict, List
+
+from sqlalchemy import event, inspect
+
+from services.event_bus import event_bus, report_channel, user_channel
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = '_report_state_events'
+
+# Status values written by the background renderer
+_GENERATION_EVENTS = {
+    'GENERATED': 'generation_complete',
+    'GENERATION_FAILED': 'generation_failed',
+}
+
+
+def parse_approvals(approvals_json) -> List[Dict[str, Any]]:
+    """Decode ``Report.approvals_json``, tolerating missing or malformed values."""
+    if not approvals_json:
+        return []
+    try:
+        approvals = json.loads(approvals_json)
+    except (TypeError, ValueError):
+        return []
+    return approvals if isinstance(approvals, list) else []
+
+
+def summarise_approvals(approvals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reduce approvals to the fields a progress indicator needs."""
+    return [
+        {
+            'stage': approval.get('stage'),
+            'status': approval.get('status', 'pending'),
+            'approver_email': approval.get('approver_email'),
+            'timestamp': approval.get('timestamp') or approval.get('approved_at'),
+        }
+        for approval in approvals
+        if isinstance(approval, dict)
+    ]
+
+
+def overall_approval_status(approvals: List[Dict[str, Any]]) -> str:
+    """Same roll-up the status page uses for its header badge."""
+    statuses = [a.get('status', 'pending') for a in approvals]
+    if 'rejected' in statuses:
+        return 'rejected'
+    if all(status == 'approved' for status in statuses):
+        return 'approved'
+    if any(status == 'approved' for status in statuses):
+        return 'partially_approved'
+    return 'pending'
+
+
+def publish_report_event(report_id: str, event_type: str, data: Dict[str, Any],
+                         recipients: List[str] = None) -> None:
+    """Publish a report event to the report channel and each recipient's channel."""
+    payload = {'report_id': report_id, **data}
+    event_bus.publish(report_channel(report_id), event_type, payload)
+    for email in {r.lower() for r in (recipients or []) if r}:
+        event_bus.publish(user_channel(email), event_type, payload)
+
+
+def _collect_report_changes(session, flush_context) -> None:
+    from models import Report
+
+    pending = session.info.setdefault(_PENDING_KEY, {})
+
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Report):
+            continue
+
+        state = inspect(obj)
+        status_history = state.attrs.status.history
+        approvals_history = state.attrs.approvals_json.history
+        is_new = obj in session.new
+        if not is_new and not status_history.has_changes() and not approvals_history.has_changes():
+            continue
+
+        previous_status = None
+        if status_history.deleted:
+            previous_status = status_history.deleted[0]
+
+        approvals = parse_approvals(obj.approvals_json)
+        recipients = [obj.user_email] + [a.get('approver_email') for a in approvals if isinstance(a, dict)]
+
+        if is_new:
+            event_type = 'report_created'
+        elif status_history.has_changes() and obj.status in _GENERATION_EVENTS:
+            event_type = _GENERATION_EVENTS[obj.status]
+        elif status_history.has_changes():
+            event_type = 'report_status'
+        else:
+            event_type = 'approval_progress'
+
+        # Keep only the latest transition per report within one transaction,
+        # but remember the status it started from.
+        earlier = pending.get(obj.id)
+        if earlier is not None:
+            previous_status = earlier['data'].get('previous_status', previous_status)
+
+        pending[obj.id] = {
+            'type': event_type,
+            'recipients': recipients,
+            'data': {
+                'status': obj.status,
+                'previous_status': previous_status,
+                'locked': bool(obj.locked),
+                'document_title': obj.document_title,
+                'overall_status': overall_approval_status(approvals),
+                'approvals': summarise_approvals(approvals),
+            },
+        }
+
+
+def _publish_report_changes(session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None) or {}
+    for report_id, change in pending.items():
+        try:
+            publish_report_event(report_id, change['type'], change['data'], change['recipients'])
+        except Exception as e:
+            logger.error(f"Failed to publish report event for {report_id}: {e}")
+
+
+def _discard_report_changes(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+_listeners_installed = False
+_listeners_lock = threading.Lock()
+
+
+def init_report_events(app) -> None:
+    """Attach the session listeners that publish report state transitions."""
+    global _listeners_installed
+    from models import db
+
+    with _listeners_lock:
+        if not _listeners_installed:
+            event.listen(db.session, 'after_flush', _collect_report_changes)
+            event.listen(db.session, 'after_commit', _publish_report_changes)
+            event.listen(db.session, 'after_rollback', _discard_report_changes)
+            _listeners_installed = True
@@ -60,7 +60,9 @@ def generate_modern_sat_report(submission_id: str) -> Dict[str, Any]:
     output_path = os.path.join(output_dir, f'SAT_Report_{submission_id}_Modern.docx')
 
     try:
-        doc.save(output_path)
+        from services.storage_accounting import storage_accountant
+        with storage_accountant.track_write(output_path):
+            doc.save(output_path)
     except Exception as exc:  # noqa: BLE001 - propagate friendly error
         current_app.logger.error('Failed to save modern SAT report for %s: %s', submission_id, exc, exc_info=True)
         return {'error': 'Could not write the generated document to disk.'}
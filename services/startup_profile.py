@@ -0,0 +1,173 @@
+"""
+Cold-start profile for the application.
+
+``StartupTimeline`` records how long each phase of ``create_app()`` takes;
+the app logs it once created and keeps it as ``app.startup_timeline``.
+
+``flask startup-profile`` creates the app in a fresh interpreter started with
+``python -X importtime``, then reports how long ``create_app()`` took, which
+top-level packages and modules dominate import time, and whether any of the
+lazily built service singletons were constructed during startup (they should
+not be).
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+
+# module -> global that holds its lazily built singleton
+LAZY_SINGLETONS = {
+    'services.mcp_integration': '_mcp_service',
+    'services.memory_manager': '_memory_manager',
+    'services.ai_agent': '_ai_agent',
+}
+
+_RESULT_MARKER = 'STARTUP_PROFILE_RESULT='
+
+
+class StartupTimeline:
+    """Durations of consecutive startup phases, in the order they ran."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str) -> float:
+        """Close the phase that ran since the previous mark; returns its seconds."""
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self.phases.append((phase, elapsed))
+        self._last = now
+        return elapsed
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'total_seconds': self.total,
+            'phases': [{'phase': phase, 'seconds': seconds} for phase, seconds in self.phases],
+        }
+
+    def summary(self) -> str:
+        phases = ', '.join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.phases)
+        return f"Startup completed in {self.total * 1000:.0f}ms ({phases})"
+
+
+_CHILD_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+app = create_app({config!r})
+elapsed = time.perf_counter() - start
+timeline = getattr(app, 'startup_timeline', None)
+singletons = {{}}
+for module, attr in {singletons!r}.items():
+    if module in sys.modules:
+        singletons[module] = getattr(sys.modules[module], attr, None) is not None
+print({marker!r} + json.dumps({{"create_app_seconds": elapsed, "singletons": singletons,
+                                "timeline": timeline.as_dict() if timeline else None}}), flush=True)
+'''
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """Parse ``-X importtime`` lines into module, self/cumulative microseconds and depth."""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2].rstrip()
+        module = name.lstrip()
+        entries.append({
+            'module': module,
+            'self_us': int(parts[0]),
+            'cumulative_us': int(parts[1]),
+            'depth': (len(name) - len(module) - 1) // 2,
+        })
+    return entries
+
+
+def summarize_imports(entries: List[Dict[str, Any]], limit: int = 15) -> Dict[str, Any]:
+    """Aggregate self time per top-level package and pick the slowest modules."""
+    packages: Dict[str, int] = defaultdict(int)
+    for entry in entries:
+        packages[entry['module'].split('.', 1)[0]] += entry['self_us']
+    total = sum(packages.values())
+    return {
+        'total_import_us': total,
+        'packages': sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit],
+        'modules': sorted(entries, key=lambda entry: entry['cumulative_us'], reverse=True)[:limit],
+    }
+
+
+def profile_startup(config_name: str = 'default', app_root: Optional[str] = None,
+                    timeout: int = 300) -> Dict[str, Any]:
+    """Create the app in a fresh interpreter and return its startup profile."""
+    app_root = app_root or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = _CHILD_SCRIPT.format(config=config_name, singletons=LAZY_SINGLETONS, marker=_RESULT_MARKER)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [app_root, os.environ.get('PYTHONPATH')])))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=app_root, env=env, capture_output=True, text=True, timeout=timeout,
+    )
+
+    result = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(_RESULT_MARKER):
+            result = json.loads(line[len(_RESULT_MARKER):])
+    if proc.returncode != 0 or result is None:
+        tail = '\n'.join(proc.stderr.splitlines()[-20:])
+        raise RuntimeError(f"App creation failed in profiling subprocess:\n{tail}")
+
+    result.update(summarize_imports(parse_importtime(proc.stderr)))
+    return result
+
+
+@click.command('startup-profile')
+@click.option('--config', 'config_name', default='default', help='Configuration to create the app with')
+@click.option('--limit', default=15, help='Number of packages and modules to list')
+@click.option('--json', 'as_json', is_flag=True, help='Print the raw profile as JSON')
+def startup_profile_command(config_name, limit, as_json):
+    """Show an import-time breakdown of application startup."""
+    try:
+        profile = profile_startup(config_name)
+    except Exception as e:
+        click.echo(f'❌ Startup profiling failed: {e}')
+        sys.exit(1)
+
+    if as_json:
+        click.echo(json.dumps(profile, indent=2))
+        return
+
+    click.echo(f"create_app(): {profile['create_app_seconds'] * 1000:.0f} ms")
+    click.echo(f"Imports:      {profile['total_import_us'] / 1000:.0f} ms\n")
+
+    if profile.get('timeline'):
+        click.echo('Startup phases:')
+        for phase in profile['timeline']['phases']:
+            click.echo(f"  {phase['seconds'] * 1000:8.1f} ms  {phase['phase']}")
+        click.echo('')
+
+    click.echo('Slowest packages (self time):')
+    for package, self_us in profile['packages'][:limit]:
+        click.echo(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    click.echo('\nSlowest modules (cumulative):')
+    for entry in profile['modules'][:limit]:
+        click.echo(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['module']}")
+
+    built = [module for module, constructed in profile['singletons'].items() if constructed]
+    if built:
+        click.echo(f"\n⚠️  Built during startup instead of on first use: {', '.join(built)}")
+    else:
+        click.echo('\n✅ No lazy service singletons were built during startup')
@@ -0,0 +1,285 @@
+"""
+Storage accounting for the upload and output directories.
+
+The system health and file stats endpoints used to ``os.walk`` their
+directory and stat every file on each request, which with tens of thousands
+of generated documents made a health probe I/O-bound for seconds.
+
+Each tracked root keeps a file count, a byte count and per-extension file
+counts.  The file manager and the report generation paths adjust them as
+they write and delete files, so reads are constant time.  The counters live
+in a Redis hash when Redis is available (shared by every worker, including
+Celery) and otherwise in an in-process map.  Writes that bypass the hooks
+are picked up by a periodic reconciliation walk: the ``reconcile_storage_task``
+Celery task, or a background walk started from ``snapshot()`` once the
+counters are older than ``STORAGE_RECONCILE_SECONDS``.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECONCILE_SECONDS = 3600
+
+_KEY_PREFIX = 'storage:usage:'
+_EXT_PREFIX = 'ext:'
+
+# Only adjust counters that have been reconciled at least once; a missing
+# hash means the next read has to walk the directory anyway.
+_HINCR_IF_EXISTS = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('hincrby', KEYS[1], 'files', ARGV[1])
+redis.call('hincrby', KEYS[1], 'bytes', ARGV[2])
+if ARGV[3] ~= '' and ARGV[1] ~= '0' then
+    local count = redis.call('hincrby', KEYS[1], ARGV[3], ARGV[1])
+    if count <= 0 then
+        redis.call('hdel', KEYS[1], ARGV[3])
+    end
+end
+return 1
+"""
+
+
+def file_extension(path: str) -> str:
+    name = os.path.basename(path)
+    return name.rsplit('.', 1)[-1].lower() if '.' in name else 'unknown'
+
+
+def _file_size(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
+
+
+def walk_usage(path: str) -> Dict[str, object]:
+    """Count the files under ``path`` the slow way."""
+    files = 0
+    size = 0
+    file_types: Dict[str, int] = {}
+    for root, _dirs, names in os.walk(path):
+        for name in names:
+            file_size = _file_size(os.path.join(root, name))
+            if file_size is None:
+                continue
+            files += 1
+            size += file_size
+            extension = file_extension(name)
+            file_types[extension] = file_types.get(extension, 0) + 1
+    return {'files': files, 'bytes': size, 'file_types': file_types}
+
+
+class StorageAccountant:
+    """File and byte counters per storage root, kept up to date on write."""
+
+    def __init__(self, reconcile_seconds: int = DEFAULT_RECONCILE_SECONDS):
+        self.reconcile_seconds = reconcile_seconds
+        self.roots: Dict[str, str] = {}
+        self._local: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+        self._reconciling: set = set()
+
+    # -- backend helpers -------------------------------------------------
+
+    def _redis(self):
+        try:
+            from cache.redis_client import redis_client
+            if redis_client.redis_client is not None and redis_client.is_available():
+                return redis_client.redis_client
+        except Exception as e:
+            logger.debug(f"Redis unavailable for storage accounting: {e}")
+        return None
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return f"{_KEY_PREFIX}{name}"
+
+    def configure(self, roots: Dict[str, str]) -> None:
+        self.roots = {name: os.path.abspath(path) for name, path in roots.items() if path}
+
+    def root_for(self, path: str) -> Optional[str]:
+        """Name of the tracked root containing ``path``, if any."""
+        path = os.path.abspath(path)
+        for name, root in self.roots.items():
+            if path == root or path.startswith(root + os.sep):
+                return name
+        return None
+
+    # -- recording -------------------------------------------------------
+
+    def record(self, path: str, files_delta: int, bytes_delta: int) -> None:
+        """Apply a change to the counters of the root containing ``path``."""
+        name = self.root_for(path)
+        if name is None or (not files_delta and not bytes_delta):
+            return
+        extension = file_extension(path)
+
+        client = self._redis()
+        if client is not None:
+            try:
+                client.eval(_HINCR_IF_EXISTS, 1, self._key(name), files_delta, bytes_delta, _EXT_PREFIX + extension)
+                return
+            except Exception as e:
+                logger.warning(f"Could not update storage counters for {name}: {e}")
+
+        with self._lock:
+            usage = self._local.get(name)
+            if usage is None:
+                return
+            usage['files'] = max(usage['files'] + files_delta, 0)
+            usage['bytes'] = max(usage['bytes'] + bytes_delta, 0)
+            if files_delta:
+                file_types = usage['file_types']
+                count = file_types.get(extension, 0) + files_delta
+                if count > 0:
+                    file_types[extension] = count
+                else:
+                    file_types.pop(extension, None)
+
+    def record_write(self, path: str, size: int, previous_size: Optional[int] = None) -> None:
+        """Record that ``path`` now holds ``size`` bytes (replacing ``previous_size`` if it existed)."""
+        if previous_size is None:
+            self.record(path, 1, size)
+        else:
+            self.record(path, 0, size - previous_size)
+
+    def record_delete(self, path: str, size: int) -> None:
+        self.record(path, -1, -size)
+
+    @contextmanager
+    def track_write(self, path: str) -> Iterator[None]:
+        """Record whatever the block writes to ``path``."""
+        before = _file_size(path)
+        yield
+        after = _file_size(path)
+        if after is not None:
+            self.record_write(path, after, before)
+        elif before is not None:
+            self.record_delete(path, before)
+
+    def remove(self, path: str) -> None:
+        """``os.remove`` that updates the counters."""
+        size = _file_size(path)
+        os.remove(path)
+        if size is not None:
+            self.record_delete(path, size)
+
+    # -- reconciliation --------------------------------------------------
+
+    def reconcile(self, name: Optional[str] = None) -> Dict[str, Dict[str, object]]:
+        """Walk the root (or every root) and replace its counters."""
+        results = {}
+        for root_name in ([name] if name else list(self.roots)):
+            usage = walk_usage(self.roots[root_name])
+            usage['reconciled_at'] = time.time()
+            self._store(root_name, usage)
+            results[root_name] = usage
+        return results
+
+    def _store(self, name: str, usage: Dict[str, object]) -> None:
+        client = self._redis()
+        if client is not None:
+            try:
+                mapping = {'files': usage['files'], 'bytes': usage['bytes'],
+                           'reconciled_at': usage['reconciled_at']}
+                mapping.update({_EXT_PREFIX + ext: count for ext, count in usage['file_types'].items()})
+                tmp_key = f"{self._key(name)}:tmp"
+                pipe = client.pipeline()
+                pipe.delete(tmp_key)
+                pipe.hset(tmp_key, mapping=mapping)
+                pipe.rename(tmp_key, self._key(name))
+                pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Could not store storage counters for {name}: {e}")
+
+        with self._lock:
+            self._local[name] = dict(usage, file_types=dict(usage['file_types']))
+
+    def _load(self, name: str) -> Optional[Dict[str, object]]:
+        client = self._redis()
+        if client is not None:
+            try:
+                raw = client.hgetall(self._key(name))
+                if not raw:
+                    return None
+                fields = {(k.decode() if isinstance(k, bytes) else k): v for k, v in raw.items()}
+                return {
+                    'files': int(fields.get('files', 0)),
+                    'bytes': int(fields.get('bytes', 0)),
+                    'file_types': {k[len(_EXT_PREFIX):]: int(v) for k, v in fields.items()
+                                   if k.startswith(_EXT_PREFIX)},
+                    'reconciled_at': float(fields.get('reconciled_at', 0)),
+                }
+            except Exception as e:
+                logger.warning(f"Could not read storage counters for {name}: {e}")
+
+        with self._lock:
+            usage = self._local.get(name)
+            return dict(usage, file_types=dict(usage['file_types'])) if usage else None
+
+    def _reconcile_in_background(self, name: str) -> None:
+        with self._lock:
+            if name in self._reconciling:
+                return
+            self._reconciling.add(name)
+
+        def run():
+            try:
+                self.reconcile(name)
+            except Exception as e:
+                logger.error(f"Storage reconciliation for {name} failed: {e}")
+            finally:
+                with self._lock:
+                    self._reconciling.discard(name)
+
+        threading.Thread(target=run, name=f'StorageReconcile-{name}', daemon=True).start()
+
+    # -- public API ------------------------------------------------------
+
+    def snapshot(self, name: str) -> Dict[str, object]:
+        """
+        Current usage of a root.
+
+        Only the very first read walks the directory; after that stale
+        counters are returned while a background walk refreshes them.
+        """
+        if name not in self.roots:
+            raise KeyError(f"Unknown storage root '{name}'")
+        usage = self._load(name)
+        if usage is None:
+            return self.reconcile(name)[name]
+        if time.time() - usage['reconciled_at'] > self.reconcile_seconds:
+            self._reconcile_in_background(name)
+        return usage
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+
+storage_accountant = StorageAccountant()
+
+
+def storage_roots(app) -> Dict[str, str]:
+    """The directories tracked for ``app``, keyed by root name."""
+    def resolve(path):
+        return path if os.path.isabs(path) else os.path.join(app.root_path, path)
+
+    return {
+        'uploads': resolve(app.config.get('UPLOAD_FOLDER', 'uploads')),
+        'outputs': resolve(app.config.get('OUTPUT_DIR') or 'outputs'),
+    }
+
+
+def init_storage_accounting(app) -> StorageAccountant:
+    """Point the shared accountant at the app's upload and output directories."""
+    storage_accountant.reconcile_seconds = app.config.get('STORAGE_RECONCILE_SECONDS', DEFAULT_RECONCILE_SECONDS)
+    storage_accountant.configure(storage_roots(app))
+    return storage_accountant
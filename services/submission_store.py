@@ -0,0 +1,191 @@
+"""
+Database-backed access to report submissions for the approval workflow.
+
+Submissions used to live in one ``submissions.json`` file that every approval
+locked, parsed and rewrote in full.  The approval routes now read and write
+``Report``/``SATReport`` rows instead, locking only the report being approved.
+Entries that exist only in a legacy ``submissions.json`` are imported on first
+access (so old approval links keep working) or in bulk with
+``flask db import-submissions``.  The parsed legacy file is cached until its
+modification time or size changes, so lookups of unknown ids do not re-read
+it.
+"""
+import datetime as dt
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+_legacy_cache: Dict[str, Any] = {'key': None, 'submissions': {}}
+_legacy_cache_lock = threading.Lock()
+
+
+def _legacy_path() -> Optional[str]:
+    path = current_app.config.get('SUBMISSIONS_FILE')
+    return path if path and os.path.exists(path) else None
+
+
+def read_legacy_submissions(path: Optional[str] = None) -> Dict[str, Any]:
+    """Parse a legacy submissions file without taking the old write lock."""
+    path = path or _legacy_path()
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read legacy submissions from {path}: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def cached_legacy_submissions() -> Dict[str, Any]:
+    """The configured legacy file, parsed again only when it has changed."""
+    path = _legacy_path()
+    if not path:
+        return {}
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _legacy_cache_lock:
+        if _legacy_cache['key'] != key:
+            _legacy_cache['submissions'] = read_legacy_submissions(path)
+            _legacy_cache['key'] = key
+        return _legacy_cache['submissions']
+
+
+def _parse_datetime(value) -> Optional[dt.datetime]:
+    if not value:
+        return None
+    try:
+        return dt.datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def import_legacy_submission(submission_id: str, data: Dict[str, Any], overwrite: bool = False):
+    """Create ``Report``/``SATReport`` rows for one legacy entry; the caller commits."""
+    from models import db, Report, SATReport
+
+    if not isinstance(data, dict):
+        return None
+
+    report = Report.query.get(submission_id)
+    if report is not None and not overwrite:
+        return report
+
+    context = data.get('context') or {}
+    approvals = data.get('approvals') or []
+    if report is None:
+        report = Report(id=submission_id, type='SAT', user_email=data.get('user_email') or '')
+        db.session.add(report)
+
+    report.status = data.get('status') or ('APPROVED' if data.get('locked') else 'PENDING')
+    report.document_title = context.get('DOCUMENT_TITLE', '')
+    report.document_reference = context.get('DOCUMENT_REFERENCE', '')
+    report.project_reference = context.get('PROJECT_REFERENCE', '')
+    report.client_name = context.get('CLIENT_NAME', '')
+    report.revision = context.get('REVISION', '')
+    report.prepared_by = context.get('PREPARED_BY', '')
+    report.locked = bool(data.get('locked', False))
+    report.approvals_json = json.dumps(approvals)
+    report.created_at = _parse_datetime(data.get('created_at')) or report.created_at
+    report.updated_at = _parse_datetime(data.get('updated_at')) or dt.datetime.utcnow()
+
+    sat_report = SATReport.query.filter_by(report_id=submission_id).first()
+    if sat_report is None:
+        sat_report = SATReport(report_id=submission_id)
+        db.session.add(sat_report)
+    sat_report.data_json = json.dumps(data)
+    sat_report.date = context.get('DATE', '')
+    sat_report.purpose = context.get('PURPOSE', '')
+    sat_report.scope = context.get('SCOPE', '')
+    sat_report.scada_image_urls = json.dumps(data.get('scada_image_urls', []))
+    sat_report.trends_image_urls = json.dumps(data.get('trends_image_urls', []))
+    sat_report.alarm_image_urls = json.dumps(data.get('alarm_image_urls', []))
+    return report
+
+
+def import_legacy_submissions(path: Optional[str] = None, overwrite: bool = False) -> Tuple[int, int]:
+    """Import every entry of a legacy submissions file. Returns (imported, skipped)."""
+    from models import db, Report
+
+    submissions = read_legacy_submissions(path)
+    existing = {row.id for row in db.session.query(Report.id).filter(Report.id.in_(list(submissions))).all()} \
+        if submissions else set()
+
+    imported = skipped = 0
+    for submission_id, data in submissions.items():
+        if (submission_id in existing and not overwrite) or not isinstance(data, dict):
+            skipped += 1
+            continue
+        import_legacy_submission(submission_id, data, overwrite=overwrite)
+        imported += 1
+    db.session.commit()
+    return imported, skipped
+
+
+def load_submission(submission_id: str, for_update: bool = False):
+    """
+    Return ``(report, sat_report, submission_data)`` for a submission, or
+    ``(None, None, None)``.
+
+    ``submission_data`` has the shape the approval templates expect; its
+    ``approvals`` come from ``Report.approvals_json``, which is authoritative.
+    With ``for_update`` the report row is locked until the transaction ends.
+    """
+    from models import db, Report, SATReport
+
+    query = Report.query.filter_by(id=submission_id)
+    if for_update:
+        query = query.with_for_update()
+    report = query.first()
+
+    if report is None:
+        # Compatibility path for links to submissions never imported
+        legacy = cached_legacy_submissions().get(submission_id)
+        if legacy is None:
+            return None, None, None
+        import_legacy_submission(submission_id, legacy)
+        db.session.commit()
+        current_app.logger.info(f"Imported legacy submission {submission_id} on access")
+        report = query.first()
+        if report is None:
+            return None, None, None
+
+    sat_report = SATReport.query.filter_by(report_id=submission_id).first()
+    try:
+        data = json.loads(sat_report.data_json) if sat_report and sat_report.data_json else {}
+    except (TypeError, ValueError):
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+
+    try:
+        approvals = json.loads(report.approvals_json) if report.approvals_json else data.get('approvals', [])
+    except (TypeError, ValueError):
+        approvals = data.get('approvals', [])
+
+    data['approvals'] = approvals if isinstance(approvals, list) else []
+    data.setdefault('context', {})
+    data['user_email'] = data.get('user_email') or report.user_email
+    data['locked'] = bool(report.locked)
+    data['status'] = report.status
+    return report, sat_report, data
+
+
+def store_submission(report, sat_report, submission_data: Dict[str, Any]) -> None:
+    """Write approvals and submission data back to their rows; the caller commits."""
+    approvals = submission_data.get('approvals', [])
+    report.approvals_json = json.dumps(approvals)
+    report.locked = bool(submission_data.get('locked', report.locked))
+    report.updated_at = dt.datetime.utcnow()
+    if sat_report is not None:
+        sat_report.data_json = json.dumps(submission_data)
@@ -0,0 +1,254 @@
+"""
+Per-template usage statistics.
+
+The template stats endpoint used to load every report of the template's
+type and count them by user and status in Python, so its cost grew with the
+whole ``reports`` table.  Reports now record the ``template_id`` they were
+created from (the newest active template of their type unless set
+explicitly), and the stats are grouped ``COUNT`` queries over the
+``(template_id, status)`` and ``(template_id, user_email)`` indexes.
+
+``ReportTemplate.usage_count`` is adjusted in the same transaction that
+creates, deletes or re-points a report, and computed stats are cached
+(Redis when available, otherwise in process).  A commit that touches a
+template's reports drops its cached stats, so the endpoint only queries
+after a change or once the cache TTL (for ``last_30_days``) has passed.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, update
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 300
+TRACKED_STATUSES = ('DRAFT', 'PENDING', 'APPROVED')
+
+_KEY_PREFIX = 'template_stats:'
+_PENDING_DELTAS_KEY = '_template_usage_deltas'
+_PENDING_TOUCHED_KEY = '_template_stats_touched'
+_TRACKED_ATTRS = ('template_id', 'status', 'user_email', 'created_at')
+
+
+class TemplateStatsCache:
+    """Computed template stats backed by Redis with an in-process fallback."""
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._local: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._lock = threading.Lock()
+
+    def _redis(self):
+        try:
+            from cache.redis_client import redis_client
+            if redis_client.redis_client is not None and redis_client.is_available():
+                return redis_client.redis_client
+        except Exception as e:
+            logger.debug(f"Redis unavailable for template stats: {e}")
+        return None
+
+    @staticmethod
+    def _key(template_id: int) -> str:
+        return f"{_KEY_PREFIX}{template_id}"
+
+    def get(self, template_id: int) -> Optional[Dict[str, Any]]:
+        key = self._key(template_id)
+        client = self._redis()
+        if client is not None:
+            try:
+                value = client.get(key)
+                return json.loads(value) if value is not None else None
+            except Exception as e:
+                logger.warning(f"Could not read template stats for {template_id}: {e}")
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            stats, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            return stats
+
+    def set(self, template_id: int, stats: Dict[str, Any]) -> None:
+        key = self._key(template_id)
+        client = self._redis()
+        if client is not None:
+            try:
+                client.setex(key, self.ttl_seconds, json.dumps(stats))
+                return
+            except Exception as e:
+                logger.warning(f"Could not store template stats for {template_id}: {e}")
+
+        with self._lock:
+            self._local[key] = (stats, time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self, template_ids: Iterable[int]) -> None:
+        keys = [self._key(template_id) for template_id in template_ids]
+        if not keys:
+            return
+        client = self._redis()
+        if client is not None:
+            try:
+                client.delete(*keys)
+            except Exception as e:
+                logger.warning(f"Could not invalidate template stats: {e}")
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+
+template_stats_cache = TemplateStatsCache()
+
+
+def compute_template_stats(template, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Usage statistics of ``template`` from grouped queries on its reports."""
+    from models import db, Report
+
+    for_template = Report.template_id == template.id
+    by_user = db.session.query(Report.user_email, func.count(Report.id))\
+        .filter(for_template).group_by(Report.user_email).all()
+    by_status = db.session.query(Report.status, func.count(Report.id))\
+        .filter(for_template).group_by(Report.status).all()
+    since = (now or datetime.utcnow()) - timedelta(days=30)
+    last_30_days = db.session.query(func.count(Report.id))\
+        .filter(for_template, Report.created_at >= since).scalar()
+
+    statuses = {status: 0 for status in TRACKED_STATUSES}
+    statuses.update({status: count for status, count in by_status if status})
+    return {
+        'total_uses': template.usage_count or 0,
+        'last_30_days': last_30_days or 0,
+        'by_user': {email: count for email, count in by_user},
+        'by_status': statuses,
+    }
+
+
+def get_template_stats(template) -> Dict[str, Any]:
+    """Cached usage statistics of ``template``."""
+    stats = template_stats_cache.get(template.id)
+    if stats is None:
+        stats = compute_template_stats(template)
+        template_stats_cache.set(template.id, stats)
+    return stats
+
+
+# -- session hooks ---------------------------------------------------------
+
+def _assign_templates(session, flush_context, instances) -> None:
+    """Point new reports without a template at the active template of their type."""
+    from models import Report, ReportTemplate
+
+    resolved: Dict[str, Optional[int]] = {}
+    for obj in session.new:
+        if not isinstance(obj, Report) or obj.template_id is not None or not obj.type:
+            continue
+        if obj.type not in resolved:
+            with session.no_autoflush:
+                row = session.query(ReportTemplate.id)\
+                    .filter(ReportTemplate.type == obj.type, ReportTemplate.is_active.is_(True))\
+                    .order_by(ReportTemplate.updated_at.desc(), ReportTemplate.id.desc())\
+                    .first()
+            resolved[obj.type] = row[0] if row else None
+        obj.template_id = resolved[obj.type]
+
+
+def _collect_template_changes(session, flush_context) -> None:
+    from models import Report
+
+    deltas = session.info.setdefault(_PENDING_DELTAS_KEY, {})
+    touched = session.info.setdefault(_PENDING_TOUCHED_KEY, set())
+
+    def adjust(template_id, delta):
+        if template_id is not None:
+            deltas[template_id] = deltas.get(template_id, 0) + delta
+            touched.add(template_id)
+
+    for obj in session.new:
+        if isinstance(obj, Report):
+            adjust(obj.template_id, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Report):
+            adjust(obj.template_id, -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Report):
+            continue
+        state = inspect(obj)
+        template_history = state.attrs.template_id.history
+        if template_history.has_changes():
+            for previous in template_history.deleted or ():
+                adjust(previous, -1)
+            adjust(obj.template_id, 1)
+        elif obj.template_id is not None and any(
+                state.attrs[attr].history.has_changes() for attr in _TRACKED_ATTRS):
+            touched.add(obj.template_id)
+
+
+def _apply_usage_deltas(session, flush_context) -> None:
+    from models import ReportTemplate
+
+    deltas = {k: v for k, v in (session.info.pop(_PENDING_DELTAS_KEY, None) or {}).items() if v}
+    if not deltas:
+        return
+    connection = session.connection()
+    try:
+        # A savepoint keeps a counter failure from aborting the report change
+        with connection.begin_nested():
+            for template_id, delta in deltas.items():
+                connection.execute(
+                    update(ReportTemplate.__table__)
+                    .where(ReportTemplate.__table__.c.id == template_id)
+                    .values(usage_count=func.coalesce(ReportTemplate.__table__.c.usage_count, 0) + delta)
+                )
+    except Exception as e:
+        logger.error(f"Failed to update template usage counts for {sorted(deltas)}: {e}")
+        return
+
+    # Loaded templates must not keep serving the pre-update count
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, ReportTemplate) and obj.id in deltas:
+            session.expire(obj, ['usage_count'])
+
+
+def _invalidate_touched_templates(session) -> None:
+    session.info.pop(_PENDING_DELTAS_KEY, None)
+    touched = session.info.pop(_PENDING_TOUCHED_KEY, None)
+    if touched:
+        template_stats_cache.invalidate(touched)
+
+
+def _discard_template_changes(session) -> None:
+    session.info.pop(_PENDING_DELTAS_KEY, None)
+    session.info.pop(_PENDING_TOUCHED_KEY, None)
+
+
+_listeners_installed = False
+_listeners_lock = threading.Lock()
+
+
+def init_template_stats(app) -> TemplateStatsCache:
+    """Attach the session listeners that keep usage counts and cached stats current."""
+    global _listeners_installed
+    from models import db
+
+    template_stats_cache.ttl_seconds = app.config.get('TEMPLATE_STATS_CACHE_SECONDS', DEFAULT_TTL_SECONDS)
+
+    with _listeners_lock:
+        if not _listeners_installed:
+            event.listen(db.session, 'before_flush', _assign_templates)
+            event.listen(db.session, 'after_flush', _collect_template_changes)
+            event.listen(db.session, 'after_flush_postexec', _apply_usage_deltas)
+            event.listen(db.session, 'after_commit', _invalidate_touched_templates)
+            event.listen(db.session, 'after_rollback', _discard_template_changes)
+            _listeners_installed = True
+
+    return template_stats_cache
@@ -0,0 +1,444 @@
+"""
+Delta-encoded report version history.
+
+Report versions are stored as periodic full keyframes followed by compressed
+JSON patches against the previous version, so storage grows with the size of
+each change rather than the size of the report.  Any version can be rebuilt
+by replaying deltas from its nearest keyframe; rebuilt documents are kept in a
+small LRU cache because versions never change once written.
+
+Patches use RFC 6902 style operations (``add``/``remove``/``replace`` with a
+JSON pointer ``path``).  Every ``replace`` and ``remove`` also carries the
+previous value under ``old`` so field diffs can be produced from the patches
+alone.
+
+Rows written before this module existed hold plain JSON in
+``data_snapshot`` and are treated as keyframes.
+
+``ReportEdit`` audit rows use the same patch format: ``after_json`` holds
+``PATCH_PREFIX`` followed by the compressed operations turning the report
+data before the edit into the data after it, and ``before_json`` is empty.
+Older rows hold the full before and after documents as plain JSON.
+:func:`decode_edit_patch` reads both.
+"""
+import base64
+import copy
+import json
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_PREFIX = 'z:'
+PATCH_PREFIX = 'p:'
+DEFAULT_KEYFRAME_INTERVAL = 10
+# A delta larger than this share of the full document is stored as a keyframe
+KEYFRAME_SIZE_RATIO = 0.5
+
+_MISSING = object()
+
+
+# -- encoding ---------------------------------------------------------------
+
+def compress_json(value: Any) -> str:
+    """Serialise and compress a JSON value into a text column friendly string."""
+    raw = json.dumps(value, separators=(',', ':'), default=str).encode('utf-8')
+    return COMPRESSED_PREFIX + base64.b64encode(zlib.compress(raw, 6)).decode('ascii')
+
+
+def decompress_json(text: str) -> Any:
+    """Inverse of :func:`compress_json`; plain JSON is accepted for legacy rows."""
+    if text is None:
+        return None
+    if text.startswith(COMPRESSED_PREFIX):
+        raw = zlib.decompress(base64.b64decode(text[len(COMPRESSED_PREFIX):]))
+        return json.loads(raw.decode('utf-8'))
+    return json.loads(text)
+
+
+# -- JSON patch -------------------------------------------------------------
+
+def _escape(token: str) -> str:
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def split_pointer(path: str) -> List[str]:
+    if not path:
+        return []
+    return [_unescape(token) for token in path.lstrip('/').split('/')]
+
+
+def make_patch(old: Any, new: Any, path: str = '') -> List[Dict[str, Any]]:
+    """Compute the operations that turn ``old`` into ``new``."""
+    if type(old) is not type(new):
+        return [{'op': 'replace', 'path': path, 'value': new, 'old': old}]
+
+    if isinstance(old, dict):
+        ops = []
+        for key in old:
+            child = f"{path}/{_escape(key)}"
+            if key not in new:
+                ops.append({'op': 'remove', 'path': child, 'old': old[key]})
+            elif old[key] != new[key]:
+                ops.extend(make_patch(old[key], new[key], child))
+        for key in new:
+            if key not in old:
+                ops.append({'op': 'add', 'path': f"{path}/{_escape(key)}", 'value': new[key]})
+        return ops
+
+    if isinstance(old, list):
+        ops = []
+        common = min(len(old), len(new))
+        for index in range(common):
+            if old[index] != new[index]:
+                ops.extend(make_patch(old[index], new[index], f"{path}/{index}"))
+        for index in range(len(old) - 1, common - 1, -1):
+            ops.append({'op': 'remove', 'path': f"{path}/{index}", 'old': old[index]})
+        for index in range(common, len(new)):
+            ops.append({'op': 'add', 'path': f"{path}/{index}", 'value': new[index]})
+        return ops
+
+    if old != new:
+        return [{'op': 'replace', 'path': path, 'value': new, 'old': old}]
+    return []
+
+
+def apply_patch(document: Any, ops: List[Dict[str, Any]]) -> Any:
+    """Apply operations in place (the root may be replaced) and return the result."""
+    for op in ops:
+        tokens = split_pointer(op['path'])
+        if not tokens:
+            document = copy.deepcopy(op.get('value'))
+            continue
+
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+
+        if isinstance(parent, list):
+            index = int(last)
+            if op['op'] == 'remove':
+                del parent[index]
+            elif op['op'] == 'add':
+                parent.insert(index, copy.deepcopy(op['value']))
+            else:
+                parent[index] = copy.deepcopy(op['value'])
+        else:
+            if op['op'] == 'remove':
+                parent.pop(last, None)
+            else:
+                parent[last] = copy.deepcopy(op['value'])
+    return document
+
+
+# -- reconstruction cache --------------------------------------------------
+
+class _DocumentCache:
+    """Bounded LRU of rebuilt version documents keyed by version id."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[int, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version_id: int) -> Any:
+        with self._lock:
+            if version_id not in self._entries:
+                return _MISSING
+            self._entries.move_to_end(version_id)
+            return self._entries[version_id]
+
+    def put(self, version_id: int, document: Any) -> None:
+        with self._lock:
+            self._entries[version_id] = document
+            self._entries.move_to_end(version_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class VersionStore:
+    """Write and read delta-encoded ``ReportVersion`` rows."""
+
+    def __init__(self, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL, cache_size: int = 64):
+        self.keyframe_interval = keyframe_interval
+        self.cache = _DocumentCache(cache_size)
+
+    # reading ----------------------------------------------------------
+
+    @staticmethod
+    def _is_keyframe(version) -> bool:
+        return version.is_keyframe is None or bool(version.is_keyframe) or not version.base_version_id
+
+    def _chain(self, version) -> List[Any]:
+        """Versions from the nearest keyframe or cached ancestor up to ``version``."""
+        from models import ReportVersion
+
+        chain = [version]
+        current = version
+        while not self._is_keyframe(current):
+            if self.cache.get(current.base_version_id) is not _MISSING:
+                break
+            current = ReportVersion.query.get(current.base_version_id)
+            if current is None:
+                raise ValueError(f"Broken version chain for report version {version.id}")
+            chain.append(current)
+        chain.reverse()
+        return chain
+
+    def get_document(self, version) -> Any:
+        """Rebuild the full report data stored for a version."""
+        from models import ReportVersion
+
+        cached = self.cache.get(version.id)
+        if cached is not _MISSING:
+            return copy.deepcopy(cached)
+
+        chain = self._chain(version)
+        first = chain[0]
+        if self._is_keyframe(first):
+            document = decompress_json(first.data_snapshot)
+            remaining = chain[1:]
+        else:
+            base = self.cache.get(first.base_version_id)
+            if base is _MISSING:
+                # Evicted since the chain was walked
+                base = self.get_document(ReportVersion.query.get(first.base_version_id))
+            document = copy.deepcopy(base)
+            remaining = chain
+
+        for step in remaining:
+            document = apply_patch(document, decompress_json(step.data_snapshot)['ops'])
+
+        self.cache.put(version.id, copy.deepcopy(document))
+        return document
+
+    def get_patch(self, version) -> Optional[List[Dict[str, Any]]]:
+        """The stored operations for a delta version, or None for keyframes."""
+        if self._is_keyframe(version):
+            return None
+        return decompress_json(version.data_snapshot)['ops']
+
+    # writing ----------------------------------------------------------
+
+    def record_version(self, report, data: Any, created_by: str, change_summary: str = None,
+                       version_number: str = None):
+        """Add a new current version holding ``data``; the caller commits."""
+        from models import db, ReportVersion
+
+        previous = ReportVersion.query.filter_by(report_id=report.id, is_current=True)\
+                                      .order_by(ReportVersion.id.desc()).first()
+        if previous is None:
+            previous = ReportVersion.query.filter_by(report_id=report.id)\
+                                          .order_by(ReportVersion.id.desc()).first()
+
+        full_text = json.dumps(data, separators=(',', ':'), default=str)
+        snapshot = compress_json(data)
+        is_keyframe = True
+        base_version_id = None
+
+        if previous is not None and self._deltas_since_keyframe(previous) + 1 < self.keyframe_interval:
+            try:
+                base_document = self.get_document(previous)
+                delta = compress_json({
+                    'ops': make_patch(base_document, data),
+                    'context': isinstance(data, dict) and 'context' in data,
+                })
+                if len(delta) < len(snapshot) * KEYFRAME_SIZE_RATIO:
+                    snapshot = delta
+                    is_keyframe = False
+                    base_version_id = previous.id
+            except Exception as e:
+                logger.warning(f"Falling back to keyframe for report {report.id}: {e}")
+
+        ReportVersion.query.filter_by(report_id=report.id).update({'is_current': False})
+
+        version = ReportVersion(
+            report_id=report.id,
+            version_number=version_number or report.revision or 'R0',
+            created_by=created_by,
+            change_summary=change_summary,
+            data_snapshot=snapshot,
+            is_current=True,
+            is_keyframe=is_keyframe,
+            base_version_id=base_version_id,
+            snapshot_size=len(full_text),
+        )
+        db.session.add(version)
+        db.session.flush()
+        self.cache.put(version.id, copy.deepcopy(data))
+        return version
+
+    def _deltas_since_keyframe(self, version) -> int:
+        from models import ReportVersion
+
+        depth = 0
+        current = version
+        while current is not None and not self._is_keyframe(current):
+            depth += 1
+            current = ReportVersion.query.get(current.base_version_id)
+        return depth
+
+    # diffing ----------------------------------------------------------
+
+    def _patches_between(self, older, newer) -> Optional[List[Dict[str, Any]]]:
+        """Stored deltas leading from ``older`` to ``newer`` if they share one chain."""
+        from models import ReportVersion
+
+        deltas = []
+        current = newer
+        while current is not None and current.id != older.id:
+            if self._is_keyframe(current):
+                return None
+            deltas.append(decompress_json(current.data_snapshot))
+            current = ReportVersion.query.get(current.base_version_id)
+        if current is None:
+            return None
+        deltas.reverse()
+        return deltas
+
+    def diff_versions(self, version1, version2) -> List[Dict[str, Any]]:
+        """Field diff between two versions, computed from the deltas between them."""
+        from routes.compare import generate_field_diff
+
+        forward = version1.id <= version2.id
+        older, newer = (version1, version2) if forward else (version2, version1)
+        deltas = self._patches_between(older, newer) if older.id != newer.id else []
+
+        if deltas is None:
+            # Not on one delta chain: compare the rebuilt documents
+            return generate_field_diff(self.get_document(version1), self.get_document(version2))
+
+        fields = changed_fields(deltas)
+        if not fields:
+            return []
+
+        old_values, new_values = field_values_from_deltas(deltas, fields)
+        if old_values is None:
+            # A change is nested inside a field, so the patch does not hold the
+            # whole value; rebuild the documents and compare only those fields
+            old_values = _pick(self.get_document(older), fields)
+            new_values = _pick(self.get_document(newer), fields)
+
+        if not forward:
+            old_values, new_values = new_values, old_values
+        return generate_field_diff({'context': old_values}, {'context': new_values})
+
+
+def _field_of(op: Dict[str, Any], has_context: bool) -> Optional[Tuple[str, int]]:
+    """
+    Map an operation to the field ``generate_field_diff`` compares.
+
+    Returns ``(name, depth below the field)``, ``('*', 0)`` when the change
+    cannot be attributed to one field, or None when it lies outside the
+    compared fields.
+    """
+    tokens = split_pointer(op['path'])
+    if has_context:
+        if not tokens or tokens[0] != 'context':
+            return None if tokens else ('*', 0)
+        tokens = tokens[1:]
+    if not tokens:
+        return '*', 0
+    return tokens[0], len(tokens) - 1
+
+
+def changed_fields(deltas: List[Dict[str, Any]]) -> set:
+    """Names of the compared fields touched by a sequence of deltas."""
+    fields = set()
+    layouts = {bool(delta.get('context')) for delta in deltas}
+    if len(layouts) > 1:
+        return {'*'}
+    for delta in deltas:
+        for op in delta['ops']:
+            field = _field_of(op, bool(delta.get('context')))
+            if field is not None:
+                fields.add(field[0])
+    return fields
+
+
+def field_values_from_deltas(deltas, fields) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Old and new values of ``fields`` read straight from the deltas.
+
+    Returns ``(None, None)`` when a change is nested inside a field or cannot
+    be attributed to a single field, since the patch then lacks the full value.
+    """
+    if '*' in fields:
+        return None, None
+
+    old_values: Dict[str, Any] = {}
+    new_values: Dict[str, Any] = {}
+    for delta in deltas:
+        for op in delta['ops']:
+            field = _field_of(op, bool(delta.get('context')))
+            if field is None:
+                continue
+            name, depth = field
+            if depth:
+                return None, None
+            if name not in old_values:
+                old_values[name] = op.get('old', '')
+            new_values[name] = '' if op['op'] == 'remove' else op.get('value', '')
+    return old_values, new_values
+
+
+def _pick(document: Any, fields) -> Dict[str, Any]:
+    if not isinstance(document, dict):
+        return {}
+    context = document.get('context', document)
+    if not isinstance(context, dict):
+        return {}
+    if '*' in fields:
+        return dict(context)
+    return {name: context.get(name, '') for name in fields}
+
+
+def encode_edit_patch(before: Any, after: Any) -> str:
+    """Compressed patch stored in ``ReportEdit.after_json`` instead of a full copy."""
+    return PATCH_PREFIX + compress_json(make_patch(before, after))
+
+
+def decode_edit_patch(edit) -> List[Dict[str, Any]]:
+    """Patch for a ``ReportEdit`` row in either the compact or the legacy format."""
+    if edit.after_json and edit.after_json.startswith(PATCH_PREFIX):
+        return decompress_json(edit.after_json[len(PATCH_PREFIX):])
+    before = json.loads(edit.before_json) if edit.before_json else {}
+    after = json.loads(edit.after_json) if edit.after_json else {}
+    return make_patch(before, after)
+
+
+def describe_edit(edit) -> List[Dict[str, Any]]:
+    """Changed paths of a ``ReportEdit`` with their old and new values, for display."""
+    changes = []
+    for op in decode_edit_patch(edit):
+        tokens = split_pointer(op['path'])
+        if tokens and tokens[0] == 'context':
+            tokens = tokens[1:]
+        changes.append({
+            'field': '.'.join(tokens) or '(document)',
+            'change': op['op'],
+            'old': op.get('old', ''),
+            'new': '' if op['op'] == 'remove' else op.get('value', ''),
+        })
+    return changes
+
+
+version_store = VersionStore()
+
+
+def init_version_store(app) -> VersionStore:
+    version_store.keyframe_interval = app.config.get('VERSION_KEYFRAME_INTERVAL', DEFAULT_KEYFRAME_INTERVAL)
+    version_store.cache.max_entries = app.config.get('VERSION_CACHE_SIZE', 64)
+    return version_store
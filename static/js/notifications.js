@@ -1,8 +1,8 @@
 
 class NotificationSystem {
     constructor() {
-        this.pollInterval = 30000; // Poll every 30 seconds
-        this.isPolling = false;
+        this.reconnectDelay = 30000; // Retry after the server refused the stream
+        this.eventSource = null;
         this.notificationContainer = null;
         this.init();
     }
@@ -10,7 +10,7 @@ class NotificationSystem {
     init() {
         this.createNotificationElements();
         this.loadInitialNotifications();
-        this.startPolling();
+        this.startStream();
         this.bindEvents();
     }
 
@@ -82,32 +82,33 @@ class NotificationSystem {
         }
     }
 
-    async startPolling() {
-        if (this.isPolling) return;
-        this.isPolling = true;
+    startStream() {
+        // Counts and new notifications are pushed by the server; streams are
+        // short-lived and EventSource reconnects after the server's retry delay
+        if (!window.EventSource) return;
 
-        const poll = async () => {
-            try {
-                const response = await fetch('/notifications/api/notifications/unread-count');
-                const data = await response.json();
-                
-                if (data.success) {
-                    this.updateNotificationBadge(data.count);
-                }
-            } catch (error) {
-                console.error('Error polling notifications:', error);
-            }
-            
-            if (this.isPolling) {
-                setTimeout(poll, this.pollInterval);
+        this.eventSource = new EventSource('/notifications/api/notifications/stream');
+
+        this.eventSource.addEventListener('unread_count', (e) => {
+            const data = JSON.parse(e.data);
+            if (data.count !== null && data.count !== undefined) {
+                this.updateNotificationBadge(data.count);
             }
-        };
+        });
 
-        poll();
-    }
+        this.eventSource.addEventListener('notification', (e) => {
+            const data = JSON.parse(e.data);
+            NotificationSystem.showToast(data.title || 'Notification', data.message || '');
+        });
 
-    stopPolling() {
-        this.isPolling = false;
+        this.eventSource.onerror = () => {
+            // EventSource retries dropped streams itself; it only gives up when
+            // the server answered with an error, so try again later
+            if (this.eventSource && this.eventSource.readyState === EventSource.CLOSED) {
+                this.eventSource = null;
+                setTimeout(() => this.startStream(), this.reconnectDelay);
+            }
+        };
     }
 
     updateNotificationBadge(count) {
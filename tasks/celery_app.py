@@ -108,6 +108,26 @@ def make_celery(app: Flask) -> Celery:
                 'schedule': timedelta(hours=24),  # Daily
                 'options': {'queue': 'maintenance'}
             },
+            'rebuild-analytics-rollups': {
+                'task': 'tasks.maintenance_tasks.rebuild_analytics_rollups_task',
+                'schedule': timedelta(hours=24),  # Nightly reconciliation
+                'options': {'queue': 'maintenance'}
+            },
+            'reconcile-storage-usage': {
+                'task': 'tasks.maintenance_tasks.reconcile_storage_task',
+                'schedule': timedelta(hours=1),  # Catch writes outside the accounting hooks
+                'options': {'queue': 'maintenance'}
+            },
+            'sweep-upload-blobs': {
+                'task': 'tasks.maintenance_tasks.sweep_upload_blobs_task',
+                'schedule': timedelta(hours=1),  # Blobs of deleted files
+                'options': {'queue': 'maintenance'}
+            },
+            'cleanup-exports': {
+                'task': 'tasks.maintenance_tasks.cleanup_exports_task',
+                'schedule': timedelta(hours=1),  # Background exports past EXPORT_RETENTION_HOURS
+                'options': {'queue': 'maintenance'}
+            },
             'backup-database': {
                 'task': 'tasks.maintenance_tasks.backup_database_task',
                 'schedule': timedelta(hours=6),  # Every 6 hours
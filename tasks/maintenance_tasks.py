@@ -28,6 +28,8 @@ def cleanup_old_files_task(self, max_age_days: int = 30) -> Dict[str, Any]:
         Dict with cleanup results
     """
     try:
+        from services.storage_accounting import storage_accountant
+        
         logger.info(f"Starting file cleanup for files older than {max_age_days} days")
         
         # Update task state
@@ -104,6 +106,7 @@ def cleanup_old_files_task(self, max_age_days: int = 30) -> Dict[str, Any]:
                                 
                                 # Delete file
                                 os.remove(file_path)
+                                storage_accountant.record_delete(file_path, file_size)
                                 
                                 cleanup_results[cleanup_dir['name']]['deleted'] += 1
                                 cleanup_results[cleanup_dir['name']]['space_freed'] += file_size
@@ -585,4 +588,148 @@ def sync_cully_statistics_task(self) -> Dict[str, Any]:
             'status': 'failed',
             'error': str(e),
             'completed_at': datetime.utcnow().isoformat()
-        }
\ No newline at end of file
+        }
+
+@celery_app.task(bind=True)
+def rebuild_analytics_rollups_task(self, full: bool = False) -> Dict[str, Any]:
+    """
+    Backfill or reconcile the analytics rollups.
+    
+    The first run (or ``full=True``) rebuilds every day since the first
+    report; later runs recompute only the last few days.
+    
+    Args:
+        full: Rebuild all history even if a backfill has completed
+    
+    Returns:
+        Dict with the rebuild results
+    """
+    try:
+        from models import db
+        from services.analytics_rollups import RECONCILE_DAYS, backfill, rollups_ready
+        
+        full = full or not rollups_ready()
+        since = None if full else datetime.utcnow().date() - timedelta(days=RECONCILE_DAYS)
+        
+        current_task.update_state(
+            state='PROGRESS',
+            meta={'status': 'Rebuilding all analytics rollups' if full else 'Reconciling recent rollups',
+                  'progress': 10}
+        )
+        
+        with db.engine.begin() as connection:
+            rows = backfill(connection, since)
+        
+        logger.info(f"Analytics rollups rebuilt ({'full' if full else 'recent'}): {rows} rows")
+        
+        return {
+            'status': 'success',
+            'full_backfill': full,
+            'rows_written': rows,
+            'completed_at': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Analytics rollup rebuild failed: {e}")
+        return {
+            'status': 'failed',
+            'error': str(e)
+        }
+
+
+@celery_app.task(bind=True)
+def reconcile_storage_task(self) -> Dict[str, Any]:
+    """
+    Recount the tracked storage roots from disk.
+    
+    Catches files written or removed outside the storage accounting hooks
+    (manual cleanup, deploy scripts, other processes).
+    
+    Returns:
+        Dict with the usage of each root
+    """
+    try:
+        from services.storage_accounting import storage_accountant
+        
+        usage = storage_accountant.reconcile()
+        
+        logger.info("Storage usage reconciled: " + ', '.join(
+            f"{name} {root['files']} files / {root['bytes']} bytes" for name, root in usage.items()
+        ))
+        
+        return {
+            'status': 'success',
+            'roots': {name: {'files': root['files'], 'bytes': root['bytes']} for name, root in usage.items()},
+            'completed_at': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Storage reconciliation failed: {e}")
+        return {
+            'status': 'failed',
+            'error': str(e)
+        }
+
+
+@celery_app.task(bind=True)
+def sweep_upload_blobs_task(self) -> Dict[str, Any]:
+    """
+    Remove upload blobs that no file row refers to any more.
+    
+    Deleting a file only deletes its row, since another upload of the same
+    content may be committing a new reference to the blob at that moment.
+    
+    Returns:
+        Dict with the number of files removed
+    """
+    try:
+        from api.files import FileManager
+        
+        removed = FileManager().sweep_blobs()
+        
+        logger.info(f"Upload blob sweep removed {removed} files")
+        
+        return {
+            'status': 'success',
+            'removed': removed,
+            'completed_at': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Upload blob sweep failed: {e}")
+        return {
+            'status': 'failed',
+            'error': str(e)
+        }
+
+
+@celery_app.task(bind=True)
+def cleanup_exports_task(self) -> Dict[str, Any]:
+    """
+    Remove background exports older than the retention period.
+    
+    Finished files, failure markers and partial files left by killed
+    workers all live in EXPORT_OUTPUT_DIR until this runs.
+    
+    Returns:
+        Dict with the number of files removed
+    """
+    try:
+        from services.export_engine import cleanup_exports
+        
+        removed = cleanup_exports()
+        
+        logger.info(f"Export cleanup removed {removed} files")
+        
+        return {
+            'status': 'success',
+            'removed': removed,
+            'completed_at': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Export cleanup failed: {e}")
+        return {
+            'status': 'failed',
+            'error': str(e)
+        }
@@ -4,10 +4,10 @@ Comprehensive task monitoring and analytics system.
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from collections import defaultdict
 from .celery_app import get_celery_app
-from .result_cache import get_task_result_cache, TaskResult
+from .result_cache import get_task_result_cache, TaskResult, METRICS_BUCKET_SECONDS
 from .failure_handler import get_failure_handler
 
 logger = logging.getLogger(__name__)
@@ -24,6 +24,30 @@ class TaskMetrics:
     avg_execution_time: float = 0.0
     success_rate: float = 0.0
     failure_rate: float = 0.0
+    latency_histogram: Dict[str, int] = field(default_factory=dict)  # Upper bound (s) -> finished tasks
+    execution_time_sum: float = field(default=0.0, repr=False)
+    timed_tasks: int = field(default=0, repr=False)
+    
+    def add_counters(self, counters: Dict[str, float]) -> None:
+        """Add one bucket's counters for a task name (see TaskResultCache.get_metric_buckets)."""
+        self.successful_tasks += int(counters.get('SUCCESS', 0))
+        self.failed_tasks += int(counters.get('FAILURE', 0))
+        self.total_tasks += int(counters.get('SUCCESS', 0) + counters.get('FAILURE', 0))
+        self.execution_time_sum += counters.get('time_sum', 0.0)
+        self.timed_tasks += int(counters.get('time_count', 0))
+        for name, value in counters.items():
+            if name.startswith('le|'):
+                bound = name[3:]
+                self.latency_histogram[bound] = self.latency_histogram.get(bound, 0) + int(value)
+    
+    def finalize(self) -> 'TaskMetrics':
+        """Derive the rates and average from the summed counters."""
+        if self.total_tasks > 0:
+            self.success_rate = (self.successful_tasks / self.total_tasks) * 100
+            self.failure_rate = (self.failed_tasks / self.total_tasks) * 100
+        if self.timed_tasks:
+            self.avg_execution_time = self.execution_time_sum / self.timed_tasks
+        return self
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
@@ -35,7 +59,8 @@ class TaskMetrics:
             'in_progress_tasks': self.in_progress_tasks,
             'avg_execution_time': self.avg_execution_time,
             'success_rate': self.success_rate,
-            'failure_rate': self.failure_rate
+            'failure_rate': self.failure_rate,
+            'latency_histogram': self.latency_histogram
         }
 
 
@@ -84,49 +109,21 @@ class TaskMonitor:
             TaskMetrics with overall statistics
         """
         try:
-            # Get recent task results from cache
-            recent_results = self.result_cache.get_recent_results(limit=10000)
-            
-            # Filter by time period
             cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            filtered_results = [
-                r for r in recent_results 
-                if r.started_at and r.started_at >= cutoff_time
-            ]
             
+            # Finished tasks from the pre-aggregated buckets
             metrics = TaskMetrics()
-            metrics.total_tasks = len(filtered_results)
-            
-            if metrics.total_tasks == 0:
-                return metrics
-            
-            # Calculate status counts
-            status_counts = defaultdict(int)
-            execution_times = []
-            
-            for result in filtered_results:
-                status_counts[result.status] += 1
-                
-                # Calculate execution time if available
-                if result.started_at and result.completed_at:
-                    execution_time = (result.completed_at - result.started_at).total_seconds()
-                    execution_times.append(execution_time)
+            for by_name in self.result_cache.get_metric_buckets(cutoff_time).values():
+                for counters in by_name.values():
+                    metrics.add_counters(counters)
             
-            metrics.successful_tasks = status_counts['SUCCESS']
-            metrics.failed_tasks = status_counts['FAILURE']
-            metrics.pending_tasks = status_counts['PENDING']
-            metrics.in_progress_tasks = status_counts['PROGRESS']
+            # Unfinished tasks are counted from the status indexes
+            status_counts = self.result_cache.count_by_status(since=cutoff_time)
+            metrics.pending_tasks = status_counts.get('PENDING', 0)
+            metrics.in_progress_tasks = status_counts.get('PROGRESS', 0)
+            metrics.total_tasks += metrics.pending_tasks + metrics.in_progress_tasks
             
-            # Calculate rates
-            if metrics.total_tasks > 0:
-                metrics.success_rate = (metrics.successful_tasks / metrics.total_tasks) * 100
-                metrics.failure_rate = (metrics.failed_tasks / metrics.total_tasks) * 100
-            
-            # Calculate average execution time
-            if execution_times:
-                metrics.avg_execution_time = sum(execution_times) / len(execution_times)
-            
-            return metrics
+            return metrics.finalize()
             
         except Exception as e:
             logger.error(f"Failed to get overall metrics: {e}")
@@ -143,52 +140,15 @@ class TaskMonitor:
             Dictionary mapping task names to their metrics
         """
         try:
-            # Get recent task results from cache
-            recent_results = self.result_cache.get_recent_results(limit=10000)
-            
-            # Filter by time period
             cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            filtered_results = [
-                r for r in recent_results 
-                if r.started_at and r.started_at >= cutoff_time
-            ]
-            
-            # Group by task name
-            task_groups = defaultdict(list)
-            for result in filtered_results:
-                task_groups[result.task_name].append(result)
-            
-            # Calculate metrics for each task type
-            task_metrics = {}
-            for task_name, results in task_groups.items():
-                metrics = TaskMetrics()
-                metrics.total_tasks = len(results)
-                
-                status_counts = defaultdict(int)
-                execution_times = []
-                
-                for result in results:
-                    status_counts[result.status] += 1
-                    
-                    if result.started_at and result.completed_at:
-                        execution_time = (result.completed_at - result.started_at).total_seconds()
-                        execution_times.append(execution_time)
-                
-                metrics.successful_tasks = status_counts['SUCCESS']
-                metrics.failed_tasks = status_counts['FAILURE']
-                metrics.pending_tasks = status_counts['PENDING']
-                metrics.in_progress_tasks = status_counts['PROGRESS']
-                
-                if metrics.total_tasks > 0:
-                    metrics.success_rate = (metrics.successful_tasks / metrics.total_tasks) * 100
-                    metrics.failure_rate = (metrics.failed_tasks / metrics.total_tasks) * 100
-                
-                if execution_times:
-                    metrics.avg_execution_time = sum(execution_times) / len(execution_times)
-                
-                task_metrics[task_name] = metrics
             
-            return task_metrics
+            # Finished tasks per name from the pre-aggregated buckets
+            task_metrics = defaultdict(TaskMetrics)
+            for by_name in self.result_cache.get_metric_buckets(cutoff_time).values():
+                for task_name, counters in by_name.items():
+                    task_metrics[task_name].add_counters(counters)
+            
+            return {task_name: metrics.finalize() for task_name, metrics in task_metrics.items()}
             
         except Exception as e:
             logger.error(f"Failed to get task type metrics: {e}")
@@ -307,26 +267,14 @@ class TaskMonitor:
             Dictionary with trend data
         """
         try:
-            # Get recent task results
-            recent_results = self.result_cache.get_recent_results(limit=10000)
-            
-            # Filter by time period
             cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            filtered_results = [
-                r for r in recent_results 
-                if r.started_at and r.started_at >= cutoff_time
-            ]
+            buckets = self.result_cache.get_metric_buckets(cutoff_time)
             
-            # Create time intervals
-            interval_delta = timedelta(minutes=interval_minutes)
-            intervals = []
-            current_time = cutoff_time
+            # Create time intervals (whole metric buckets)
+            interval_seconds = max(interval_minutes * 60 // METRICS_BUCKET_SECONDS, 1) * METRICS_BUCKET_SECONDS
+            first_bucket = self.result_cache.bucket_start(cutoff_time)
+            now_bucket = self.result_cache.bucket_start(None)
             
-            while current_time < datetime.utcnow():
-                intervals.append(current_time)
-                current_time += interval_delta
-            
-            # Group results by interval
             trend_data = {
                 'timestamps': [],
                 'total_tasks': [],
@@ -335,35 +283,20 @@ class TaskMonitor:
                 'avg_execution_time': []
             }
             
-            for i, interval_start in enumerate(intervals):
-                interval_end = interval_start + interval_delta
-                
-                # Filter results for this interval
-                interval_results = [
-                    r for r in filtered_results
-                    if interval_start <= r.started_at < interval_end
-                ]
-                
-                # Calculate metrics for this interval
-                total_tasks = len(interval_results)
-                successful_tasks = len([r for r in interval_results if r.status == 'SUCCESS'])
-                failed_tasks = len([r for r in interval_results if r.status == 'FAILURE'])
-                
-                # Calculate average execution time
-                execution_times = []
-                for result in interval_results:
-                    if result.started_at and result.completed_at:
-                        execution_time = (result.completed_at - result.started_at).total_seconds()
-                        execution_times.append(execution_time)
-                
-                avg_execution_time = sum(execution_times) / len(execution_times) if execution_times else 0
+            for interval_start in range(first_bucket, now_bucket + 1, interval_seconds):
+                # Sum the buckets that fall in this interval
+                metrics = TaskMetrics()
+                for bucket in range(interval_start, interval_start + interval_seconds, METRICS_BUCKET_SECONDS):
+                    for counters in buckets.get(bucket, {}).values():
+                        metrics.add_counters(counters)
+                metrics.finalize()
                 
                 # Add to trend data
-                trend_data['timestamps'].append(interval_start.isoformat())
-                trend_data['total_tasks'].append(total_tasks)
-                trend_data['successful_tasks'].append(successful_tasks)
-                trend_data['failed_tasks'].append(failed_tasks)
-                trend_data['avg_execution_time'].append(avg_execution_time)
+                trend_data['timestamps'].append(datetime.utcfromtimestamp(interval_start).isoformat())
+                trend_data['total_tasks'].append(metrics.total_tasks)
+                trend_data['successful_tasks'].append(metrics.successful_tasks)
+                trend_data['failed_tasks'].append(metrics.failed_tasks)
+                trend_data['avg_execution_time'].append(metrics.avg_execution_time)
             
             return trend_data
             
@@ -72,14 +72,16 @@ def generate_report_task(self, report_id: str, report_type: str,
         )
         
         # Generate report based on type
-        if report_type.upper() == 'SAT':
-            result = generator.generate_sat_report(report_data, output_path, output_format)
-        elif report_type.upper() == 'FDS':
-            result = generator.generate_fds_report(report_data, output_path, output_format)
-        elif report_type.upper() == 'HDS':
-            result = generator.generate_hds_report(report_data, output_path, output_format)
-        else:
-            result = generator.generate_generic_report(report_data, output_path, output_format)
+        from services.storage_accounting import storage_accountant
+        with storage_accountant.track_write(output_path):
+            if report_type.upper() == 'SAT':
+                result = generator.generate_sat_report(report_data, output_path, output_format)
+            elif report_type.upper() == 'FDS':
+                result = generator.generate_fds_report(report_data, output_path, output_format)
+            elif report_type.upper() == 'HDS':
+                result = generator.generate_hds_report(report_data, output_path, output_format)
+            else:
+                result = generator.generate_generic_report(report_data, output_path, output_format)
         
         # Update task state
         current_task.update_state(
@@ -389,6 +391,7 @@ def cleanup_generated_reports_task(self, max_age_days: int = 30) -> Dict[str, An
     try:
         import glob
         from datetime import datetime, timedelta
+        from services.storage_accounting import storage_accountant
         
         logger.info(f"Starting cleanup of generated reports older than {max_age_days} days")
         
@@ -424,6 +427,7 @@ def cleanup_generated_reports_task(self, max_age_days: int = 30) -> Dict[str, An
                     
                     # Delete file
                     os.remove(file_path)
+                    storage_accountant.record_delete(file_path, file_size)
                     
                     files_deleted += 1
                     space_freed += file_size
@@ -450,4 +454,51 @@ def cleanup_generated_reports_task(self, max_age_days: int = 30) -> Dict[str, An
             'status': 'failed',
             'error': str(e),
             'max_age_days': max_age_days
-        }
\ No newline at end of file
+        }
+
+@celery_app.task(bind=True, time_limit=3600, soft_time_limit=3300)
+def export_data_task(self, export_name: str, params: Dict[str, Any], output_format: str,
+                     export_id: str) -> Dict[str, Any]:
+    """
+    Write a large export to the export directory for later download.
+    
+    Args:
+        export_name: Name of the export in services.export_engine.EXPORTS
+        params: Request parameters the export is filtered by
+        output_format: csv, ndjson or xlsx
+        export_id: Id the file is stored (and downloaded) under
+    
+    Returns:
+        Dict with the export file path and row count
+    """
+    try:
+        from services.export_engine import EXPORTS, export_output_dir, write_export
+        
+        current_task.update_state(
+            state='PROGRESS',
+            meta={'status': f'Exporting {export_name}', 'progress': 10}
+        )
+        
+        output_path = os.path.join(export_output_dir(), f"{export_id}.{output_format}")
+        batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+        rows = write_export(EXPORTS[export_name], params, output_format, output_path, batch_size)
+        
+        logger.info(f"Export {export_name} ({export_id}) completed: {rows} rows")
+        
+        return {
+            'status': 'success',
+            'export_id': export_id,
+            'output_path': output_path,
+            'rows': rows,
+            'file_size': os.path.getsize(output_path),
+            'completed_at': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Export {export_name} ({export_id}) failed: {e}")
+        try:
+            from services.export_engine import mark_export_failed
+            mark_export_failed(export_id, output_format, str(e))
+        except Exception as marker_error:
+            logger.error(f"Could not record failure of export {export_id}: {marker_error}")
+        raise
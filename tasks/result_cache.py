@@ -1,15 +1,60 @@
 """
 Task result caching and retrieval system.
+
+Each result is a JSON string under ``task_result:<id>``.  Sorted-set indexes
+scored by the task's start time list the ids overall, per status and per task
+name, so listings and time-range queries are a ``ZREVRANGEBYSCORE`` plus
+batched ``MGET`` calls rather than one ``GET`` per task.  Index entries for
+results that have expired are skipped on read and pruned by
+``cleanup_expired_results``, which finds them through a further index scored
+by expiry time instead of checking every member.
+
+Finished tasks are also counted into metric buckets: one hash per
+``METRICS_BUCKET_SECONDS`` of start time holding, per task name, success and
+failure counts, summed execution time and a latency histogram.  The buckets
+are updated in the same transaction that stores the finished result, so the
+monitoring views read a fixed number of hashes however many tasks ran.  A
+run's end can be reported more than once (failure handler and postrun
+signal); a ``SET NX`` marker per task lets only the first report count it.
 """
 import json
 import logging
-from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, Optional, List
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass, asdict
 from cache.redis_client import get_redis_client
 
 logger = logging.getLogger(__name__)
 
+# Celery states plus the custom PROGRESS state used by the tasks
+TASK_STATES = ('PENDING', 'RECEIVED', 'STARTED', 'PROGRESS', 'RETRY', 'SUCCESS', 'FAILURE', 'REVOKED')
+
+# Keys per MGET; keeps single replies bounded for large time ranges
+MGET_BATCH_SIZE = 500
+
+TERMINAL_STATES = ('SUCCESS', 'FAILURE')
+# Index entries cleaned up per cleanup_expired_results() call
+CLEANUP_BUDGET = 1000
+
+METRICS_BUCKET_SECONDS = 300
+METRICS_RETENTION_SECONDS = 8 * 24 * 3600
+# Upper bounds (seconds) of the execution time histogram buckets
+LATENCY_BOUNDS = (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, float('inf'))
+
+
+def latency_bucket(seconds: float) -> str:
+    """Histogram field suffix for an execution time."""
+    for bound in LATENCY_BOUNDS:
+        if seconds <= bound:
+            return 'inf' if bound == float('inf') else f"{bound:g}"
+    return 'inf'
+
+
+def _score(value: Optional[datetime]) -> float:
+    """Index score for a naive UTC datetime (now when missing)."""
+    value = value or datetime.utcnow()
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
 
 @dataclass
 class TaskResult:
@@ -59,18 +104,42 @@ class TaskResultCache:
         self.cache_prefix = "task_result:"
         self.index_key = "task_results_index"
         self.default_ttl = 3600  # 1 hour
+        self.max_ttl = 7200  # Completed and failed results
+        self.names_key = f"{self.index_key}:names"  # Task names with a name index
+        self.metrics_prefix = "task_metrics:"
+        self.expiry_key = f"{self.index_key}:expiry"  # '<task_name>|<task_id>' scored by expiry time
+        self.legacy_cursor_key = f"{self.index_key}:cleanup_cursor"
         
     def _get_cache_key(self, task_id: str) -> str:
         """Get cache key for task ID."""
         return f"{self.cache_prefix}{task_id}"
     
-    def store_result(self, task_result: TaskResult, ttl: Optional[int] = None) -> bool:
+    def _status_index_key(self, status: str) -> str:
+        return f"{self.index_key}:status:{status}"
+    
+    def _name_index_key(self, task_name: str) -> str:
+        return f"{self.index_key}:name:{task_name}"
+    
+    @staticmethod
+    def _expiry_member(task_name: str, task_id: str) -> str:
+        return f"{task_name}|{task_id}"
+    
+    def _available(self) -> bool:
+        return bool(self.redis_client) and self.redis_client.is_available()
+    
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+    
+    def store_result(self, task_result: TaskResult, ttl: Optional[int] = None,
+                     record_metrics: bool = False) -> bool:
         """
         Store task result in cache.
         
         Args:
             task_result: Task result to store
             ttl: Time to live in seconds
+            record_metrics: Also count the finished task into its metric bucket
         
         Returns:
             True if stored successfully
@@ -82,22 +151,37 @@ class TaskResultCache:
             
             cache_key = self._get_cache_key(task_result.task_id)
             ttl = ttl or self.default_ttl
+            task_id = task_result.task_id
+            score = _score(task_result.started_at)
+            # Entries older than any result can live are dropped as we go
+            stale_before = _score(None) - self.max_ttl * 2
             
-            # Store result data
-            result_data = json.dumps(task_result.to_dict())
-            success = self.redis_client.setex(cache_key, ttl, result_data)
+            # Result and all of its index entries in one round trip; a
+            # transaction when the metric counters change with it
+            pipe = self.redis_client.pipeline(transaction=record_metrics)
+            pipe.setex(cache_key, ttl, json.dumps(task_result.to_dict()))
+            for status in set(TASK_STATES) - {task_result.status}:
+                pipe.zrem(self._status_index_key(status), task_id)
+            index_keys = [
+                self.index_key,
+                self._status_index_key(task_result.status),
+                self._name_index_key(task_result.task_name),
+            ]
+            for index_key in index_keys:
+                pipe.zremrangebyscore(index_key, '-inf', stale_before)
+                pipe.zadd(index_key, {task_id: score})
+                # Indexes outlive the results they list
+                pipe.expire(index_key, self.max_ttl * 2)
+            pipe.sadd(self.names_key, task_result.task_name)
+            pipe.expire(self.names_key, self.max_ttl * 2)
+            pipe.zadd(self.expiry_key, {self._expiry_member(task_result.task_name, task_id): _score(None) + ttl})
+            pipe.expire(self.expiry_key, self.max_ttl * 2)
+            if record_metrics:
+                self._record_metrics(pipe, task_result)
+            success = pipe.execute()[0]
             
             if success:
-                # Add to index for listing
-                self.redis_client.zadd(
-                    self.index_key,
-                    {task_result.task_id: datetime.utcnow().timestamp()}
-                )
-                
-                # Set TTL on index (longer than individual results)
-                self.redis_client.expire(self.index_key, ttl * 2)
-                
-                logger.debug(f"Cached task result for {task_result.task_id}")
+                logger.debug(f"Cached task result for {task_id}")
                 return True
             
             return False
@@ -106,6 +190,83 @@ class TaskResultCache:
             logger.error(f"Failed to cache task result {task_result.task_id}: {e}")
             return False
     
+    def _metrics_key(self, bucket_start: int) -> str:
+        return f"{self.metrics_prefix}{bucket_start}"
+    
+    @staticmethod
+    def bucket_start(value: Optional[datetime]) -> int:
+        """Start (epoch seconds) of the metric bucket containing ``value``."""
+        score = int(_score(value))
+        return score - score % METRICS_BUCKET_SECONDS
+    
+    def _record_metrics(self, pipe, task_result: TaskResult) -> None:
+        """Queue the counter updates for a finished task on ``pipe``."""
+        key = self._metrics_key(self.bucket_start(task_result.started_at or task_result.completed_at))
+        name = task_result.task_name
+        pipe.hincrby(key, f"{name}|{task_result.status}", 1)
+        if task_result.started_at and task_result.completed_at:
+            seconds = max((task_result.completed_at - task_result.started_at).total_seconds(), 0.0)
+            pipe.hincrbyfloat(key, f"{name}|time_sum", seconds)
+            pipe.hincrby(key, f"{name}|time_count", 1)
+            pipe.hincrby(key, f"{name}|le|{latency_bucket(seconds)}", 1)
+        pipe.expire(key, METRICS_RETENTION_SECONDS)
+    
+    def _claim_completion(self, task_id: str) -> bool:
+        """Atomically claim the metric update of a run's end; True for one caller only."""
+        return bool(self.redis_client.set(f"{self.metrics_prefix}counted:{task_id}", 1,
+                                          nx=True, ex=self.max_ttl * 2))
+    
+    def _release_completion(self, task_id: str) -> None:
+        """Give up a claim whose result could not be stored, so a retry counts it."""
+        try:
+            self.redis_client.delete(f"{self.metrics_prefix}counted:{task_id}")
+        except Exception as e:
+            logger.warning(f"Failed to release metrics claim of {task_id}: {e}")
+    
+    def _store_terminal(self, task_result: TaskResult, first_completion: bool) -> bool:
+        record_metrics = first_completion and self._claim_completion(task_result.task_id)
+        stored = self.store_result(task_result, ttl=self.max_ttl,  # Keep finished tasks longer
+                                   record_metrics=record_metrics)
+        if record_metrics and not stored:
+            self._release_completion(task_result.task_id)
+        return stored
+    
+    def get_metric_buckets(self, since: datetime,
+                           until: Optional[datetime] = None) -> Dict[int, Dict[str, Dict[str, float]]]:
+        """
+        Pre-aggregated counters for the buckets between ``since`` and ``until``.
+        
+        Returns:
+            ``{bucket_start: {task_name: {field: value}}}`` where the fields
+            are status names, ``time_sum``, ``time_count`` and ``le|<bound>``
+        """
+        try:
+            if not self._available():
+                return {}
+            
+            first = self.bucket_start(since)
+            last = self.bucket_start(until)
+            starts = list(range(first, last + 1, METRICS_BUCKET_SECONDS))
+            
+            pipe = self.redis_client.pipeline(transaction=False)
+            for start in starts:
+                pipe.hgetall(self._metrics_key(start))
+            
+            buckets = {}
+            for start, raw in zip(starts, pipe.execute()):
+                if not raw:
+                    continue
+                by_name: Dict[str, Dict[str, float]] = {}
+                for field, value in raw.items():
+                    name, counter = self._decode(field).split('|', 1)
+                    by_name.setdefault(name, {})[counter] = float(self._decode(value))
+                buckets[start] = by_name
+            return buckets
+            
+        except Exception as e:
+            logger.error(f"Failed to read task metric buckets: {e}")
+            return {}
+    
     def get_result(self, task_id: str) -> Optional[TaskResult]:
         """
         Get task result from cache.
@@ -174,12 +335,14 @@ class TaskResultCache:
         try:
             task_result = self.get_result(task_id)
             if task_result:
+                # Count each run once, however many signals report its end
+                first_completion = task_result.status not in TERMINAL_STATES
                 task_result.status = status
                 task_result.result = result
                 task_result.progress = 100
                 task_result.completed_at = datetime.utcnow()
                 task_result.current_step = "Completed"
-                return self.store_result(task_result, ttl=7200)  # Keep completed tasks longer
+                return self._store_terminal(task_result, first_completion)
             
             return False
             
@@ -202,12 +365,13 @@ class TaskResultCache:
         try:
             task_result = self.get_result(task_id)
             if task_result:
+                first_completion = task_result.status not in TERMINAL_STATES
                 task_result.status = 'FAILURE'
                 task_result.error = error
                 task_result.retries = retries
                 task_result.completed_at = datetime.utcnow()
                 task_result.current_step = f"Failed: {error}"
-                return self.store_result(task_result, ttl=7200)  # Keep failed tasks longer
+                return self._store_terminal(task_result, first_completion)
             
             return False
             
@@ -215,82 +379,167 @@ class TaskResultCache:
             logger.error(f"Failed to mark task failed {task_id}: {e}")
             return False
     
-    def get_recent_results(self, limit: int = 100) -> List[TaskResult]:
+    def get_results(self, task_ids: Iterable[str]) -> List[TaskResult]:
+        """
+        Get several task results, in the order given.
+        
+        Args:
+            task_ids: Task IDs to retrieve
+        
+        Returns:
+            Task results that are still cached
+        """
+        task_ids = [self._decode(task_id) for task_id in task_ids]
+        results = []
+        for start in range(0, len(task_ids), MGET_BATCH_SIZE):
+            batch = task_ids[start:start + MGET_BATCH_SIZE]
+            values = self.redis_client.mget([self._get_cache_key(task_id) for task_id in batch])
+            for task_id, value in zip(batch, values):
+                if not value:
+                    continue
+                try:
+                    results.append(TaskResult.from_dict(json.loads(value)))
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"Skipping unreadable task result {task_id}: {e}")
+        return results
+    
+    def _query_index(self, index_key: str, limit: Optional[int],
+                     since: Optional[datetime], until: Optional[datetime]) -> List[TaskResult]:
+        """Results from one index, newest first, optionally within ``[since, until]``."""
+        if not self._available():
+            return []
+        
+        if since is None and until is None:
+            task_ids = self.redis_client.zrevrange(index_key, 0, (limit or 0) - 1)
+        else:
+            task_ids = self.redis_client.zrevrangebyscore(
+                index_key,
+                _score(until) if until else '+inf',
+                _score(since) if since else '-inf',
+                start=0 if limit else None,
+                num=limit
+            )
+        return self.get_results(task_ids)
+    
+    def get_recent_results(self, limit: Optional[int] = 100, since: Optional[datetime] = None,
+                           until: Optional[datetime] = None) -> List[TaskResult]:
         """
         Get recent task results.
         
         Args:
-            limit: Maximum number of results to return
+            limit: Maximum number of results to return (None for all in range)
+            since: Only tasks started at or after this UTC time
+            until: Only tasks started at or before this UTC time
         
         Returns:
-            List of recent task results
+            List of recent task results, newest first
         """
         try:
-            if not self.redis_client or not self.redis_client.is_available():
-                return []
-            
-            # Get recent task IDs from index
-            task_ids = self.redis_client.zrevrange(self.index_key, 0, limit - 1)
-            
-            results = []
-            for task_id in task_ids:
-                if isinstance(task_id, bytes):
-                    task_id = task_id.decode('utf-8')
-                
-                task_result = self.get_result(task_id)
-                if task_result:
-                    results.append(task_result)
-            
-            return results
+            return self._query_index(self.index_key, limit, since, until)
             
         except Exception as e:
             logger.error(f"Failed to get recent task results: {e}")
             return []
     
-    def get_results_by_status(self, status: str, limit: int = 100) -> List[TaskResult]:
+    def get_results_by_status(self, status: str, limit: Optional[int] = 100,
+                              since: Optional[datetime] = None) -> List[TaskResult]:
         """
         Get task results by status.
         
         Args:
             status: Task status to filter by
             limit: Maximum number of results to return
+            since: Only tasks started at or after this UTC time
         
         Returns:
             List of task results with specified status
         """
         try:
-            recent_results = self.get_recent_results(limit * 2)  # Get more to filter
-            filtered_results = [r for r in recent_results if r.status == status]
-            return filtered_results[:limit]
+            results = self._query_index(self._status_index_key(status), limit, since, None)
+            # A result can change status between the index read and the MGET
+            return [r for r in results if r.status == status]
             
         except Exception as e:
             logger.error(f"Failed to get results by status {status}: {e}")
             return []
     
-    def cleanup_expired_results(self) -> int:
+    def get_results_by_task_name(self, task_name: str, limit: Optional[int] = 100,
+                                 since: Optional[datetime] = None) -> List[TaskResult]:
+        """
+        Get results of one task type.
+        
+        Args:
+            task_name: Registered task name
+            limit: Maximum number of results to return
+            since: Only tasks started at or after this UTC time
+        
+        Returns:
+            List of task results for that task
+        """
+        try:
+            return self._query_index(self._name_index_key(task_name), limit, since, None)
+            
+        except Exception as e:
+            logger.error(f"Failed to get results for task {task_name}: {e}")
+            return []
+    
+    def count_by_status(self, since: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Count indexed results per status without fetching them.
+        
+        Counts include index entries whose result has expired but has not
+        been pruned yet.
+        """
+        if not self._available():
+            return {}
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        for status in TASK_STATES:
+            pipe.zcount(self._status_index_key(status), _score(since) if since else '-inf', '+inf')
+        return {status: count for status, count in zip(TASK_STATES, pipe.execute()) if count}
+    
+    def cleanup_expired_results(self, budget: int = CLEANUP_BUDGET) -> int:
         """
         Clean up expired task results from index.
         
+        Expired entries are read from the expiry index in score order, so a
+        run touches only what has expired, at most ``budget`` entries; the
+        rest are left for the next run.  Any remaining budget goes to an
+        incremental scan for entries indexed before the expiry index existed.
+        
+        Args:
+            budget: Maximum number of index entries to examine
+        
         Returns:
             Number of expired results cleaned up
         """
         try:
-            if not self.redis_client or not self.redis_client.is_available():
+            if not self._available():
                 return 0
             
-            # Get all task IDs from index
-            all_task_ids = self.redis_client.zrange(self.index_key, 0, -1)
+            now = _score(None)
+            members = [self._decode(member) for member in
+                       self.redis_client.zrangebyscore(self.expiry_key, '-inf', now, start=0, num=budget)]
             
-            expired_count = 0
-            for task_id in all_task_ids:
-                if isinstance(task_id, bytes):
-                    task_id = task_id.decode('utf-8')
+            if members:
+                by_name: Dict[str, List[str]] = {}
+                for member in members:
+                    task_name, task_id = member.rsplit('|', 1)
+                    by_name.setdefault(task_name, []).append(task_id)
+                task_ids = [task_id for ids in by_name.values() for task_id in ids]
                 
-                cache_key = self._get_cache_key(task_id)
-                if not self.redis_client.exists(cache_key):
-                    # Remove from index if cache entry doesn't exist
-                    self.redis_client.zrem(self.index_key, task_id)
-                    expired_count += 1
+                pipe = self.redis_client.pipeline(transaction=False)
+                self._unindex(pipe, task_ids, by_name)
+                if len(members) < budget:
+                    # Everything expired is in hand: drop it in one command
+                    pipe.zremrangebyscore(self.expiry_key, '-inf', now)
+                else:
+                    pipe.zrem(self.expiry_key, *members)
+                pipe.execute()
+            
+            expired_count = len(members)
+            if budget - expired_count > 0:
+                expired_count += self._cleanup_legacy_entries(budget - expired_count)
             
             logger.info(f"Cleaned up {expired_count} expired task results")
             return expired_count
@@ -299,6 +548,43 @@ class TaskResultCache:
             logger.error(f"Failed to cleanup expired results: {e}")
             return 0
     
+    def _unindex(self, pipe, task_ids: List[str], ids_by_name: Dict[str, List[str]]) -> None:
+        """Queue removal of ``task_ids`` from the start-time indexes on ``pipe``."""
+        pipe.zrem(self.index_key, *task_ids)
+        for status in TASK_STATES:
+            pipe.zrem(self._status_index_key(status), *task_ids)
+        for task_name, ids in ids_by_name.items():
+            pipe.zrem(self._name_index_key(task_name), *ids)
+    
+    def _cleanup_legacy_entries(self, budget: int) -> int:
+        """
+        Check up to about ``budget`` members of the main index for results
+        that are gone, resuming the ``ZSCAN`` where the previous run stopped.
+        """
+        cursor = int(self.redis_client.get(self.legacy_cursor_key) or 0)
+        scanned = 0
+        expired: List[str] = []
+        while True:
+            cursor, entries = self.redis_client.zscan(self.index_key, cursor, count=budget - scanned)
+            task_ids = [self._decode(member) for member, _ in entries]
+            scanned += len(task_ids)
+            if task_ids:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for task_id in task_ids:
+                    pipe.exists(self._get_cache_key(task_id))
+                expired.extend(task_id for task_id, exists in zip(task_ids, pipe.execute()) if not exists)
+            if cursor == 0 or scanned >= budget:
+                break
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        if expired:
+            # The task name is unknown here, so every name index is pruned
+            names = [self._decode(name) for name in self.redis_client.smembers(self.names_key)]
+            self._unindex(pipe, expired, {name: expired for name in names})
+        pipe.set(self.legacy_cursor_key, cursor, ex=self.max_ttl * 2)
+        pipe.execute()
+        return len(expired)
+    
     def get_cache_stats(self) -> Dict[str, Any]:
         """
         Get cache statistics.
@@ -307,17 +593,14 @@ class TaskResultCache:
             Dictionary with cache statistics
         """
         try:
-            if not self.redis_client or not self.redis_client.is_available():
+            if not self._available():
                 return {'available': False}
             
             # Get total cached results
             total_results = self.redis_client.zcard(self.index_key)
             
-            # Get results by status
-            recent_results = self.get_recent_results(1000)  # Sample recent results
-            status_counts = {}
-            for result in recent_results:
-                status_counts[result.status] = status_counts.get(result.status, 0) + 1
+            # Counted from the status indexes, no results fetched
+            status_counts = self.count_by_status()
             
             return {
                 'available': True,
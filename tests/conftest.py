@@ -64,6 +64,13 @@ def db_session(app):
         db.session.remove()
         db.drop_all()
 
+    # Cached counters must not outlive the tables they were computed from
+    from services.notification_counters import notification_counters
+    notification_counters.clear()
+
+    from services.autosave import autosave_buffer
+    autosave_buffer.clear()
+
 
 @pytest.fixture
 def admin_user(db_session):
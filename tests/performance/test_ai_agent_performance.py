@@ -0,0 +1,47 @@
+"""
+AI agent performance tests for SAT Report Generator.
+"""
+import pytest
+import time
+
+from services.intent_classifier import intent_classifier
+
+
+@pytest.mark.performance
+class TestIntentClassifierPerformance:
+    """Micro-benchmark for the agent's per-message intent analysis."""
+
+    MESSAGES = [
+        "Please create a new SAT report for project ABC-123",
+        "How do I approve a report? The workflow is not working and it's urgent",
+        "Show me performance metrics and trends for last month",
+        "What is the best practice for SCADA alarm documentation?",
+        "Can you review and share this with the team, contact pm@example.com",
+        "System status check please, the export keeps failing with an error",
+    ]
+
+    def test_classify_throughput(self):
+        """Test that classifying a message stays well under the request budget."""
+        iterations = 2000
+        messages = self.MESSAGES * (iterations // len(self.MESSAGES))
+
+        start_time = time.perf_counter()
+        for message in messages:
+            intent_classifier.classify(message)
+        elapsed = time.perf_counter() - start_time
+
+        per_message_us = elapsed / len(messages) * 1_000_000
+        print(f"Classified {len(messages)} messages in {elapsed:.3f}s ({per_message_us:.1f}us/message)")
+        assert per_message_us < 500
+
+    def test_classify_scales_linearly_with_message_length(self):
+        """Test that long messages are not rescanned once per keyword."""
+        message = " ".join(self.MESSAGES) * 20
+
+        start_time = time.perf_counter()
+        for _ in range(100):
+            intent_classifier.classify(message)
+        elapsed = time.perf_counter() - start_time
+
+        print(f"Classified a {len(message)}-character message 100 times in {elapsed:.3f}s")
+        assert elapsed < 2.0
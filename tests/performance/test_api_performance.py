@@ -465,4 +465,47 @@ class TestAPIResourceUsage:
         
         # Should handle external service delays gracefully
         # Response time will be affected, but should not hang indefinitely
-        assert response_time < 10000, f"Request hung too long: {response_time:.2f}ms"
\ No newline at end of file
+        assert response_time < 10000, f"Request hung too long: {response_time:.2f}ms"
+
+@pytest.mark.performance
+class TestStreamingCompressionMemory:
+    """Test that response compression does not buffer whole bodies."""
+
+    def test_streamed_export_memory_is_bounded(self):
+        """Test that peak memory while compressing a streamed export stays flat."""
+        import tracemalloc
+        import zlib
+        from flask import Flask, Response
+        from middleware_optimized import StreamingCompressionMiddleware
+
+        row = b'1234,Example report title,2024-01-01,APPROVED,engineer@example.com\n'
+        rows_per_chunk = 100
+        chunks = 2000  # ~13 MB uncompressed
+
+        app = Flask(__name__)
+
+        @app.route('/export')
+        def export():
+            return Response((row * rows_per_chunk for _ in range(chunks)), mimetype='text/csv')
+
+        app.wsgi_app = StreamingCompressionMiddleware(app.wsgi_app)
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': '/export', 'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80', 'wsgi.url_scheme': 'http', 'HTTP_ACCEPT_ENCODING': 'gzip',
+            'wsgi.input': None, 'wsgi.errors': None,
+        }
+
+        compressed = []
+        tracemalloc.start()
+        try:
+            body = app.wsgi_app(environ, lambda status, headers, exc_info=None: None)
+            for data in body:
+                compressed.append(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        total = len(row) * rows_per_chunk * chunks
+        print(f"Compressed {total / 1e6:.1f} MB stream with peak {peak / 1e6:.2f} MB traced")
+        assert len(zlib.decompress(b''.join(compressed), 16 + zlib.MAX_WBITS)) == total
+        assert peak < total / 10
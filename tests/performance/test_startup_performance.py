@@ -0,0 +1,34 @@
+"""
+Startup performance tests for SAT Report Generator.
+"""
+import pytest
+
+from services.startup_profile import profile_startup
+
+
+@pytest.mark.performance
+class TestStartupPerformance:
+    """Guard application cold start against regressions."""
+
+    def test_create_app_records_timeline(self, app):
+        """Test that app creation records its phases and stays within budget."""
+        timeline = app.startup_timeline
+        phases = [phase for phase, _ in timeline.phases]
+
+        assert phases[0] == 'config'
+        assert 'blueprints' in phases
+        assert timeline.total == pytest.approx(sum(seconds for _, seconds in timeline.phases))
+        assert timeline.total < app.config['STARTUP_BUDGET_SECONDS']
+
+    def test_cold_start_within_budget(self, app):
+        """Test that creating the app in a fresh interpreter stays within budget."""
+        budget = app.config['STARTUP_BUDGET_SECONDS']
+        profile = profile_startup('testing')
+
+        print(f"Cold start: create_app() took {profile['create_app_seconds']:.2f}s (budget {budget}s)")
+        for package, self_us in profile['packages'][:10]:
+            print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+        assert profile['create_app_seconds'] < budget
+        # AI and MCP services are built on first use, never during startup
+        assert not any(profile['singletons'].values())
@@ -68,6 +68,8 @@ class TestTaskResultCache:
         redis_mock.zrevrange.return_value = []
         redis_mock.exists.return_value = True
         redis_mock.zrem.return_value = True
+        redis_mock.mget.return_value = []
+        redis_mock.pipeline.return_value.execute.return_value = [True]
         return redis_mock
     
     @pytest.fixture
@@ -112,8 +114,114 @@ class TestTaskResultCache:
         success = cache.store_result(task_result)
         
         assert success is True
-        mock_redis.setex.assert_called_once()
-        mock_redis.zadd.assert_called_once()
+        # Result and index updates go out in one pipelined round trip
+        pipe = mock_redis.pipeline.return_value
+        pipe.setex.assert_called_once()
+        pipe.execute.assert_called_once()
+        indexed = {call.args[0] for call in pipe.zadd.call_args_list}
+        assert indexed == {
+            'task_results_index',
+            'task_results_index:status:SUCCESS',
+            'task_results_index:name:test_task',
+            'task_results_index:expiry',
+        }
+        removed = {call.args[0] for call in pipe.zrem.call_args_list}
+        assert 'task_results_index:status:PROGRESS' in removed
+        assert 'task_results_index:status:SUCCESS' not in removed
+    
+    def test_recent_results_use_batched_mget(self, cache, mock_redis):
+        """Test that listings fetch results with MGET instead of a GET per task."""
+        results = [
+            TaskResult(task_id=f'task-{i}', task_name='test_task', status='SUCCESS')
+            for i in range(3)
+        ]
+        mock_redis.zrevrangebyscore.return_value = [r.task_id for r in results] + ['expired']
+        mock_redis.mget.return_value = [json.dumps(r.to_dict()) for r in results] + [None]
+        
+        since = datetime.utcnow() - timedelta(hours=24)
+        retrieved = cache.get_recent_results(limit=None, since=since)
+        
+        assert [r.task_id for r in retrieved] == ['task-0', 'task-1', 'task-2']
+        mock_redis.mget.assert_called_once()
+        mock_redis.get.assert_not_called()
+        args = mock_redis.zrevrangebyscore.call_args
+        assert args.args[0] == 'task_results_index'
+        assert args.args[1] == '+inf'
+    
+    def test_finished_tasks_update_metric_buckets_once(self, cache, mock_redis):
+        """Test that completion counts a run into its bucket in the same transaction."""
+        started = datetime.utcnow() - timedelta(seconds=90)
+        running = TaskResult(task_id='test-123', task_name='test_task', status='PROGRESS',
+                             started_at=started)
+        mock_redis.get.return_value = json.dumps(running.to_dict())
+        
+        assert cache.mark_completed('test-123', {'output': 'ok'}) is True
+        
+        mock_redis.pipeline.assert_called_with(transaction=True)
+        pipe = mock_redis.pipeline.return_value
+        key = f"task_metrics:{TaskResultCache.bucket_start(started)}"
+        pipe.hincrby.assert_any_call(key, 'test_task|SUCCESS', 1)
+        pipe.hincrby.assert_any_call(key, 'test_task|le|120', 1)
+        assert pipe.hincrbyfloat.call_args.args[:2] == (key, 'test_task|time_sum')
+        
+        # A second end-of-task signal for the same run is not counted again
+        pipe.reset_mock()
+        finished = TaskResult(task_id='test-123', task_name='test_task', status='SUCCESS',
+                              started_at=started, completed_at=datetime.utcnow())
+        mock_redis.get.return_value = json.dumps(finished.to_dict())
+        assert cache.mark_failed('test-123', 'late failure signal') is True
+        pipe.hincrby.assert_not_called()
+    
+    def test_concurrent_end_reports_count_once(self, cache, mock_redis):
+        """Test that two end reports that both read a running task count it once."""
+        running = TaskResult(task_id='test-123', task_name='test_task', status='PROGRESS',
+                             started_at=datetime.utcnow())
+        mock_redis.get.return_value = json.dumps(running.to_dict())
+        # Only the first SET NX on the run's marker succeeds
+        mock_redis.set.side_effect = [True, None]
+        pipe = mock_redis.pipeline.return_value
+        
+        assert cache.mark_failed('test-123', 'worker lost') is True
+        assert cache.mark_completed('test-123', {'output': 'ok'}) is True
+        
+        assert pipe.hincrby.call_args_list[0].args[1] == 'test_task|FAILURE'
+        assert not any(call.args[1] == 'test_task|SUCCESS' for call in pipe.hincrby.call_args_list)
+        assert mock_redis.set.call_args.args[0] == 'task_metrics:counted:test-123'
+        assert mock_redis.set.call_args.kwargs['nx'] is True
+    
+    def test_cleanup_reads_expiry_index(self, cache, mock_redis):
+        """Test that cleanup removes expired entries without checking every member."""
+        mock_redis.zrangebyscore.return_value = ['test_task|task-1', 'other_task|task-2']
+        mock_redis.get.return_value = None
+        mock_redis.zscan.return_value = (0, [('legacy-1', 1.0), ('live-1', 2.0)])
+        mock_redis.smembers.return_value = {'test_task'}
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.side_effect = [[], [False, True], []]
+        
+        cleaned = cache.cleanup_expired_results(budget=10)
+        
+        assert cleaned == 3
+        mock_redis.zrange.assert_not_called()
+        assert mock_redis.zrangebyscore.call_args.kwargs == {'start': 0, 'num': 10}
+        pipe.zremrangebyscore.assert_called_once()
+        assert pipe.zremrangebyscore.call_args.args[0] == 'task_results_index:expiry'
+        pipe.zrem.assert_any_call('task_results_index:name:test_task', 'task-1')
+        pipe.zrem.assert_any_call('task_results_index:name:other_task', 'task-2')
+        pipe.zrem.assert_any_call('task_results_index', 'legacy-1')
+        # The legacy scan only got the budget left after the expiry index
+        assert mock_redis.zscan.call_args.kwargs == {'count': 8}
+        pipe.set.assert_called_once_with('task_results_index:cleanup_cursor', 0, ex=cache.max_ttl * 2)
+    
+    def test_results_by_status_read_status_index(self, cache, mock_redis):
+        """Test that status queries read the status index rather than over-fetching."""
+        result = TaskResult(task_id='task-1', task_name='test_task', status='FAILURE')
+        mock_redis.zrevrange.return_value = ['task-1']
+        mock_redis.mget.return_value = [json.dumps(result.to_dict())]
+        
+        retrieved = cache.get_results_by_status('FAILURE', limit=10)
+        
+        assert [r.task_id for r in retrieved] == ['task-1']
+        mock_redis.zrevrange.assert_called_once_with('task_results_index:status:FAILURE', 0, 9)
     
     def test_get_result(self, cache, mock_redis):
         """Test retrieving task result from cache."""
@@ -147,7 +255,7 @@ class TestTaskResultCache:
         
         assert success is True
         # Should call setex to update the cached result
-        assert mock_redis.setex.call_count >= 1
+        assert mock_redis.pipeline.return_value.setex.call_count >= 1
     
     def test_mark_completed(self, cache, mock_redis):
         """Test marking task as completed."""
@@ -162,7 +270,7 @@ class TestTaskResultCache:
         success = cache.mark_completed('test-123', result_data)
         
         assert success is True
-        mock_redis.setex.assert_called()
+        mock_redis.pipeline.return_value.setex.assert_called()
     
     def test_mark_failed(self, cache, mock_redis):
         """Test marking task as failed."""
@@ -176,7 +284,7 @@ class TestTaskResultCache:
         success = cache.mark_failed('test-123', 'Test error', retries=2)
         
         assert success is True
-        mock_redis.setex.assert_called()
+        mock_redis.pipeline.return_value.setex.assert_called()
     
     def test_cache_unavailable(self):
         """Test cache behavior when Redis is unavailable."""
@@ -302,6 +410,14 @@ class TestTaskMonitoring:
                 completed_at=datetime.utcnow() - timedelta(minutes=15)
             )
         ]
+        # The same two runs as pre-aggregated bucket counters
+        bucket = TaskResultCache.bucket_start(datetime.utcnow() - timedelta(minutes=30))
+        cache_mock.get_metric_buckets.return_value = {
+            bucket: {'test_task': {'SUCCESS': 1, 'FAILURE': 1, 'time_sum': 600.0,
+                                   'time_count': 2, 'le|300': 2}}
+        }
+        cache_mock.count_by_status.return_value = {'PROGRESS': 1}
+        cache_mock.bucket_start.side_effect = TaskResultCache.bucket_start
         return cache_mock
     
     @pytest.fixture
@@ -314,12 +430,15 @@ class TestTaskMonitoring:
         """Test overall metrics calculation."""
         metrics = monitor.get_overall_metrics(24)
         
-        assert metrics.total_tasks == 2
+        assert metrics.total_tasks == 3
         assert metrics.successful_tasks == 1
         assert metrics.failed_tasks == 1
-        assert metrics.success_rate == 50.0
-        assert metrics.failure_rate == 50.0
-        assert metrics.avg_execution_time > 0
+        assert metrics.in_progress_tasks == 1
+        assert metrics.success_rate == pytest.approx(100 / 3)
+        assert metrics.failure_rate == pytest.approx(100 / 3)
+        assert metrics.avg_execution_time == 300.0
+        # Read from the buckets, not by re-scanning cached results
+        monitor.result_cache.get_recent_results.assert_not_called()
     
     def test_task_type_metrics(self, monitor):
         """Test task type metrics calculation."""
@@ -330,6 +449,15 @@ class TestTaskMonitoring:
         assert metrics.total_tasks == 2
         assert metrics.successful_tasks == 1
         assert metrics.failed_tasks == 1
+        assert metrics.latency_histogram == {'300': 2}
+    
+    def test_performance_trends_from_buckets(self, monitor):
+        """Test that trend intervals sum the metric buckets they cover."""
+        trends = monitor.get_performance_trends(hours=2, interval_minutes=60)
+        
+        assert sum(trends['total_tasks']) == 2
+        assert sum(trends['failed_tasks']) == 1
+        assert len(trends['timestamps']) in (2, 3)
     
     @patch('tasks.monitoring.get_celery_app')
     def test_worker_metrics(self, mock_get_celery, monitor):
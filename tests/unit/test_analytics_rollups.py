@@ -0,0 +1,100 @@
+"""
+Unit tests for the analytics rollups.
+"""
+import json
+from unittest.mock import MagicMock
+from models import Report
+
+
+class TestAnalyticsRollups:
+    """Test cases for the materialised analytics rollups."""
+
+    def _add_reports(self, db_session):
+        from datetime import datetime, timedelta
+
+        now = datetime.utcnow()
+        specs = [
+            ('r-1', 'SAT', 'DRAFT', 'Acme', 0),
+            ('r-2', 'SAT', 'SUBMITTED', 'Acme', 1),
+            ('r-3', 'FDS', 'TECH_APPROVED', 'Globex', 3),
+            ('r-4', 'SAT', 'REJECTED', None, 3),
+            ('r-5', 'HDS', 'COMPLETED', 'Acme', 45),
+        ]
+        for report_id, report_type, status, client, age_days in specs:
+            created = now - timedelta(days=age_days, hours=2)
+            approvals = [{'stage': 1, 'status': 'approved', 'timestamp': (created + timedelta(hours=5)).isoformat()}]
+            db_session.add(Report(
+                id=report_id, type=report_type, status=status, client_name=client,
+                user_email='engineer@example.com', created_at=created, updated_at=created + timedelta(hours=8),
+                approvals_json=json.dumps(approvals) if status in ('TECH_APPROVED', 'COMPLETED') else None,
+            ))
+        db_session.commit()
+
+    def test_backfilled_rollups_match_raw_scan(self, app, db_session):
+        """Test that rollup-based metrics equal the raw-table computation."""
+        from models import db
+        from services.analytics_rollups import (
+            backfill, report_metrics, report_metrics_raw, rollups_ready,
+            window_start, workflow_metrics, workflow_metrics_raw,
+        )
+
+        self._add_reports(db_session)
+        assert not rollups_ready()
+        with db.engine.begin() as connection:
+            backfill(connection)
+        assert rollups_ready()
+
+        for days in (1, 7, 60):
+            start = window_start(days)
+            assert report_metrics(start) == report_metrics_raw(start)
+            assert report_metrics(start, 'hour') == report_metrics_raw(start, 'hour')
+            assert workflow_metrics(start) == workflow_metrics_raw(start)
+
+        metrics = report_metrics(window_start(7))
+        assert metrics['total_reports'] == 4
+        assert metrics['top_clients'][0] == {'client': 'Acme', 'count': 2}
+        assert metrics['avg_approval_time_hours'] == 8.0
+        assert workflow_metrics(window_start(60))['avg_tm_approval_hours'] == 5.0
+
+    def test_status_transitions_refresh_rollups(self, app, db_session):
+        """Test that report changes keep the rollups current without a rebuild."""
+        from models import db
+        from services.analytics_rollups import (
+            backfill, report_metrics, report_metrics_raw, window_start, workflow_metrics, workflow_metrics_raw,
+        )
+
+        self._add_reports(db_session)
+        with db.engine.begin() as connection:
+            backfill(connection)
+
+        report = db_session.get(Report, 'r-2')
+        report.status = 'TECH_APPROVED'
+        db_session.add(Report(id='r-6', type='SAT', status='SUBMITTED', client_name='Initech',
+                              user_email='engineer@example.com'))
+        db_session.delete(db_session.get(Report, 'r-1'))
+        db_session.commit()
+
+        start = window_start(7)
+        metrics = report_metrics(start)
+        assert metrics == report_metrics_raw(start)
+        assert {'status': 'TECH_APPROVED', 'count': 2} in metrics['status_distribution']
+        assert metrics['total_reports'] == 4
+        assert workflow_metrics(start) == workflow_metrics_raw(start)
+
+    def test_rebuild_locks_days_in_order_on_postgresql(self):
+        """Test that PostgreSQL rebuilds take a per-day advisory lock before reading the day."""
+        from datetime import date
+        from services.analytics_rollups import rebuild_days
+
+        connection = MagicMock()
+        connection.dialect.name = 'postgresql'
+        connection.execute.return_value.all.return_value = []
+
+        rebuild_days(connection, [date(2024, 1, 2), date(2024, 1, 1)])
+
+        statements = [str(call.args[0]) for call in connection.execute.call_args_list]
+        locks = [call.args[1]['day'] for call in connection.execute.call_args_list
+                 if 'pg_advisory_xact_lock' in str(call.args[0])]
+        assert locks == [date(2024, 1, 1).toordinal(), date(2024, 1, 2).toordinal()]
+        assert 'pg_advisory_xact_lock' in statements[0]
+        assert statements[1].startswith('SELECT reports.created_at')
@@ -0,0 +1,45 @@
+"""
+Unit tests for the incremental autosave buffer.
+"""
+import json
+import pytest
+from models import SATReport
+from services.autosave import AutosaveBuffer, AutosaveConflict
+
+
+class TestAutosaveBuffer:
+    """Test cases for autosave drafts shared between worker processes."""
+
+    def test_revision_issued_by_another_worker_is_accepted(self, app, db_session):
+        """Test that a worker behind the client catches up instead of returning a conflict."""
+        worker_a = AutosaveBuffer(write_interval=0)
+        worker_b = AutosaveBuffer(write_interval=0)
+
+        with app.app_context():
+            first = worker_a.save('multi-1', 'a@test.com', {'DOCUMENT_TITLE': 'One'}, base_revision=0)
+            # Worker B loads the draft now, then falls behind worker A
+            worker_b.save('multi-1', 'a@test.com', {}, base_revision=first['revision'])
+            second = worker_a.save('multi-1', 'a@test.com', {'PURPOSE': 'Two'}, base_revision=first['revision'])
+
+            third = worker_b.save('multi-1', 'a@test.com', {'SCOPE': 'Three'}, base_revision=second['revision'])
+            assert third['revision'] == second['revision'] + 1
+
+            fourth = worker_a.save('multi-1', 'a@test.com', {'DATE': 'Four'}, base_revision=third['revision'])
+            assert fourth['revision'] == third['revision'] + 1
+
+            sat_report = SATReport.query.filter_by(report_id='multi-1').first()
+            context = json.loads(sat_report.data_json)['context']
+            assert context['DOCUMENT_TITLE'] == 'One'
+            assert context['PURPOSE'] == 'Two'
+            assert context['SCOPE'] == 'Three'
+            assert context['DATE'] == 'Four'
+
+    def test_stale_base_revision_conflicts(self, app, db_session):
+        """Test that a base older than the draft is still rejected."""
+        buffer = AutosaveBuffer(write_interval=0)
+
+        with app.app_context():
+            buffer.save('multi-2', 'a@test.com', {'DOCUMENT_TITLE': 'One'}, base_revision=0)
+            with pytest.raises(AutosaveConflict) as excinfo:
+                buffer.save('multi-2', 'a@test.com', {'PURPOSE': 'Stale'}, base_revision=0)
+            assert excinfo.value.revision == 1
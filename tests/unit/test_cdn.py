@@ -0,0 +1,98 @@
+"""
+Unit tests for CDN asset sync.
+"""
+from unittest.mock import patch
+
+
+class TestCDNSync:
+    """Test cases for incremental CDN asset sync."""
+
+    class FakeS3:
+        """In-memory stand-in for the S3 client."""
+
+        def __init__(self):
+            self.objects = {}
+            self.uploads = []
+
+        def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+            self.objects[(bucket, key)] = fileobj.read()
+            self.uploads.append(key)
+
+    class FakeCloudFront:
+        def __init__(self):
+            self.invalidations = []
+
+        def create_invalidation(self, DistributionId, InvalidationBatch):
+            self.invalidations.append(InvalidationBatch['Paths']['Items'])
+            return {'Invalidation': {'Id': f'I{len(self.invalidations)}'}}
+
+    def test_sync_uploads_only_changed_files(self, tmp_path):
+        """Test that a re-sync skips unchanged files and invalidates replaced ones in one batch."""
+        from flask import Flask
+        from cache.cdn import CDNManager
+
+        static = tmp_path / 'static'
+        (static / 'css').mkdir(parents=True)
+        (static / 'css' / 'main.css').write_text('body {}')
+        (static / 'app.js').write_text('console.log(1)')
+        (static / '.DS_Store').write_text('')
+
+        with patch.object(CDNManager, '_init_aws_clients'):
+            manager = CDNManager({
+                'enabled': True, 'provider': 'cloudfront', 'base_url': 'https://cdn.test',
+                's3_bucket': 'assets', 'distribution_id': 'D1', 'auto_version': False,
+                'sync_manifest': str(tmp_path / 'manifest.json'),
+            })
+        manager.s3_client, manager.cloudfront_client = self.FakeS3(), self.FakeCloudFront()
+
+        with Flask(__name__, static_folder=str(static)).app_context():
+            first = manager.sync_static_assets(str(static))
+            assert (first['uploaded'], first['skipped'], first['invalidated']) == (2, 1, 0)
+
+            second = manager.sync_static_assets(str(static))
+            assert (second['uploaded'], second['unchanged']) == (0, 2)
+
+            (static / 'app.js').write_text('console.log(2)')
+            (static / 'logo.svg').write_text('<svg/>')
+            third = manager.sync_static_assets(str(static))
+
+            assert third['uploaded'] == 2 and third['unchanged'] == 1
+            assert sorted(manager.s3_client.uploads) == ['app.js', 'app.js', 'css/main.css', 'logo.svg']
+            assert manager.s3_client.objects[('assets', 'app.js')] == b'console.log(2)'
+            assert manager.cloudfront_client.invalidations == [['/app.js']]
+
+            # A forced sync re-uploads everything and invalidates every path
+            forced = manager.sync_static_assets(str(static), force=True)
+
+        assert (forced['uploaded'], forced['unchanged'], forced['invalidated']) == (3, 0, 3)
+        assert sorted(manager.cloudfront_client.invalidations[-1]) == ['/app.js', '/css/main.css', '/logo.svg']
+
+    def test_failed_invalidation_is_retried_next_sync(self, tmp_path):
+        """Test that replaced paths stay pending until an invalidation succeeds."""
+        from flask import Flask
+        from cache.cdn import CDNManager
+
+        static = tmp_path / 'static'
+        static.mkdir()
+        (static / 'app.js').write_text('console.log(1)')
+
+        with patch.object(CDNManager, '_init_aws_clients'):
+            manager = CDNManager({
+                'enabled': True, 'provider': 'cloudfront', 'base_url': 'https://cdn.test',
+                's3_bucket': 'assets', 'distribution_id': 'D1', 'auto_version': False,
+                'sync_manifest': str(tmp_path / 'manifest.json'),
+            })
+        manager.s3_client, manager.cloudfront_client = self.FakeS3(), self.FakeCloudFront()
+
+        with Flask(__name__, static_folder=str(static)).app_context():
+            manager.sync_static_assets(str(static))
+
+            (static / 'app.js').write_text('console.log(2)')
+            with patch.object(manager.cloudfront_client, 'create_invalidation', side_effect=RuntimeError('throttled')):
+                failed = manager.sync_static_assets(str(static))
+            assert (failed['uploaded'], failed['invalidated'], failed['invalidation_pending']) == (1, 0, 1)
+
+            retried = manager.sync_static_assets(str(static))
+
+        assert (retried['uploaded'], retried['unchanged'], retried['invalidated']) == (0, 1, 1)
+        assert manager.cloudfront_client.invalidations == [['/app.js']]
@@ -0,0 +1,20 @@
+"""
+Unit tests for the AI conversation store.
+"""
+
+
+class TestConversationStore:
+    """Test cases for the AI conversation store."""
+
+    def test_history_is_bounded_and_summarised(self):
+        """Test that old messages are folded into the summary."""
+        from services.conversation_store import ConversationStore
+
+        store = ConversationStore(max_messages=3)
+        history = [{'type': 'user_message', 'content': f'message {i}'} for i in range(5)]
+        store.save('user-1', 'conv-1', {'conversation_history': history})
+
+        state = store.load('user-1', 'conv-1')
+        assert [m['content'] for m in state['conversation_history']] == ['message 2', 'message 3', 'message 4']
+        assert state['conversation_summary'] == 'User: message 0\nUser: message 1'
+        assert store.load('user-2', 'conv-1') is None
@@ -0,0 +1,48 @@
+"""
+Unit tests for the Server-Sent Events bus.
+"""
+import time
+
+import pytest
+
+from services.event_bus import EventBus, open_stream, stream_slots
+
+
+class TestEventStreams:
+    """Test cases for stream lifetime and the per-process stream cap."""
+
+    @pytest.fixture(autouse=True)
+    def _slots(self):
+        limit = stream_slots.limit
+        stream_slots.limit = 1
+        yield
+        stream_slots.limit = limit
+        stream_slots.active = 0
+
+    def test_streams_end_after_max_duration(self):
+        """Test that a quiet stream ends on time instead of waiting out a heartbeat."""
+        bus = EventBus()
+        started = time.monotonic()
+        frames = list(open_stream(bus.subscribe('user:a'), heartbeat_seconds=20, max_duration=0.2))
+
+        assert time.monotonic() - started < 2
+        assert frames[0].startswith('event: ready')
+        assert stream_slots.active == 0
+        assert bus.subscriber_count() == 0
+
+    def test_streams_beyond_the_cap_are_told_to_retry(self):
+        """Test that a stream over the cap gets its initial state and a busy event."""
+        bus = EventBus()
+        held = open_stream(bus.subscribe('user:a'), heartbeat_seconds=0.05, max_duration=5)
+        assert next(held).startswith('event: ready')
+        assert stream_slots.active == 1
+
+        refused = list(open_stream(bus.subscribe('user:b'), initial_frames=['event: state\ndata: {}\n\n']))
+        assert refused[0].startswith('event: state')
+        assert refused[1].startswith('event: busy')
+        assert 'retry: ' in refused[1]
+        assert bus.subscriber_count() == 1
+
+        held.close()
+        assert stream_slots.active == 0
+        assert bus.subscriber_count() == 0
@@ -0,0 +1,116 @@
+"""
+Unit tests for the streaming export engine.
+"""
+import json
+from models import Report
+
+
+class TestExportEngine:
+    """Test cases for the streaming export engine."""
+
+    def test_csv_and_ndjson_are_chunked_by_batch(self):
+        """Test that writers emit one chunk per batch of rows."""
+        import csv
+        import io
+        from services.export_engine import iter_csv, iter_ndjson
+
+        rows = [[i, f'name {i}'] for i in range(5)]
+
+        chunks = list(iter_csv(['ID', 'Name'], iter(rows), batch_size=2))
+        assert len(chunks) == 3
+        parsed = list(csv.reader(io.StringIO(''.join(chunks))))
+        assert parsed[0] == ['ID', 'Name'] and parsed[-1] == ['4', 'name 4']
+
+        lines = ''.join(iter_ndjson(['ID', 'Name'], iter(rows), batch_size=2)).splitlines()
+        assert [json.loads(line)['ID'] for line in lines] == [0, 1, 2, 3, 4]
+
+    def test_analytics_export_streams_rows(self, app, db_session):
+        """Test that the analytics export is a streamed response over the selected rows."""
+        import csv
+        import io
+        from services.export_engine import export_response
+
+        for i in range(25):
+            db_session.add(Report(id=f'export-{i}', type='SAT', user_email='engineer@example.com',
+                                  document_title=f'Report {i}'))
+        db_session.commit()
+
+        app.config['EXPORT_BATCH_SIZE'] = 10
+        with app.test_request_context('/analytics/api/export-analytics'):
+            response = export_response('analytics', {'days': 30}, fmt='csv', background=False)
+            assert response.is_streamed
+            body = response.get_data(as_text=True)
+
+        rows = list(csv.reader(io.StringIO(body)))
+        assert rows[0][:3] == ['Report ID', 'Type', 'Title']
+        assert sorted(row[0] for row in rows[1:]) == sorted(f'export-{i}' for i in range(25))
+
+    def test_unknown_format_is_rejected(self, app):
+        """Test that unsupported formats return 400 before touching the database."""
+        from services.export_engine import export_response
+
+        with app.test_request_context('/analytics/api/export-analytics'):
+            response, status = export_response('analytics', {'days': 30}, fmt='pdf')
+        assert status == 400
+
+    def test_xlsx_file_removed_after_response_closes(self, app, db_session):
+        """Test that the temporary XLSX file is only deleted once the response is closed."""
+        import os
+        from unittest.mock import patch
+        from services.export_engine import export_response
+
+        written = []
+
+        def fake_write_xlsx(headers, rows, path, title='Export'):
+            with open(path, 'wb') as f:
+                f.write(b'xlsx-bytes')
+            written.append(path)
+
+        with app.test_request_context('/analytics/api/export-analytics'):
+            with patch('services.export_engine.write_xlsx', side_effect=fake_write_xlsx):
+                response = export_response('analytics', {'days': 30}, fmt='xlsx', background=False)
+            response.direct_passthrough = False
+            assert response.get_data() == b'xlsx-bytes'
+            assert os.path.exists(written[0])
+            response.close()
+
+        assert not os.path.exists(written[0])
+
+    def test_failed_background_export_is_reported(self, app, tmp_path):
+        """Test that the download link reports a failed export instead of pending forever."""
+        from services.export_engine import download_response, mark_export_failed
+
+        app.config['EXPORT_OUTPUT_DIR'] = str(tmp_path)
+        export_id = 'a' * 32
+        with app.test_request_context(f'/analytics/api/export-analytics/{export_id}'):
+            response, status = download_response('analytics', export_id)
+            assert response.get_json()['status'] == 'pending'
+
+            mark_export_failed(export_id, 'csv', 'database went away')
+            response, status = download_response('analytics', export_id)
+
+        assert status == 500
+        assert response.get_json()['status'] == 'failed'
+        assert response.get_json()['error'] == 'database went away'
+
+    def test_cleanup_removes_exports_past_retention(self, app, tmp_path):
+        """Test that only export files older than the retention period are removed."""
+        import os
+        import time
+        from services.export_engine import cleanup_exports
+
+        app.config['EXPORT_OUTPUT_DIR'] = str(tmp_path)
+        old = tmp_path / f"{'b' * 32}.csv"
+        failed = tmp_path / f"{'c' * 32}.xlsx.failed"
+        fresh = tmp_path / f"{'d' * 32}.csv"
+        unrelated = tmp_path / 'notes.txt'
+        for path in (old, failed, fresh, unrelated):
+            path.write_text('x')
+        two_days_ago = time.time() - 48 * 3600
+        for path in (old, failed, unrelated):
+            os.utime(path, (two_days_ago, two_days_ago))
+
+        with app.app_context():
+            assert cleanup_exports(max_age_hours=24) == 2
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted([fresh.name, unrelated.name])
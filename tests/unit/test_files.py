@@ -0,0 +1,107 @@
+"""
+Unit tests for the file manager's upload index.
+"""
+import pytest
+import os
+
+
+class TestUploadedFileIndex:
+    """Test cases for database-backed upload metadata and blob deduplication."""
+
+    def _upload(self, manager, data, filename='notes.txt', report_id=None):
+        from io import BytesIO
+        from werkzeug.datastructures import FileStorage
+
+        storage = FileStorage(stream=BytesIO(data), filename=filename, content_type='text/plain')
+        metadata, error = manager.save_file(storage, report_id)
+        assert error is None
+        return metadata
+
+    def _manager(self, app, tmp_path):
+        from api.files import FileManager
+
+        manager = FileManager()
+        manager.upload_folder = str(tmp_path / 'uploads')
+        return manager
+
+    def test_identical_uploads_share_a_blob(self, app, db_session, tmp_path):
+        """Test that identical content is stored once and removed with its last reference."""
+        from models import UploadedFile
+
+        with app.test_request_context():
+            manager = self._manager(app, tmp_path)
+            first = self._upload(manager, b'same content', report_id='r-1')
+            second = self._upload(manager, b'same content', 'copy.txt')
+            other = self._upload(manager, b'different content')
+
+            assert first['file_path'] == second['file_path'] != other['file_path']
+            assert first['sha256'] == second['sha256']
+            assert len(list((tmp_path / 'uploads' / 'blobs').rglob('*.txt'))) == 2
+
+            record = db_session.get(UploadedFile, first['file_id'])
+            assert (record.report_id, record.size, record.mime_type) == ('r-1', 12, 'text/plain')
+            assert manager.get_file(first['file_id'], report_id='r-2') is None
+
+            assert manager.delete_file(first['file_id'])
+            assert manager.sweep_blobs() == 0
+            assert os.path.exists(second['file_path'])
+            assert manager.delete_file(second['file_id'])
+            assert os.path.exists(second['file_path'])
+            assert manager.get_file_path(second['file_id']) is None
+
+            # Blobs go in the sweep once nothing refers to them
+            assert manager.sweep_blobs() == 1
+            assert not os.path.exists(second['file_path'])
+            assert os.path.exists(other['file_path'])
+
+    def test_sweep_keeps_blob_referenced_during_sweep(self, app, db_session, tmp_path):
+        """Test that a reference committed while the sweep runs keeps its blob."""
+        from unittest.mock import patch
+        from api.files import FileManager
+
+        with app.test_request_context():
+            manager = self._manager(app, tmp_path)
+            first = self._upload(manager, b'shared content')
+            manager.delete_file(first['file_id'])
+
+            # The first check finds no reference; a new upload commits before the second
+            original = FileManager._blob_referenced
+            checks = []
+
+            def referenced(blob_name):
+                checks.append(blob_name)
+                if len(checks) == 2:
+                    self._upload(manager, b'shared content')
+                return original(blob_name)
+
+            with patch.object(FileManager, '_blob_referenced', side_effect=referenced):
+                assert manager.sweep_blobs() == 0
+            assert os.path.exists(first['file_path'])
+
+    def test_listing_pages_with_keyset_cursor(self, app, db_session, tmp_path):
+        """Test that cursor pages cover every upload once, newest first."""
+        from datetime import datetime, timedelta
+        from models import UploadedFile
+
+        created = datetime(2024, 1, 1)
+        for i in range(5):
+            db_session.add(UploadedFile(id=f'f-{i}', filename=f'{i}.txt', sha256='0' * 64, size=1,
+                                        report_id='r-1' if i % 2 else None,
+                                        created_at=created + timedelta(minutes=i // 2)))
+        db_session.commit()
+
+        with app.test_request_context():
+            manager = self._manager(app, tmp_path)
+            seen, cursor = [], None
+            while True:
+                records, total, cursor = manager.list_files(per_page=2, cursor=cursor)
+                seen.extend(record.id for record in records)
+                assert total == 5
+                if cursor is None:
+                    break
+
+            assert seen == ['f-4', 'f-3', 'f-2', 'f-1', 'f-0']
+            records, total, cursor = manager.list_files('r-1', per_page=2)
+            assert ([r.id for r in records], total, cursor) == (['f-3', 'f-1'], 2, None)
+            with pytest.raises(ValueError):
+                manager.list_files(cursor='not-a-cursor')
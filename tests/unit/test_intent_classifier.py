@@ -0,0 +1,51 @@
+"""
+Unit tests for the intent classifier.
+"""
+import pytest
+
+
+class TestIntentClassifier:
+    """Test cases for the compiled intent classifier."""
+
+    def test_keywords_match_whole_words_only(self):
+        """Test that keywords inside longer words do not count."""
+        from services.intent_classifier import intent_classifier
+
+        result = intent_classifier.classify('I know the prefix of the showcase')
+        assert result['intents']['get_help']['confidence'] == 0
+        assert result['intents']['troubleshooting']['confidence'] == 0
+        assert result['urgency'] == 'low'
+
+    def test_scores_inflections_phrases_and_entities_in_one_pass(self):
+        """Test that one call returns every score the agent routes on."""
+        from services.intent_classifier import intent_classifier
+
+        result = intent_classifier.classify(
+            'Reports for PRJ-001 are not working, errors since 12/10/2024. Urgent, fix it now!'
+        )
+        assert result['intents']['troubleshooting']['confidence'] == pytest.approx(0.9)
+        assert result['intents']['create_report']['confidence'] == pytest.approx(0.4)
+        assert result['urgency'] == 'high'
+        assert result['entities'] == {'project_references': ['PRJ-001'], 'dates': ['12/10/2024']}
+
+        knowledge = intent_classifier.classify('What is the best practice here?')['intents']
+        assert knowledge['knowledge_query']['confidence'] == pytest.approx(0.5)
+        assert knowledge['get_help']['confidence'] == pytest.approx(0.2)
+
+    @pytest.mark.parametrize('message, intents', [
+        ('I fixed the wiring', ['troubleshooting']),
+        ('fixing the report', ['troubleshooting', 'create_report']),
+        ('There are bugs in the export', ['troubleshooting']),
+        ('The health checks failed', ['system_operation']),
+        ('She made a new form', ['create_report']),
+        ('He was showing me the trends', ['get_help', 'analyze_data']),
+        ('The team reviewed and approved the steps', ['collaboration', 'workflow_assistance']),
+        ('Generated documents are missing', ['create_report']),
+    ])
+    def test_inflected_keywords_still_score(self, message, intents):
+        """Test phrases the old substring matching scored keep scoring the same intents."""
+        from services.intent_classifier import intent_classifier
+
+        result = intent_classifier.classify(message)['intents']
+        for intent in intents:
+            assert result[intent]['confidence'] > 0, intent
@@ -0,0 +1,95 @@
+"""
+Unit tests for the MCP integration client.
+"""
+import pytest
+from unittest.mock import patch
+
+
+class TestMCPIntegration:
+    """Test cases for MCP health probing and circuit breakers."""
+
+    @pytest.fixture
+    def stub_server(self):
+        """A local MCP stub answering /health and /query."""
+        import threading
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.end_headers()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                body = b'{"success": true}'
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server.server_address[1]
+        server.shutdown()
+        server.server_close()
+
+    @staticmethod
+    def _unused_port():
+        import socket
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def test_probes_run_concurrently_and_are_cached(self, stub_server):
+        """Test that status comes from one parallel probe and is then served from cache."""
+        import time
+        from services.mcp_integration import MCPClient, MCPIntegrationService, MCPServerConfig
+
+        servers = {'up': MCPServerConfig('up', '127.0.0.1', stub_server)}
+        servers.update({f'down{i}': MCPServerConfig(f'down{i}', '127.0.0.1', self._unused_port())
+                        for i in range(5)})
+        service = MCPIntegrationService(servers, health_timeout=1, status_ttl=60)
+
+        real_health_check = MCPClient.health_check
+
+        def slow_health_check(client):
+            time.sleep(0.2)
+            return real_health_check(client)
+
+        with patch.object(MCPClient, 'health_check', autospec=True,
+                          side_effect=slow_health_check) as health_check:
+            start = time.monotonic()
+            status = service.get_server_status()
+            elapsed = time.monotonic() - start
+            assert service.get_server_status() == status
+        assert elapsed < 0.2 * len(servers)
+        assert health_check.call_count == len(servers)
+        assert status['up'] is True
+        assert not any(status[f'down{i}'] for i in range(5))
+
+    def test_circuit_opens_fails_fast_and_half_opens(self, stub_server):
+        """Test that a dead server is short-circuited until the reset timeout passes."""
+        import time
+        from services.mcp_integration import CircuitBreaker, MCPClient
+
+        client = MCPClient(f'http://127.0.0.1:{self._unused_port()}', timeout=1,
+                           breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+        assert client.query({})['success'] is False
+        assert client.query({})['success'] is False
+        assert client.breaker.state == CircuitBreaker.OPEN
+
+        with patch.object(client.session, 'post') as post:
+            result = client.query({})
+        post.assert_not_called()
+        assert result['circuit_open'] is True
+
+        # Server comes back: after the reset timeout one trial call closes the circuit
+        client.server_url = f'http://127.0.0.1:{stub_server}'
+        time.sleep(0.25)
+        assert client.breaker.state == CircuitBreaker.HALF_OPEN
+        assert client.query({}) == {'success': True}
+        assert client.breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,55 @@
+"""
+Unit tests for the AI agent memory manager.
+"""
+
+
+class TestMemoryManager:
+    """Test cases for the per-user memory manager."""
+
+    def test_memory_is_partitioned_per_user(self, tmp_path):
+        """Test that one user's interactions never appear in another user's context."""
+        from services.memory_manager import AdvancedMemoryManager
+
+        manager = AdvancedMemoryManager(str(tmp_path), max_active_users=1, background_consolidation=False)
+        manager.process_interaction('alice', 'hi', 'hello', 'greeting', {'client': 'Acme'}, {}, 0.5)
+        manager.process_interaction('bob', 'hi', 'hello', 'greeting', {'client': 'Globex'}, {}, 0.5)
+
+        # alice's shard was evicted to cold storage and is reloaded intact
+        assert list(manager._shards) == ['bob']
+        alice = manager.get_memory_influenced_response_context('alice', 'greeting')
+        bob = manager.get_memory_influenced_response_context('bob', 'greeting')
+        assert alice['active_parameters'] == {'client': 'Acme'}
+        assert bob['active_parameters'] == {'client': 'Globex'}
+
+    def test_eviction_writes_outside_the_shard_map_lock(self, tmp_path):
+        """Test that a slow eviction write blocks neither other users nor a reload of the same user."""
+        import threading
+        from unittest.mock import patch
+        from services.memory_manager import AdvancedMemoryManager
+
+        manager = AdvancedMemoryManager(str(tmp_path), max_active_users=1, background_consolidation=False)
+        alice = manager.shard('alice')
+
+        writing, release = threading.Event(), threading.Event()
+        original_save = manager._save_shard
+
+        def slow_save(shard):
+            if shard.user_id == 'alice':
+                writing.set()
+                release.wait(5)
+            original_save(shard)
+
+        with patch.object(manager, '_save_shard', side_effect=slow_save):
+            evictor = threading.Thread(target=manager.shard, args=('bob',))
+            evictor.start()
+            assert writing.wait(5)
+
+            # alice is being written; other users and alice herself are still served
+            carol = manager.shard('carol')
+            assert carol.user_id == 'carol'
+            assert manager.shard('alice') is alice
+            release.set()
+            evictor.join(5)
+
+        assert not evictor.is_alive()
+        assert manager._saving == {}
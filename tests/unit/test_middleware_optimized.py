@@ -0,0 +1,66 @@
+"""
+Unit tests for the optimized middleware.
+"""
+import json
+
+
+class TestStreamingCompression:
+    """Test cases for the streaming WSGI compression layer."""
+
+    def _app(self):
+        from flask import Flask, Response, jsonify
+        from middleware_optimized import OptimizedMiddleware
+
+        app = Flask(__name__)
+        OptimizedMiddleware(app)
+
+        @app.route('/listing')
+        def listing():
+            return jsonify([{'id': i, 'name': f'report {i}'} for i in range(500)])
+
+        @app.route('/export.csv')
+        def export():
+            def rows():
+                yield 'id,name\n'
+                for i in range(2000):
+                    yield f'{i},report {i}\n'
+            return Response(rows(), mimetype='text/csv')
+
+        @app.route('/tiny')
+        def tiny():
+            return jsonify(ok=True)
+
+        @app.route('/archive.zip')
+        def archive():
+            return Response(b'PK' + b'\x00' * 4096, mimetype='application/zip')
+
+        return app
+
+    def test_buffered_and_streamed_responses_are_gzipped(self):
+        """Test that JSON and streamed CSV bodies are compressed incrementally."""
+        import gzip
+
+        client = self._app().test_client()
+
+        response = client.get('/listing', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert json.loads(gzip.decompress(response.data))[499]['id'] == 499
+
+        response = client.get('/export.csv', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        lines = gzip.decompress(response.data).decode().splitlines()
+        assert lines[0] == 'id,name' and lines[-1] == '1999,report 1999'
+
+    def test_skips_small_binary_and_unaccepted_responses(self):
+        """Test that small bodies, archives and clients without gzip get identity."""
+        client = self._app().test_client()
+
+        assert 'Content-Encoding' not in client.get('/tiny', headers={'Accept-Encoding': 'gzip'}).headers
+        assert 'Content-Encoding' not in client.get('/archive.zip', headers={'Accept-Encoding': 'gzip'}).headers
+        assert 'Content-Encoding' not in client.get('/listing', headers={'Accept-Encoding': 'gzip;q=0'}).headers
+
+        response = client.get('/export.csv')
+        assert 'Content-Encoding' not in response.headers
+        assert response.data.startswith(b'id,name\n0,report 0\n')
@@ -157,6 +157,88 @@ class TestReport:
         expected = '<Report test-789: SAT - Test Report>'
         assert repr(report) == expected
 
+    def test_report_status_change_published(self, db_session, admin_user):
+        """Test that committed status transitions reach report and approver streams."""
+        from services.event_bus import event_bus, report_channel, user_channel
+
+        report = Report(
+            id='test-events',
+            type='SAT',
+            status='DRAFT',
+            user_email=admin_user.email,
+            approvals_json=json.dumps([
+                {'stage': 1, 'approver_email': 'approver1@test.com', 'status': 'pending'}
+            ])
+        )
+        db_session.add(report)
+        db_session.commit()
+
+        with event_bus.subscribe(report_channel('test-events')) as report_stream, \
+                event_bus.subscribe(user_channel('approver1@test.com')) as approver_stream:
+            report.status = 'PENDING'
+            db_session.commit()
+
+            report_event = report_stream.get(timeout=1)
+            approver_event = approver_stream.get(timeout=1)
+
+            report.status = 'APPROVED'
+            db_session.rollback()
+            assert report_stream.get(timeout=0.1) is None
+
+        assert report_event['type'] == 'report_status'
+        assert report_event['data']['status'] == 'PENDING'
+        assert report_event['data']['overall_status'] == 'pending'
+        assert approver_event['data']['report_id'] == 'test-events'
+
+
+class TestReportVersion:
+    """Test cases for delta-encoded report versions."""
+
+    def test_versions_rebuild_from_deltas(self, db_session, sample_report):
+        """Test that delta versions rebuild exactly and diff from their patches."""
+        import hashlib
+        from services.version_store import version_store
+
+        # Hex digests barely compress, so the keyframe is much larger than the delta
+        notes = ''.join(hashlib.sha256(str(i).encode()).hexdigest() for i in range(40))
+        base = {'context': {'DOCUMENT_TITLE': 'Report', 'NOTES': notes}}
+        edited = {'context': {'DOCUMENT_TITLE': 'Report v2', 'NOTES': notes}}
+
+        v1 = version_store.record_version(sample_report, base, 'a@test.com', version_number='R0')
+        v2 = version_store.record_version(sample_report, edited, 'a@test.com', version_number='R1')
+        db_session.commit()
+        version_store.cache.clear()
+
+        assert v1.is_keyframe is True
+        assert v2.is_keyframe is False
+        assert v2.base_version_id == v1.id
+        assert version_store.get_document(v2) == edited
+        assert version_store.get_document(v1) == base
+
+        diff = version_store.diff_versions(v1, v2)
+        assert [d['field'] for d in diff] == ['DOCUMENT_TITLE']
+        assert diff[0]['new_value'] == 'Report v2'
+
+    def test_edit_audit_patch_decodes(self, db_session, sample_report, admin_user):
+        """Test that compact and legacy ReportEdit rows both describe their changes."""
+        from models import ReportEdit
+        from services.version_store import encode_edit_patch, describe_edit
+
+        before = {'context': {'DOCUMENT_TITLE': 'Report', 'CLIENT_NAME': 'Acme'}}
+        after = {'context': {'DOCUMENT_TITLE': 'Report v2', 'CLIENT_NAME': 'Acme'}}
+        compact = ReportEdit(report_id=sample_report.id, editor_user_id=admin_user.id,
+                             editor_email=admin_user.email, before_json=None,
+                             after_json=encode_edit_patch(before, after))
+        legacy = ReportEdit(report_id=sample_report.id, editor_user_id=admin_user.id,
+                            editor_email=admin_user.email, before_json=json.dumps(before),
+                            after_json=json.dumps(after))
+        db_session.add_all([compact, legacy])
+        db_session.commit()
+
+        expected = [{'field': 'DOCUMENT_TITLE', 'change': 'replace', 'old': 'Report', 'new': 'Report v2'}]
+        assert describe_edit(compact) == expected
+        assert describe_edit(legacy) == expected
+
 
 class TestSATReport:
     """Test cases for SATReport model."""
@@ -0,0 +1,207 @@
+"""
+Unit tests for secrets management.
+"""
+import json
+from unittest.mock import MagicMock
+
+
+class TestSecretsManagerCache:
+    """Test cases for the lock-free secrets cache."""
+
+    def _manager(self, vault):
+        from config.secrets import SecretsManager
+
+        manager = SecretsManager()
+        manager.vault_client = vault
+        return manager
+
+    def test_concurrent_misses_fetch_once(self):
+        """Test that readers of a missing key share a single Vault fetch."""
+        import threading
+        import time
+
+        vault = MagicMock()
+        vault.get_secret.side_effect = lambda key: time.sleep(0.2) or {'value': key}
+        manager = self._manager(vault)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(manager.get_secret('db'))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [{'value': 'db'}] * 5
+        assert vault.get_secret.call_count == 1
+        assert manager.get_secret('db') == {'value': 'db'}
+        assert vault.get_secret.call_count == 1
+
+    def test_slow_fetch_does_not_block_other_keys(self):
+        """Test that a cached key is served while another key waits on Vault."""
+        import threading
+        import time
+
+        release = threading.Event()
+        vault = MagicMock()
+        vault.get_secret.side_effect = lambda key: release.wait(5) and {'value': key}
+        manager = self._manager(vault)
+        release.set()
+        manager.get_secret('fast')
+        release.clear()
+
+        slow = threading.Thread(target=manager.get_secret, args=('slow',))
+        slow.start()
+        started = time.monotonic()
+        assert manager.get_secret('fast') == {'value': 'fast'}
+        assert time.monotonic() - started < 1
+        release.set()
+        slow.join()
+
+    def test_entries_near_expiry_refresh_in_background(self):
+        """Test that a read in the refresh window returns at once and re-fetches."""
+        import time
+        from datetime import timedelta
+
+        vault = MagicMock()
+        vault.get_secret.side_effect = [{'value': 'v1'}, {'value': 'v2'}]
+        manager = self._manager(vault)
+        now = [1000.0]
+        manager.clock = lambda: now[0]
+        manager.default_cache_duration = timedelta(seconds=10)
+        manager.refresh_ahead = 0.5
+
+        assert manager.get_secret('key') == {'value': 'v1'}
+        now[0] += 6
+        assert manager.get_secret('key') == {'value': 'v1'}
+        deadline = time.monotonic() + 2
+        while manager.get_secret('key') != {'value': 'v2'} and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert manager.get_secret('key') == {'value': 'v2'}
+        assert vault.get_secret.call_count == 2
+
+    def test_last_good_value_served_during_outage(self):
+        """Test stale-while-revalidate when Vault is down, bounded by max_stale."""
+        from datetime import timedelta
+        from config.secrets import VaultUnavailableError
+
+        vault = MagicMock()
+        vault.get_secret.return_value = {'value': 'good'}
+        manager = self._manager(vault)
+        now = [1000.0]
+        manager.clock = lambda: now[0]
+        manager.default_cache_duration = timedelta(seconds=60)
+        manager.max_stale = timedelta(seconds=600)
+        manager.get_secret('db/password')
+
+        vault.get_secret.side_effect = VaultUnavailableError('connection refused')
+        now[0] += 61
+        assert manager.get_secret('db/password') == {'value': 'good'}
+        # The stale value is re-cached briefly so the outage is not hammered
+        now[0] += manager.STALE_RETRY_SECONDS - 1
+        assert manager.get_secret('db/password') == {'value': 'good'}
+        assert vault.get_secret.call_count == 2
+
+        now[0] += 600
+        assert manager.get_secret('db/password') is None
+        assert manager.get_status()['cached_secrets'] == 0
+
+    def test_put_invalidates_cached_value(self):
+        """Test that writing a secret drops the cached copy."""
+        vault = MagicMock()
+        vault.get_secret.side_effect = [{'value': 'old'}, {'value': 'new'}]
+        vault.put_secret.return_value = True
+        manager = self._manager(vault)
+
+        assert manager.get_secret('key') == {'value': 'old'}
+        assert manager.put_secret('key', 'new')
+        assert manager.get_secret('key') == {'value': 'new'}
+        assert manager.get_status()['cached_secrets'] == 1
+
+
+
+
+
+class TestLocalSecretsStore:
+    """Test cases for the append-only local secrets log."""
+
+    def _manager(self, path):
+        from config.secrets import LocalSecretsManager
+
+        return LocalSecretsManager(str(path), master_key='test-master-key')
+
+    def test_writes_append_one_record_and_replay(self, tmp_path):
+        """Test that each write adds a line and a reload replays the log."""
+        path = tmp_path / 'secrets.enc'
+        manager = self._manager(path)
+        manager.put_secret('db_password', 'one')
+        manager.put_secret('api_key', {'token': 'abc'})
+        manager.put_secret('db_password', 'two')
+        manager.delete_secret('api_key')
+
+        assert len(path.read_bytes().splitlines()) == 4
+        reloaded = self._manager(path)
+        assert reloaded.list_secrets() == ['db_password']
+        assert reloaded.get_secret('db_password') == 'two'
+        assert reloaded.metadata_cache['db_password'].version == 2
+
+    def test_log_is_compacted(self, tmp_path):
+        """Test that superseded records are folded into one snapshot."""
+        path = tmp_path / 'secrets.enc'
+        manager = self._manager(path)
+        manager.COMPACT_MIN_RECORDS = 5
+        for i in range(12):
+            manager.put_secret('rotating', f'value-{i}')
+
+        assert len(path.read_bytes().splitlines()) < 5
+        assert self._manager(path).get_secret('rotating') == 'value-11'
+
+    def test_reads_keep_access_metadata_in_memory(self, tmp_path):
+        """Test that reads count accesses without ever writing the file."""
+        path = tmp_path / 'secrets.enc'
+        manager = self._manager(path)
+        manager.ACCESS_FOLD_THRESHOLD = 2
+        manager.put_secret('key', 'value')
+        content = path.read_bytes()
+
+        for _ in range(3):
+            assert manager.get_secret('key') == 'value'
+        manager.flush_access_metadata()
+
+        assert manager.metadata_cache['key'].access_count == 3
+        assert path.read_bytes() == content
+
+    def test_compaction_keeps_records_of_other_processes(self, tmp_path):
+        """Test that compacting replays what other processes appended since loading."""
+        path = tmp_path / 'secrets.enc'
+        web = self._manager(path)
+        web.COMPACT_MIN_RECORDS = 5
+        web.put_secret('shared', 'web')
+
+        cli = self._manager(path)
+        cli.put_secret('rotated', 'from-cli')
+        cli.delete_secret('shared')
+
+        # The fifth record this process wrote triggers compaction
+        for i in range(4):
+            web.put_secret('counter', str(i))
+
+        assert len(path.read_bytes().splitlines()) == 1
+        reloaded = self._manager(path)
+        assert reloaded.get_secret('rotated') == 'from-cli'
+        assert reloaded.get_secret('counter') == '3'
+        assert 'shared' not in reloaded.list_secrets()
+
+    def test_reads_snapshot_written_by_older_versions(self, tmp_path):
+        """Test that a file holding one encrypted map (the old format) still loads."""
+        path = tmp_path / 'secrets.enc'
+        manager = self._manager(path)
+        path.write_bytes(manager.cipher.encrypt(json.dumps({
+            'secrets': {'legacy': 'value'},
+            'metadata': {'legacy': {'version': 3, 'access_count': 7}},
+        }).encode()))
+
+        reloaded = self._manager(path)
+        assert reloaded.get_secret('legacy') == 'value'
+        assert reloaded.metadata_cache['legacy'].version == 3
+        reloaded.put_secret('new', 'x')
+        assert self._manager(path).list_secrets() == ['legacy', 'new']
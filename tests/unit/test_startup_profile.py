@@ -0,0 +1,41 @@
+"""
+Unit tests for startup import profiling.
+"""
+import os
+
+
+class TestStartupProfile:
+    """Test cases for lazy service singletons and the startup profile."""
+
+    def test_importing_ai_services_builds_no_singletons(self):
+        """Test that importing the AI modules defers their heavy singletons."""
+        import subprocess
+        import sys
+
+        script = (
+            "import services.ai_agent as a, services.memory_manager as m, services.mcp_integration as c\n"
+            "print(a._ai_agent, m._memory_manager, c._mcp_service)"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        result = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split() == ['None', 'None', 'None']
+
+    def test_importtime_output_is_aggregated_per_package(self):
+        """Test parsing of ``-X importtime`` output."""
+        from services.startup_profile import parse_importtime, summarize_imports
+
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |     sqlalchemy.orm\n"
+            "import time:        50 |        150 |   sqlalchemy\n"
+            "import time:        30 |        180 | models\n"
+        )
+        entries = parse_importtime(output)
+        assert [(e['module'], e['depth']) for e in entries] == [
+            ('sqlalchemy.orm', 2), ('sqlalchemy', 1), ('models', 0)]
+
+        summary = summarize_imports(entries)
+        assert summary['total_import_us'] == 180
+        assert summary['packages'] == [('sqlalchemy', 150), ('models', 30)]
+        assert summary['modules'][0]['module'] == 'models'
@@ -0,0 +1,109 @@
+"""
+Unit tests for the static asset build.
+"""
+
+
+class TestStaticAssetBuild:
+    """Test cases for fingerprinted, precompressed static assets."""
+
+    def _app(self, static):
+        from flask import Flask
+        from middleware_optimized import OptimizedMiddleware
+
+        app = Flask(__name__, static_folder=str(static))
+        OptimizedMiddleware(app)
+        return app
+
+    def test_build_fingerprints_and_precompresses(self, tmp_path):
+        """Test that the build writes hashed copies, gzip siblings and a manifest."""
+        import gzip
+        from cache.static_assets import build_static_assets, AssetManifest
+
+        static = tmp_path / 'static'
+        (static / 'css').mkdir(parents=True)
+        (static / 'signatures').mkdir()
+        css = 'body { color: #333; }\n' * 50
+        (static / 'css' / 'main.css').write_text(css)
+        (static / 'logo.png').write_bytes(b'\x89PNG' + b'\x00' * 10)
+        (static / 'signatures' / 'user.png').write_bytes(b'\x89PNG')
+
+        result = build_static_assets(str(static), use_brotli=False)
+        manifest = AssetManifest.read(result['manifest'])
+
+        built = manifest['assets']['css/main.css']
+        assert built.startswith('dist/css/main.') and built.endswith('.css')
+        assert 'signatures/user.png' not in manifest['assets']
+        assert manifest['encodings'] == {built: ['gzip']}
+        assert gzip.decompress((static / (built + '.gz')).read_bytes()).decode() == css
+
+        # An unchanged tree rebuilds without writing; a changed file replaces its output
+        assert build_static_assets(str(static), use_brotli=False)['written'] == 0
+        (static / 'css' / 'main.css').write_text(css + 'p {}\n')
+        build_static_assets(str(static), use_brotli=False)
+        (static / 'css' / 'main.css').write_text(css + 'a {}\n')
+        build_static_assets(str(static), use_brotli=False)
+        assert not (static / built).exists()
+
+    def test_css_references_point_at_built_assets(self, tmp_path):
+        """Test that relative url() and @import references follow their fingerprinted targets."""
+        from cache.static_assets import build_static_assets, AssetManifest
+
+        static = tmp_path / 'static'
+        (static / 'css').mkdir(parents=True)
+        (static / 'img').mkdir()
+        (static / 'css' / 'notifications.css').write_text('.badge { color: red; }\n')
+        (static / 'img' / 'bg.png').write_bytes(b'\x89PNG' + b'\x01' * 10)
+        (static / 'css' / 'form.css').write_text(
+            "@import url('notifications.css');\n"
+            'body { background: url("../img/bg.png?v=2"); }\n'
+            ".icon { background: url(data:image/png;base64,AAAA); }\n"
+            ".logo { background: url(/static/logo.png); }\n"
+        )
+
+        result = build_static_assets(str(static), use_brotli=False)
+        assets = AssetManifest.read(result['manifest'])['assets']
+        built = (static / assets['css/form.css']).read_text()
+
+        notifications = assets['css/notifications.css'].rsplit('/', 1)[1]
+        assert f"@import url('{notifications}');" in built
+        assert f'url("../{assets["img/bg.png"][len("dist/"):]}?v=2")' in built
+        assert 'url(data:image/png;base64,AAAA)' in built
+        assert 'url(/static/logo.png)' in built
+
+        # Changing an imported stylesheet gives the importer a new name too
+        (static / 'css' / 'notifications.css').write_text('.badge { color: blue; }\n')
+        rebuilt = AssetManifest.read(build_static_assets(str(static), use_brotli=False)['manifest'])
+        assert rebuilt['assets']['css/form.css'] != assets['css/form.css']
+
+    def test_middleware_serves_precompressed_variant(self, tmp_path):
+        """Test that built assets are served precompressed, fingerprinted and immutable."""
+        from flask import url_for
+        from cache.static_assets import build_static_assets
+
+        static = tmp_path / 'static'
+        static.mkdir()
+        (static / 'app.js').write_text('console.log("hello");\n' * 40)
+        (static / 'plain.txt').write_text('not built')
+        build_static_assets(str(static), use_brotli=False)
+
+        app = self._app(static)
+        with app.test_request_context():
+            url = url_for('static', filename='app.js')
+        assert url.startswith('/static/dist/app.') and url.endswith('.js')
+
+        client = app.test_client()
+        response = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype in ('application/javascript', 'text/javascript')
+        assert 'immutable' in response.headers['Cache-Control']
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        response.close()
+
+        response = client.get(url)
+        assert 'Content-Encoding' not in response.headers
+        assert response.data.startswith(b'console.log')
+        response.close()
+
+        response = client.get('/static/plain.txt')
+        assert 'immutable' not in response.headers['Cache-Control']
+        response.close()
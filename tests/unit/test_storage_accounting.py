@@ -0,0 +1,56 @@
+"""
+Unit tests for storage accounting.
+"""
+import os
+from unittest.mock import patch
+
+
+class TestStorageAccounting:
+    """Test cases for the upload and output storage counters."""
+
+    def _accountant(self, tmp_path):
+        from services.storage_accounting import StorageAccountant
+
+        accountant = StorageAccountant()
+        accountant._redis = lambda: None
+        accountant.configure({'outputs': str(tmp_path / 'outputs'), 'uploads': str(tmp_path / 'uploads')})
+        (tmp_path / 'outputs').mkdir()
+        (tmp_path / 'uploads').mkdir()
+        return accountant
+
+    def test_counters_follow_writes_and_deletes(self, tmp_path):
+        """Test that tracked writes and deletes keep the counters equal to a walk."""
+        from services.storage_accounting import walk_usage
+
+        accountant = self._accountant(tmp_path)
+        (tmp_path / 'outputs' / 'old.pdf').write_bytes(b'x' * 100)
+        assert accountant.snapshot('outputs')['files'] == 1
+
+        report = tmp_path / 'outputs' / 'SAT_1.docx'
+        with accountant.track_write(str(report)):
+            report.write_bytes(b'x' * 300)
+        with accountant.track_write(str(report)):
+            report.write_bytes(b'x' * 50)
+        accountant.remove(str(tmp_path / 'outputs' / 'old.pdf'))
+        with accountant.track_write(str(tmp_path / 'elsewhere.txt')):
+            (tmp_path / 'elsewhere.txt').write_bytes(b'ignored')
+
+        usage = accountant.snapshot('outputs')
+        expected = walk_usage(str(tmp_path / 'outputs'))
+        assert (usage['files'], usage['bytes'], usage['file_types']) == (1, 50, {'docx': 1})
+        assert (usage['files'], usage['bytes'], usage['file_types']) == \
+            (expected['files'], expected['bytes'], expected['file_types'])
+        assert accountant.snapshot('uploads')['files'] == 0
+
+    def test_snapshot_does_not_walk_until_stale(self, tmp_path):
+        """Test that reads come from the counters and reconciliation catches untracked files."""
+        accountant = self._accountant(tmp_path)
+        accountant.snapshot('outputs')
+
+        (tmp_path / 'outputs' / 'manual.docx').write_bytes(b'x' * 10)
+        with patch('services.storage_accounting.os.walk') as walk:
+            assert accountant.snapshot('outputs')['files'] == 0
+            walk.assert_not_called()
+
+        accountant.reconcile()
+        assert accountant.snapshot('outputs')['bytes'] == 10
@@ -0,0 +1,67 @@
+"""
+Unit tests for the database-backed submission store.
+"""
+import json
+import pytest
+from unittest.mock import patch
+from models import Report
+
+
+class TestSubmissionStore:
+    """Test cases for approval storage and the legacy submissions.json import."""
+
+    @pytest.fixture(autouse=True)
+    def _clean_session(self, db_session):
+        """Start from a usable session even if an earlier test left a failed flush behind."""
+        db_session.rollback()
+        yield
+        db_session.rollback()
+
+    def test_legacy_submission_imported_on_access(self, app, db_session, tmp_path):
+        """Test that approval links to legacy submissions.json entries still resolve."""
+        from services.submission_store import load_submission, store_submission
+
+        legacy_file = tmp_path / 'submissions.json'
+        legacy_file.write_text(json.dumps({
+            'legacy-1': {
+                'context': {'DOCUMENT_TITLE': 'Legacy Report'},
+                'user_email': 'engineer@test.com',
+                'approvals': [{'stage': 1, 'status': 'pending', 'approver_email': 'am@test.com'}]
+            }
+        }))
+        app.config['SUBMISSIONS_FILE'] = str(legacy_file)
+
+        report, sat_report, data = load_submission('legacy-1', for_update=True)
+        assert report.document_title == 'Legacy Report'
+        assert data['approvals'][0]['approver_email'] == 'am@test.com'
+
+        data['approvals'][0]['status'] = 'approved'
+        store_submission(report, sat_report, data)
+        db_session.commit()
+
+        stored = json.loads(Report.query.get('legacy-1').approvals_json)
+        assert stored[0]['status'] == 'approved'
+        assert load_submission('missing-id') == (None, None, None)
+
+    def test_legacy_file_parsed_once_until_it_changes(self, app, db_session, tmp_path):
+        """Test that misses reuse the parsed legacy file until it is modified."""
+        import os
+        from services import submission_store
+
+        legacy_file = tmp_path / 'submissions.json'
+        legacy_file.write_text(json.dumps({'legacy-2': {'context': {}}}))
+        app.config['SUBMISSIONS_FILE'] = str(legacy_file)
+
+        with patch.object(submission_store, 'read_legacy_submissions',
+                          wraps=submission_store.read_legacy_submissions) as read:
+            for _ in range(3):
+                assert submission_store.load_submission('unknown-id') == (None, None, None)
+            assert read.call_count == 1
+
+            legacy_file.write_text(json.dumps({'legacy-3': {'context': {'DOCUMENT_TITLE': 'New'}}}))
+            stat = legacy_file.stat()
+            os.utime(legacy_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            report, _, _ = submission_store.load_submission('legacy-3')
+            assert read.call_count == 2
+
+        assert report.document_title == 'New'
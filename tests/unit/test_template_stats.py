@@ -0,0 +1,69 @@
+"""
+Unit tests for template usage statistics.
+"""
+import pytest
+from models import Report
+
+
+class TestTemplateStats:
+    """Test cases for SQL-computed, cached template usage statistics."""
+
+    @pytest.fixture(autouse=True)
+    def _clean_session(self, db_session):
+        """Start from a usable session even if an earlier test left a failed flush behind."""
+        db_session.rollback()
+        yield
+        db_session.rollback()
+
+    def _templates(self, db_session):
+        from models import ReportTemplate
+
+        sat = ReportTemplate(name='SAT v2', type='SAT', created_by='admin@example.com', usage_count=0)
+        fds = ReportTemplate(name='FDS', type='FDS', created_by='admin@example.com', usage_count=0)
+        db_session.add_all([sat, fds])
+        db_session.commit()
+        return sat, fds
+
+    def test_stats_are_per_template(self, app, db_session):
+        """Test that reports are attributed to their template and counted in SQL."""
+        from services.template_stats import compute_template_stats, template_stats_cache
+
+        template_stats_cache.clear()
+        sat, fds = self._templates(db_session)
+        for i, (status, email) in enumerate([('DRAFT', 'a@example.com'), ('PENDING', 'a@example.com'),
+                                             ('TECH_APPROVED', 'b@example.com')]):
+            db_session.add(Report(id=f'tpl-{i}', type='SAT', status=status, user_email=email))
+        db_session.add(Report(id='tpl-fds', type='FDS', user_email='a@example.com'))
+        db_session.add(Report(id='tpl-none', type='HDS', user_email='a@example.com'))
+        db_session.commit()
+
+        assert db_session.get(Report, 'tpl-0').template_id == sat.id
+        assert db_session.get(Report, 'tpl-none').template_id is None
+        assert (sat.usage_count, fds.usage_count) == (3, 1)
+
+        stats = compute_template_stats(sat)
+        assert stats == {
+            'total_uses': 3,
+            'last_30_days': 3,
+            'by_user': {'a@example.com': 2, 'b@example.com': 1},
+            'by_status': {'DRAFT': 1, 'PENDING': 1, 'APPROVED': 0, 'TECH_APPROVED': 1},
+        }
+
+    def test_cached_stats_invalidated_by_report_changes(self, app, db_session):
+        """Test that creating or deleting a report drops only its template's cached stats."""
+        from services.template_stats import get_template_stats, template_stats_cache
+
+        template_stats_cache.clear()
+        sat, fds = self._templates(db_session)
+        assert get_template_stats(sat)['total_uses'] == 0
+        get_template_stats(fds)
+
+        db_session.add(Report(id='tpl-new', type='SAT', user_email='a@example.com'))
+        db_session.commit()
+        assert template_stats_cache.get(fds.id) is not None
+        assert get_template_stats(sat)['by_user'] == {'a@example.com': 1}
+
+        db_session.delete(db_session.get(Report, 'tpl-new'))
+        db_session.commit()
+        stats = get_template_stats(sat)
+        assert (stats['total_uses'], stats['by_user']) == (0, {})
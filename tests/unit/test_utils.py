@@ -136,6 +136,54 @@ class TestNotificationUtils:
             assert 'fully approved' in notification.message
             assert notification.type == 'completion'
 
+    def test_unread_count_served_from_counter(self, app, db_session):
+        """Test that counters follow create/read without re-counting."""
+        from services.notification_counters import notification_counters
+
+        with app.app_context():
+            assert get_unread_count('counter@test.com') == 0
+
+            first = Notification.create_notification(
+                user_email='counter@test.com',
+                title='One',
+                message='Message',
+                notification_type='status_update'
+            )
+            Notification.create_notification(
+                user_email='counter@test.com',
+                title='Two',
+                message='Message',
+                notification_type='status_update'
+            )
+            assert notification_counters.get_cached('counter@test.com') == 2
+
+            first.read = True
+            db_session.commit()
+            assert notification_counters.get_cached('counter@test.com') == 1
+
+            with patch.object(Notification, 'query') as mock_query:
+                assert get_unread_count('counter@test.com') == 1
+                mock_query.filter_by.assert_not_called()
+
+    def test_new_notification_published_to_stream(self, app, db_session):
+        """Test that count changes and new notifications reach subscribers."""
+        from services.event_bus import event_bus, user_channel
+
+        with app.app_context():
+            get_unread_count('stream@test.com')
+            with event_bus.subscribe(user_channel('stream@test.com')) as subscription:
+                Notification.create_notification(
+                    user_email='stream@test.com',
+                    title='Pushed',
+                    message='Message',
+                    notification_type='status_update'
+                )
+                events = [subscription.get(timeout=1), subscription.get(timeout=1)]
+
+            by_type = {event['type']: event['data'] for event in events}
+            assert by_type['unread_count']['count'] == 1
+            assert by_type['notification']['title'] == 'Pushed'
+
 
 class TestFileOperations:
     """Test cases for file operation utilities."""
@@ -425,4 +473,4 @@ class TestApprovalWorkflow:
             assert len(approvals) == 1
             assert approvals[0]['approver_email'] == 'custom@test.com'
             assert approvals[0]['status'] == 'pending'
-            assert locked is False
\ No newline at end of file
+            assert locked is False
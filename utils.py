@@ -21,7 +21,6 @@ from datetime import datetime
 def get_unread_count(user_email=None):
     """Get unread notifications count for a user"""
     try:
-        from models import Notification
         from flask_login import current_user
 
         if not user_email and current_user.is_authenticated:
@@ -30,10 +29,8 @@ def get_unread_count(user_email=None):
         if not user_email:
             return 0
 
-        return Notification.query.filter_by(
-            user_email=user_email,
-            read=False
-        ).count()
+        from services.notification_counters import notification_counters
+        return notification_counters.get_unread_count(user_email)
     except Exception as e:
         if current_app:
             current_app.logger.warning(f"Could not get unread count: {e}")
@@ -1370,18 +1367,3 @@ def generate_sat_report(data):
     """Generate SAT report (placeholder)"""
     print("Generating SAT report...")
     return {"success": True, "filename": "SAT_Report_Final.docx"}
-
-def get_unread_count():
-    """Get unread notification count for current user"""
-    try:
-        from flask_login import current_user
-        if current_user.is_authenticated:
-            from models import Notification
-            count = Notification.query.filter_by(
-                user_email=current_user.email,
-                read=False
-            ).count()
-            return count
-    except Exception as e:
-        print(f"Error getting unread count: {e}")
-    return 0
\ No newline at end of file
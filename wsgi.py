@@ -18,13 +18,18 @@ def run_production_server():
     print(f"Starting SAT Report Generator on {host}:{port}")
     print("Using optimized Waitress production server")
     
+    # Each open notification/status stream holds a thread, so streams get
+    # their own threads on top of the request threads
+    from services.event_bus import DEFAULT_MAX_STREAMS
+    max_streams = app.config.get('SSE_MAX_STREAMS', DEFAULT_MAX_STREAMS)
+
     # Optimized Waitress configuration for better performance
     serve(
         app,
         host=host,
         port=port,
-        threads=6,  # Optimal thread count for most systems
-        connection_limit=50,  # Prevent connection overload
+        threads=6 + max_streams,  # 6 request threads plus one per stream
+        connection_limit=50 + max_streams,  # Prevent connection overload
         cleanup_interval=10,  # Frequent cleanup of idle connections
         channel_timeout=60,  # Reasonable timeout for idle connections
         ident='SAT-Report-Generator',